@@ -1,10 +1,16 @@
 import json
+import numpy as np
 from datetime import datetime
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Union, Tuple
 import csv
 from pathlib import Path
+from .csv_loader import (CsvBlock, iter_csv_blocks, string_mask, parse_float_column, unique_codes, map_unique,
+                         append_notes, join_notes, add_count, build_records)
+from .jsonl_loader import JsonlBlock, iter_jsonl_blocks, float_column, int_column, epoch_microseconds
 from .models import ADSData, DataCleaningStats
+from .ingest_checkpoint import FileCheckpoint, open_checkpoint_range
+from .utils import iter_batches
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,15 +27,68 @@ class ADSBProcessor:
         """
         处理ADS-B文件，支持JSONL和CSV格式
         """
+        return list(self.iter_adsb_file(file_path))
+
+    def iter_adsb_file(self, file_path: str,
+                       batch_size: int = 0) -> Iterator[Union[ADSData, List[ADSData]]]:
+        """
+        惰性处理ADS-B文件，逐条产出ADSData；batch_size>0时按固定大小批次产出列表。
+        文件按行流式读取，内存占用与文件大小无关
+        """
+        logger.info(f"开始处理ADS-B文件: {file_path}")
+
+        # 重置清洗统计
+        self.cleaning_stats = DataCleaningStats()
+
+        file_path = Path(file_path)
+        file_format = self.detect_format(file_path)
+        if file_format is None:
+            return
+
+        if file_format == 'csv':
+            records = self._iter_csv_file(file_path)
+        else:
+            records = self._iter_jsonl_file(file_path)
+
+        if batch_size and batch_size > 0:
+            yield from iter_batches(records, batch_size)
+        else:
+            yield from records
+
+    def iter_adsb_columns(self, file_path: str,
+                          checkpoint: Optional[FileCheckpoint] = None) -> Iterator[Dict[str, Any]]:
+        """
+        惰性处理ADS-B文件，逐块产出清洗后的列数据（字段名 -> 数组），可直接追加到TrackStore，
+        不构造逐条记录对象。给出checkpoint时只解码检查点偏移之后新增的完整行，全部产出后推进检查点
+        """
         logger.info(f"开始处理ADS-B文件: {file_path}")
 
         # 重置清洗统计
         self.cleaning_stats = DataCleaningStats()
 
+        file_path = Path(file_path)
+        file_format = self.detect_format(file_path)
+        if file_format is None:
+            return
+
+        if checkpoint is not None:
+            lines, end = open_checkpoint_range(checkpoint)
+            if checkpoint.file_format == 'csv':
+                yield from self.iter_csv_columns(lines, fieldnames=checkpoint.header)
+            else:
+                yield from self.iter_jsonl_columns(lines)
+            checkpoint.advance(end)
+        elif file_format == 'csv':
+            yield from self._iter_csv_file_columns(file_path)
+        else:
+            yield from self._iter_jsonl_file_columns(file_path)
+
+    def detect_format(self, file_path: Path) -> Optional[str]:
+        """检测ADS-B文件格式，返回 'jsonl' 或 'csv'，文件不可读时返回None"""
         file_path = Path(file_path)
         if not file_path.exists():
             logger.error(f"ADS-B文件不存在: {file_path}")
-            return []
+            return None
 
         # 检测文件格式
         try:
@@ -38,18 +97,18 @@ class ADSBProcessor:
 
             if self._is_jsonl_format(first_line):
                 logger.info("检测到JSONL格式的ADS-B数据")
-                return self._decode_jsonl_file(file_path)
+                return 'jsonl'
             elif self._is_csv_format(first_line):
                 logger.info("检测到CSV格式的ADS-B数据")
-                return self._decode_csv_file(file_path)
+                return 'csv'
             else:
                 logger.warning(f"无法识别的ADS-B文件格式，第一行: {first_line[:100]}...")
                 # 尝试JSONL格式解码
-                return self._decode_jsonl_file(file_path)
+                return 'jsonl'
 
         except Exception as e:
             logger.error(f"检测文件格式时出错: {str(e)}")
-            return []
+            return None
 
     def _is_csv_format(self, first_line: str) -> bool:
         """检查是否为CSV格式"""
@@ -90,436 +149,399 @@ class ADSBProcessor:
         adsb_indicators = ['"latitude"', '"longitude"', '"altitude"', '"aircraft"', '"speed"']
         return any(indicator in first_line for indicator in adsb_indicators)
 
-    def _decode_csv_file(self, file_path: Path) -> List[ADSData]:
-        """解码CSV格式的ADS-B文件"""
-        decoded_records = []
+    def _iter_csv_file(self, file_path: Path) -> Iterator[ADSData]:
+        """流式解码CSV格式的ADS-B文件"""
+        for columns in self._iter_csv_file_columns(file_path):
+            yield from build_records(ADSData, columns, len(columns['aircraft_id']))
 
+    def _iter_csv_file_columns(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """流式读取CSV格式的ADS-B文件，逐块产出清洗后的列数据"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # 使用DictReader自动处理列名
-                csv_reader = csv.DictReader(f)
-                total_rows = 0
-                valid_count = 0
-
-                for row_num, row in enumerate(csv_reader, 1):
-                    total_rows = row_num
-                    self.cleaning_stats.total_records += 1
-
-                    try:
-                        # 解析必需字段
-                        aircraft_id = row.get('flight', '').strip()
-                        tail_number = row.get('tail_number', '').strip()
-                        lon_str = row.get('long', '').strip()
-                        lat_str = row.get('lat', '').strip()
-                        alt_str = row.get('alt', '').strip()
-
-                        # 数据清洗检查
-                        cleaning_notes = []
-                        data_status = "normal"
-
-                        # 检查核心字段缺失
-                        if not aircraft_id:
-                            aircraft_id = tail_number if tail_number else "unknown"
-                            if not aircraft_id or aircraft_id == 'unknown':
-                                cleaning_notes.append("飞行标识缺失")
-                                data_status = "warning"
-                                self.cleaning_stats.warning_records += 1
-                                self.cleaning_stats.warnings_by_type['missing_aircraft_id'] = \
-                                    self.cleaning_stats.warnings_by_type.get('missing_aircraft_id', 0) + 1
-
-                        if not tail_number or tail_number == 'unknown':
-                            cleaning_notes.append("飞机尾号缺失")
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warning_records += 1
-                            self.cleaning_stats.warnings_by_type['missing_tail_number'] = \
-                                self.cleaning_stats.warnings_by_type.get('missing_tail_number', 0) + 1
-
-                        if not lon_str or not lat_str:
-                            cleaning_notes.append("经纬度缺失")
-                            data_status = "error"  # 没有位置数据，剔除
-                            self.cleaning_stats.error_records += 1
-                            self.cleaning_stats.errors_by_type['missing_coordinates'] = \
-                                self.cleaning_stats.errors_by_type.get('missing_coordinates', 0) + 1
-                            continue
-
-                        # 转换数据类型并验证
-                        try:
-                            lon = float(lon_str)
-                            lat = float(lat_str)
-                        except ValueError:
-                            cleaning_notes.append(f"坐标格式错误: LON={lon_str}, LAT={lat_str}")
-                            data_status = "error"
-                            self.cleaning_stats.error_records += 1
-                            self.cleaning_stats.errors_by_type['coordinate_format'] = \
-                                self.cleaning_stats.errors_by_type.get('coordinate_format', 0) + 1
-                            continue
-
-                        # 验证坐标范围
-                        if not (-90 <= lat <= 90):
-                            cleaning_notes.append(f"纬度超出范围: {lat}")
-                            data_status = "error"
-                            self.cleaning_stats.error_records += 1
-                            self.cleaning_stats.errors_by_type['latitude_range'] = \
-                                self.cleaning_stats.errors_by_type.get('latitude_range', 0) + 1
-                            continue
-
-                        if not (-180 <= lon <= 180):
-                            cleaning_notes.append(f"经度超出范围: {lon}")
-                            data_status = "error"
-                            self.cleaning_stats.error_records += 1
-                            self.cleaning_stats.errors_by_type['longitude_range'] = \
-                                self.cleaning_stats.errors_by_type.get('longitude_range', 0) + 1
-                            continue
-
-                        # 检查异常坐标（如0,0海洋交叉点）
-                        if lat == 0 and lon == 0:
-                            cleaning_notes.append("可疑坐标(0,0)")
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warnings_by_type['suspicious_coordinates'] = \
-                                self.cleaning_stats.warnings_by_type.get('suspicious_coordinates', 0) + 1
-
-                        # 解析高度并进行清洗
-                        altitude_ft = 0.0
-                        if alt_str:
-                            try:
-                                altitude_ft = float(alt_str)
-                            except ValueError:
-                                cleaning_notes.append(f"高度格式错误: {alt_str}")
-                                altitude_ft = 0.0
-
-                        # 检查高度异常（负数或过高）
-                        if altitude_ft < 0:
-                            cleaning_notes.append(f"高度为负数: {altitude_ft}")
-                            data_status = "error"
-                            self.cleaning_stats.error_records += 1
-                            self.cleaning_stats.errors_by_type['negative_altitude'] = \
-                                self.cleaning_stats.errors_by_type.get('negative_altitude', 0) + 1
-                            continue
-
-                        if altitude_ft > 60000:  # 假设商业飞机最大飞行高度
-                            cleaning_notes.append(f"高度异常高: {altitude_ft}")
-                            altitude_ft = min(altitude_ft, 60000)  # 截断到合理范围
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warnings_by_type['high_altitude'] = \
-                                self.cleaning_stats.warnings_by_type.get('high_altitude', 0) + 1
-
-                        # 解析地速并进行清洗（mph转换为kts）
-                        ground_speed_kts = 0.0
-                        mph_str = row.get('mph', '').strip()
-                        if mph_str:
-                            try:
-                                mph = float(mph_str)
-                                ground_speed_kts = mph * 0.868976  # mph转换为kts
-                            except ValueError:
-                                cleaning_notes.append(f"速度格式错误: {mph_str}")
-
-                        # 检查地速异常
-                        if ground_speed_kts < 0 or ground_speed_kts > 1000:
-                            cleaning_notes.append(f"地速异常: {ground_speed_kts} kts")
-                            ground_speed_kts = max(0, min(ground_speed_kts, 1000))
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warnings_by_type['speed_range'] = \
-                                self.cleaning_stats.warnings_by_type.get('speed_range', 0) + 1
-
-                        # 解析其他字段
-                        squawk = row.get('squawk', '').strip()
-                        manufacturer = row.get('manufacturer', '').strip()
-                        model = row.get('model', '').strip()
-
-                        # 解析时间戳
-                        spotted_str = row.get('spotted', '').strip()
-                        timestamp = datetime.now()  # 默认值
-
-                        if spotted_str:
-                            try:
-                                # 尝试解析 "11/7/22 13:30" 格式
-                                if '/' in spotted_str and ':' in spotted_str:
-                                    # 分割日期和时间
-                                    date_part, time_part = spotted_str.split(' ')
-                                    month, day, year = date_part.split('/')
-                                    hour, minute = time_part.split(':')
-
-                                    # 处理年份（假设20xx年）
-                                    year_int = int(year)
-                                    if year_int < 100:
-                                        year_int += 2000
-
-                                    timestamp = datetime(year_int, int(month), int(day),
-                                                         int(hour), int(minute))
-                            except Exception:
-                                cleaning_notes.append(f"时间戳格式错误: {spotted_str}")
-                                data_status = "warning" if data_status == "normal" else data_status
-                                self.cleaning_stats.warnings_by_type['timestamp_format'] = \
-                                    self.cleaning_stats.warnings_by_type.get('timestamp_format', 0) + 1
-
-                        # 创建ADS-B数据对象
-                        adsb_data = ADSData(
-                            aircraft_id=aircraft_id,
-                            latitude=lat,
-                            longitude=lon,
-                            altitude_ft=altitude_ft,
-                            ground_speed_kts=ground_speed_kts,
-                            heading_deg=0.0,  # CSV格式没有航向信息
-                            aircraft_tail=tail_number,
-                            timestamp=timestamp,
-                            data_type="adsb",
-                            data_status=data_status,
-                            cleaning_notes="; ".join(cleaning_notes) if cleaning_notes else ""
-                        )
-
-                        decoded_records.append(adsb_data)
-                        valid_count += 1
-
-                        # 更新统计
-                        if data_status == "error":
-                            self.cleaning_stats.error_records += 1
-                        elif data_status == "warning":
-                            self.cleaning_stats.warning_records += 1
-                        else:
-                            self.cleaning_stats.valid_records += 1
-
-                        # 每处理1000条记录输出一次进度
-                        if row_num % 1000 == 0:
-                            logger.info(f"已处理 {row_num} 行CSV数据，有效: {valid_count}")
-
-                    except Exception as e:
-                        logger.debug(f"处理第 {row_num} 行CSV数据时出错: {str(e)}")
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['processing_error'] = \
-                            self.cleaning_stats.errors_by_type.get('processing_error', 0) + 1
-                        continue
-
-                # 输出清洗统计
-                logger.info(f"CSV文件处理完成，总行数: {total_rows}, 有效记录: {valid_count}")
-                logger.info(f"数据清洗统计: 正常={self.cleaning_stats.valid_records}, "
-                            f"警告={self.cleaning_stats.warning_records}, "
-                            f"错误={self.cleaning_stats.error_records}")
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                yield from self.iter_csv_columns(f)
 
         except Exception as e:
             logger.error(f"读取CSV文件时出错: {str(e)}")
-            return []
+            return
+
+    def _iter_csv_lines(self, lines, fieldnames: Optional[List[str]] = None) -> Iterator[ADSData]:
+        """
+        解码CSV文本行；按块清洗为列数据后再逐条构造ADSData。
+        fieldnames为None时第一行作为表头（并行解码的分块传入文件表头）
+        """
+        for columns in self.iter_csv_columns(lines, fieldnames):
+            yield from build_records(ADSData, columns, len(columns['aircraft_id']))
+
+    def iter_csv_columns(self, lines, fieldnames: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按块将CSV文本行读入列数组，以向量化掩码完成数据清洗，逐块产出清洗后的列数据
+        （字段名 -> 数组，时间戳为datetime64[us]），不构造逐条记录对象
+        """
+        total_rows = 0
+        valid_count = 0
 
-        return decoded_records
+        for block in iter_csv_blocks(lines, fieldnames):
+            columns = self._clean_csv_block(block)
+            total_rows += block.size
+            valid_count += len(columns['aircraft_id'])
+            logger.info(f"已处理 {total_rows} 行CSV数据，有效: {valid_count}")
+            yield columns
 
-    def _decode_jsonl_file(self, file_path: Path) -> List[ADSData]:
-        """解码JSONL格式的ADS-B文件"""
-        processed_records = []
+        # 输出清洗统计
+        logger.info(f"CSV文件处理完成，总行数: {total_rows}, 有效记录: {valid_count}")
+        logger.info(f"数据清洗统计: 正常={self.cleaning_stats.valid_records}, "
+                    f"警告={self.cleaning_stats.warning_records}, "
+                    f"错误={self.cleaning_stats.error_records}")
 
+    def _clean_csv_block(self, block: CsvBlock) -> Dict[str, Any]:
+        """清洗一块CSV列数据，检查项、顺序与统计口径与逐行清洗一致；返回保留行的列数据"""
+        stats = self.cleaning_stats
+        stats.total_records += block.size
+        notes: Dict[int, List[str]] = {}
+        warning = np.zeros(block.size, dtype=bool)
+
+        # 列数不足的行无法解析
+        stats.error_records += add_count(stats.errors_by_type, 'processing_error', block.short_rows)
+        active = ~block.short_rows
+
+        # 检查核心字段缺失：没有航班号时用尾号作为标识
+        flight = block.get_stripped('flight')
+        tail_number = block.get_stripped('tail_number')
+        missing_flight = string_mask(flight, '')
+        missing_tail = string_mask(tail_number, '', 'unknown')
+        aircraft_id = np.where(missing_flight, np.array(tail_number, dtype=object), np.array(flight, dtype=object))
+        aircraft_id[aircraft_id == ''] = "unknown"
+
+        missing_aircraft_id = active & missing_flight & missing_tail
+        append_notes(notes, missing_aircraft_id, "飞行标识缺失")
+        warning |= missing_aircraft_id
+        stats.warning_records += add_count(stats.warnings_by_type, 'missing_aircraft_id', missing_aircraft_id)
+
+        missing_tail &= active
+        append_notes(notes, missing_tail, "飞机尾号缺失")
+        warning |= missing_tail
+        stats.warning_records += add_count(stats.warnings_by_type, 'missing_tail_number', missing_tail)
+
+        # 没有位置数据，剔除
+        lon_str = block.get_stripped('long')
+        lat_str = block.get_stripped('lat')
+        missing_coordinates = active & (string_mask(lon_str, '') | string_mask(lat_str, ''))
+        stats.error_records += add_count(stats.errors_by_type, 'missing_coordinates', missing_coordinates)
+        active &= ~missing_coordinates
+
+        # 转换数据类型并验证
+        lon, lon_invalid = parse_float_column(lon_str)
+        lat, lat_invalid = parse_float_column(lat_str)
+        coordinate_format = active & (lon_invalid | lat_invalid)
+        stats.error_records += add_count(stats.errors_by_type, 'coordinate_format', coordinate_format)
+        active &= ~coordinate_format
+
+        # 验证坐标范围
+        latitude_range = active & ~((lat >= -90) & (lat <= 90))
+        stats.error_records += add_count(stats.errors_by_type, 'latitude_range', latitude_range)
+        active &= ~latitude_range
+
+        longitude_range = active & ~((lon >= -180) & (lon <= 180))
+        stats.error_records += add_count(stats.errors_by_type, 'longitude_range', longitude_range)
+        active &= ~longitude_range
+
+        # 检查异常坐标（如0,0海洋交叉点）
+        suspicious = active & (lat == 0) & (lon == 0)
+        append_notes(notes, suspicious, "可疑坐标(0,0)")
+        warning |= suspicious
+        add_count(stats.warnings_by_type, 'suspicious_coordinates', suspicious)
+
+        # 解析高度并进行清洗（格式错误按0处理）
+        alt_str = block.get_stripped('alt')
+        altitude_ft, altitude_invalid = parse_float_column(alt_str)
+        append_notes(notes, active & altitude_invalid, "高度格式错误: {}", alt_str)
+
+        # 检查高度异常（负数或过高）
+        negative_altitude = active & (altitude_ft < 0)
+        append_notes(notes, negative_altitude, "高度为负数: {}", altitude_ft)
+        stats.error_records += add_count(stats.errors_by_type, 'negative_altitude', negative_altitude)
+        active &= ~negative_altitude
+
+        high_altitude = active & (altitude_ft > 60000)  # 假设商业飞机最大飞行高度
+        append_notes(notes, high_altitude, "高度异常高: {}", altitude_ft)
+        altitude_ft = np.where(high_altitude, 60000.0, altitude_ft)  # 截断到合理范围
+        warning |= high_altitude
+        add_count(stats.warnings_by_type, 'high_altitude', high_altitude)
+
+        # 解析地速并进行清洗（mph转换为kts）
+        mph_str = block.get_stripped('mph')
+        mph, mph_invalid = parse_float_column(mph_str)
+        append_notes(notes, active & mph_invalid, "速度格式错误: {}", mph_str)
+        ground_speed_kts = np.where(mph_invalid, 0.0, mph * 0.868976)
+
+        # 检查地速异常
+        speed_range = active & ((ground_speed_kts < 0) | (ground_speed_kts > 1000))
+        append_notes(notes, speed_range, "地速异常: {} kts", ground_speed_kts)
+        ground_speed_kts = np.where(speed_range, np.clip(ground_speed_kts, 0, 1000), ground_speed_kts)
+        warning |= speed_range
+        add_count(stats.warnings_by_type, 'speed_range', speed_range)
+
+        # 解析时间戳：相同的spotted字符串只解析一次
+        spotted = block.get_stripped('spotted')
+        encoded = unique_codes(spotted)
+        timestamps = map_unique(spotted, lambda text: self._parse_spotted(text)[0],
+                                dtype='datetime64[us]', encoded=encoded)
+        timestamp_invalid = active & map_unique(spotted, lambda text: self._parse_spotted(text)[1],
+                                                dtype=bool, encoded=encoded)
+        append_notes(notes, timestamp_invalid, "时间戳格式错误: {}", spotted)
+        warning |= timestamp_invalid
+        add_count(stats.warnings_by_type, 'timestamp_format', timestamp_invalid)
+
+        # 更新统计
+        warning &= active
+        stats.warning_records += int(np.count_nonzero(warning))
+        stats.valid_records += int(np.count_nonzero(active & ~warning))
+
+        rows = np.nonzero(active)[0]
+        return {
+            'aircraft_id': aircraft_id[rows],
+            'latitude': lat[rows],
+            'longitude': lon[rows],
+            'altitude_ft': altitude_ft[rows],
+            'ground_speed_kts': ground_speed_kts[rows],
+            'heading_deg': np.zeros(len(rows)),  # CSV格式没有航向信息
+            'aircraft_tail': np.array(tail_number, dtype=object)[rows],
+            'timestamp': timestamps[rows],
+            'data_type': np.full(len(rows), "adsb", dtype=object),
+            'data_status': np.where(warning[rows], "warning", "normal").astype(object),
+            'cleaning_notes': join_notes(notes, block.size)[rows]
+        }
+
+    @staticmethod
+    def _parse_spotted(spotted_str: str) -> Tuple[Optional[datetime], bool]:
+        """解析 "11/7/22 13:30" 格式的时间戳，返回 (时间, 是否格式错误)；无法识别的格式返回 (None, False)"""
+        if not spotted_str or '/' not in spotted_str or ':' not in spotted_str:
+            return None, False
+        try:
+            # 分割日期和时间
+            date_part, time_part = spotted_str.split(' ')
+            month, day, year = date_part.split('/')
+            hour, minute = time_part.split(':')
+
+            # 处理年份（假设20xx年）
+            year_int = int(year)
+            if year_int < 100:
+                year_int += 2000
+
+            return datetime(year_int, int(month), int(day), int(hour), int(minute)), False
+        except Exception:
+            return None, True
+
+    def _iter_jsonl_file(self, file_path: Path) -> Iterator[ADSData]:
+        """流式解码JSONL格式的ADS-B文件"""
+        for columns in self._iter_jsonl_file_columns(file_path):
+            yield from build_records(ADSData, columns, len(columns['aircraft_id']))
+
+    def _iter_jsonl_file_columns(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """流式读取JSONL格式的ADS-B文件，逐块产出清洗后的列数据"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            total_lines = len(lines)
-            logger.info(f"共读取到 {total_lines} 条ADS-B记录")
-
-            valid_count = 0
-            invalid_count = 0
-
-            for i, line in enumerate(lines, 1):
-                self.cleaning_stats.total_records += 1
-
-                try:
-                    # 移除空白字符
-                    line = line.strip()
-                    if not line:
-                        invalid_count += 1
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['empty_line'] = \
-                            self.cleaning_stats.errors_by_type.get('empty_line', 0) + 1
-                        continue
-
-                    # 解析JSON行
-                    try:
-                        data = json.loads(line)
-                    except json.JSONDecodeError as e:
-                        logger.debug(f"第 {i} 行JSON解析错误: {str(e)}")
-                        invalid_count += 1
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['json_decode'] = \
-                            self.cleaning_stats.errors_by_type.get('json_decode', 0) + 1
-                        continue
-
-                    # 验证必要字段 - 针对示例JSONL格式调整
-                    if 'latitude' not in data or 'longitude' not in data:
-                        logger.debug(f"第 {i} 行缺少经纬度字段")
-                        invalid_count += 1
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['missing_fields'] = \
-                            self.cleaning_stats.errors_by_type.get('missing_fields', 0) + 1
-                        continue
-
-                    # 数据清洗检查
-                    cleaning_notes = []
-                    data_status = "normal"
-
-                    # 检查核心字段
-                    aircraft_id = str(data.get('aircraft_id', 'unknown'))
-                    if not aircraft_id or aircraft_id == 'unknown':
-                        cleaning_notes.append("航空器ID缺失")
-                        data_status = "warning"
-                        self.cleaning_stats.warning_records += 1
-                        self.cleaning_stats.warnings_by_type['missing_aircraft_id'] = \
-                            self.cleaning_stats.warnings_by_type.get('missing_aircraft_id', 0) + 1
-
-                    # 检查飞机尾号
-                    aircraft_tail = data.get('aircraft_tail', 'unknown')
-                    if not aircraft_tail or aircraft_tail == 'unknown':
-                        cleaning_notes.append("飞机尾号缺失")
-                        data_status = "warning" if data_status == "normal" else data_status
-
-                    # 解析坐标并验证
-                    try:
-                        lat = float(data.get('latitude', 0.0))
-                        lon = float(data.get('longitude', 0.0))
-                    except (ValueError, TypeError) as e:
-                        logger.debug(f"第 {i} 行坐标格式错误: {str(e)}")
-                        invalid_count += 1
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['coordinate_format'] = \
-                            self.cleaning_stats.errors_by_type.get('coordinate_format', 0) + 1
-                        continue
-
-                    # 验证坐标范围
-                    if not (-90 <= lat <= 90):
-                        cleaning_notes.append(f"纬度超出范围: {lat}")
-                        data_status = "error"
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['latitude_range'] = \
-                            self.cleaning_stats.errors_by_type.get('latitude_range', 0) + 1
-                        invalid_count += 1
-                        continue
-
-                    if not (-180 <= lon <= 180):
-                        cleaning_notes.append(f"经度超出范围: {lon}")
-                        data_status = "error"
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['longitude_range'] = \
-                            self.cleaning_stats.errors_by_type.get('longitude_range', 0) + 1
-                        invalid_count += 1
-                        continue
-
-                    # 检查异常坐标（如0,0海洋交叉点）
-                    if lat == 0 and lon == 0:
-                        cleaning_notes.append("可疑坐标(0,0)")
-                        data_status = "warning" if data_status == "normal" else data_status
-                        self.cleaning_stats.warning_records += 1
-                        self.cleaning_stats.warnings_by_type['suspicious_coordinates'] = \
-                            self.cleaning_stats.warnings_by_type.get('suspicious_coordinates', 0) + 1
-
-                    # 解析高度并进行清洗
-                    altitude_ft = float(data.get('altitude_ft', 0.0))
-
-                    # 检查高度异常（负数或过高）
-                    if altitude_ft < 0:
-                        cleaning_notes.append(f"高度为负数: {altitude_ft}")
-                        data_status = "error"
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['negative_altitude'] = \
-                            self.cleaning_stats.errors_by_type.get('negative_altitude', 0) + 1
-                        invalid_count += 1
-                        continue
-
-                    if altitude_ft > 60000:  # 假设商业飞机最大飞行高度
-                        cleaning_notes.append(f"高度异常高: {altitude_ft}")
-                        altitude_ft = min(altitude_ft, 60000)  # 截断到合理范围
-                        data_status = "warning" if data_status == "normal" else data_status
-                        self.cleaning_stats.warning_records += 1
-                        self.cleaning_stats.warnings_by_type['high_altitude'] = \
-                            self.cleaning_stats.warnings_by_type.get('high_altitude', 0) + 1
-
-                    # 解析地速并进行清洗
-                    ground_speed_kts = float(data.get('ground_speed_kts', 0.0))
-                    if ground_speed_kts < 0 or ground_speed_kts > 1000:  # 假设合理速度范围
-                        cleaning_notes.append(f"地速异常: {ground_speed_kts}")
-                        ground_speed_kts = max(0, min(ground_speed_kts, 1000))
-                        data_status = "warning" if data_status == "normal" else data_status
-                        self.cleaning_stats.warning_records += 1
-                        self.cleaning_stats.warnings_by_type['speed_range'] = \
-                            self.cleaning_stats.warnings_by_type.get('speed_range', 0) + 1
-
-                    # 解析航向并进行清洗
-                    heading_deg = float(data.get('heading_deg', 0.0))
-                    if heading_deg < 0 or heading_deg > 360:
-                        cleaning_notes.append(f"航向异常: {heading_deg}")
-                        heading_deg = heading_deg % 360  # 归一化到0-360度
-                        data_status = "warning" if data_status == "normal" else data_status
-                        self.cleaning_stats.warning_records += 1
-                        self.cleaning_stats.warnings_by_type['heading_range'] = \
-                            self.cleaning_stats.warnings_by_type.get('heading_range', 0) + 1
-
-                    # 解析时间戳
-                    timestamp = self._parse_timestamp(data)
-
-                    # 创建ADS-B数据对象
-                    adsb_data = ADSData(
-                        aircraft_id=aircraft_id,
-                        latitude=lat,
-                        longitude=lon,
-                        altitude_ft=altitude_ft,
-                        ground_speed_kts=ground_speed_kts,
-                        heading_deg=heading_deg,
-                        aircraft_tail=aircraft_tail,
-                        timestamp=timestamp,
-                        data_status=data_status,
-                        cleaning_notes="; ".join(cleaning_notes) if cleaning_notes else ""
-                    )
-                    processed_records.append(adsb_data)
-                    valid_count += 1
-
-                    if data_status == "normal":
-                        self.cleaning_stats.valid_records += 1
-                    elif data_status == "warning":
-                        self.cleaning_stats.warning_records += 1
-                    elif data_status == "error":
-                        self.cleaning_stats.error_records += 1
-
-                    # 每处理1000条记录输出一次进度
-                    if i % 1000 == 0:
-                        logger.info(f"已处理 {i}/{total_lines} 条ADS-B记录，有效: {valid_count}, 无效: {invalid_count}")
-
-                except Exception as e:
-                    logger.debug(f"处理第 {i} 行时出错: {str(e)}")
-                    invalid_count += 1
-                    self.cleaning_stats.error_records += 1
-                    self.cleaning_stats.errors_by_type['processing_error'] = \
-                        self.cleaning_stats.errors_by_type.get('processing_error', 0) + 1
-                    continue
+                yield from self.iter_jsonl_columns(f)
 
         except FileNotFoundError:
             logger.error(f"未找到ADS-B文件: {file_path}")
-            return []
+            return
         except Exception as e:
             logger.error(f"读取ADS-B文件时出错: {str(e)}")
-            return []
+            return
+
+    def _iter_jsonl_lines(self, lines) -> Iterator[ADSData]:
+        """解码JSONL文本行序列；按块清洗为列数据后再逐条构造ADSData"""
+        for columns in self.iter_jsonl_columns(lines):
+            yield from build_records(ADSData, columns, len(columns['aircraft_id']))
+
+    def iter_jsonl_columns(self, lines) -> Iterator[Dict[str, Any]]:
+        """
+        按块解析JSONL文本行，已知字段提取为类型化列并以向量化掩码完成数据清洗，
+        逐块产出清洗后的列数据（字段名 -> 数组，时间戳为datetime64[us]），不构造逐条记录对象
+        """
+        total_rows = 0
+        valid_count = 0
+
+        for block in iter_jsonl_blocks(lines):
+            columns = self._clean_jsonl_block(block)
+            total_rows += block.size
+            valid_count += len(columns['aircraft_id'])
+            logger.info(f"已处理 {total_rows} 条ADS-B记录，有效: {valid_count}, 无效: {total_rows - valid_count}")
+            yield columns
 
         # 输出清洗统计
-        logger.info(f"ADS-B处理完成，有效记录: {valid_count}, 无效记录: {invalid_count}")
+        logger.info(f"ADS-B处理完成，有效记录: {valid_count}, 无效记录: {total_rows - valid_count}")
         logger.info(f"数据清洗统计: 正常={self.cleaning_stats.valid_records}, "
                     f"警告={self.cleaning_stats.warning_records}, "
                     f"错误={self.cleaning_stats.error_records}")
 
-        return processed_records
-
-    def _parse_timestamp(self, data: Dict[str, Any]) -> datetime:
-        """解析时间戳"""
-        try:
-            year = data.get('year', 2022)  # 默认2022年
-            month = data.get('month', 1)
-            day = data.get('day', 1)
-            hour = data.get('hour', 0)
-            minute = data.get('minute', 0)
-            second = data.get('second', 0)
-
-            if isinstance(second, float):
-                microsecond = int((second - int(second)) * 1000000)
-                second = int(second)
+    def _clean_jsonl_block(self, block: JsonlBlock) -> Dict[str, Any]:
+        """清洗一块JSONL数据，检查项、顺序与统计口径与逐行清洗一致；返回保留行的列数据"""
+        stats = self.cleaning_stats
+        stats.total_records += block.size
+
+        stats.error_records += add_count(stats.errors_by_type, 'empty_line', block.empty)
+        stats.error_records += add_count(stats.errors_by_type, 'json_decode', block.decode_error)
+
+        # 验证必要字段；非对象的JSON值按逐行处理时的行为归类
+        parsed = ~(block.empty | block.decode_error)
+        missing_fields = np.zeros(block.size, dtype=bool)
+        processing_error = np.zeros(block.size, dtype=bool)
+        for i in np.nonzero(parsed)[0].tolist():
+            data = block.records[i]
+            if isinstance(data, dict):
+                missing_fields[i] = 'latitude' not in data or 'longitude' not in data
+            elif self._classify_non_object(data) == 'missing_fields':
+                missing_fields[i] = True
             else:
-                microsecond = 0
-
-            return datetime(year, month, day, hour, minute, second, microsecond)
-        except Exception as e:
-            logger.warning(f"解析时间戳时出错，使用当前时间: {str(e)}")
-            return datetime.now()
+                processing_error[i] = True
+        stats.error_records += add_count(stats.errors_by_type, 'missing_fields', missing_fields)
+
+        rows = np.nonzero(parsed & ~missing_fields & ~processing_error)[0]
+        records = [block.records[i] for i in rows.tolist()]
+        size = len(records)
+        notes: Dict[int, List[str]] = {}
+        warning = np.zeros(size, dtype=bool)
+        active = np.ones(size, dtype=bool)
+        dropped_by_error = np.zeros(size, dtype=bool)
+
+        # 检查核心字段
+        aircraft_id = np.array([str(record.get('aircraft_id', 'unknown')) for record in records], dtype=object)
+        missing_aircraft_id = string_mask(aircraft_id, '', 'unknown')
+        append_notes(notes, missing_aircraft_id, "航空器ID缺失")
+        warning |= missing_aircraft_id
+        stats.warning_records += add_count(stats.warnings_by_type, 'missing_aircraft_id', missing_aircraft_id)
+
+        # 检查飞机尾号
+        aircraft_tail = np.empty(size, dtype=object)
+        aircraft_tail[:] = [record.get('aircraft_tail', 'unknown') for record in records]
+        missing_tail = np.array([not tail or tail == 'unknown' for tail in aircraft_tail], dtype=bool)
+        append_notes(notes, missing_tail, "飞机尾号缺失")
+        warning |= missing_tail
+
+        # 解析坐标并验证
+        lat, lat_invalid = float_column(records, 'latitude')
+        lon, lon_invalid = float_column(records, 'longitude')
+        coordinate_format = lat_invalid | lon_invalid
+        stats.error_records += add_count(stats.errors_by_type, 'coordinate_format', coordinate_format)
+        active &= ~coordinate_format
+
+        latitude_range = active & ~((lat >= -90) & (lat <= 90))
+        stats.error_records += add_count(stats.errors_by_type, 'latitude_range', latitude_range)
+        active &= ~latitude_range
+
+        longitude_range = active & ~((lon >= -180) & (lon <= 180))
+        stats.error_records += add_count(stats.errors_by_type, 'longitude_range', longitude_range)
+        active &= ~longitude_range
+
+        # 检查异常坐标（如0,0海洋交叉点）
+        suspicious = active & (lat == 0) & (lon == 0)
+        append_notes(notes, suspicious, "可疑坐标(0,0)")
+        warning |= suspicious
+        stats.warning_records += add_count(stats.warnings_by_type, 'suspicious_coordinates', suspicious)
+
+        # 解析高度并进行清洗（无法转换的按处理错误剔除）
+        altitude_ft, altitude_invalid = float_column(records, 'altitude_ft')
+        dropped_by_error |= active & altitude_invalid
+        active &= ~altitude_invalid
+
+        negative_altitude = active & (altitude_ft < 0)
+        stats.error_records += add_count(stats.errors_by_type, 'negative_altitude', negative_altitude)
+        active &= ~negative_altitude
+
+        high_altitude = active & (altitude_ft > 60000)  # 假设商业飞机最大飞行高度
+        append_notes(notes, high_altitude, "高度异常高: {}", altitude_ft)
+        altitude_ft = np.where(high_altitude, 60000.0, altitude_ft)  # 截断到合理范围
+        warning |= high_altitude
+        stats.warning_records += add_count(stats.warnings_by_type, 'high_altitude', high_altitude)
+
+        # 解析地速并进行清洗
+        ground_speed_kts, speed_invalid = float_column(records, 'ground_speed_kts')
+        dropped_by_error |= active & speed_invalid
+        active &= ~speed_invalid
+
+        speed_range = active & ((ground_speed_kts < 0) | (ground_speed_kts > 1000))  # 假设合理速度范围
+        append_notes(notes, speed_range, "地速异常: {}", ground_speed_kts)
+        ground_speed_kts = np.where(speed_range, np.clip(ground_speed_kts, 0, 1000), ground_speed_kts)
+        warning |= speed_range
+        stats.warning_records += add_count(stats.warnings_by_type, 'speed_range', speed_range)
+
+        # 解析航向并进行清洗
+        heading_deg, heading_invalid = float_column(records, 'heading_deg')
+        dropped_by_error |= active & heading_invalid
+        active &= ~heading_invalid
+
+        heading_range = active & ((heading_deg < 0) | (heading_deg > 360))
+        append_notes(notes, heading_range, "航向异常: {}", heading_deg)
+        heading_deg = np.where(heading_range, np.mod(heading_deg, 360), heading_deg)  # 归一化到0-360度
+        warning |= heading_range
+        stats.warning_records += add_count(stats.warnings_by_type, 'heading_range', heading_range)
+
+        # 无法转换的数值字段计为处理错误
+        stats.error_records += add_count(stats.errors_by_type, 'processing_error', processing_error)
+        stats.error_records += add_count(stats.errors_by_type, 'processing_error', dropped_by_error)
+
+        # 接收机测得的距离与方位（缺失或无法转换的记为-1），方位归一化到0-360度
+        range_nm, range_invalid = float_column(records, 'range_nm', -1.0)
+        bearing_deg, bearing_invalid = float_column(records, 'bearing_deg', -1.0)
+        unknown_position = range_invalid | bearing_invalid | (range_nm < 0) | ~np.isfinite(range_nm + bearing_deg)
+        range_nm = np.where(unknown_position, -1.0, range_nm)
+        bearing_deg = np.where(unknown_position, -1.0, np.mod(bearing_deg, 360.0))
+        altitude_is_gnss = np.array([record.get('altitude_is_gnss') is True for record in records], dtype=bool)
+
+        # 解析时间戳：整块按年月日时分秒算术计算epoch微秒
+        timestamps = self._jsonl_timestamps(records)
+
+        # 更新统计
+        warning &= active
+        stats.warning_records += int(np.count_nonzero(warning))
+        stats.valid_records += int(np.count_nonzero(active & ~warning))
+
+        keep = np.nonzero(active)[0]
+        return {
+            'aircraft_id': aircraft_id[keep],
+            'latitude': lat[keep],
+            'longitude': lon[keep],
+            'altitude_ft': altitude_ft[keep],
+            'ground_speed_kts': ground_speed_kts[keep],
+            'heading_deg': heading_deg[keep],
+            'aircraft_tail': aircraft_tail[keep],
+            'timestamp': timestamps[keep],
+            'data_type': np.full(len(keep), "adsb", dtype=object),
+            'data_status': np.where(warning[keep], "warning", "normal").astype(object),
+            'cleaning_notes': join_notes(notes, size)[keep],
+            'range_nm': range_nm[keep],
+            'bearing_deg': bearing_deg[keep],
+            'altitude_is_gnss': altitude_is_gnss[keep]
+        }
+
+    def _jsonl_timestamps(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """由各记录的year/month/day/hour/minute/second字段整列计算时间戳，无法组成合法时间的为NaT"""
+        year, year_invalid = int_column(records, 'year', 2022)  # 默认2022年
+        month, month_invalid = int_column(records, 'month', 1)
+        day, day_invalid = int_column(records, 'day', 1)
+        hour, hour_invalid = int_column(records, 'hour', 0)
+        minute, minute_invalid = int_column(records, 'minute', 0)
+        second, second_invalid = float_column(records, 'second', 0, numeric_only=True)
+
+        epoch_us, valid = epoch_microseconds(year, month, day, hour, minute, second)
+        valid &= ~(year_invalid | month_invalid | day_invalid | hour_invalid | minute_invalid | second_invalid)
+
+        invalid_count = len(records) - int(np.count_nonzero(valid))
+        if invalid_count:
+            logger.warning(f"{invalid_count} 条记录的时间戳无法解析，使用当前时间")
+        return np.where(valid, epoch_us, np.iinfo(np.int64).min).view('datetime64[us]')
+
+    @staticmethod
+    def _classify_non_object(data: Any) -> str:
+        """非对象JSON值的错误类型（与逐行处理时的行为一致）"""
+        try:
+            if 'latitude' not in data or 'longitude' not in data:
+                return 'missing_fields'
+        except TypeError:
+            pass
+        return 'processing_error'
 
     def get_cleaning_stats(self) -> Dict[str, Any]:
         """获取数据清洗统计"""
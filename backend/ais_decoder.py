@@ -1,36 +1,216 @@
+import numpy as np
 import pyais
 from datetime import datetime
 import logging
-from typing import List, Dict, Any
+from collections import OrderedDict
+from itertools import chain
+from typing import List, Dict, Any, Iterator, Optional, Union, Tuple
 import re
 import csv
 from pathlib import Path
+from .config import Config
+from .csv_loader import (CsvBlock, iter_csv_blocks, string_mask, parse_float_column, parse_iso_timestamps,
+                         unique_codes, map_unique, append_notes, join_notes, add_count, build_records)
+from .ais_fastpath import split_fastpath_candidate, decode_position_reports
 from .models import AISData, DataCleaningStats
+from .track_store import records_to_columns
+from .ingest_checkpoint import FileCheckpoint, open_checkpoint_range
+from .utils import iter_batches
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class FragmentBuffer:
+    """
+    NMEA多片段消息重组缓冲区。
+    按 (信道, 序列号) 收集片段，片段齐全后按序返回；未完成的消息受数量与年龄上限约束，
+    超限时按LRU顺序淘汰并计入孤立片段统计，保证在丢包的实时数据流上内存占用恒定。
+    年龄以消息最近一个片段之后读入的语句行数计算（advance()），重组结果与解码耗时无关
+    """
+
+    def __init__(self, max_messages: int = Config.AIS_FRAGMENT_BUFFER_SIZE,
+                 max_age_lines: int = Config.AIS_FRAGMENT_MAX_AGE_LINES):
+        self.max_messages = max_messages
+        self.max_age_lines = max_age_lines
+        # 已读入的语句行数
+        self.position = 0
+        # key -> {'total': 片段总数, 'fragments': {片段号: 原始语句}, 'updated': 最近一个片段所在的行数}
+        self._pending: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self.stats = {
+            'completed_messages': 0,
+            'evicted_orphans': 0,
+            'evicted_by_size': 0,
+            'evicted_by_age': 0,
+            'evicted_by_restart': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def advance(self, lines: int = 1):
+        """读入lines行语句（单片段消息与无效行同样计入）"""
+        self.position += lines
+
+    def add(self, line: str, total: int, number: int, sequence_id: str, channel: str) -> Optional[List[str]]:
+        """加入当前行的片段；若消息已完整则返回按片段号排序的语句列表，否则返回None"""
+        # 先淘汰超龄的消息：迟到的片段不会补全已超龄的消息，结果与淘汰检查的时机无关
+        self._evict_expired()
+        key = (channel, sequence_id)
+        entry = self._pending.get(key)
+
+        # 序列号循环复用：同一key上出现新的首片段、重复片段或片段总数不一致，说明旧消息已丢片
+        if entry is not None and (entry['total'] != total or number in entry['fragments']):
+            del self._pending[key]
+            self._record_eviction('evicted_by_restart')
+            entry = None
+
+        if entry is None:
+            entry = {'total': total, 'fragments': {}, 'updated': self.position}
+            self._pending[key] = entry
+
+        entry['fragments'][number] = line
+        entry['updated'] = self.position
+        self._pending.move_to_end(key)
+
+        if len(entry['fragments']) == total:
+            del self._pending[key]
+            self.stats['completed_messages'] += 1
+            return [entry['fragments'][num] for num in sorted(entry['fragments'])]
+
+        # 超出容量时淘汰最久未更新的消息（OrderedDict头部）
+        while len(self._pending) > self.max_messages:
+            self._pending.popitem(last=False)
+            self._record_eviction('evicted_by_size')
+        return None
+
+    def _evict_expired(self):
+        """淘汰最近一个片段之后已读入超过max_age_lines行的未完成消息"""
+        while self._pending:
+            oldest = next(iter(self._pending.values()))
+            if self.position - oldest['updated'] <= self.max_age_lines:
+                break
+            self._pending.popitem(last=False)
+            self._record_eviction('evicted_by_age')
+
+    def _record_eviction(self, reason: str):
+        self.stats[reason] += 1
+        self.stats['evicted_orphans'] += 1
+
+    def drain(self) -> List[List[str]]:
+        """清空缓冲区，返回所有未完成消息的片段（按到达顺序）"""
+        pending = [[entry['fragments'][num] for num in sorted(entry['fragments'])]
+                   for entry in self._pending.values()]
+        self._pending.clear()
+        return pending
+
+
 class AISDecoder:
     """AIS数据解码器 - 支持各种格式的AIS消息"""
 
+    # 携带船舶静态信息的消息类型
+    STATIC_MESSAGE_TYPES = (5, 19, 24)
+
+    # 静态信息补全的字段及其未补全时的取值（船舶类型为NMEA位置报告的默认值）
+    STATIC_FIELD_DEFAULTS = {
+        'vessel_name': 'unknown', 'imo': 'unknown', 'call_sign': 'unknown', 'vessel_type': 'Unknown',
+        'length': 0.0, 'width': 0.0, 'draft': 0.0
+    }
+
+    # 快速路径每批解码的语句数
+    FASTPATH_BATCH_SIZE = 4096
+
+    # NMEA记录转为列数据时每块的记录数
+    COLUMN_BATCH_SIZE = 50000
+
     def __init__(self):
         self.decoded_data = []
         self.cleaning_stats = DataCleaningStats()
+        self.fragment_buffer = FragmentBuffer()
+        # MMSI -> 由静态报文(5/19/24)得到的船舶信息，用于补全后续位置报告
+        self.vessel_static: Dict[str, Dict[str, Any]] = {}
 
     def decode_ais_file(self, file_path: str) -> List[AISData]:
         """
         解码AIS文件中的所有数据，支持NMEA和CSV格式，包含数据清洗
         """
+        return list(self.iter_ais_file(file_path))
+
+    def iter_ais_file(self, file_path: str,
+                      batch_size: int = 0) -> Iterator[Union[AISData, List[AISData]]]:
+        """
+        惰性解码AIS文件，逐条产出AISData；batch_size>0时按固定大小批次产出列表。
+        文件按行流式读取，内存占用与文件大小无关
+        """
+        logger.info(f"开始解码AIS文件: {file_path}")
+
+        # 重置清洗统计
+        self.cleaning_stats = DataCleaningStats()
+
+        file_path = Path(file_path)
+        file_format = self.detect_format(file_path)
+        if file_format is None:
+            return
+
+        if file_format == 'csv':
+            records = self._iter_csv_file(file_path)
+        else:
+            records = self._iter_nmea_file(file_path)
+
+        if batch_size and batch_size > 0:
+            yield from iter_batches(records, batch_size)
+        else:
+            yield from records
+
+    def iter_ais_columns(self, file_path: str,
+                         checkpoint: Optional[FileCheckpoint] = None) -> Iterator[Dict[str, Any]]:
+        """
+        惰性解码AIS文件，逐块产出清洗后的列数据（字段名 -> 数组），可直接追加到TrackStore。
+        CSV文件整块向量化清洗，不构造逐条记录对象；NMEA逐条解码后按块转为列。
+        给出checkpoint时只解码检查点偏移之后新增的完整行，全部产出后推进检查点
+        """
         logger.info(f"开始解码AIS文件: {file_path}")
 
         # 重置清洗统计
         self.cleaning_stats = DataCleaningStats()
 
+        file_path = Path(file_path)
+        file_format = self.detect_format(file_path)
+        if file_format is None:
+            return
+
+        if checkpoint is not None:
+            yield from self._iter_checkpoint_columns(checkpoint)
+        elif file_format == 'csv':
+            yield from self._iter_csv_file_columns(file_path)
+        else:
+            for batch in iter_batches(self._iter_nmea_file(file_path), self.COLUMN_BATCH_SIZE):
+                yield records_to_columns(AISData, batch)
+
+    def _iter_checkpoint_columns(self, checkpoint: FileCheckpoint) -> Iterator[Dict[str, Any]]:
+        """
+        解码检查点之后新增的完整行。CSV沿用检查点中的表头；NMEA先将上次未完成的片段放回重组缓冲区，
+        结束时仍未完成的片段留在检查点中等待后续追加的数据，不计为孤立片段
+        """
+        lines, end = open_checkpoint_range(checkpoint)
+        if checkpoint.file_format == 'csv':
+            yield from self.iter_csv_columns(lines, fieldnames=checkpoint.header)
+        else:
+            self.fragment_buffer = FragmentBuffer()
+            records = chain(self._iter_nmea_lines(checkpoint.pending, count_totals=False),
+                            self._iter_nmea_lines(lines))
+            for batch in iter_batches(records, self.COLUMN_BATCH_SIZE):
+                yield records_to_columns(AISData, batch)
+            checkpoint.pending = [line for fragments in self.fragment_buffer.drain() for line in fragments]
+            self._record_orphan_fragments(self.fragment_buffer.stats['evicted_orphans'])
+        checkpoint.advance(end)
+
+    def detect_format(self, file_path: Path) -> Optional[str]:
+        """检测AIS文件格式，返回 'csv' 或 'nmea'，文件不可读时返回None"""
         file_path = Path(file_path)
         if not file_path.exists():
             logger.error(f"AIS文件不存在: {file_path}")
-            return []
+            return None
 
         # 检测文件格式
         try:
@@ -39,18 +219,18 @@ class AISDecoder:
 
             if self._is_csv_format(first_line):
                 logger.info("检测到CSV格式的AIS数据")
-                return self._decode_csv_file(file_path)
+                return 'csv'
             elif self._is_nmea_format(first_line):
                 logger.info("检测到NMEA格式的AIS数据")
-                return self._decode_nmea_file(file_path)
+                return 'nmea'
             else:
                 logger.warning(f"无法识别的AIS文件格式，第一行: {first_line[:100]}...")
                 # 尝试NMEA格式解码
-                return self._decode_nmea_file(file_path)
+                return 'nmea'
 
         except Exception as e:
             logger.error(f"检测文件格式时出错: {str(e)}")
-            return []
+            return None
 
     def _is_csv_format(self, first_line: str) -> bool:
         """检查是否为CSV格式"""
@@ -62,221 +242,236 @@ class AISDecoder:
         """检查是否为NMEA格式"""
         return first_line.startswith('!AIVDM') or first_line.startswith('!AIVDO')
 
-    def _decode_csv_file(self, file_path: Path) -> List[AISData]:
-        """解码CSV格式的AIS文件，包含数据清洗"""
-        decoded_records = []
+    def _iter_csv_file(self, file_path: Path) -> Iterator[AISData]:
+        """流式解码CSV格式的AIS文件，包含数据清洗"""
+        for columns in self._iter_csv_file_columns(file_path):
+            yield from build_records(AISData, columns, len(columns['mmsi']))
 
+    def _iter_csv_file_columns(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """流式读取CSV格式的AIS文件，逐块产出清洗后的列数据"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # 使用DictReader自动处理列名
-                csv_reader = csv.DictReader(f)
-                total_rows = 0
-                valid_count = 0
-
-                for row_num, row in enumerate(csv_reader, 1):
-                    total_rows = row_num
-                    self.cleaning_stats.total_records += 1
-
-                    try:
-                        # 解析必需字段
-                        mmsi = row.get('MMSI', '').strip()
-                        lat_str = row.get('LAT', '').strip()
-                        lon_str = row.get('LON', '').strip()
-
-                        # 数据清洗检查
-                        cleaning_notes = []
-                        data_status = "normal"
-
-                        # 检查核心字段缺失
-                        if not mmsi or mmsi == 'unknown':
-                            cleaning_notes.append("MMSI缺失")
-                            data_status = "warning"
-                            # 标记为待复核但不剔除
-
-                        if not lat_str or not lon_str:
-                            cleaning_notes.append("经纬度缺失")
-                            data_status = "error"  # 没有位置数据，剔除
-                            self.cleaning_stats.errors_by_type['missing_coordinates'] = \
-                                self.cleaning_stats.errors_by_type.get('missing_coordinates', 0) + 1
-                            continue
-
-                        # 转换数据类型并验证
-                        try:
-                            lat = float(lat_str)
-                            lon = float(lon_str)
-                        except ValueError:
-                            cleaning_notes.append(f"坐标格式错误: LAT={lat_str}, LON={lon_str}")
-                            data_status = "error"
-                            self.cleaning_stats.errors_by_type['coordinate_format'] = \
-                                self.cleaning_stats.errors_by_type.get('coordinate_format', 0) + 1
-                            continue
-
-                        # 验证坐标范围
-                        if not (-90 <= lat <= 90):
-                            cleaning_notes.append(f"纬度超出范围: {lat}")
-                            data_status = "error"
-                            self.cleaning_stats.errors_by_type['latitude_range'] = \
-                                self.cleaning_stats.errors_by_type.get('latitude_range', 0) + 1
-                            continue
-
-                        if not (-180 <= lon <= 180):
-                            cleaning_notes.append(f"经度超出范围: {lon}")
-                            data_status = "error"
-                            self.cleaning_stats.errors_by_type['longitude_range'] = \
-                                self.cleaning_stats.errors_by_type.get('longitude_range', 0) + 1
-                            continue
-
-                        # 检查异常坐标（如0,0海洋交叉点）
-                        if lat == 0 and lon == 0:
-                            cleaning_notes.append("可疑坐标(0,0)")
-                            data_status = "warning"
-                            self.cleaning_stats.warnings_by_type['suspicious_coordinates'] = \
-                                self.cleaning_stats.warnings_by_type.get('suspicious_coordinates', 0) + 1
-
-                        # 解析可选数值字段并进行清洗
-                        sog = self._parse_float(row.get('SOG', '0'))
-                        cog = self._parse_float(row.get('COG', '0'))
-                        heading = self._parse_float(row.get('Heading', '0'))
-                        length = self._parse_float(row.get('Length', '0'))
-                        width = self._parse_float(row.get('Width', '0'))
-                        draft = self._parse_float(row.get('Draft', '0'))
-
-                        # 检查数值范围异常
-                        if sog < 0 or sog > 50:  # 假设航速合理范围
-                            cleaning_notes.append(f"航速异常: {sog}")
-                            sog = max(0, min(sog, 50))  # 截断到合理范围
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warnings_by_type['speed_range'] = \
-                                self.cleaning_stats.warnings_by_type.get('speed_range', 0) + 1
-
-                        if cog < 0 or cog > 360:
-                            cleaning_notes.append(f"航向异常: {cog}")
-                            cog = cog % 360  # 归一化到0-360度
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warnings_by_type['course_range'] = \
-                                self.cleaning_stats.warnings_by_type.get('course_range', 0) + 1
-
-                        if heading < 0 or heading > 360:
-                            cleaning_notes.append(f"船首向异常: {heading}")
-                            heading = heading % 360  # 归一化到0-360度
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warnings_by_type['heading_range'] = \
-                                self.cleaning_stats.warnings_by_type.get('heading_range', 0) + 1
-
-                        # 检查船舶尺寸合理性
-                        if length > 0 and (length < 5 or length > 500):  # 假设船舶长度合理范围
-                            cleaning_notes.append(f"船长异常: {length}")
-                            data_status = "warning" if data_status == "normal" else data_status
-                            self.cleaning_stats.warnings_by_type['length_range'] = \
-                                self.cleaning_stats.warnings_by_type.get('length_range', 0) + 1
-
-                        # 解析时间戳
-                        timestamp_str = row.get('BaseDateTime', '')
-                        timestamp = datetime.now()  # 默认值
-
-                        if timestamp_str:
-                            try:
-                                timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                            except ValueError:
-                                cleaning_notes.append(f"时间戳格式错误: {timestamp_str}")
-                                data_status = "warning" if data_status == "normal" else data_status
-                                self.cleaning_stats.warnings_by_type['timestamp_format'] = \
-                                    self.cleaning_stats.warnings_by_type.get('timestamp_format', 0) + 1
-                        else:
-                            cleaning_notes.append("时间戳缺失")
-                            data_status = "warning" if data_status == "normal" else data_status
-
-                        # 解析船舶类型和状态
-                        vessel_type_code = row.get('VesselType', '0')
-                        try:
-                            vessel_type_code_int = int(float(vessel_type_code))
-                        except (ValueError, TypeError):
-                            vessel_type_code_int = 0
-                            cleaning_notes.append(f"船舶类型代码格式错误: {vessel_type_code}")
-                            data_status = "warning" if data_status == "normal" else data_status
-
-                        vessel_type = self._get_vessel_type(vessel_type_code_int)
-
-                        status_code = row.get('Status', '')
-                        nav_status = self._get_nav_status_from_code(status_code)
-
-                        # 创建AIS数据对象
-                        ais_data = AISData(
-                            mmsi=mmsi if mmsi else "unknown",
-                            latitude=lat,
-                            longitude=lon,
-                            sog=sog,
-                            cog=cog,
-                            heading=heading,
-                            nav_status=nav_status,
-                            vessel_type=vessel_type,
-                            timestamp=timestamp,
-                            data_type="ais",
-                            data_status=data_status,
-                            cleaning_notes="; ".join(cleaning_notes) if cleaning_notes else "",
-                            vessel_name=row.get('VesselName', 'unknown').strip(),
-                            imo=row.get('IMO', 'unknown').strip(),
-                            call_sign=row.get('CallSign', 'unknown').strip(),
-                            status=row.get('Status', 'unknown').strip(),
-                            length=length,
-                            width=width,
-                            draft=draft,
-                            cargo=row.get('Cargo', 'unknown').strip(),
-                            transceiver_class=row.get('TransceiverClass', 'unknown').strip(),
-                            base_date_time=timestamp_str
-                        )
-
-                        decoded_records.append(ais_data)
-                        valid_count += 1
-
-                        # 更新统计
-                        if data_status == "error":
-                            self.cleaning_stats.error_records += 1
-                        elif data_status == "warning":
-                            self.cleaning_stats.warning_records += 1
-                        else:
-                            self.cleaning_stats.valid_records += 1
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                yield from self.iter_csv_columns(f)
 
-                        # 每处理1000条记录输出一次进度
-                        if row_num % 1000 == 0:
-                            logger.info(f"已处理 {row_num} 行CSV数据，有效: {valid_count}")
+        except Exception as e:
+            logger.error(f"读取CSV文件时出错: {str(e)}")
+            return
 
-                    except Exception as e:
-                        logger.debug(f"处理第 {row_num} 行CSV数据时出错: {str(e)}")
-                        self.cleaning_stats.error_records += 1
-                        self.cleaning_stats.errors_by_type['processing_error'] = \
-                            self.cleaning_stats.errors_by_type.get('processing_error', 0) + 1
-                        continue
+    def _iter_csv_lines(self, lines, fieldnames: Optional[List[str]] = None) -> Iterator[AISData]:
+        """
+        解码CSV文本行，包含数据清洗；按块清洗为列数据后再逐条构造AISData。
+        fieldnames为None时第一行作为表头（并行解码的分块传入文件表头）
+        """
+        for columns in self.iter_csv_columns(lines, fieldnames):
+            yield from build_records(AISData, columns, len(columns['mmsi']))
 
-                # 输出清洗统计
-                logger.info(f"CSV文件处理完成，总行数: {total_rows}, 有效记录: {valid_count}")
-                logger.info(f"数据清洗统计: 正常={self.cleaning_stats.valid_records}, "
-                            f"警告={self.cleaning_stats.warning_records}, "
-                            f"错误={self.cleaning_stats.error_records}")
+    def iter_csv_columns(self, lines, fieldnames: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按块将CSV文本行读入列数组，以向量化掩码完成数据清洗，逐块产出清洗后的列数据
+        （字段名 -> 数组，时间戳为datetime64[us]），不构造逐条记录对象
+        """
+        total_rows = 0
+        valid_count = 0
+
+        for block in iter_csv_blocks(lines, fieldnames):
+            columns = self._clean_csv_block(block)
+            total_rows += block.size
+            valid_count += len(columns['mmsi'])
+            logger.info(f"已处理 {total_rows} 行CSV数据，有效: {valid_count}")
+            yield columns
+
+        # 输出清洗统计
+        logger.info(f"CSV文件处理完成，总行数: {total_rows}, 有效记录: {valid_count}")
+        logger.info(f"数据清洗统计: 正常={self.cleaning_stats.valid_records}, "
+                    f"警告={self.cleaning_stats.warning_records}, "
+                    f"错误={self.cleaning_stats.error_records}")
 
-        except Exception as e:
-            logger.error(f"读取CSV文件时出错: {str(e)}")
-            return []
+    def _clean_csv_block(self, block: CsvBlock) -> Dict[str, Any]:
+        """清洗一块CSV列数据，检查项与顺序与逐行清洗一致；返回保留行的列数据"""
+        stats = self.cleaning_stats
+        stats.total_records += block.size
+        notes: Dict[int, List[str]] = {}
+        warning = np.zeros(block.size, dtype=bool)
+
+        # 列数不足的行无法解析
+        stats.error_records += add_count(stats.errors_by_type, 'processing_error', block.short_rows)
+        active = ~block.short_rows
+
+        # 检查核心字段缺失（标记为待复核但不剔除）
+        mmsi = block.get_stripped('MMSI')
+        missing_mmsi = active & string_mask(mmsi, '', 'unknown')
+        append_notes(notes, missing_mmsi, "MMSI缺失")
+        warning |= missing_mmsi
+
+        # 没有位置数据，剔除
+        lat_str = block.get_stripped('LAT')
+        lon_str = block.get_stripped('LON')
+        missing_coordinates = active & (string_mask(lat_str, '') | string_mask(lon_str, ''))
+        add_count(stats.errors_by_type, 'missing_coordinates', missing_coordinates)
+        active &= ~missing_coordinates
+
+        # 转换数据类型并验证
+        lat, lat_invalid = parse_float_column(lat_str)
+        lon, lon_invalid = parse_float_column(lon_str)
+        coordinate_format = active & (lat_invalid | lon_invalid)
+        add_count(stats.errors_by_type, 'coordinate_format', coordinate_format)
+        active &= ~coordinate_format
+
+        # 验证坐标范围
+        latitude_range = active & ~((lat >= -90) & (lat <= 90))
+        add_count(stats.errors_by_type, 'latitude_range', latitude_range)
+        active &= ~latitude_range
+
+        longitude_range = active & ~((lon >= -180) & (lon <= 180))
+        add_count(stats.errors_by_type, 'longitude_range', longitude_range)
+        active &= ~longitude_range
+
+        # 检查异常坐标（如0,0海洋交叉点）
+        suspicious = active & (lat == 0) & (lon == 0)
+        append_notes(notes, suspicious, "可疑坐标(0,0)")
+        warning |= suspicious
+        add_count(stats.warnings_by_type, 'suspicious_coordinates', suspicious)
+
+        # 解析可选数值字段并进行清洗（空值和格式错误按0处理）
+        sog = parse_float_column(block.get('SOG', '0'))[0]
+        cog = parse_float_column(block.get('COG', '0'))[0]
+        heading = parse_float_column(block.get('Heading', '0'))[0]
+        length = parse_float_column(block.get('Length', '0'))[0]
+        width = parse_float_column(block.get('Width', '0'))[0]
+        draft = parse_float_column(block.get('Draft', '0'))[0]
+
+        # 检查数值范围异常
+        speed_range = active & ((sog < 0) | (sog > 50))  # 假设航速合理范围
+        append_notes(notes, speed_range, "航速异常: {}", sog)
+        sog = np.where(speed_range, np.clip(sog, 0, 50), sog)  # 截断到合理范围
+        warning |= speed_range
+        add_count(stats.warnings_by_type, 'speed_range', speed_range)
+
+        course_range = active & ((cog < 0) | (cog > 360))
+        append_notes(notes, course_range, "航向异常: {}", cog)
+        cog = np.where(course_range, np.mod(cog, 360), cog)  # 归一化到0-360度
+        warning |= course_range
+        add_count(stats.warnings_by_type, 'course_range', course_range)
+
+        heading_range = active & ((heading < 0) | (heading > 360))
+        append_notes(notes, heading_range, "船首向异常: {}", heading)
+        heading = np.where(heading_range, np.mod(heading, 360), heading)
+        warning |= heading_range
+        add_count(stats.warnings_by_type, 'heading_range', heading_range)
+
+        # 检查船舶尺寸合理性
+        length_range = active & (length > 0) & ((length < 5) | (length > 500))  # 假设船舶长度合理范围
+        append_notes(notes, length_range, "船长异常: {}", length)
+        warning |= length_range
+        add_count(stats.warnings_by_type, 'length_range', length_range)
+
+        # 批量解析时间戳（相同的时间字符串只解析一次）
+        timestamp_str = block.get('BaseDateTime')
+        timestamps, timestamp_missing, timestamp_invalid = parse_iso_timestamps(timestamp_str)
+        timestamp_invalid &= active
+        append_notes(notes, timestamp_invalid, "时间戳格式错误: {}", timestamp_str)
+        add_count(stats.warnings_by_type, 'timestamp_format', timestamp_invalid)
+        timestamp_missing &= active
+        append_notes(notes, timestamp_missing, "时间戳缺失")
+        warning |= timestamp_invalid | timestamp_missing
+
+        # 解析船舶类型和状态（按不同取值查表）
+        vessel_type_code = block.get('VesselType', '0')
+        encoded = unique_codes(vessel_type_code)
+        vessel_type_invalid = active & map_unique(
+            vessel_type_code, lambda code: self._parse_vessel_type_code(code) is None, dtype=bool, encoded=encoded)
+        append_notes(notes, vessel_type_invalid, "船舶类型代码格式错误: {}", vessel_type_code)
+        warning |= vessel_type_invalid
+        vessel_type = map_unique(vessel_type_code,
+                                 lambda code: self._get_vessel_type(self._parse_vessel_type_code(code) or 0),
+                                 encoded=encoded)
+        nav_status = map_unique(block.get('Status'), self._get_nav_status_from_code)
+
+        # 更新统计
+        warning &= active
+        stats.warning_records += int(np.count_nonzero(warning))
+        stats.valid_records += int(np.count_nonzero(active & ~warning))
+
+        rows = np.nonzero(active)[0]
+        mmsi = np.array(mmsi, dtype=object)
+        mmsi[mmsi == ''] = "unknown"
+        return {
+            'mmsi': mmsi[rows],
+            'latitude': lat[rows],
+            'longitude': lon[rows],
+            'sog': sog[rows],
+            'cog': cog[rows],
+            'heading': heading[rows],
+            'nav_status': nav_status[rows],
+            'vessel_type': vessel_type[rows],
+            'timestamp': timestamps[rows],
+            'data_status': np.where(warning[rows], "warning", "normal").astype(object),
+            'cleaning_notes': join_notes(notes, block.size)[rows],
+            'vessel_name': np.array(block.get_stripped('VesselName', 'unknown'), dtype=object)[rows],
+            'imo': np.array(block.get_stripped('IMO', 'unknown'), dtype=object)[rows],
+            'call_sign': np.array(block.get_stripped('CallSign', 'unknown'), dtype=object)[rows],
+            'status': np.array(block.get_stripped('Status', 'unknown'), dtype=object)[rows],
+            'length': length[rows],
+            'width': width[rows],
+            'draft': draft[rows],
+            'cargo': np.array(block.get_stripped('Cargo', 'unknown'), dtype=object)[rows],
+            'transceiver_class': np.array(block.get_stripped('TransceiverClass', 'unknown'), dtype=object)[rows],
+            'base_date_time': np.array(timestamp_str, dtype=object)[rows]
+        }
 
-        return decoded_records
+    @staticmethod
+    def _parse_vessel_type_code(vessel_type_code: str) -> Optional[int]:
+        """解析CSV船舶类型代码，格式错误返回None"""
+        try:
+            return int(float(vessel_type_code))
+        except (ValueError, TypeError, OverflowError):
+            return None
 
-    def _decode_nmea_file(self, file_path: Path) -> List[AISData]:
-        """解码NMEA格式的AIS文件，包含数据清洗"""
-        decoded_records = []
+    def _iter_nmea_file(self, file_path: Path) -> Iterator[AISData]:
+        """流式解码NMEA格式的AIS文件，包含数据清洗"""
+        decoded_count = 0
+        self.fragment_buffer = FragmentBuffer()
 
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+                decoded_count = yield from self._iter_nmea_lines(f)
+
+        except FileNotFoundError:
+            logger.error(f"未找到AIS文件: {file_path}")
+            return
+        except Exception as e:
+            logger.error(f"读取AIS文件时出错: {str(e)}")
+            return
+
+        # 处理剩余未完成的多片段消息（如果有）
+        leftover = self.fragment_buffer.drain()
+        self._record_orphan_fragments(self.fragment_buffer.stats['evicted_orphans'] + len(leftover))
+        if leftover:
+            logger.warning(f"文件结束时仍有 {len(leftover)} 条未完成的多片段消息")
+
+        logger.info(f"AIS解码完成，共获得 {decoded_count} 条有效位置记录")
+        logger.info(f"数据清洗统计: 正常={self.cleaning_stats.valid_records}, "
+                    f"警告={self.cleaning_stats.warning_records}, "
+                    f"错误={self.cleaning_stats.error_records}")
 
-            lines = content.strip().split('\n')
-            total_lines = len(lines)
-            logger.info(f"共读取到 {total_lines} 条AIS记录")
+    def _iter_nmea_lines(self, lines, count_totals: bool = True, line_numbers: Optional[List[int]] = None):
+        """
+        解码NMEA语句序列，多片段消息经self.fragment_buffer重组。
+        每批语句先将单片段位置报告（类型1/2/3/18/19）交给向量化快速路径批量解码，
+        其余语句逐条走pyais；输出顺序与逐条解码一致。
+        count_totals=False 用于重放已计数过的片段（如并行解码的分块接缝处）；
+        line_numbers不为None时依次追加每条产出记录所在的行号（从1开始）；返回成功解码的条数
+        """
+        decoded_count = 0
 
-            # 用于存储多片段消息
-            multi_part_messages = {}
+        for batch in iter_batches(enumerate(lines, 1), self.FASTPATH_BATCH_SIZE):
+            fast_messages = self._decode_fastpath_batch(batch)
 
-            for i, line in enumerate(lines, 1):
-                self.cleaning_stats.total_records += 1
+            for i, line in batch:
+                if count_totals:
+                    self.cleaning_stats.total_records += 1
+                self.fragment_buffer.advance()
+                ready = []
 
                 try:
                     line = line.strip()
@@ -304,42 +499,28 @@ class AISDecoder:
                         fragment_num = 1
                         sequential_id = ''
 
-                    message_key = f"{sequential_id}_{parts[5] if len(parts) > 5 else ''}"
-
                     if total_fragments > 1:
-                        # 处理多片段消息
-                        if message_key not in multi_part_messages:
-                            multi_part_messages[message_key] = {}
-
-                        multi_part_messages[message_key][fragment_num] = line
-
-                        # 检查是否收集了所有片段
-                        if len(multi_part_messages[message_key]) == total_fragments:
-                            # 按顺序组装片段
-                            fragments = []
-                            for frag_num in sorted(multi_part_messages[message_key].keys()):
-                                fragments.append(multi_part_messages[message_key][frag_num])
-
-                            # 解码完整的多片段消息
-                            for fragment in fragments:
-                                try:
-                                    ais_data = self._decode_single_nmea_message(fragment)
-                                    if ais_data:
-                                        decoded_records.append(ais_data)
-                                except Exception as e:
-                                    logger.debug(f"解码多片段消息子片段时出错: {str(e)}")
-
-                            # 清理已处理的消息
-                            del multi_part_messages[message_key]
+                        # 多片段消息：按(信道, 序列号)重组，片段齐全后整体解码一次
+                        channel = parts[4]
+                        fragments = self.fragment_buffer.add(line, total_fragments, fragment_num,
+                                                             sequential_id, channel)
+                        if fragments:
+                            ais_data = self._decode_single_nmea_message(*fragments)
+                            if ais_data:
+                                ready.append(ais_data)
                     else:
-                        # 单片段消息，直接解码
-                        ais_data = self._decode_single_nmea_message(line)
+                        # 单片段消息：已由快速路径解码的直接清洗，否则交给pyais
+                        msg_dict = fast_messages.get(i)
+                        if msg_dict is not None:
+                            ais_data = self._process_message_dict(msg_dict)
+                        else:
+                            ais_data = self._decode_single_nmea_message(line)
                         if ais_data:
-                            decoded_records.append(ais_data)
+                            ready.append(ais_data)
 
                     # 每处理1000条记录输出一次进度
                     if i % 1000 == 0:
-                        logger.info(f"已处理 {i}/{total_lines} 条记录，成功解码 {len(decoded_records)} 条")
+                        logger.info(f"已处理 {i} 条记录，成功解码 {decoded_count + len(ready)} 条")
 
                 except Exception as e:
                     logger.warning(f"处理第 {i} 行时出错: {str(e)}")
@@ -348,30 +529,90 @@ class AISDecoder:
                         self.cleaning_stats.errors_by_type.get('processing_error', 0) + 1
                     continue
 
-        except FileNotFoundError:
-            logger.error(f"未找到AIS文件: {file_path}")
-            return []
-        except Exception as e:
-            logger.error(f"读取AIS文件时出错: {str(e)}")
-            return []
-
-        # 处理剩余未完成的多片段消息（如果有）
-        for message_key, fragments in multi_part_messages.items():
-            if len(fragments) > 0:
-                logger.warning(f"未完成的多片段消息 {message_key}: 收到 {len(fragments)} 个片段")
-
-        logger.info(f"AIS解码完成，共获得 {len(decoded_records)} 条有效位置记录")
-        logger.info(f"数据清洗统计: 正常={self.cleaning_stats.valid_records}, "
-                    f"警告={self.cleaning_stats.warning_records}, "
-                    f"错误={self.cleaning_stats.error_records}")
-
-        return decoded_records
+                decoded_count += len(ready)
+                if line_numbers is not None:
+                    line_numbers.extend([i] * len(ready))
+                yield from ready
+
+        return decoded_count
+
+    def _decode_fastpath_batch(self, batch: List[Tuple[int, str]]) -> Dict[int, Dict[str, Any]]:
+        """用向量化快速路径批量解码一批语句中的单片段位置报告，返回 行号 -> 消息字典"""
+        line_numbers = []
+        candidates = []
+        for i, line in batch:
+            line = line.strip()
+            if not (line.startswith('!AIVDM') or line.startswith('!AIVDO')):
+                continue
+            candidate = split_fastpath_candidate(line)
+            if candidate is not None:
+                line_numbers.append(i)
+                candidates.append(candidate)
+
+        if not candidates:
+            return {}
 
-    def _decode_single_nmea_message(self, nmea_string: str) -> AISData:
-        """解码单条NMEA格式的AIS消息，包含数据清洗"""
+        try:
+            messages = decode_position_reports(candidates)
+        except Exception as e:
+            # 快速路径失败不影响结果：整批回退到pyais
+            logger.debug(f"快速路径解码失败，回退到pyais: {str(e)}")
+            return {}
+
+        return {i: msg for i, msg in zip(line_numbers, messages) if msg is not None}
+
+    def _record_orphan_fragments(self, count: int):
+        """记录被丢弃的不完整多片段消息"""
+        if count > 0:
+            self.cleaning_stats.errors_by_type['orphan_fragments'] = \
+                self.cleaning_stats.errors_by_type.get('orphan_fragments', 0) + count
+
+    def get_fragment_stats(self) -> Dict[str, int]:
+        """获取多片段重组统计"""
+        stats = dict(self.fragment_buffer.stats)
+        stats['pending_messages'] = len(self.fragment_buffer)
+        return stats
+
+    def _update_vessel_static(self, msg_dict: Dict[str, Any]):
+        """从静态报文中提取船舶信息并按MMSI缓存"""
+        mmsi = str(msg_dict.get('mmsi', ''))
+        if not mmsi:
+            return
+
+        static = self.vessel_static.setdefault(mmsi, {})
+        shipname = (msg_dict.get('shipname') or '').strip()
+        if shipname:
+            static['vessel_name'] = shipname
+        callsign = (msg_dict.get('callsign') or '').strip()
+        if callsign:
+            static['call_sign'] = callsign
+        if msg_dict.get('imo'):
+            static['imo'] = str(msg_dict['imo'])
+        if msg_dict.get('ship_type') is not None:
+            static['vessel_type'] = self._get_vessel_type(int(msg_dict['ship_type']))
+
+        to_bow, to_stern = msg_dict.get('to_bow'), msg_dict.get('to_stern')
+        if to_bow is not None and to_stern is not None and (to_bow or to_stern):
+            static['length'] = float(to_bow + to_stern)
+        to_port, to_starboard = msg_dict.get('to_port'), msg_dict.get('to_starboard')
+        if to_port is not None and to_starboard is not None and (to_port or to_starboard):
+            static['width'] = float(to_port + to_starboard)
+        if msg_dict.get('draught'):
+            static['draft'] = float(msg_dict['draught'])
+
+    def apply_vessel_static(self, ais_data: AISData, static: Dict[str, Any]):
+        """用缓存的静态信息逐字段补全NMEA位置记录：只填充仍为默认值的字段，已有的取值不覆盖"""
+        if ais_data.base_date_time:
+            return
+        for field_name, default in self.STATIC_FIELD_DEFAULTS.items():
+            if field_name in static and getattr(ais_data, field_name) == default:
+                setattr(ais_data, field_name, static[field_name])
+
+    def _decode_single_nmea_message(self, *nmea_strings: str) -> AISData:
+        """解码一条完整的NMEA格式AIS消息（多片段消息传入全部片段），包含数据清洗"""
         try:
             # 使用pyais解码
-            decoded = pyais.decode(nmea_string)
+            decoded = pyais.decode(*nmea_strings)
 
             # 将解码结果转换为字典
             if hasattr(decoded, 'asdict'):
@@ -379,100 +620,11 @@ class AISDecoder:
             else:
                 # 如果asdict不可用，尝试获取属性
                 msg_dict = {}
-                for attr in ['mmsi', 'lat', 'lon', 'sog', 'cog', 'heading', 'nav_status', 'type']:
+                for attr in ['msg_type', 'mmsi', 'lat', 'lon', 'speed', 'course', 'heading', 'status', 'ship_type']:
                     if hasattr(decoded, attr):
                         msg_dict[attr] = getattr(decoded, attr)
 
-            # 检查是否有位置信息
-            if 'lat' in msg_dict and 'lon' in msg_dict:
-                lat = msg_dict.get('lat')
-                lon = msg_dict.get('lon')
-
-                if lat is None or lon is None:
-                    self.cleaning_stats.error_records += 1
-                    self.cleaning_stats.errors_by_type['missing_coordinates'] = \
-                        self.cleaning_stats.errors_by_type.get('missing_coordinates', 0) + 1
-                    return None
-
-                # 确保坐标值是数字
-                try:
-                    lat = float(lat)
-                    lon = float(lon)
-                except (ValueError, TypeError):
-                    self.cleaning_stats.error_records += 1
-                    self.cleaning_stats.errors_by_type['coordinate_format'] = \
-                        self.cleaning_stats.errors_by_type.get('coordinate_format', 0) + 1
-                    return None
-
-                # 数据清洗检查
-                cleaning_notes = []
-                data_status = "normal"
-
-                # 检查核心字段缺失
-                mmsi = str(msg_dict.get('mmsi', 'unknown'))
-                if not mmsi or mmsi == 'unknown':
-                    cleaning_notes.append("MMSI缺失")
-                    data_status = "warning"
-                    self.cleaning_stats.warning_records += 1
-                    self.cleaning_stats.warnings_by_type['missing_mmsi'] = \
-                        self.cleaning_stats.warnings_by_type.get('missing_mmsi', 0) + 1
-                else:
-                    self.cleaning_stats.valid_records += 1
-
-                # 跳过无效的坐标
-                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
-                    self.cleaning_stats.error_records += 1
-                    self.cleaning_stats.errors_by_type['coordinate_range'] = \
-                        self.cleaning_stats.errors_by_type.get('coordinate_range', 0) + 1
-                    return None
-
-                # 检查异常坐标（如0,0海洋交叉点）
-                if lat == 0 and lon == 0:
-                    cleaning_notes.append("可疑坐标(0,0)")
-                    data_status = "warning"
-                    self.cleaning_stats.warnings_by_type['suspicious_coordinates'] = \
-                        self.cleaning_stats.warnings_by_type.get('suspicious_coordinates', 0) + 1
-
-                # 获取数值字段并进行清洗
-                sog = float(msg_dict.get('sog', 0.0)) if msg_dict.get('sog') is not None else 0.0
-                cog = float(msg_dict.get('cog', 0.0)) if msg_dict.get('cog') is not None else 0.0
-                heading = float(msg_dict.get('heading', 0.0)) if msg_dict.get('heading') is not None else 0.0
-
-                # 检查数值范围异常
-                if sog < 0 or sog > 50:
-                    cleaning_notes.append(f"航速异常: {sog}")
-                    sog = max(0, min(sog, 50))
-                    data_status = "warning" if data_status == "normal" else data_status
-
-                if cog < 0 or cog > 360:
-                    cleaning_notes.append(f"航向异常: {cog}")
-                    cog = cog % 360
-                    data_status = "warning" if data_status == "normal" else data_status
-
-                if heading < 0 or heading > 360:
-                    cleaning_notes.append(f"船首向异常: {heading}")
-                    heading = heading % 360
-                    data_status = "warning" if data_status == "normal" else data_status
-
-                # 创建AIS数据对象
-                ais_data = AISData(
-                    mmsi=mmsi,
-                    latitude=lat,
-                    longitude=lon,
-                    sog=sog,
-                    cog=cog,
-                    heading=heading,
-                    nav_status=self._get_nav_status(msg_dict.get('nav_status')),
-                    vessel_type=self._get_vessel_type(msg_dict.get('type')),
-                    timestamp=datetime.now(),
-                    data_status=data_status,
-                    cleaning_notes="; ".join(cleaning_notes) if cleaning_notes else ""
-                )
-                return ais_data
-            else:
-                self.cleaning_stats.error_records += 1
-                self.cleaning_stats.errors_by_type['no_position_data'] = \
-                    self.cleaning_stats.errors_by_type.get('no_position_data', 0) + 1
+            return self._process_message_dict(msg_dict)
 
         except Exception as e:
             logger.debug(f"解码消息时出错: {str(e)}")
@@ -481,6 +633,116 @@ class AISDecoder:
                 self.cleaning_stats.errors_by_type.get('decoding_error', 0) + 1
             return None
 
+    def _process_message_dict(self, msg_dict: Dict[str, Any]) -> Optional[AISData]:
+        """
+        将解码后的消息字典（pyais asdict()或快速路径输出，字段名一致）清洗为AISData。
+        静态报文只更新静态信息缓存，不含位置时返回None
+        """
+        # 静态报文（5/19/24）：缓存船名、呼号、船型和尺寸，用于补全位置报告
+        if msg_dict.get('msg_type') in self.STATIC_MESSAGE_TYPES:
+            self._update_vessel_static(msg_dict)
+            if 'lat' not in msg_dict:
+                return None
+
+        # 检查是否有位置信息
+        if 'lat' in msg_dict and 'lon' in msg_dict:
+            lat = msg_dict.get('lat')
+            lon = msg_dict.get('lon')
+
+            if lat is None or lon is None:
+                self.cleaning_stats.error_records += 1
+                self.cleaning_stats.errors_by_type['missing_coordinates'] = \
+                    self.cleaning_stats.errors_by_type.get('missing_coordinates', 0) + 1
+                return None
+
+            # 确保坐标值是数字
+            try:
+                lat = float(lat)
+                lon = float(lon)
+            except (ValueError, TypeError):
+                self.cleaning_stats.error_records += 1
+                self.cleaning_stats.errors_by_type['coordinate_format'] = \
+                    self.cleaning_stats.errors_by_type.get('coordinate_format', 0) + 1
+                return None
+
+            # 数据清洗检查
+            cleaning_notes = []
+            data_status = "normal"
+
+            # 检查核心字段缺失
+            mmsi = str(msg_dict.get('mmsi', 'unknown'))
+            if not mmsi or mmsi == 'unknown':
+                cleaning_notes.append("MMSI缺失")
+                data_status = "warning"
+                self.cleaning_stats.warning_records += 1
+                self.cleaning_stats.warnings_by_type['missing_mmsi'] = \
+                    self.cleaning_stats.warnings_by_type.get('missing_mmsi', 0) + 1
+            else:
+                self.cleaning_stats.valid_records += 1
+
+            # 跳过无效的坐标
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                self.cleaning_stats.error_records += 1
+                self.cleaning_stats.errors_by_type['coordinate_range'] = \
+                    self.cleaning_stats.errors_by_type.get('coordinate_range', 0) + 1
+                return None
+
+            # 检查异常坐标（如0,0海洋交叉点）
+            if lat == 0 and lon == 0:
+                cleaning_notes.append("可疑坐标(0,0)")
+                data_status = "warning"
+                self.cleaning_stats.warnings_by_type['suspicious_coordinates'] = \
+                    self.cleaning_stats.warnings_by_type.get('suspicious_coordinates', 0) + 1
+
+            # 获取数值字段并进行清洗
+            # pyais字段名：speed/course/status，对应本系统的sog/cog/nav_status
+            sog = float(msg_dict['speed']) if msg_dict.get('speed') is not None else 0.0
+            cog = float(msg_dict['course']) if msg_dict.get('course') is not None else 0.0
+            heading = float(msg_dict['heading']) if msg_dict.get('heading') is not None else 0.0
+
+            # 检查数值范围异常
+            if sog < 0 or sog > 50:
+                cleaning_notes.append(f"航速异常: {sog}")
+                sog = max(0, min(sog, 50))
+                data_status = "warning" if data_status == "normal" else data_status
+
+            if cog < 0 or cog > 360:
+                cleaning_notes.append(f"航向异常: {cog}")
+                cog = cog % 360
+                data_status = "warning" if data_status == "normal" else data_status
+
+            if heading < 0 or heading > 360:
+                cleaning_notes.append(f"船首向异常: {heading}")
+                heading = heading % 360
+                data_status = "warning" if data_status == "normal" else data_status
+
+            # 创建AIS数据对象，并用已知的静态信息补全
+            static = self.vessel_static.get(mmsi, {})
+            ais_data = AISData(
+                mmsi=mmsi,
+                latitude=lat,
+                longitude=lon,
+                sog=sog,
+                cog=cog,
+                heading=heading,
+                nav_status=self._get_nav_status(msg_dict.get('status')),
+                vessel_type=static.get('vessel_type') or self._get_vessel_type(msg_dict.get('ship_type')),
+                timestamp=datetime.now(),
+                data_status=data_status,
+                cleaning_notes="; ".join(cleaning_notes) if cleaning_notes else "",
+                vessel_name=static.get('vessel_name', 'unknown'),
+                imo=static.get('imo', 'unknown'),
+                call_sign=static.get('call_sign', 'unknown'),
+                length=static.get('length', 0.0),
+                width=static.get('width', 0.0),
+                draft=static.get('draft', 0.0)
+            )
+            return ais_data
+        else:
+            self.cleaning_stats.error_records += 1
+            self.cleaning_stats.errors_by_type['no_position_data'] = \
+                self.cleaning_stats.errors_by_type.get('no_position_data', 0) + 1
+
         return None
 
     def _parse_float(self, value: str) -> float:
@@ -0,0 +1,173 @@
+"""
+AIS位置报告快速解码路径。
+
+对类型 1/2/3/18/19 的单片段位置报告，批量去除6-bit装甲编码并用NumPy向量化位运算提取字段，
+避免为每条语句构造pyais消息对象和字典。输出字段名、取值与pyais的asdict()保持一致；
+其他类型（及无法快速解码的语句）由调用方回退到pyais。
+"""
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# 载荷首字符 -> 消息类型
+FASTPATH_TYPE_CHARS = {'1': 1, '2': 2, '3': 3, 'B': 18, 'C': 19}
+
+# 各消息类型快速解码所需的最少比特数
+_REQUIRED_BITS = {1: 168, 2: 168, 3: 168, 18: 168, 19: 312}
+
+# (起始比特, 长度, 是否有符号)
+_CLASS_A_FIELDS = {
+    'mmsi': (8, 30, False),
+    'status': (38, 4, False),
+    'speed': (50, 10, False),
+    'lon': (61, 28, True),
+    'lat': (89, 27, True),
+    'course': (116, 12, False),
+    'heading': (128, 9, False),
+}
+
+_CLASS_B_FIELDS = {
+    'mmsi': (8, 30, False),
+    'speed': (46, 10, False),
+    'lon': (57, 28, True),
+    'lat': (85, 27, True),
+    'course': (112, 12, False),
+    'heading': (124, 9, False),
+}
+
+_TYPE19_STATIC_FIELDS = {
+    'ship_type': (263, 8, False),
+    'to_bow': (271, 9, False),
+    'to_stern': (280, 9, False),
+    'to_port': (289, 6, False),
+    'to_starboard': (295, 6, False),
+}
+_TYPE19_SHIPNAME = (143, 120)
+
+# 6-bit ASCII字符表（AIS文本字段）
+_SIXBIT_ASCII = np.array([ord(c) for c in "@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_ !\"#$%&'()*+,-./0123456789:;<=>?"],
+                         dtype=np.uint8)
+
+
+def split_fastpath_candidate(line: str) -> Optional[Tuple[str, int]]:
+    """
+    判断NMEA语句能否走快速路径：单片段、载荷首字符对应位置报告类型。
+    可以则返回 (载荷, 填充比特数)，否则返回None
+    """
+    parts = line.split(',')
+    if len(parts) != 7 or parts[1] != '1':
+        return None
+    payload = parts[5]
+    if not payload or payload[0] not in FASTPATH_TYPE_CHARS:
+        return None
+    try:
+        fill_bits = int(parts[6].split('*', 1)[0] or 0)
+    except ValueError:
+        return None
+    return payload, fill_bits
+
+
+def _payload_bits(payloads: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """批量去装甲：返回 (n, 6*最大长度) 的比特矩阵、每条载荷的有效比特数、字符是否合法"""
+    lengths = np.fromiter((len(p) for p in payloads), dtype=np.int64, count=len(payloads))
+    width = int(lengths.max())
+    raw = np.frombuffer(''.join(p.ljust(width, '0') for p in payloads).encode('ascii', errors='replace'),
+                        dtype=np.uint8).reshape(len(payloads), width)
+
+    valid = np.all(((raw >= 48) & (raw <= 87)) | ((raw >= 96) & (raw <= 119)), axis=1)
+    sixbit = raw.astype(np.int16) - 48
+    sixbit[sixbit > 40] -= 8
+    sixbit = np.clip(sixbit, 0, 63).astype(np.uint8)
+
+    shifts = np.arange(5, -1, -1, dtype=np.uint8)
+    bits = ((sixbit[:, :, None] >> shifts) & 1).reshape(len(payloads), width * 6)
+    return bits, lengths * 6, valid
+
+
+def _extract(bits: np.ndarray, start: int, length: int, signed: bool) -> np.ndarray:
+    """从比特矩阵中按列提取无符号/有符号整数字段"""
+    weights = np.left_shift(np.int64(1), np.arange(length - 1, -1, -1, dtype=np.int64))
+    values = bits[:, start:start + length].astype(np.int64) @ weights
+    if signed:
+        values = np.where(values >= (1 << (length - 1)), values - (1 << length), values)
+    return values
+
+
+def _extract_text(bits: np.ndarray, start: int, length: int) -> List[str]:
+    """提取6-bit ASCII文本字段（与pyais一致：去除'@'填充及首尾空白）"""
+    chars = length // 6
+    codes = np.stack([_extract(bits, start + 6 * k, 6, False) for k in range(chars)], axis=1)
+    ascii_bytes = _SIXBIT_ASCII[codes]
+    return [row.tobytes().decode('ascii').replace('@', '').strip() for row in ascii_bytes]
+
+
+def decode_position_reports(candidates: List[Tuple[str, int]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    批量解码位置报告载荷。
+    candidates 为 split_fastpath_candidate() 的结果列表；返回等长列表，
+    无法快速解码的元素为None（调用方应回退到pyais）
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(candidates)
+    if not candidates:
+        return results
+
+    payloads = [payload for payload, _ in candidates]
+    fill_bits = np.fromiter((fill for _, fill in candidates), dtype=np.int64, count=len(candidates))
+    bits, bit_lengths, valid = _payload_bits(payloads)
+    bit_lengths = bit_lengths - fill_bits
+
+    msg_types = _extract(bits, 0, 6, False)
+    required = np.zeros(len(candidates), dtype=np.int64)
+    for msg_type, needed in _REQUIRED_BITS.items():
+        required[msg_types == msg_type] = needed
+    usable = valid & (required > 0) & (bit_lengths >= required)
+
+    class_a = usable & (msg_types <= 3)
+    class_b = usable & ((msg_types == 18) | (msg_types == 19))
+
+    for mask, fields in ((class_a, _CLASS_A_FIELDS), (class_b, _CLASS_B_FIELDS)):
+        rows = np.nonzero(mask)[0]
+        if rows.size == 0:
+            continue
+        sub = bits[rows]
+        columns = {name: _extract(sub, start, length, signed)
+                   for name, (start, length, signed) in fields.items()}
+
+        # 与pyais的to_converter一致的换算
+        lon = (columns['lon'] / 600000.0).tolist()
+        lat = (columns['lat'] / 600000.0).tolist()
+        speed = (columns['speed'] / 10.0).tolist()
+        course = (columns['course'] / 10.0).tolist()
+        mmsi = columns['mmsi'].tolist()
+        heading = columns['heading'].tolist()
+        types = msg_types[rows].tolist()
+        status = columns['status'].tolist() if 'status' in columns else None
+
+        for k, row in enumerate(rows.tolist()):
+            msg = {
+                'msg_type': types[k],
+                'mmsi': mmsi[k],
+                'speed': speed[k],
+                'lon': round(lon[k], 6),
+                'lat': round(lat[k], 6),
+                'course': course[k],
+                'heading': heading[k],
+            }
+            if status is not None:
+                msg['status'] = status[k]
+            results[row] = msg
+
+    # 类型19额外携带船名、船型和尺寸
+    rows19 = np.nonzero(class_b & (msg_types == 19))[0]
+    if rows19.size:
+        sub = bits[rows19]
+        names = _extract_text(sub, *_TYPE19_SHIPNAME)
+        static = {name: _extract(sub, start, length, signed).tolist()
+                  for name, (start, length, signed) in _TYPE19_STATIC_FIELDS.items()}
+        for k, row in enumerate(rows19.tolist()):
+            msg = results[row]
+            msg['shipname'] = names[k]
+            for name, values in static.items():
+                msg[name] = values[k]
+
+    return results
@@ -1,13 +1,27 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import hashlib
 import logging
 from datetime import datetime
+import threading
 import traceback
 import os
+from pathlib import Path
 import sys
 
 from .config import Config
 from .data_processor import DataProcessor
+from .response_cache import EncodedResponseCache
+from .spatial_index import parse_bbox
+from .pagination import DATA_KEYS, CursorError, ExpiredCursorError, SnapshotRegistry, decode_cursor, read_page
+from .track_store import TrackStore
+from .vector_tiles import TileCache, render_tile
+from .density import DensityAggregator, VALUE_FIELDS, sparse_cells
+from .raster_tiles import RasterTileCache, render_density_tile
+from .clusters import ClusterPyramid
+from .stream import StreamFilter, StreamHub
+from .time_index import NO_TIME_RANGE, TimeIndex, TimeRangeError, filter_rows, format_time_range, parse_time_range
 
 # 配置日志
 logging.basicConfig(
@@ -16,17 +30,104 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class DataJSONProvider(DefaultJSONProvider):
+    """JSON序列化：列式记录存储按记录字典列表输出"""
+
+    @staticmethod
+    def default(obj):
+        if isinstance(obj, TrackStore):
+            return obj.to_dicts()
+        return DefaultJSONProvider.default(obj)
+
+
 # 创建Flask应用
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
+app.json = DataJSONProvider(app)
 CORS(app)  # 允许跨域请求
 
 # 配置
 config = Config()
 data_processor = DataProcessor()
+# /api/data 响应体按数据版本预编码（JSON + gzip/brotli）
+data_responses = EncodedResponseCache(app.json.dumps, config.RESPONSE_GZIP_LEVEL, config.RESPONSE_BROTLI_QUALITY)
+# 分页游标固定的数据版本
+data_snapshots = SnapshotRegistry(config.PAGE_SNAPSHOT_VERSIONS)
+# 按数据版本缓存的矢量瓦片
+tile_cache = TileCache(config.TILE_CACHE_SIZE)
+# 密度网格分块缓存（按数据版本与时间桶）
+density_aggregator = DensityAggregator(config.DENSITY_CHUNK_CELLS, config.DENSITY_TIME_BUCKET_SECONDS,
+                                       config.DENSITY_MAX_LEVEL, config.DENSITY_CACHE_SIZE)
+# 密度热力图栅格瓦片缓存（内存 + 磁盘，数据版本变化时失效）
+density_tiles = RasterTileCache(config.DENSITY_TILE_CACHE_DIR, config.DENSITY_TILE_MEMORY_SIZE,
+                                config.DENSITY_TILE_DISK_SIZE)
+# 位置更新推送的订阅者（每次处理得到新数据后推送变化的目标）
+stream_hub = StreamHub(config.STREAM_MAX_SUBSCRIBERS, config.STREAM_QUEUE_SIZE)
 
 # 全局变量存储处理后的数据
 processed_data = None
 last_update_time = None
+# 处理数据文件的互斥锁（请求触发的更新与后台摄取不同时处理）
+ingest_lock = threading.Lock()
+# 通知后台摄取线程退出
+ingest_stop = threading.Event()
+
+
+def _publish_stream():
+    """把当前处理结果相对上次推送的变化分发给推送订阅者"""
+    if processed_data is None:
+        return
+    try:
+        published = stream_hub.publish_changes(data_processor.change_log)
+        if published:
+            logger.info(f"推送 {published} 个目标的更新")
+    except Exception as e:
+        logger.error(f"推送位置更新时出错: {str(e)}\n{traceback.format_exc()}")
+
+
+def ingest_once() -> bool:
+    """
+    后台摄取一次：增量解码各数据文件新追加或变化的内容，处理结果变化时更新当前数据并推送变化的目标。
+    返回处理结果是否变化（没有变化时沿用原结果，响应缓存与数据版本不变）
+    """
+    global processed_data, last_update_time
+
+    with ingest_lock:
+        data = data_processor.process_all_data()
+        if data is None or data is processed_data:
+            return False
+        processed_data = data
+        last_update_time = datetime.now()
+        density_tiles.set_version(data_processor.data_hash)
+    _publish_stream()
+    return True
+
+
+def start_background_ingest(interval: float = None):
+    """启动后台摄取线程，每隔interval秒（默认INGEST_INTERVAL_SECONDS）调用ingest_once()；间隔不大于0时不启动"""
+    interval = config.INGEST_INTERVAL_SECONDS if interval is None else interval
+    if interval <= 0:
+        logger.info("后台摄取未启用，数据只在请求时更新")
+        return None
+
+    def run():
+        while not ingest_stop.wait(interval):
+            try:
+                if ingest_once():
+                    logger.info("后台摄取完成，数据已更新")
+            except Exception as e:
+                logger.error(f"后台摄取时出错: {str(e)}\n{traceback.format_exc()}")
+
+    ingest_stop.clear()
+    thread = threading.Thread(target=run, name='background-ingest', daemon=True)
+    thread.start()
+    logger.info(f"后台摄取已启动，每 {interval} 秒检查一次数据文件")
+    return thread
+
+
+def stop_background_ingest():
+    """通知后台摄取线程在本次检查后退出"""
+    ingest_stop.set()
 
 
 def initialize_data():
@@ -48,8 +149,11 @@ def initialize_data():
             logger.info(f"清理临时缓存文件: {temp_cache}")
 
         # 处理数据
-        processed_data = data_processor.process_all_data(force_update=False)
-        last_update_time = datetime.now()
+        with ingest_lock:
+            processed_data = data_processor.process_all_data(force_update=False)
+            last_update_time = datetime.now()
+            density_tiles.set_version(data_processor.data_hash)
+        _publish_stream()
 
         if processed_data is None:
             logger.error("数据处理失败，返回None")
@@ -174,7 +278,8 @@ def get_system_info():
                 'exists': config.PROCESSED_DATA_CACHE.exists(),
                 'size': get_file_size(config.PROCESSED_DATA_CACHE),
                 'temp_exists': config.PROCESSED_DATA_CACHE.with_suffix('.tmp').exists(),
-                'bak_exists': config.PROCESSED_DATA_CACHE.with_suffix('.bak').exists()
+                'bak_exists': config.PROCESSED_DATA_CACHE.with_suffix('.bak').exists(),
+                'segments': len(list(config.CACHE_SEGMENT_DIR.glob('*.segment.snap')))
             },
             'data_status': {
                 'processed': processed_data is not None,
@@ -183,7 +288,13 @@ def get_system_info():
                 'ais_by_format': processed_data.get('metadata', {}).get('ais_by_format', {}) if processed_data else {},
                 'adsb_count': processed_data.get('metadata', {}).get('adsb_count', 0) if processed_data else 0,
                 'adsb_by_format': processed_data.get('metadata', {}).get('adsb_by_format', {}) if processed_data else {}
-            }
+            },
+            'response_cache': data_responses.metrics(),
+            'tile_cache': tile_cache.stats(),
+            'density_cache': density_aggregator.stats(),
+            'density_tiles': density_tiles.stats(),
+            'change_log': data_processor.change_log.stats(),
+            'stream': stream_hub.stats()
         }
 
         return jsonify({
@@ -309,15 +420,17 @@ def get_data():
         refresh_cache = request.args.get('refresh_cache', 'false').lower() == 'true'
 
         if refresh_cache:
-            # 强制清除缓存
-            if config.PROCESSED_DATA_CACHE.exists():
-                config.PROCESSED_DATA_CACHE.unlink()
-                logger.info("缓存文件已清除")
+            # 强制清除缓存（缓存清单与各数据文件的缓存分段）
+            with ingest_lock:
+                if data_processor.clear_cache():
+                    logger.info("缓存文件已清除")
 
         if processed_data is None or force_update:
             logger.info("开始处理数据..." if processed_data is None else "强制更新数据...")
-            processed_data = data_processor.process_all_data(force_update=force_update)
-            last_update_time = datetime.now()
+            with ingest_lock:
+                processed_data = data_processor.process_all_data(force_update=force_update)
+                last_update_time = datetime.now()
+            _publish_stream()
 
         if processed_data is None:
             logger.error("数据处理失败，返回None")
@@ -327,17 +440,32 @@ def get_data():
                 'message': '无法处理数据，请检查数据文件和日志'
             }), 500
 
+        # 分页请求：按游标取下一页，或只带limit时返回元数据与各类型的第一页
+        cursor = request.args.get('cursor')
+        if cursor:
+            return _page_response(None, cursor)
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+        if 'limit' in request.args:
+            return _first_pages_response(time_range)
+        if time_range != NO_TIME_RANGE:
+            return _time_range_response(time_range)
+
         # 记录数据统计
         metadata = processed_data.get('metadata', {})
         logger.info(f"返回数据统计: AIS={metadata.get('ais_count', 0)}, ADS-B={metadata.get('adsb_count', 0)}")
 
-        return jsonify({
+        # 同一数据版本只编码一次；客户端已有当前版本时返回304
+        payload = data_responses.get((data_processor.data_hash, last_update_time), lambda: {
             'success': True,
             'data': processed_data,
             'last_update': last_update_time.isoformat() if last_update_time else None,
             'metadata': metadata,
             'message': '数据获取成功'
-        })
+        }, last_update_time)
+        return data_responses.respond(request, payload)
 
     except Exception as e:
         logger.error(f"获取数据时出错: {str(e)}\n{traceback.format_exc()}")
@@ -348,6 +476,750 @@ def get_data():
         }), 500
 
 
+def _page_limit() -> int:
+    """解析分页大小参数"""
+    limit = request.args.get('limit', config.PAGE_DEFAULT_LIMIT, type=int)
+    if limit is None or limit <= 0:
+        raise CursorError(f"无效的分页大小: {request.args.get('limit')}")
+    return min(limit, config.PAGE_MAX_LIMIT)
+
+
+def _query_time_range():
+    """解析start/end参数（ISO时间、epoch秒或-15m等相对时长），无效时抛出TimeRangeError"""
+    return parse_time_range(request.args.get('start'), request.args.get('end'))
+
+
+def _time_range_error_response(error: TimeRangeError):
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'message': '时间范围参数无效：start/end为ISO时间、epoch秒或-15m、-2h等相对时长'
+    }), 400
+
+
+def _time_index(kind, store):
+    """记录存储的时间索引：当前处理结果使用已建立的索引，分页游标固定的旧版本临时建立"""
+    index = data_processor.time_indexes.get(kind)
+    if index is None or index.timestamps is not store.raw('timestamp'):
+        index = TimeIndex(store.raw('timestamp'))
+    return index
+
+
+def _time_rows(kind, store, time_range):
+    """时间范围内的行号（按时间升序），不限时间时返回None"""
+    if time_range == NO_TIME_RANGE:
+        return None
+    return _time_index(kind, store).query(time_range)
+
+
+def _read_data_page(kind, cursor, limit, time_range=NO_TIME_RANGE):
+    """按游标读取一页记录；没有游标时从当前数据版本的第一条开始（游标记录自身的时间范围）"""
+    if cursor:
+        version, kind_of_cursor, offset, time_range = decode_cursor(cursor)
+        if kind is not None and kind_of_cursor != kind:
+            raise CursorError(f"游标不属于{kind}数据")
+        store = data_snapshots.get(version)[DATA_KEYS[kind_of_cursor]]
+        return read_page(store, version, kind_of_cursor, offset, limit,
+                         _time_rows(kind_of_cursor, store, time_range), time_range)
+
+    version = data_snapshots.register(processed_data, data_processor.data_hash)
+    store = processed_data[DATA_KEYS[kind]]
+    return read_page(store, version, kind, 0, limit, _time_rows(kind, store, time_range), time_range)
+
+
+def _cursor_error_response(error: CursorError):
+    """游标错误：过期返回410，格式错误返回400"""
+    if isinstance(error, ExpiredCursorError):
+        return jsonify({
+            'success': False,
+            'error': str(error),
+            'message': '游标对应的数据版本已过期，请从第一页重新获取'
+        }), 410
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'message': '分页参数无效'
+    }), 400
+
+
+def _page_response(kind, cursor):
+    """一页记录的响应"""
+    try:
+        time_range = NO_TIME_RANGE if cursor else _query_time_range()
+        page = _read_data_page(kind, cursor, _page_limit(), time_range)
+    except CursorError as e:
+        return _cursor_error_response(e)
+    except TimeRangeError as e:
+        return _time_range_error_response(e)
+    return jsonify(dict(page, success=True, message='数据获取成功'))
+
+
+def _first_pages_response(time_range=NO_TIME_RANGE):
+    """元数据、覆盖范围与各类型记录的第一页"""
+    try:
+        limit = _page_limit()
+    except CursorError as e:
+        return _cursor_error_response(e)
+    pages = {kind: _read_data_page(kind, None, limit, time_range) for kind in DATA_KEYS}
+    return jsonify({
+        'success': True,
+        'version': pages['ais']['version'],
+        'data': {
+            'metadata': processed_data.get('metadata', {}),
+            'coverage_layers': processed_data.get('coverage_layers', []),
+            'status_summary': processed_data.get('status_summary', {}),
+            'ais_data': pages['ais']['records'],
+            'adsb_data': pages['adsb']['records']
+        },
+        'next_cursors': {kind: page['next_cursor'] for kind, page in pages.items()},
+        'last_update': last_update_time.isoformat() if last_update_time else None,
+        'metadata': processed_data.get('metadata', {}),
+        'message': '数据获取成功'
+    })
+
+
+def _time_range_response(time_range):
+    """时间范围内的全部记录（按时间升序），记录数为时间索引中的连续区间"""
+    records = {}
+    for kind, key in DATA_KEYS.items():
+        store = processed_data[key]
+        records[key] = store.to_dicts(_time_rows(kind, store, time_range))
+    return jsonify({
+        'success': True,
+        'data': dict(records,
+                     metadata=processed_data.get('metadata', {}),
+                     coverage_layers=processed_data.get('coverage_layers', []),
+                     status_summary=processed_data.get('status_summary', {})),
+        'time_range': format_time_range(time_range),
+        'counts': {kind: len(records[key]) for kind, key in DATA_KEYS.items()},
+        'last_update': last_update_time.isoformat() if last_update_time else None,
+        'metadata': processed_data.get('metadata', {}),
+        'message': '数据获取成功'
+    })
+
+
+def _query_types():
+    """解析types参数（逗号分隔的数据类型），无效时返回None"""
+    types = [kind.strip() for kind in request.args.get('types', 'ais,adsb').split(',') if kind.strip()]
+    if not types or any(kind not in DATA_KEYS for kind in types):
+        return None
+    return types
+
+
+def _bbox_records(bbox, types, limit, time_range=NO_TIME_RANGE):
+    """
+    用空间索引查询矩形内（及时间范围内）各类型的记录，返回 (计数, 是否截断, 数据字段 -> 记录列表)；
+    空间索引与当前处理结果不一致时返回None
+    """
+    counts, truncated, records = {}, False, {}
+    for kind in types:
+        index = data_processor.spatial_indexes.get(kind)
+        store = processed_data[DATA_KEYS[kind]]
+        if index is None or index.longitude.shape[0] != len(store):
+            return None
+        rows = filter_rows(store.raw('timestamp'), index.query(*bbox), time_range)
+        counts[kind] = len(rows)
+        truncated = truncated or len(rows) > limit
+        records[DATA_KEYS[kind]] = store.to_dicts(rows[:limit])
+    return counts, truncated, records
+
+
+def _latest_records(bbox, types, limit=None, time_range=NO_TIME_RANGE):
+    """
+    矩形内（及时间范围内）各类型每个目标的最新记录，返回值与_bbox_records相同（limit为None时不截断）；
+    最新状态索引与当前处理结果不一致时返回None
+    """
+    counts, truncated, records = {}, False, {}
+    for kind in types:
+        state = data_processor.latest_states.get(kind)
+        store = processed_data[DATA_KEYS[kind]]
+        if state is None or state.store is not store:
+            return None
+        rows = state.latest_rows(bbox, time_range)
+        counts[kind] = len(rows)
+        truncated = truncated or (limit is not None and len(rows) > limit)
+        records[DATA_KEYS[kind]] = store.to_dicts(rows[:limit])
+    return counts, truncated, records
+
+
+def _index_missing_response():
+    return jsonify({
+        'success': False,
+        'message': '空间索引尚未建立，请先更新数据'
+    }), 503
+
+
+@app.route('/api/data/bbox', methods=['GET'])
+def get_bbox_data():
+    """
+    查询地图视图矩形内的AIS/ADS-B记录：west/south/east/north为经纬度边界（west > east 表示跨越180°经线），
+    types为逗号分隔的数据类型，limit为每种类型最多返回的记录数，start/end为时间范围
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+
+        bbox = parse_bbox(*(request.args.get(name) for name in ('west', 'south', 'east', 'north')))
+        types = _query_types()
+        limit = request.args.get('limit', config.BBOX_MAX_RECORDS, type=int)
+        if bbox is None or types is None or not limit or limit < 0:
+            return jsonify({
+                'success': False,
+                'message': '查询参数无效：需要有效的west/south/east/north，types为ais、adsb'
+            }), 400
+
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+
+        start = datetime.now()
+        found = _bbox_records(bbox, types, min(limit, config.BBOX_MAX_RECORDS), time_range)
+        if found is None:
+            return _index_missing_response()
+        counts, truncated, records = found
+
+        result = dict(records, success=True, bbox=bbox, counts=counts, truncated=truncated,
+                      time_range=format_time_range(time_range))
+        result['query_ms'] = round((datetime.now() - start).total_seconds() * 1000, 3)
+        result['message'] = '查询成功'
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"矩形查询时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '矩形查询失败'
+        }), 500
+
+
+@app.route('/api/clusters', methods=['GET'])
+def get_clusters():
+    """
+    按缩放级别聚类查询：z为地图缩放级别，bbox为"west,south,east,north"，types为逗号分隔的数据类型，
+    start/end为时间范围。z不大于CLUSTER_POINT_ZOOM时返回聚合网格（点数、质心、各类型点数），
+    否则返回矩形内的单个记录（latest=true时只返回每个目标的最新记录）。指定时间范围时由时间范围内的点临时聚合
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+
+        zoom = request.args.get('z', type=int)
+        bbox = parse_bbox(*(request.args.get('bbox', '').split(',') + [None] * 4)[:4])
+        types = _query_types()
+        if zoom is None or zoom < 0 or bbox is None or types is None:
+            return jsonify({
+                'success': False,
+                'message': '查询参数无效：需要z与bbox=west,south,east,north，types为ais、adsb'
+            }), 400
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+
+        if zoom > config.CLUSTER_POINT_ZOOM:
+            latest = request.args.get('latest', 'false').lower() == 'true'
+            found = (_latest_records if latest else _bbox_records)(bbox, types, config.BBOX_MAX_RECORDS, time_range)
+            if found is None:
+                return _index_missing_response()
+            counts, truncated, records = found
+            return jsonify(dict(records, success=True, mode='points', zoom=zoom, bbox=bbox, counts=counts,
+                                truncated=truncated, message='查询成功'))
+
+        pyramid = data_processor.cluster_pyramid
+        if time_range != NO_TIME_RANGE:
+            # 只聚合到查询的缩放级别
+            points = {}
+            for kind, key in DATA_KEYS.items():
+                store = processed_data[key]
+                rows = _time_rows(kind, store, time_range)
+                points[kind] = (store.raw('longitude')[rows], store.raw('latitude')[rows])
+            pyramid = ClusterPyramid(points, zoom)
+        if pyramid is None:
+            return _index_missing_response()
+        clusters = pyramid.query(zoom, bbox, types)
+        return jsonify({
+            'success': True,
+            'mode': 'clusters',
+            'zoom': zoom,
+            'bbox': bbox,
+            'clusters': clusters,
+            'total': sum(cluster['count'] for cluster in clusters),
+            'message': '查询成功'
+        })
+
+    except Exception as e:
+        logger.error(f"聚类查询时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '聚类查询失败'
+        }), 500
+
+
+@app.route('/tiles/density/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+def get_density_tile(z, x, y):
+    """
+    密度热力图栅格瓦片（PNG）：z/x/y为XYZ瓦片坐标，types为逗号分隔的数据类型，start/end为时间范围。
+    瓦片按数据版本与过滤条件缓存在内存与磁盘中，以ETag校验
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+        types = _query_types()
+        if not 0 <= z <= 30 or not 0 <= x < (1 << z) or not 0 <= y < (1 << z) or types is None:
+            return jsonify({
+                'success': False,
+                'message': f'瓦片坐标或数据类型无效: {z}/{x}/{y}'
+            }), 400
+
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+
+        sources = []
+        for kind in types:
+            index = data_processor.spatial_indexes.get(kind)
+            store = processed_data[DATA_KEYS[kind]]
+            if index is None or index.longitude.shape[0] != len(store):
+                return _index_missing_response()
+            sources.append((store, index))
+
+        version = data_processor.data_hash
+        density_tiles.set_version(version)
+        key = (z, x, y, tuple(sorted(types)), time_range)
+        tile = density_tiles.get(key)
+        if tile is None:
+            tile = render_density_tile(sources, z, x, y, config.DENSITY_TILE_SATURATION, time_range)
+            density_tiles.put(key, tile)
+
+        etag = hashlib.md5(f"{version}|{key}".encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(tile, mimetype='image/png')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    except Exception as e:
+        logger.error(f"生成密度瓦片时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '密度瓦片生成失败'
+        }), 500
+
+
+@app.route('/tiles/<any(ais, adsb):layer>/<int:z>/<int:x>/<int:y>.pbf', methods=['GET'])
+def get_vector_tile(layer, z, x, y):
+    """
+    点图层矢量瓦片（Mapbox Vector Tile）：图层为ais或adsb，z/x/y为XYZ瓦片坐标，start/end为时间范围。
+    低缩放级别按像素网格抽稀，编码结果按数据版本缓存，以ETag校验
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+        if not 0 <= z <= 30 or not 0 <= x < (1 << z) or not 0 <= y < (1 << z):
+            return jsonify({
+                'success': False,
+                'message': f'瓦片坐标无效: {z}/{x}/{y}'
+            }), 400
+
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+
+        index = data_processor.spatial_indexes.get(layer)
+        store = processed_data[DATA_KEYS[layer]]
+        if index is None or index.longitude.shape[0] != len(store):
+            return _index_missing_response()
+
+        version = (data_processor.data_hash, last_update_time)
+        key = (version, layer, z, x, y, time_range)
+        tile = tile_cache.get(key)
+        if tile is None:
+            tile = render_tile(store, index, layer, z, x, y, config.TILE_FULL_DETAIL_ZOOM, time_range)
+            tile_cache.put(key, tile)
+
+        etag = hashlib.md5(f"{version}|{layer}/{z}/{x}/{y}|{time_range}".encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(tile, mimetype='application/vnd.mapbox-vector-tile')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    except Exception as e:
+        logger.error(f"生成矢量瓦片时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '矢量瓦片生成失败'
+        }), 500
+
+
+@app.route('/api/tracks', methods=['GET'])
+def get_tracks():
+    """
+    航迹查询：z为地图缩放级别（选择对应的简化层级），bbox为"west,south,east,north"（可选），
+    types为逗号分隔的数据类型，id为目标标识（MMSI或aircraft_id，可选），start/end为时间范围
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+
+        zoom = request.args.get('z', type=int)
+        bbox = None
+        if request.args.get('bbox'):
+            bbox = parse_bbox(*(request.args['bbox'].split(',') + [None] * 4)[:4])
+        types = _query_types()
+        if zoom is None or zoom < 0 or (request.args.get('bbox') and bbox is None) or types is None:
+            return jsonify({
+                'success': False,
+                'message': '查询参数无效：需要z，bbox为west,south,east,north，types为ais、adsb'
+            }), 400
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+
+        tracks, counts, truncated, levels = [], {}, False, {}
+        remaining = config.TRACK_MAX_RESULTS
+        for kind in types:
+            track_set = data_processor.trajectories.get(kind)
+            if track_set is None or track_set.size != len(processed_data[DATA_KEYS[kind]]):
+                return _index_missing_response()
+            selected = track_set.select(bbox, time_range, request.args.get('id'))
+            counts[kind] = len(selected)
+            truncated = truncated or len(selected) > remaining
+            levels[kind] = track_set.level_for(zoom)
+            tracks.extend(track_set.to_dicts(kind, selected[:remaining], levels[kind], time_range))
+            remaining = max(0, config.TRACK_MAX_RESULTS - len(tracks))
+
+        return jsonify({
+            'success': True,
+            'zoom': zoom,
+            'bbox': bbox,
+            'time_range': format_time_range(time_range),
+            # 各数据类型使用的简化层级（None表示未简化）
+            'levels': levels,
+            'tracks': tracks,
+            'counts': counts,
+            'point_count': sum(len(track['coordinates']) for track in tracks),
+            'truncated': truncated,
+            'message': '航迹获取成功'
+        })
+
+    except Exception as e:
+        logger.error(f"航迹查询时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '航迹查询失败'
+        }), 500
+
+
+@app.route('/api/state/latest', methods=['GET'])
+def get_latest_state():
+    """
+    每个目标（MMSI或aircraft_id）的最新记录：types为逗号分隔的数据类型，bbox为"west,south,east,north"（可选），
+    start/end为时间范围（只保留最新记录在范围内的目标，如 start=-15m）
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+
+        bbox = None
+        if request.args.get('bbox'):
+            bbox = parse_bbox(*(request.args['bbox'].split(',') + [None] * 4)[:4])
+        types = _query_types()
+        if (request.args.get('bbox') and bbox is None) or types is None:
+            return jsonify({
+                'success': False,
+                'message': '查询参数无效：bbox为west,south,east,north，types为ais、adsb'
+            }), 400
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+
+        found = _latest_records(bbox, types, time_range=time_range)
+        if found is None:
+            return _index_missing_response()
+        counts, _, records = found
+
+        return jsonify(dict(records, success=True, bbox=bbox, time_range=format_time_range(time_range),
+                            counts=counts, last_update=last_update_time.isoformat() if last_update_time else None,
+                            message='最新状态获取成功'))
+
+    except Exception as e:
+        logger.error(f"获取最新状态时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '最新状态获取失败'
+        }), 500
+
+
+@app.route('/api/data/changes', methods=['GET'])
+def get_data_changes():
+    """
+    增量同步：客户端数据版本since之后新增、更新（返回各目标的最新记录）与移除（返回目标标识）的目标。
+    epoch为客户端数据所属的服务进程纪元；since过早（变更日志已不再保留）或纪元不同时返回resync=true，
+    客户端需重新获取全部数据
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+
+        since = request.args.get('since', type=int)
+        types = _query_types()
+        if since is None or since < 0 or types is None:
+            return jsonify({
+                'success': False,
+                'message': '查询参数无效：since为客户端的数据版本号，types为ais、adsb'
+            }), 400
+
+        change_log = data_processor.change_log
+        epoch = request.args.get('epoch')
+        version, changes, stores = change_log.versioned_changes(since, types) \
+            if epoch in (None, change_log.epoch) else (change_log.version, None, {})
+        if changes is None:
+            return jsonify({
+                'success': True,
+                'resync': True,
+                'version': version,
+                'epoch': change_log.epoch,
+                'message': '客户端数据版本过旧，请重新获取全部数据'
+            })
+
+        result, counts = {}, {}
+        for kind in types:
+            store = stores[kind]
+            if store is None or store is not processed_data[DATA_KEYS[kind]]:
+                return _index_missing_response()
+            rows = changes[kind]
+            result[kind] = {
+                'inserted': store.to_dicts(rows['inserted']),
+                'updated': store.to_dicts(rows['updated']),
+                'evicted': rows['evicted'].tolist()
+            }
+            counts[kind] = {name: len(values) for name, values in result[kind].items()}
+
+        return jsonify({
+            'success': True,
+            'resync': False,
+            'since': since,
+            'version': version,
+            'epoch': change_log.epoch,
+            'changes': result,
+            'counts': counts,
+            'last_update': last_update_time.isoformat() if last_update_time else None,
+            'message': '增量数据获取成功'
+        })
+
+    except Exception as e:
+        logger.error(f"获取增量数据时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '增量数据获取失败'
+        }), 500
+
+
+def _sse(event, data):
+    """编码一条Server-Sent Events消息"""
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+
+def _stream_events(subscriber):
+    """推送连接的消息流：连接信息、合并后的位置更新批次、重新获取全部数据的通知与心跳"""
+    try:
+        yield f"retry: {config.STREAM_RETRY_MILLISECONDS}\n\n"
+        yield _sse('hello', {'subscriber': subscriber.id, 'filter': subscriber.filter.to_dict(),
+                             'version': stream_hub.version, 'epoch': stream_hub.epoch})
+        while not subscriber.closed:
+            resync, events = subscriber.drain(config.STREAM_HEARTBEAT_SECONDS)
+            if resync:
+                yield _sse('resync', {'version': stream_hub.version, 'epoch': stream_hub.epoch})
+            if events:
+                payload = {'version': stream_hub.version, 'epoch': stream_hub.epoch,
+                           'ais_data': [], 'adsb_data': [], 'evicted': {'ais': [], 'adsb': []}}
+                for (kind, entity), record in events:
+                    if record is None:
+                        payload['evicted'][kind].append(entity)
+                    else:
+                        payload[DATA_KEYS[kind]].append(record)
+                yield _sse('positions', payload)
+            elif not resync:
+                yield ": keepalive\n\n"
+    finally:
+        stream_hub.unsubscribe(subscriber)
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_positions():
+    """
+    位置更新推送（Server-Sent Events）：每次处理得到新数据后推送新增、更新（最新记录）与移除的目标。
+    过滤条件：types为逗号分隔的数据类型，bbox为"west,south,east,north"，vessel_type为逗号分隔的船舶类型（只作用于AIS）
+    """
+    bbox = None
+    if request.args.get('bbox'):
+        bbox = parse_bbox(*(request.args['bbox'].split(',') + [None] * 4)[:4])
+    types = _query_types()
+    if (request.args.get('bbox') and bbox is None) or types is None:
+        return jsonify({
+            'success': False,
+            'message': '查询参数无效：bbox为west,south,east,north，types为ais、adsb'
+        }), 400
+    vessel_types = [value.strip() for value in request.args.get('vessel_type', '').split(',') if value.strip()]
+
+    subscriber = stream_hub.subscribe(StreamFilter(types, bbox, vessel_types))
+    if subscriber is None:
+        return jsonify({
+            'success': False,
+            'message': '推送连接数已达上限，请稍后重试'
+        }), 503
+
+    logger.info(f"推送订阅者已连接: {subscriber.id} {subscriber.filter.to_dict()}")
+    return Response(_stream_events(subscriber), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/stream/stats', methods=['GET'])
+def get_stream_stats():
+    """推送统计：订阅者数、队列深度、已发送、合并与丢弃的更新数"""
+    try:
+        return jsonify({
+            'success': True,
+            'stream': stream_hub.stats(),
+            'message': '推送统计获取成功'
+        })
+
+    except Exception as e:
+        logger.error(f"获取推送统计时出错: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '推送统计获取失败'
+        }), 500
+
+
+@app.route('/api/density', methods=['GET'])
+def get_density():
+    """
+    密度热力图网格：bbox为"west,south,east,north"，res为矩形长边的最大网格数，type为ais或adsb，
+    start/end为时间范围，mean=true时同时返回各网格的平均值（AIS为航速、ADS-B为高度）。
+    只返回非空网格：cells为行优先的网格编号（第0行为最北），counts为点数
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+
+        bbox = parse_bbox(*(request.args.get('bbox', '').split(',') + [None] * 4)[:4])
+        res = request.args.get('res', config.DENSITY_DEFAULT_RES, type=int)
+        kind = request.args.get('type', 'ais')
+        if bbox is None or res is None or res <= 0 or kind not in DATA_KEYS:
+            return jsonify({
+                'success': False,
+                'message': '查询参数无效：需要bbox=west,south,east,north，res为正整数，type为ais或adsb'
+            }), 400
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+
+        index = data_processor.spatial_indexes.get(kind)
+        store = processed_data[DATA_KEYS[kind]]
+        if index is None or index.longitude.shape[0] != len(store):
+            return _index_missing_response()
+
+        start = datetime.now()
+        version = (data_processor.data_hash, last_update_time)
+        grid = density_aggregator.grid(store, index, _time_index(kind, store), kind, version, bbox,
+                                       min(res, config.DENSITY_MAX_RES), time_range)
+        with_means = request.args.get('mean', 'false').lower() == 'true'
+
+        result = sparse_cells(grid, with_means)
+        result.update({
+            'success': True,
+            'type': kind,
+            'bbox': bbox,
+            'time_range': format_time_range(time_range),
+            'level': grid['level'],
+            'cell_degrees': grid['cell_degrees'],
+            'origin': grid['origin'],
+            'shape': grid['shape'],
+            'total': int(grid['counts'].sum()),
+            'max_count': int(grid['counts'].max()) if grid['counts'].size else 0,
+            'value_field': VALUE_FIELDS[kind] if with_means else None,
+            'query_ms': round((datetime.now() - start).total_seconds() * 1000, 3),
+            'message': '查询成功'
+        })
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"密度查询时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '密度查询失败'
+        }), 500
+
+
+@app.route('/api/data/<any(ais, adsb):kind>', methods=['GET'])
+def get_data_page(kind):
+    """
+    按游标分页获取AIS或ADS-B记录（cursor为空时从当前数据版本的第一条开始）；
+    start/end为时间范围，指定时按时间升序分页
+    """
+    try:
+        cursor = request.args.get('cursor')
+        if processed_data is None and not cursor:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+        return _page_response(kind, cursor)
+
+    except Exception as e:
+        logger.error(f"获取分页数据时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '数据获取失败'
+        }), 500
+
+
 @app.route('/api/data/stats', methods=['GET'])
 def get_data_stats():
     """获取数据统计信息"""
@@ -371,6 +1243,16 @@ def get_data_stats():
             'metadata': processed_data.get('metadata', {})
         }
 
+        # 指定时间范围时统计范围内的记录数（时间索引二分查找，不扫描记录）
+        try:
+            time_range = _query_time_range()
+        except TimeRangeError as e:
+            return _time_range_error_response(e)
+        if time_range != NO_TIME_RANGE:
+            counts = {kind: _time_index(kind, processed_data[key]).count(time_range)
+                      for kind, key in DATA_KEYS.items()}
+            stats['time_range'] = {'range': format_time_range(time_range), 'counts': counts}
+
         return jsonify({
             'success': True,
             'stats': stats,
@@ -388,27 +1270,46 @@ def get_data_stats():
 
 @app.route('/api/data/update', methods=['POST'])
 def update_data():
-    """更新数据（重新扫描文件）"""
+    """
+    更新数据：默认增量摄取各文件新追加的内容（文件被截断或轮转时自动全量重扫）；
+    full=true 时清除缓存后重新扫描所有文件
+    """
     global processed_data, last_update_time
 
     try:
-        logger.info("收到数据更新请求")
-
-        # 清除缓存
-        cache_files = [
-            config.PROCESSED_DATA_CACHE,
-            config.PROCESSED_DATA_CACHE.with_suffix('.tmp'),
-            config.PROCESSED_DATA_CACHE.with_suffix('.bak')
-        ]
-
-        for cache_file in cache_files:
-            if cache_file.exists():
-                cache_file.unlink(missing_ok=True)
-                logger.info(f"已清除缓存文件: {cache_file}")
-
-        # 重新处理所有数据
-        processed_data = data_processor.process_all_data(force_update=True)
-        last_update_time = datetime.now()
+        full_rescan = request.args.get('full', 'false').lower() == 'true'
+        logger.info(f"收到数据更新请求（{'全量重扫' if full_rescan else '增量更新'}）")
+
+        with ingest_lock:
+            previous = processed_data
+            if full_rescan:
+                # 清除缓存
+                cache_files = [
+                    config.PROCESSED_DATA_CACHE.with_suffix('.tmp'),
+                    config.PROCESSED_DATA_CACHE.with_suffix('.bak')
+                ]
+
+                for cache_file in cache_files:
+                    if cache_file.exists():
+                        cache_file.unlink(missing_ok=True)
+                        logger.info(f"已清除缓存文件: {cache_file}")
+                for name in data_processor.clear_cache():
+                    logger.info(f"已清除缓存文件: {name}")
+
+                # 重新处理所有数据
+                processed_data = data_processor.process_all_data(force_update=True)
+            else:
+                # 复用未变化文件的缓存分段，只解码追加或变化的文件
+                processed_data = data_processor.process_all_data()
+            # 处理结果没有变化时沿用原结果，响应缓存与数据版本不变
+            changed = processed_data is not None and processed_data is not previous
+            if changed:
+                last_update_time = datetime.now()
+                # 数据版本变化时删除旧版本的密度瓦片
+                density_tiles.set_version(data_processor.data_hash)
+        if changed:
+            # 向推送订阅者发送变化的目标
+            _publish_stream()
 
         if processed_data is None:
             return jsonify({
@@ -420,7 +1321,9 @@ def update_data():
         return jsonify({
             'success': True,
             'message': '数据更新成功',
-            'last_update': last_update_time.isoformat(),
+            'mode': 'full' if full_rescan else 'incremental',
+            'changed': changed,
+            'last_update': last_update_time.isoformat() if last_update_time else None,
             'data_stats': {
                 'total_records': processed_data.get('metadata', {}).get('total_records', 0),
                 'ais_count': processed_data.get('metadata', {}).get('ais_count', 0),
@@ -465,12 +1368,61 @@ def get_coverage_layers():
         }), 500
 
 
+@app.route('/api/adsb/polar', methods=['GET'])
+def get_adsb_polar():
+    """
+    ADS-B接收机极坐标覆盖图：每台接收机（ADS-B数据文件）各高度层、方位扇区的最远接收距离与报文数，
+    以及最远距离连成的轮廓；receiver为数据文件名（可选），band为轮廓使用的高度层下标（默认取所有高度层）
+    """
+    try:
+        if processed_data is None:
+            return jsonify({
+                'success': False,
+                'message': '数据未初始化，请先获取数据'
+            }), 400
+
+        receiver = request.args.get('receiver')
+        band = request.args.get('band', type=int)
+        if band is not None and not 0 <= band < len(config.POLAR_ALTITUDE_BANDS):
+            return jsonify({
+                'success': False,
+                'message': f'查询参数无效：band为0到{len(config.POLAR_ALTITUDE_BANDS) - 1}的高度层下标'
+            }), 400
+
+        receivers = []
+        for segment in data_processor.segments.values():
+            name = Path(segment.path).name
+            if segment.kind != 'adsb' or (receiver and name != receiver):
+                continue
+            polar = segment.polar_coverage(config.POLAR_SECTOR_DEGREES, config.POLAR_ALTITUDE_BANDS)
+            receivers.append(dict(polar.to_dict(), receiver=name, outline=polar.outline(band)))
+        if receiver and not receivers:
+            return jsonify({
+                'success': False,
+                'message': f'未找到接收机: {receiver}'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'receivers': receivers,
+            'band': band,
+            'message': '接收机覆盖图获取成功'
+        })
+
+    except Exception as e:
+        logger.error(f"获取接收机覆盖图时出错: {str(e)}\n{traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '接收机覆盖图获取失败'
+        }), 500
+
+
 @app.route('/api/data/cache/clear', methods=['POST'])
 def clear_cache():
     """清除缓存"""
     try:
         cache_files = [
-            config.PROCESSED_DATA_CACHE,
             config.PROCESSED_DATA_CACHE.with_suffix('.tmp'),
             config.PROCESSED_DATA_CACHE.with_suffix('.bak')
         ]
@@ -481,10 +1433,16 @@ def clear_cache():
                 cache_file.unlink()
                 cleared_count += 1
                 logger.info(f"已清除缓存文件: {cache_file}")
+        for name in data_processor.clear_cache():
+            cleared_count += 1
+            logger.info(f"已清除缓存文件: {name}")
 
         global processed_data, last_update_time
         processed_data = None
         last_update_time = None
+        tile_cache.clear()
+        density_aggregator.clear()
+        density_tiles.clear()
 
         return jsonify({
             'success': True,
@@ -533,9 +1491,10 @@ def get_cache_content():
             'preview': content[:1000] + '...' if len(content) > 1000 else content,
             'data_preview': {
                 'metadata': data.get('metadata') if data else None,
-                'ais_count': len(data.get('ais_data', [])) if data else 0,
+                'ais_count': data.get('metadata', {}).get('ais_count', 0) if data else 0,
                 'ais_by_format': data.get('metadata', {}).get('ais_by_format', {}) if data else {},
-                'adsb_count': len(data.get('adsb_data', [])) if data else 0
+                'adsb_count': data.get('metadata', {}).get('adsb_count', 0) if data else 0,
+                'segments': len(data.get('segments', [])) if data else 0
             } if data else None
         })
 
@@ -590,5 +1549,11 @@ if __name__ == '__main__':
     if not initialize_data():
         logger.warning("数据初始化失败，将在首次请求时重试")
 
+    # 后台摄取数据文件新追加的内容，并向推送订阅者发送变化的目标。
+    # 调试模式下Werkzeug重载器的父进程只负责监视文件并重启子进程，只在实际提供服务的子进程中摄取，
+    # 避免两个进程同时写入同一缓存目录
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_ingest()
+
     logger.info("启动Flask应用...")
     app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
\ No newline at end of file
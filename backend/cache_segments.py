@@ -0,0 +1,248 @@
+"""
+按数据源分段的处理结果缓存。
+
+每个输入文件对应一个缓存分段：文件指纹、增量摄取检查点、清洗统计、汇总信息（记录数、状态分布、在线数、
+坐标边界）以及该文件的记录，以二进制快照（见snapshot模块）保存，加载时列数组直接映射文件内容。
+分段每次保存都写入新的版本序号文件名，不替换可能仍被映射的旧文件（Windows上无法替换或删除），
+旧版本文件在不再被映射后删除。
+启动时只重建指纹失效的分段，有效分段直接复用；
+合并后的元数据由各分段的汇总信息计算，无需遍历记录；覆盖范围与每个目标的最新记录按分段分别计算（见coverage、latest_state模块），
+ADS-B分段另有接收机极坐标覆盖图（见polar_coverage模块）。
+"""
+import glob
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .coverage import CoverageGrid
+from .ingest_checkpoint import FileCheckpoint
+from .latest_state import LatestState
+from .models import AISData, ADSData
+from .polar_coverage import PolarCoverage
+from .snapshot import read_snapshot, verify_snapshot, write_snapshot
+from .track_store import TrackStore
+
+logger = logging.getLogger(__name__)
+
+# 分段文件格式版本，格式或清洗规则变化时递增以使旧分段失效
+SEGMENT_FORMAT_VERSION = 3
+
+# 数据源类型 -> 记录模型
+RECORD_CLASSES = {'ais': AISData, 'adsb': ADSData}
+
+# 指纹抽样：文件开头、中间、结尾各读取的字节数
+_SAMPLE_BYTES = 64 * 1024
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_SEGMENT_SUFFIX = '.segment.snap'
+
+
+def file_fingerprint(file_path, full_hash: bool = False) -> Dict[str, Any]:
+    """
+    计算文件指纹：大小 + 修改时间 + 抽样内容哈希（开头、中间、结尾各一段），
+    full_hash时另计算整个文件的MD5
+    """
+    stat = os.stat(file_path)
+    size = stat.st_size
+    sample = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - _SAMPLE_BYTES // 2), max(0, size - _SAMPLE_BYTES)}):
+            f.seek(offset)
+            sample.update(f.read(_SAMPLE_BYTES))
+
+    fingerprint = {'size': size, 'mtime_ns': stat.st_mtime_ns, 'sample': sample.hexdigest(), 'full': None}
+    if full_hash:
+        full = hashlib.md5()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                full.update(chunk)
+        fingerprint['full'] = full.hexdigest()
+    return fingerprint
+
+
+def fingerprint_matches(saved: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    """判断分段保存的指纹与文件当前指纹是否一致（两者都有整文件哈希时一并比较）"""
+    if any(saved.get(key) != current.get(key) for key in ('size', 'mtime_ns', 'sample')):
+        return False
+    if saved.get('full') and current.get('full'):
+        return saved['full'] == current['full']
+    return True
+
+
+class SourceSegment:
+    """单个数据文件的缓存分段"""
+
+    def __init__(self, kind: str, path: str, file_format: str, store: TrackStore, checkpoint: FileCheckpoint,
+                 fingerprint: Dict[str, Any], cleaning_stats: Dict[str, Any], summary: Dict[str, Any],
+                 vessel_static: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.kind = kind
+        self.path = str(path)
+        self.file_format = file_format
+        self.store = store
+        self.checkpoint = checkpoint
+        self.fingerprint = fingerprint
+        self.cleaning_stats = cleaning_stats
+        # 汇总信息：count, by_status, online, bounds
+        self.summary = summary
+        # NMEA文件的船舶静态信息（增量解码时补全新位置报告）
+        self.vessel_static = vessel_static or {}
+        # 分段所在的分段文件（尚未保存时为None）
+        self.file: Optional[Path] = None
+        # 覆盖范围网格（只保存在内存中，首次使用时建立，之后只合并新追加的记录）
+        self.coverage: Optional[CoverageGrid] = None
+        # ADS-B接收机极坐标覆盖图（同样只保存在内存中、增量合并）
+        self.polar: Optional[PolarCoverage] = None
+        # 每个目标的最新记录（同样只保存在内存中，追加记录后只处理新追加的行）
+        self.latest: Optional[LatestState] = None
+
+    def coverage_grid(self, cell_degrees: float) -> CoverageGrid:
+        """分段记录的覆盖范围网格"""
+        if self.coverage is None or self.coverage.cell_degrees != cell_degrees:
+            self.coverage = CoverageGrid(cell_degrees)
+        self.coverage.update(self.store)
+        return self.coverage
+
+    def polar_coverage(self, sector_degrees: float, altitude_bands: List[float]) -> PolarCoverage:
+        """分段记录（ADS-B）的接收机极坐标覆盖图"""
+        if (self.polar is None or self.polar.sector_degrees != sector_degrees or
+                self.polar.altitude_bands != [float(band) for band in altitude_bands]):
+            self.polar = PolarCoverage(sector_degrees, altitude_bands)
+        self.polar.update(self.store)
+        return self.polar
+
+    def latest_state(self, entity_field: str) -> LatestState:
+        """分段记录中每个目标的最新记录"""
+        if self.latest is None or self.latest.store is not self.store or self.latest.entity_field != entity_field:
+            self.latest = LatestState(self.store, entity_field)
+        self.latest.update()
+        return self.latest
+
+    def describe(self) -> Dict[str, Any]:
+        """分段的描述信息（不含记录）"""
+        return {
+            'kind': self.kind,
+            'path': self.path,
+            'file_format': self.file_format,
+            'fingerprint': self.fingerprint,
+            'summary': self.summary,
+            'cleaning_stats': self.cleaning_stats
+        }
+
+    def save(self, directory: Path) -> bool:
+        """写入新版本的分段文件并删除旧版本，返回是否成功"""
+        existing = segment_files(directory, self.kind, self.path)
+        segment_file = segment_path(directory, self.kind, self.path, existing[-1][0] + 1 if existing else 0)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            meta = self.describe()
+            meta.update({
+                'format_version': SEGMENT_FORMAT_VERSION,
+                'checkpoint': self.checkpoint.to_dict(),
+                'vessel_static': self.vessel_static
+            })
+            write_snapshot(segment_file, self.store, meta)
+            self.file = segment_file
+            logger.info(f"缓存分段已保存: {segment_file.name} ({self.summary.get('count', 0)} 条记录)")
+        except Exception as e:
+            logger.error(f"保存缓存分段 {segment_file.name} 时出错: {str(e)}")
+            return False
+
+        # 旧版本可能仍被映射（本分段追加前的存储），删除失败时留待之后清理
+        for _, old_file in existing:
+            remove_segment_file(old_file)
+        return True
+
+    @classmethod
+    def load(cls, directory: Path, kind: str, path) -> Optional['SourceSegment']:
+        """加载数据文件对应的最新版本分段（不校验列数据）；分段不存在、版本不符或损坏时返回None"""
+        existing = segment_files(directory, kind, path)
+        if not existing:
+            return None
+        segment_file = existing[-1][1]
+        try:
+            store, meta = read_snapshot(segment_file, RECORD_CLASSES[kind])
+            if meta.get('format_version') != SEGMENT_FORMAT_VERSION or meta.get('path') != str(path):
+                logger.info(f"缓存分段 {segment_file.name} 版本或来源不符，将重建")
+                return None
+            segment = cls(kind, meta['path'], meta['file_format'], store,
+                          FileCheckpoint.from_dict(meta['checkpoint']), meta['fingerprint'],
+                          meta['cleaning_stats'], meta['summary'], meta.get('vessel_static'))
+            segment.file = segment_file
+            return segment
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            logger.warning(f"缓存分段 {segment_file.name} 损坏，将重建: {str(e)}")
+            return None
+
+    def verify(self) -> bool:
+        """校验分段文件的列数据CRC32；校验失败时丢弃分段（见discard），下次处理时从头解码。返回是否通过"""
+        if self.file is None:
+            return True
+        try:
+            verify_snapshot(self.file, RECORD_CLASSES[self.kind])
+            return True
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            logger.error(f"缓存分段 {self.file.name} 校验失败，下次处理时重建: {str(e)}")
+            self.discard()
+            return False
+
+    def discard(self):
+        """
+        丢弃损坏的分段：清空存储、检查点与指纹并删除分段文件，
+        之后既不会被复用，也不会从检查点在损坏的存储上增量解码
+        """
+        segment_file = self.file
+        self.store = TrackStore(RECORD_CLASSES[self.kind])
+        self.checkpoint = FileCheckpoint(self.path, self.file_format)
+        self.fingerprint = {}
+        self.coverage = self.polar = self.latest = None
+        self.file = None
+        if segment_file is not None:
+            remove_segment_file(segment_file)
+
+
+def _segment_prefix(kind: str, path) -> str:
+    """分段文件名前缀（文件名 + 完整路径哈希，避免同名文件冲突）"""
+    path = Path(path)
+    digest = hashlib.md5(str(path).encode('utf-8')).hexdigest()[:8]
+    return f"{kind}-{path.name}-{digest}"
+
+
+def segment_path(directory: Path, kind: str, path, generation: int = 0) -> Path:
+    """数据文件对应的第generation版分段文件路径"""
+    return Path(directory) / f"{_segment_prefix(kind, path)}.{generation}{_SEGMENT_SUFFIX}"
+
+
+def segment_files(directory: Path, kind: str, path) -> List[Tuple[int, Path]]:
+    """数据文件已有的分段文件 [(版本序号, 路径)]，按版本序号升序"""
+    prefix = _segment_prefix(kind, path)
+    files = []
+    for segment_file in Path(directory).glob(f"{glob.escape(prefix)}.*{_SEGMENT_SUFFIX}"):
+        generation = segment_file.name[len(prefix) + 1:-len(_SEGMENT_SUFFIX)]
+        if generation.isdigit():
+            files.append((int(generation), segment_file))
+    return sorted(files)
+
+
+def remove_segments(directory: Path, keep: Optional[List[Path]] = None) -> int:
+    """删除分段目录中不在keep列表里的分段文件（仍被映射而无法删除的跳过），返回删除的文件数"""
+    directory = Path(directory)
+    if not directory.exists():
+        return 0
+    keep = {Path(p).name for p in keep or []}
+    removed = 0
+    for segment_file in directory.glob('*.segment.*'):
+        if segment_file.name not in keep and remove_segment_file(segment_file):
+            removed += 1
+    return removed
+
+
+def remove_segment_file(segment_file: Path) -> bool:
+    """删除分段文件，返回是否成功；Windows上仍被映射的文件无法删除"""
+    try:
+        segment_file.unlink(missing_ok=True)
+        return True
+    except OSError as e:
+        logger.debug(f"分段文件 {segment_file.name} 暂时无法删除: {str(e)}")
+        return False
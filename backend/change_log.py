@@ -0,0 +1,160 @@
+"""
+增量同步的变更日志。
+
+每次处理得到新的处理结果时，按目标（AIS的MMSI、ADS-B的aircraft_id）比较前后两个版本的最新状态：
+新出现的目标记为新增，最新记录（时间戳或位置）变化的目标记为更新，不再出现的目标记为移除，
+变更以批次追加到日志中并得到单调递增的数据版本号。日志只保留最近max_entries条变更，
+客户端的版本早于保留范围（或来自服务重启之前，纪元不同）时需要重新获取全部数据。
+"""
+import threading
+import uuid
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .latest_state import LatestState
+from .track_store import TrackStore
+
+# 变更类型
+INSERTED, UPDATED, EVICTED = 0, 1, 2
+
+
+class EntitySnapshot:
+    """一个版本中一种数据类型各目标的最新状态：ids升序，rows为最新记录在store中的行号"""
+
+    def __init__(self, store: Optional[TrackStore], ids: np.ndarray, rows: np.ndarray,
+                 times: np.ndarray, longitude: np.ndarray, latitude: np.ndarray):
+        self.store = store
+        self.ids, self.rows = ids, rows
+        self.times, self.longitude, self.latitude = times, longitude, latitude
+
+    @classmethod
+    def empty(cls) -> 'EntitySnapshot':
+        return cls(None, np.zeros(0, dtype=str), *(np.zeros(0, dtype=dtype)
+                                                   for dtype in (np.int64, np.int64, np.float64, np.float64)))
+
+    @classmethod
+    def from_state(cls, state: LatestState) -> 'EntitySnapshot':
+        codes = np.flatnonzero(state.rows >= 0)
+        ids = np.asarray(state.store.categories[state.entity_field].values, dtype=str)[codes]
+        order = np.argsort(ids, kind='stable')
+        rows = state.rows[codes[order]]
+        return cls(state.store, ids[order], rows, state.times[codes[order]],
+                   state.store.raw('longitude')[rows], state.store.raw('latitude')[rows])
+
+    def rows_of(self, ids: np.ndarray) -> np.ndarray:
+        """目标对应的最新记录行号（ids须都在本版本中）"""
+        return self.rows[np.searchsorted(self.ids, ids)]
+
+
+def diff_snapshots(previous: EntitySnapshot, current: EntitySnapshot) -> Tuple[np.ndarray, np.ndarray]:
+    """两个版本之间的变更，返回 (目标标识, 变更类型)"""
+    _, before, after = np.intersect1d(previous.ids, current.ids, assume_unique=True, return_indices=True)
+    changed = ((previous.times[before] != current.times[after]) |
+               (previous.longitude[before] != current.longitude[after]) |
+               (previous.latitude[before] != current.latitude[after]))
+    inserted = np.setdiff1d(current.ids, previous.ids, assume_unique=True)
+    updated = current.ids[after[changed]]
+    evicted = np.setdiff1d(previous.ids, current.ids, assume_unique=True)
+    ids = np.concatenate([inserted, updated, evicted])
+    ops = np.repeat(np.array([INSERTED, UPDATED, EVICTED], dtype=np.int8),
+                    [len(inserted), len(updated), len(evicted)])
+    return ids, ops
+
+
+class ChangeLog:
+    """
+    按目标的变更日志：version为当前数据版本（每次record()加一），floor为可增量同步的最早版本
+    （since不小于floor时日志中有since之后的全部变更），epoch区分服务进程（重启后版本号重新计数）
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.floor = 0
+        # (版本, 数据类型, 目标标识, 变更类型)
+        self._batches: deque = deque()
+        self._entries = 0
+        self._snapshots: Dict[str, EntitySnapshot] = {}
+        self._lock = threading.Lock()
+
+    def record(self, latest_states: Dict[str, LatestState]) -> int:
+        """记录新处理结果中各目标的最新状态与上一版本的差异，返回新的版本号"""
+        snapshots = {kind: EntitySnapshot.from_state(state) for kind, state in latest_states.items()}
+        with self._lock:
+            self.version += 1
+            for kind in sorted(set(snapshots) | set(self._snapshots)):
+                current = snapshots.get(kind) or EntitySnapshot.empty()
+                ids, ops = diff_snapshots(self._snapshots.get(kind) or EntitySnapshot.empty(), current)
+                if len(ids):
+                    self._batches.append((self.version, kind, ids, ops))
+                    self._entries += len(ids)
+            self._snapshots = snapshots
+            # 超出保留条数时按版本整批丢弃最早的变更
+            while self._entries > self.max_entries and self._batches:
+                dropped = self._batches[0][0]
+                while self._batches and self._batches[0][0] == dropped:
+                    self._entries -= len(self._batches.popleft()[2])
+                self.floor = dropped
+            return self.version
+
+    def snapshot(self, kind: str) -> Optional[EntitySnapshot]:
+        return self._snapshots.get(kind)
+
+    def changes(self, since: int, kinds: Iterable[str]) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+        """
+        since版本之后各数据类型的变更：inserted/updated为当前版本中的最新记录行号，evicted为目标标识；
+        同一目标的多次变更合并（客户端在since版本没有、当前也没有的目标不返回）。
+        since不在可增量同步的范围内时返回None（需要重新获取全部数据）
+        """
+        return self.versioned_changes(since, kinds)[1]
+
+    def versioned_changes(self, since: int, kinds: Iterable[str]) \
+            -> Tuple[int, Optional[Dict[str, Dict[str, np.ndarray]]], Dict[str, Optional[TrackStore]]]:
+        """
+        同changes()，同时返回变更截止的版本号与各数据类型的记录存储（行号所指的存储）：
+        三者在同一次加锁中取得，期间记录的新版本不会混入
+        """
+        with self._lock:
+            version = self.version
+            snapshots = dict(self._snapshots)
+            if since < self.floor or since > version:
+                return version, None, {}
+            batches = [batch for batch in self._batches if batch[0] > since]
+
+        stores = {kind: (snapshots.get(kind) or EntitySnapshot.empty()).store for kind in kinds}
+        result = {}
+        for kind in kinds:
+            selected = [(ids, ops) for _, batch_kind, ids, ops in batches if batch_kind == kind]
+            inserted, updated, evicted = _collapse(selected)
+            snapshot = snapshots.get(kind) or EntitySnapshot.empty()
+            result[kind] = {
+                'inserted': snapshot.rows_of(inserted),
+                'updated': snapshot.rows_of(updated),
+                'evicted': evicted
+            }
+        return version, result, stores
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'version': self.version, 'floor': self.floor, 'entries': self._entries,
+                    'max_entries': self.max_entries, 'batches': len(self._batches)}
+
+
+def _collapse(batches: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    合并按版本顺序排列的变更批次：目标的第一次变更说明它在起始版本是否存在（新增表示不存在），
+    最后一次变更说明它当前是否存在（移除表示不存在）
+    """
+    if not batches:
+        empty = np.zeros(0, dtype=str)
+        return empty, empty, empty
+    ids = np.concatenate([ids for ids, _ in batches])
+    ops = np.concatenate([ops for _, ops in batches])
+    unique, first = np.unique(ids, return_index=True)
+    _, last_from_end = np.unique(ids[::-1], return_index=True)
+    existed = ops[first] != INSERTED
+    present = ops[len(ids) - 1 - last_from_end] != EVICTED
+    return unique[~existed & present], unique[existed & present], unique[existed & ~present]
@@ -0,0 +1,142 @@
+"""
+按缩放级别聚合的点聚类金字塔。
+
+将各数据类型的点按Web墨卡托投影划入网格：缩放级别z的网格每个方向有 2^z * CELLS_PER_TILE 个
+（每个256像素瓦片划分为 CELLS_PER_TILE x CELLS_PER_TILE 个网格）。最细级别由点直接分组统计，
+较粗级别由下一级的四个子网格合并（四叉树），每个网格保存各数据类型的点数与坐标和，
+查询时按选中的类型汇总点数与质心。
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# 每个瓦片每个方向的网格数（256像素瓦片上约64像素一个网格）
+CELLS_PER_TILE = 4
+# Web墨卡托投影的纬度范围
+_MAX_LATITUDE = 85.05112878
+
+
+def mercator_xy(lon: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """经纬度转为归一化Web墨卡托坐标，x、y均在[0, 1)内（y向南增大）"""
+    lat = np.clip(lat, -_MAX_LATITUDE, _MAX_LATITUDE)
+    x = (lon + 180.0) / 360.0
+    sin = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)
+    limit = np.nextafter(1.0, 0.0)
+    return np.clip(x, 0.0, limit), np.clip(y, 0.0, limit)
+
+
+class ClusterLevel:
+    """
+    单个缩放级别的非空网格：网格编号（行 * 每行网格数 + 列，升序）与各类型的点数、坐标和
+    （形状为 类型数 x 网格数）
+    """
+
+    def __init__(self, zoom: int, keys: np.ndarray, counts: np.ndarray, sum_lon: np.ndarray, sum_lat: np.ndarray):
+        self.zoom = zoom
+        self.cells_per_axis = (1 << zoom) * CELLS_PER_TILE
+        self.keys = keys
+        self.cx = keys % self.cells_per_axis
+        self.cy = keys // self.cells_per_axis
+        self.counts = counts
+        self.sum_lon = sum_lon
+        self.sum_lat = sum_lat
+
+    def __len__(self) -> int:
+        return len(self.cx)
+
+    def parent(self) -> 'ClusterLevel':
+        """合并四个子网格得到上一级（缩放级别减一）"""
+        return _group(self.zoom - 1, self.cx >> 1, self.cy >> 1, self.counts, self.sum_lon, self.sum_lat)
+
+
+class ClusterPyramid:
+    """各缩放级别的聚类网格，types为数据类型名称（与构造时传入的点集顺序一致）"""
+
+    def __init__(self, points: Dict[str, Tuple[np.ndarray, np.ndarray]], max_zoom: int):
+        self.types: List[str] = list(points)
+        self.max_zoom = max_zoom
+
+        # 最细级别：各类型的点分别按网格统计
+        cells_per_axis = (1 << max_zoom) * CELLS_PER_TILE
+        projected = []
+        for lon, lat in points.values():
+            lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+            valid = (lon >= -180) & (lon <= 180) & (lat >= -90) & (lat <= 90)
+            lon, lat = lon[valid], lat[valid]
+            x, y = mercator_xy(lon, lat)
+            keys = (y * cells_per_axis).astype(np.int64) * cells_per_axis + (x * cells_per_axis).astype(np.int64)
+            projected.append((keys, lon, lat))
+
+        unique, inverse = np.unique(np.concatenate([keys for keys, _, _ in projected]), return_inverse=True)
+        shape = (len(self.types), len(unique))
+        counts, sum_lon, sum_lat = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        start = 0
+        for type_index, (keys, lon, lat) in enumerate(projected):
+            cells = inverse[start:start + len(keys)]
+            start += len(keys)
+            counts[type_index] = np.bincount(cells, minlength=len(unique))
+            sum_lon[type_index] = np.bincount(cells, weights=lon, minlength=len(unique))
+            sum_lat[type_index] = np.bincount(cells, weights=lat, minlength=len(unique))
+        level = ClusterLevel(max_zoom, unique, counts, sum_lon, sum_lat)
+
+        self.levels: List[ClusterLevel] = [level]
+        while level.zoom > 0:
+            level = level.parent()
+            self.levels.append(level)
+        self.levels.reverse()
+
+    def query(self, zoom: int, bbox: Sequence[float], types: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        查询缩放级别zoom下与矩形bbox（west, south, east, north；west > east 表示跨越180°经线）相交的聚类，
+        按选中类型汇总点数与质心，按点数降序返回
+        """
+        level = self.levels[max(0, min(zoom, self.max_zoom))]
+        selected = [self.types.index(kind) for kind in types if kind in self.types]
+        if not len(level) or not selected:
+            return []
+
+        west, south, east, north = bbox
+        size = level.cells_per_axis
+        (x0, x1), (y_north, y_south) = mercator_xy(np.array([west, east]), np.array([north, south]))
+        col0, col1 = int(x0 * size), int(x1 * size)
+        row0, row1 = int(y_north * size), int(y_south * size)
+        # 网格按行排列，先取覆盖行的连续区间，再按列过滤
+        start, end = np.searchsorted(level.keys, [row0 * size, (row1 + 1) * size])
+        cx = level.cx[start:end]
+        in_cols = (cx >= col0) & (cx <= col1) if west <= east else (cx >= col0) | (cx <= col1)
+        cells = np.flatnonzero(in_cols) + start
+
+        counts = level.counts[selected][:, cells] if len(selected) < len(self.types) else level.counts[:, cells]
+        total = counts.sum(axis=0)
+        nonzero = total > 0
+        cells, counts, total = cells[nonzero], counts[:, nonzero], total[nonzero]
+        lon = level.sum_lon[np.ix_(selected, cells)].sum(axis=0) / total
+        lat = level.sum_lat[np.ix_(selected, cells)].sum(axis=0) / total
+        cx, cy = level.cx[cells], level.cy[cells]
+
+        order = np.argsort(-total, kind='stable')
+        names = [self.types[i] for i in selected]
+        return [{
+            'longitude': float(lon[i]),
+            'latitude': float(lat[i]),
+            'count': int(total[i]),
+            'by_type': {name: int(counts[j, i]) for j, name in enumerate(names)},
+            'cell': [level.zoom, int(cx[i]), int(cy[i])]
+        } for i in order.tolist()]
+
+
+def _group(zoom: int, cx: np.ndarray, cy: np.ndarray, counts: np.ndarray,
+           sum_lon: np.ndarray, sum_lat: np.ndarray) -> ClusterLevel:
+    """按网格坐标分组，合并各组的点数与坐标和"""
+    cells_per_axis = (1 << zoom) * CELLS_PER_TILE
+    keys = cy * cells_per_axis + cx
+    unique, inverse = np.unique(keys, return_inverse=True)
+
+    def merge(values):
+        merged = np.zeros((values.shape[0], len(unique)))
+        for row in range(values.shape[0]):
+            merged[row] = np.bincount(inverse, weights=values[row], minlength=len(unique))
+        return merged
+
+    return ClusterLevel(zoom, unique, merge(counts), merge(sum_lon), merge(sum_lat))
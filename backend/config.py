@@ -21,6 +21,14 @@ class Config:
     # 缓存配置
     CACHE_DIR = BASE_DIR / 'data_cache'
     PROCESSED_DATA_CACHE = CACHE_DIR / 'processed_data.json'
+    # 按数据文件分段的处理结果缓存（记录、汇总信息、文件指纹与增量摄取检查点）
+    CACHE_SEGMENT_DIR = CACHE_DIR / 'segments'
+    # 密度热力图栅格瓦片的磁盘缓存（按数据版本分目录）
+    DENSITY_TILE_CACHE_DIR = CACHE_DIR / 'density_tiles'
+    # 文件指纹默认为大小+修改时间+抽样哈希，开启后另计算整个文件的哈希
+    CACHE_FULL_HASH = os.environ.get('SDFS_CACHE_FULL_HASH', 'false').lower() == 'true'
+    # 分段文件加载时不校验列数据（保证热启动只映射文件），开启后在后台线程中校验CRC32，失败的分段下次处理时重建
+    CACHE_VERIFY_SEGMENTS = os.environ.get('SDFS_CACHE_VERIFY_SEGMENTS', 'true').lower() == 'true'
 
     # 确保目录存在
     CACHE_DIR.mkdir(exist_ok=True)
@@ -34,6 +42,80 @@ class Config:
     STATUS_OFFLINE = 'offline'
     MAX_DATA_AGE_HOURS = 24  # 数据最大有效时间（小时）
 
+    # NMEA多片段消息重组缓冲区配置
+    AIS_FRAGMENT_BUFFER_SIZE = 1000  # 最多同时缓存的未完成消息数
+    AIS_FRAGMENT_MAX_AGE_LINES = 2000  # 未完成消息最近一个片段之后最多再读入的语句行数，超过即视为丢片
+
+    # 多进程并行解码配置（单个大文件按行对齐的字节区间切分后并行解码）
+    PARALLEL_DECODE_WORKERS = int(os.environ.get('SDFS_DECODE_WORKERS', 0)) or os.cpu_count() or 1
+    PARALLEL_DECODE_MIN_FILE_SIZE = 64 * 1024 * 1024  # 小于该大小的文件仍单进程解码
+    PARALLEL_DECODE_CHUNK_SIZE = 32 * 1024 * 1024  # 每个分块的目标字节数
+
+    # /api/data 预编码响应的压缩级别（brotli为可选依赖，未安装时只提供gzip）
+    RESPONSE_GZIP_LEVEL = 6
+    RESPONSE_BROTLI_QUALITY = 5
+
+    # 游标分页配置
+    PAGE_DEFAULT_LIMIT = 1000
+    PAGE_MAX_LIMIT = 10000
+    PAGE_SNAPSHOT_VERSIONS = 3  # 保留的数据版本数，更早版本的游标过期
+
+    # 矩形查询（/api/data/bbox）每种类型最多返回的记录数
+    BBOX_MAX_RECORDS = 5000
+
+    # 聚类查询（/api/clusters）：缩放级别不大于该值时返回聚合网格，更大时返回单个点
+    CLUSTER_POINT_ZOOM = 12
+
+    # 矢量瓦片（/tiles/{layer}/{z}/{x}/{y}.pbf）：缩放级别不小于该值时不抽稀，LRU缓存的瓦片数
+    TILE_FULL_DETAIL_ZOOM = 12
+    TILE_CACHE_SIZE = 512
+
+    # 航迹（/api/tracks）：相邻两点间隔超过该秒数时断开航迹；在这些缩放级别上按像素容差预先简化，
+    # 更大的缩放级别返回全部点；每次最多返回的航迹数
+    TRACK_MAX_GAP_SECONDS = 1800
+    TRACK_LOD_ZOOMS = [4, 8, 12]
+    TRACK_TOLERANCE_PIXELS = 1.0
+    TRACK_MAX_RESULTS = 2000
+
+    # 覆盖范围：位置点划入该间隔（度）的网格，闭运算填补不超过 2 * COVERAGE_CLOSING_CELLS 个网格宽的空隙，
+    # 点数不少于COVERAGE_MIN_POINTS的网格计为覆盖；每个数据源最多保留的多边形数（按面积）
+    COVERAGE_CELL_DEGREES = 0.1
+    COVERAGE_CLOSING_CELLS = 2
+    COVERAGE_MIN_POINTS = 1
+    COVERAGE_MAX_POLYGONS = 50
+
+    # 密度网格（/api/density）：默认与最大分辨率（矩形长边的网格数），最细网格级别（间隔 360 / 2^级别 度），
+    # 缓存分块的边长（网格数）、时间桶长度（秒）与缓存的分块数
+    DENSITY_DEFAULT_RES = 128
+    DENSITY_MAX_RES = 512
+    DENSITY_MAX_LEVEL = 20
+    DENSITY_CHUNK_CELLS = 128
+    DENSITY_TIME_BUCKET_SECONDS = 3600
+    DENSITY_CACHE_SIZE = 256
+
+    # 密度热力图栅格瓦片（/tiles/density/{z}/{x}/{y}.png）：像素（模糊后）点数达到该值时颜色饱和，
+    # 内存LRU缓存的瓦片数与磁盘缓存的最大文件数
+    DENSITY_TILE_SATURATION = 50
+    DENSITY_TILE_MEMORY_SIZE = 256
+    DENSITY_TILE_DISK_SIZE = 5000
+
+    # ADS-B接收机极坐标覆盖图（/api/adsb/polar）：方位扇区宽度（度）与高度层的下边界（英尺，升序）
+    POLAR_SECTOR_DEGREES = 10
+    POLAR_ALTITUDE_BANDS = [0, 5000, 10000, 20000, 30000]
+
+    # 增量同步（/api/data/changes）：变更日志保留的最多变更条数（按目标计），更早版本的客户端需重新获取全部数据
+    CHANGE_LOG_MAX_ENTRIES = 200000
+
+    # 位置更新推送（/api/stream，Server-Sent Events）：最多同时连接的订阅者数，每个订阅者队列最多保留的目标数
+    # （同一目标的更新合并，超出时丢弃最早的目标），没有更新时发送心跳的间隔（秒）与客户端断线重连的等待时间（毫秒）
+    STREAM_MAX_SUBSCRIBERS = 100
+    STREAM_QUEUE_SIZE = 5000
+    STREAM_HEARTBEAT_SECONDS = 15
+    STREAM_RETRY_MILLISECONDS = 5000
+
+    # 后台摄取：每隔该秒数检查数据文件，增量解码新追加的内容并推送变化的目标（0表示不启动，只在请求时更新）
+    INGEST_INTERVAL_SECONDS = float(os.environ.get('SDFS_INGEST_INTERVAL', 5))
+
     def get_ais_files(self):
         """获取所有存在的AIS文件路径"""
         ais_files = []
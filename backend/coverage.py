@@ -0,0 +1,211 @@
+"""
+覆盖范围计算（占用网格轮廓）。
+
+按固定经纬度间隔把位置点划入全球网格，只保存有点的网格（升序网格编号与点数），新追加的点
+合并到已有网格中即可增量更新。计算轮廓时先做形态学闭运算（膨胀后腐蚀）填补点之间的空隙，
+再沿占用网格的边界边连接成环：外环逆时针、内环（空洞）顺时针，共线顶点合并。
+"""
+import math
+from typing import List, Optional
+
+import numpy as np
+
+from .track_store import TrackStore
+
+# 多边形：[外环, 空洞...]，环为闭合的 [经度, 纬度] 列表
+Polygon = List[List[List[float]]]
+
+
+class CoverageGrid:
+    """位置点的稀疏占用网格：keys为有点的网格编号（行 * 列数 + 列，升序），counts为各网格的点数"""
+
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self.ncols = math.ceil(360 / cell_degrees)
+        self.nrows = math.ceil(180 / cell_degrees)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        # 已从记录存储中读取的行数（update()从此处继续）
+        self.size = 0
+
+    def copy(self) -> 'CoverageGrid':
+        duplicate = CoverageGrid(self.cell_degrees)
+        duplicate.keys, duplicate.counts, duplicate.size = self.keys, self.counts, self.size
+        return duplicate
+
+    def add(self, lon: np.ndarray, lat: np.ndarray):
+        """合并一批位置点"""
+        valid = (lon >= -180) & (lon <= 180) & (lat >= -90) & (lat <= 90)
+        if not valid.all():
+            lon, lat = lon[valid], lat[valid]
+        if not len(lon):
+            return
+        cols = np.minimum(((lon + 180) / self.cell_degrees).astype(np.int64), self.ncols - 1)
+        rows = np.minimum(((lat + 90) / self.cell_degrees).astype(np.int64), self.nrows - 1)
+        keys, counts = np.unique(rows * self.ncols + cols, return_counts=True)
+        if len(self.keys):
+            merged, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                 minlength=len(merged)).astype(np.int64)
+            keys = merged
+        self.keys, self.counts = keys, counts
+
+    def update(self, store: TrackStore):
+        """合并记录存储中新追加的行"""
+        if len(store) > self.size:
+            self.add(store.raw_since('longitude', self.size), store.raw_since('latitude', self.size))
+            self.size = len(store)
+
+    def outline(self, closing_cells: int = 1, min_points: int = 1,
+                max_polygons: Optional[int] = None) -> List[Polygon]:
+        """占用网格（点数不少于min_points）闭运算后的轮廓多边形，按面积降序，最多max_polygons个"""
+        cells = self.keys[self.counts >= min_points]
+        if not len(cells):
+            return []
+        rows, cols = cells // self.ncols, cells % self.ncols
+        if closing_cells > 0:
+            rows, cols = self._erode(*self._dilate(rows, cols, closing_cells), closing_cells)
+        rows, cols = self._fill_diagonals(rows, cols)
+        return self._polygons(rows, cols, max_polygons)
+
+    # ---- 形态学运算（稀疏网格） ----
+
+    def _shift(self, rows, cols, radius):
+        """每个网格及其 (2*radius+1)^2 邻域内的网格（超出网格范围的丢弃）"""
+        offsets = np.arange(-radius, radius + 1)
+        dr, dc = np.meshgrid(offsets, offsets, indexing='ij')
+        r = (rows[:, None] + dr.ravel()[None, :]).ravel()
+        c = (cols[:, None] + dc.ravel()[None, :]).ravel()
+        inside = (r >= 0) & (r < self.nrows) & (c >= 0) & (c < self.ncols)
+        return r, c, inside
+
+    def _dilate(self, rows, cols, radius):
+        r, c, inside = self._shift(rows, cols, radius)
+        keys = np.unique(r[inside] * self.ncols + c[inside])
+        return keys // self.ncols, keys % self.ncols
+
+    def _erode(self, rows, cols, radius):
+        """保留邻域全部被占用的网格（网格范围外视为占用）"""
+        keys = rows * self.ncols + cols
+        r, c, inside = self._shift(rows, cols, radius)
+        present = _contains(keys, r * self.ncols + c) | ~inside
+        keep = present.reshape(len(keys), -1).all(axis=1)
+        return rows[keep], cols[keep]
+
+    def _fill_diagonals(self, rows, cols):
+        """填补只在对角相接的网格，使每个边界顶点只连接一条出边"""
+        while True:
+            keys = rows * self.ncols + cols
+            right, up, up_right = keys + 1, keys + self.ncols, keys + self.ncols + 1
+            valid = (cols + 1 < self.ncols) & (rows + 1 < self.nrows)
+            has_right, has_up = _contains(keys, right), _contains(keys, up)
+            # 本网格与右上网格占用、右侧与上方空：填右侧
+            fill_a = valid & _contains(keys, up_right) & ~has_right & ~has_up
+            # 本网格与左上网格占用、左侧与上方空：填上方
+            left, up_left = keys - 1, keys + self.ncols - 1
+            valid_left = (cols > 0) & (rows + 1 < self.nrows)
+            fill_b = valid_left & _contains(keys, up_left) & ~_contains(keys, left) & ~has_up
+            added = np.concatenate([right[fill_a], up[fill_b]])
+            if not len(added):
+                return rows, cols
+            keys = np.unique(np.concatenate([keys, added]))
+            rows, cols = keys // self.ncols, keys % self.ncols
+
+    # ---- 轮廓 ----
+
+    def _polygons(self, rows, cols, max_polygons: Optional[int]) -> List[Polygon]:
+        keys = rows * self.ncols + cols
+        width = self.ncols + 1
+
+        # 边界边（占用网格在左侧）：下、右、上、左，顶点编号为 y * (列数 + 1) + x
+        starts, ends = [], []
+        for neighbor, start, end in (
+                (keys - self.ncols, (rows, cols), (rows, cols + 1)),
+                (keys + 1, (rows, cols + 1), (rows + 1, cols + 1)),
+                (keys + self.ncols, (rows + 1, cols + 1), (rows + 1, cols)),
+                (keys - 1, (rows + 1, cols), (rows, cols))):
+            open_side = ~_contains(keys, neighbor)
+            starts.append(start[0][open_side] * width + start[1][open_side])
+            ends.append(end[0][open_side] * width + end[1][open_side])
+        starts, ends = np.concatenate(starts), np.concatenate(ends)
+
+        # 每个顶点只有一条出边：按起点排序后二分查找下一条边
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+        following = np.searchsorted(starts, ends)
+        x, y = starts % width, starts // width
+
+        # 指针倍增求每条边所在环的编号（环上最小的边下标）
+        ring = np.arange(len(starts))
+        jump = following
+        while True:
+            merged = np.minimum(ring, ring[jump])
+            if np.array_equal(merged, ring):
+                break
+            ring, jump = merged, jump[jump]
+
+        # 各环的带符号面积（逆时针为外环，顺时针为空洞）与外包矩形，以环编号为下标
+        area = np.bincount(ring, weights=x * y[following] - x[following] * y, minlength=len(starts)) / 2
+        by_ring = np.argsort(ring, kind='stable')
+        heads = np.flatnonzero(ring == np.arange(len(starts)))
+        first = np.searchsorted(ring[by_ring], heads)
+        bounds = np.full((len(starts), 4), -1, dtype=np.int64)
+        bounds[heads] = np.stack([np.minimum.reduceat(x[by_ring], first), np.minimum.reduceat(y[by_ring], first),
+                                  np.maximum.reduceat(x[by_ring], first), np.maximum.reduceat(y[by_ring], first)],
+                                 axis=1)
+
+        outers = heads[area[heads] > 0]
+        outers = outers[np.argsort(-area[outers], kind='stable')][:max_polygons]
+        holes = heads[area[heads] < 0]
+
+        # 方向改变处的顶点（终点处转弯的边的下一条边的起点）
+        dx, dy = x[following] - x, y[following] - y
+        corner = np.zeros(len(starts), dtype=bool)
+        corner[following] = (dx * dy[following] - dy * dx[following]) != 0
+        following, corner = following.tolist(), corner.tolist()
+
+        def trace(first):
+            vertices, edge = [], first
+            while True:
+                if corner[edge]:
+                    vertices.append(edge)
+                edge = following[edge]
+                if edge == first:
+                    return np.array(vertices)
+
+        polygons = []
+        for outer in outers.tolist():
+            vertices = trace(outer)
+            polygon = [self._ring_coordinates(x[vertices], y[vertices])]
+            ox, oy = x[vertices], y[vertices]
+            inside = holes[(bounds[holes, 0] >= bounds[outer, 0]) & (bounds[holes, 1] >= bounds[outer, 1]) &
+                           (bounds[holes, 2] <= bounds[outer, 2]) & (bounds[holes, 3] <= bounds[outer, 3])]
+            for hole in inside.tolist():
+                if _point_in_ring(x[hole], y[hole], ox, oy):
+                    hole_vertices = trace(hole)
+                    polygon.append(self._ring_coordinates(x[hole_vertices], y[hole_vertices]))
+            polygons.append(polygon)
+        return polygons
+
+    def _ring_coordinates(self, x: np.ndarray, y: np.ndarray) -> List[List[float]]:
+        """网格顶点转为闭合的 [经度, 纬度] 环"""
+        lon = np.clip(x * self.cell_degrees - 180.0, -180.0, 180.0)
+        lat = np.clip(y * self.cell_degrees - 90.0, -90.0, 90.0)
+        ring = np.stack([lon, lat], axis=1).tolist()
+        ring.append(ring[0])
+        return ring
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """keys中的每个值是否在升序数组sorted_keys中"""
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[positions] == keys
+
+
+def _point_in_ring(px: float, py: float, x: np.ndarray, y: np.ndarray) -> bool:
+    """射线法判断网格顶点是否在环内（点的纵坐标上移半格，避免恰好落在水平边上）"""
+    py = py + 0.5
+    x2, y2 = np.roll(x, -1), np.roll(y, -1)
+    crosses = (y > py) != (y2 > py)
+    intersect_x = x + (py - y) * (x2 - x) / np.where(y2 != y, y2 - y, 1)
+    return bool(np.count_nonzero(crosses & (px < intersect_x)) % 2)
@@ -0,0 +1,283 @@
+"""
+列式CSV批量加载工具。
+
+将CSV按块读入列（每列一个序列），数值列整列转换为NumPy数组，时间戳按不同取值批量解析为datetime64，
+供解码器以向量化掩码完成数据清洗，避免逐行构造DictReader字典和逐个调用float()/fromisoformat()。
+"""
+import csv
+import re
+from dataclasses import fields, MISSING
+from datetime import datetime
+from itertools import islice, repeat
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 每块读取的行数（控制内存占用）
+CSV_BLOCK_ROWS = 100000
+
+# MarineCadastre风格的ISO时间戳，可直接由NumPy批量解析为datetime64
+_ISO_TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,6})?$')
+
+
+class CsvBlock:
+    """
+    一块CSV数据：列名 -> 字符串列，以及列数不足的行掩码。
+    stripped为True表示已确认所有取值都没有首尾空白
+    """
+
+    def __init__(self, columns: Dict[str, Sequence[str]], size: int, short_rows: np.ndarray,
+                 stripped: bool = False):
+        self.columns = columns
+        self.size = size
+        self.short_rows = short_rows
+        self.stripped = stripped
+
+    def get(self, name: str, default: str = '') -> Sequence[str]:
+        """获取列；列不存在时返回以default填充的列（与DictReader的row.get(name, default)一致）"""
+        column = self.columns.get(name)
+        if column is None:
+            return [default] * self.size
+        return column
+
+    def get_stripped(self, name: str, default: str = '') -> Sequence[str]:
+        """获取去除首尾空白后的列"""
+        column = self.get(name, default)
+        if self.stripped and name in self.columns:
+            return column
+        return [value.strip() for value in column]
+
+
+def iter_csv_blocks(lines: Iterable[str], fieldnames: Optional[List[str]] = None,
+                    block_rows: int = CSV_BLOCK_ROWS) -> Iterator[CsvBlock]:
+    """
+    按块读取CSV文本行，产出CsvBlock。
+    fieldnames为None时第一行作为表头；与DictReader一致跳过空行，多余字段忽略
+    """
+    lines = iter(lines)
+    if fieldnames is None:
+        header = next(csv.reader(lines), None)
+        if header is None:
+            return
+        fieldnames = header
+    width = len(fieldnames)
+
+    while True:
+        block_lines = list(islice(lines, block_rows))
+        if not block_lines:
+            return
+
+        split = _split_simple_block(block_lines, width)
+        if split is not None:
+            columns, stripped = split
+            yield CsvBlock(dict(zip(fieldnames, columns)), len(block_lines),
+                           np.zeros(len(block_lines), dtype=bool), stripped)
+            continue
+
+        rows = [row for row in csv.reader(block_lines) if row]
+        if not rows:
+            continue
+
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        short_rows = lengths < width
+        if short_rows.any() or (lengths > width).any():
+            rows = [row[:width] if len(row) >= width else row + [''] * (width - len(row)) for row in rows]
+
+        yield CsvBlock(dict(zip(fieldnames, zip(*rows))), len(rows), short_rows)
+
+
+def _split_simple_block(block_lines: List[str], width: int) -> Optional[Tuple[List[List[str]], bool]]:
+    """
+    快速切分不含引号、没有空行且每行字段数一致的文本块：整块一次split后按步长取列。
+    返回 (列列表, 是否所有取值都没有首尾空白)；不满足条件时返回None，由csv.reader处理
+    """
+    # 文件逐行读取的行自带换行符，splitlines()得到的行则没有
+    if block_lines[0].endswith('\n'):
+        text = ''.join(block_lines)
+    else:
+        text = '\n'.join(block_lines)
+    text = text.replace('\r', '').rstrip('\n')
+    if '"' in text or not text or text.startswith('\n') or '\n\n' in text:
+        return None
+
+    row_count = text.count('\n') + 1
+    values = text.replace('\n', ',').split(',')
+    if row_count != len(block_lines) or len(values) != row_count * width:
+        return None
+    return [values[i::width] for i in range(width)], not _has_edge_whitespace(text)
+
+
+def _has_edge_whitespace(text: str) -> bool:
+    """整块检查是否有字段带首尾空白（非ASCII文本保守地返回True）"""
+    if not text.isascii():
+        return True
+    if text[0].isspace() or text[-1].isspace():
+        return True
+    for space in (' ', '\t', '\x0b', '\x0c', '\x1c', '\x1d', '\x1e', '\x1f'):
+        if space not in text:
+            continue
+        if any(pattern in text for pattern in (space + ',', ',' + space, space + '\n', '\n' + space)):
+            return True
+    return False
+
+
+def string_mask(values: Sequence[str], *targets: str) -> np.ndarray:
+    """值等于任一targets的行掩码"""
+    column = np.array(values, dtype=object)
+    mask = np.zeros(len(column), dtype=bool)
+    for target in targets:
+        mask |= column == target
+    return mask
+
+
+def parse_float_column(values: Sequence[str], default: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    整列解析浮点数，返回 (数值, 格式错误掩码)；空值与格式错误处填default。
+    整列一次性转换；存在空值时先填充后再整列转换，仅在存在非法值时退回逐个解析
+    """
+    invalid = np.zeros(len(values), dtype=bool)
+    try:
+        return np.array(values, dtype=np.float64), invalid
+    except ValueError:
+        pass
+
+    empty = string_mask(values, '')
+    try:
+        result = np.array(['0' if not text else text for text in values], dtype=np.float64)
+        result[empty] = default
+        return result, invalid
+    except ValueError:
+        pass
+
+    result = np.empty(len(values), dtype=np.float64)
+    for i, text in enumerate(values):
+        try:
+            result[i] = float(text)
+        except ValueError:
+            result[i] = default
+            invalid[i] = bool(text.strip())
+    return result, invalid
+
+
+def unique_codes(values: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """按首次出现顺序对列做字典编码，返回 (每行的编码, 不同取值列表)"""
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values),
+                        dtype=np.int64, count=len(values))
+    return codes, list(index)
+
+
+def map_unique(values: Sequence[str], func: Callable[[str], Any], dtype=object,
+               encoded: Optional[Tuple[np.ndarray, List[str]]] = None) -> np.ndarray:
+    """
+    对列中每个不同的值只调用一次func（重复值较多的列，如时间、状态码），结果按原顺序展开。
+    encoded可传入unique_codes()的结果，同一列多次映射时复用
+    """
+    codes, uniques = encoded if encoded is not None else unique_codes(values)
+    mapped = np.empty(len(uniques), dtype=dtype)
+    for i, value in enumerate(uniques):
+        mapped[i] = func(value)
+    return mapped[codes]
+
+
+def _parse_iso(text: str) -> Optional[np.datetime64]:
+    """单个ISO时间戳解析（带时区的统一转换为UTC无时区时间）"""
+    try:
+        value = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if value.tzinfo is not None:
+        value = (value - value.utcoffset()).replace(tzinfo=None)
+    return np.datetime64(value, 'us')
+
+
+def parse_iso_timestamps(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    整列解析ISO时间戳为datetime64[us]。返回 (时间戳, 空值掩码, 格式错误掩码)，空值与错误处为NaT。
+    不同的时间戳字符串只解析一次；标准格式整批交给NumPy解析
+    """
+    codes, uniques = unique_codes(values)
+
+    parsed = np.full(len(uniques), np.datetime64('NaT'), dtype='datetime64[us]')
+    invalid = np.zeros(len(uniques), dtype=bool)
+    standard = np.fromiter((bool(_ISO_TIMESTAMP_RE.match(text)) for text in uniques),
+                           dtype=bool, count=len(uniques))
+    try:
+        parsed[standard] = np.array([text for text in uniques if _ISO_TIMESTAMP_RE.match(text)],
+                                    dtype='datetime64[us]')
+    except ValueError:
+        standard[:] = False
+
+    for i in np.nonzero(~standard)[0].tolist():
+        if uniques[i] == '':
+            continue
+        value = _parse_iso(uniques[i])
+        if value is None:
+            invalid[i] = True
+        else:
+            parsed[i] = value
+
+    empty = np.array([text == '' for text in uniques], dtype=bool)
+    return parsed[codes], empty[codes], invalid[codes]
+
+
+def datetimes_or_now(timestamps: np.ndarray) -> List[datetime]:
+    """datetime64列转为datetime对象列表，NaT替换为当前时间"""
+    now = datetime.now()
+    return [now if value is None else value for value in timestamps.astype(object).tolist()]
+
+
+def append_notes(notes: Dict[int, List[str]], mask: np.ndarray, template: str, values=None):
+    """
+    为掩码选中的行追加清洗备注。
+    template为备注文本；给出values时作为格式模板，以对应行的取值填充'{}'
+    """
+    rows = np.nonzero(mask)[0]
+    if values is None:
+        texts = repeat(template, len(rows))
+    elif isinstance(values, np.ndarray):
+        texts = map(template.format, values[rows].tolist())
+    else:
+        texts = (template.format(values[i]) for i in rows.tolist())
+
+    for i, text in zip(rows.tolist(), texts):
+        notes.setdefault(i, []).append(text)
+
+
+def join_notes(notes: Dict[int, List[str]], size: int) -> np.ndarray:
+    """将按行收集的备注合并为备注列（无备注为空字符串）"""
+    column = np.full(size, '', dtype=object)
+    for i, messages in notes.items():
+        column[i] = "; ".join(messages)
+    return column
+
+
+def add_count(counter: Dict[str, int], key: str, mask: np.ndarray) -> int:
+    """按掩码中选中的行数累加统计项（计数为0时不创建该项），返回计数"""
+    count = int(np.count_nonzero(mask))
+    if count:
+        counter[key] = counter.get(key, 0) + count
+    return count
+
+
+def build_records(record_class, columns: Dict[str, Any], size: int) -> Iterator[Any]:
+    """
+    按需将列数据逐行构造为数据对象（dataclass），列名即字段名；缺失的列使用字段默认值。
+    datetime64列转为datetime对象
+    """
+    iterables = []
+    for field_info in fields(record_class):
+        column = columns.get(field_info.name)
+        if column is None:
+            if field_info.default is MISSING:
+                raise KeyError(f"缺少列: {field_info.name}")
+            iterables.append(repeat(field_info.default, size))
+        elif isinstance(column, np.ndarray) and column.dtype.kind == 'M':
+            iterables.append(datetimes_or_now(column))
+        elif isinstance(column, np.ndarray):
+            iterables.append(column.tolist())
+        else:
+            iterables.append(column)
+
+    for values in zip(*iterables):
+        yield record_class(*values)
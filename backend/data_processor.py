@@ -1,18 +1,99 @@
 import json
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Set, Tuple, Optional
 from pathlib import Path
 import hashlib
 
+import numpy as np
+
 from .config import Config
 from .ais_decoder import AISDecoder
 from .adsb_processor import ADSBProcessor
+from .parallel_decoder import ParallelFileDecoder
 from .models import AISData, ADSData, ResourceCoverage, DataEncoder, DataCleaningStats
+from .track_store import TrackStore
+from .ingest_checkpoint import FileCheckpoint, read_csv_header, APPENDED
+from .spatial_index import GridIndex
+from .clusters import ClusterPyramid
+from .time_index import TimeIndex
+from .trajectories import ENTITY_FIELDS, TrackSet, build_track_sets
+from .latest_state import LatestState
+from .change_log import ChangeLog
+from .cache_segments import (RECORD_CLASSES, SourceSegment, file_fingerprint, fingerprint_matches,
+                             remove_segment_file, remove_segments)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class StreamAccumulator:
+    """流式汇总器 - 边解码边将单个数据文件的记录追加到列式存储，汇总统计在列上向量化计算，不保留逐条记录对象"""
+
+    def __init__(self, record_class, max_age_seconds: float, store: Optional[TrackStore] = None):
+        # 增量摄取时从已有的存储继续累积
+        self.store = store if store is not None else TrackStore(record_class)
+        self._now = datetime.now()
+        self._max_age_seconds = max_age_seconds
+
+    def add_columns(self, columns: Dict[str, Any]):
+        """累积一块清洗后的列数据"""
+        self.store.append_columns(columns)
+
+    def add_records(self, records: List[Any]):
+        """累积一批记录对象"""
+        self.store.append_records(records)
+
+    @property
+    def count(self) -> int:
+        return len(self.store)
+
+    def summarize(self) -> Dict[str, Any]:
+        """在列上一次计算记录数、状态分布、在线数（基于时间戳）与有效坐标边界 [min_lon, min_lat, max_lon, max_lat]"""
+        store = self.store
+        by_status = {"normal": 0, "warning": 0, "error": 0}
+        statuses = store.categories['data_status']
+        counts = np.bincount(store.raw('data_status'), minlength=len(statuses.values))
+        for status, count in zip(statuses.values, counts.tolist()):
+            if count:
+                by_status[status] = by_status.get(status, 0) + count
+
+        oldest = np.datetime64(self._now, 'us') - np.timedelta64(int(self._max_age_seconds * 1000000), 'us')
+        online = int(np.count_nonzero(store.raw('timestamp') > oldest.astype(np.int64)))
+
+        lon, lat = store.raw('longitude'), store.raw('latitude')
+        valid = (lon >= -180) & (lon <= 180) & (lat >= -90) & (lat <= 90)
+        bounds = None
+        if valid.any():
+            lon, lat = lon[valid], lat[valid]
+            bounds = [float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())]
+
+        return {'count': len(store), 'by_status': by_status, 'online': online, 'bounds': bounds}
+
+
+class MergedSummary:
+    """同类数据源全部缓存分段的合并结果：汇总信息由各分段的汇总合并得到，记录存储按分段顺序拼接"""
+
+    def __init__(self, record_class, formats: List[str], segments: List[SourceSegment]):
+        self.segments = segments
+        self.store = TrackStore.concat(record_class, (segment.store for segment in segments))
+        self.count = 0
+        self.by_status = {"normal": 0, "warning": 0, "error": 0}
+        self.by_format = {fmt: 0 for fmt in formats}
+        self.bounds = None
+
+        for segment in segments:
+            summary = segment.summary
+            self.count += summary['count']
+            self.by_format[segment.file_format] = self.by_format.get(segment.file_format, 0) + summary['count']
+            for status, count in summary['by_status'].items():
+                self.by_status[status] = self.by_status.get(status, 0) + count
+            bounds = summary['bounds']
+            if bounds:
+                self.bounds = bounds if self.bounds is None else [
+                    min(self.bounds[0], bounds[0]), min(self.bounds[1], bounds[1]),
+                    max(self.bounds[2], bounds[2]), max(self.bounds[3], bounds[3])]
+
 
 class DataProcessor:
     """数据处理器 - 集成多个AIS文件和多个ADS-B文件数据处理"""
@@ -21,276 +102,355 @@ class DataProcessor:
         self.config = Config()
         self.ais_decoder = AISDecoder()
         self.adsb_processor = ADSBProcessor()
+        self.parallel_decoder = ParallelFileDecoder()
         self.processed_data = None
         self.data_hash = None
         self.cleaning_stats = DataCleaningStats()
+        # 数据文件路径 -> 缓存分段
+        self.segments: Dict[str, SourceSegment] = {}
+        # 数据类型（ais/adsb） -> 当前处理结果的空间网格索引
+        self.spatial_indexes: Dict[str, GridIndex] = {}
+        # 数据类型（ais/adsb） -> 当前处理结果的时间索引
+        self.time_indexes: Dict[str, TimeIndex] = {}
+        # 数据类型（ais/adsb） -> 当前处理结果按目标构建的航迹
+        self.trajectories: Dict[str, TrackSet] = {}
+        # 数据类型（ais/adsb） -> 当前处理结果中每个目标的最新记录
+        self.latest_states: Dict[str, LatestState] = {}
+        # 各处理结果之间按目标的变更日志（数据版本号与增量同步）
+        self.change_log = ChangeLog(self.config.CHANGE_LOG_MAX_ENTRIES)
+        # 当前处理结果的聚类金字塔（各缩放级别的聚合网格）
+        self.cluster_pyramid: Optional[ClusterPyramid] = None
+        # 缓存分段的后台校验线程
+        self.verify_threads: List[threading.Thread] = []
+        # 分段校验失败、下次处理时需从头解码的数据文件路径
+        self.rebuild_paths: Set[str] = set()
 
     def process_all_data(self, force_update: bool = False) -> Dict[str, Any]:
         """
-        处理所有数据，返回标准化格式
+        处理所有数据，返回标准化格式。
+        每个数据文件对应一个缓存分段：指纹未变的分段直接复用，只追加了内容的文件从检查点增量解码，
+        其余文件（新增、截断、轮转、分段缺失或损坏）从头解码。force_update=True 时全部从头解码
         """
-        # 检查缓存是否存在且有效
-        if not force_update:
-            cache_data = self._load_cached_data()
-            if cache_data is not None:
-                logger.info(f"使用缓存的已处理数据")
-                logger.info(
-                    f"缓存数据统计: AIS={cache_data.get('metadata', {}).get('ais_count', 0)}, ADS-B={cache_data.get('metadata', {}).get('adsb_count', 0)}")
-                return cache_data
-
-        logger.info("开始处理所有数据...")
-
-        # 重置清洗统计
-        self.cleaning_stats = DataCleaningStats()
+        logger.info("开始强制重新处理所有数据..." if force_update else "开始处理所有数据...")
 
-        # 1. 处理所有AIS数据文件
+        # 1. 刷新所有AIS数据文件的缓存分段
         logger.info("处理AIS数据文件...")
-        all_ais_data = self._process_all_ais_files()
+        ais_segments, ais_changed = self._refresh_segments('ais', self.config.get_ais_files(), force_update)
 
-        # 2. 处理所有ADS-B数据文件
+        # 2. 刷新所有ADS-B数据文件的缓存分段
         logger.info("处理ADS-B数据文件...")
-        all_adsb_data = self._process_all_adsb_files()
+        adsb_segments, adsb_changed = self._refresh_segments('adsb', self.config.get_adsb_files(), force_update)
+
+        current = {segment.path: segment for segment in ais_segments + adsb_segments}
+        if not (ais_changed or adsb_changed) and self.processed_data is not None and current == self.segments:
+            logger.info("数据文件没有变化，沿用已有处理结果")
+            return self.processed_data
+
+        self.segments = current
+        removed = remove_segments(self.config.CACHE_SEGMENT_DIR,
+                                  [segment.file for segment in current.values() if segment.file is not None])
+        if removed:
+            logger.info(f"已删除 {removed} 个失效的缓存分段")
+
+        # 清洗统计由各分段的统计合并
+        self.cleaning_stats = DataCleaningStats()
+        for segment in current.values():
+            self._merge_cleaning_stats(segment.cleaning_stats)
+
+        ais_summary = MergedSummary(AISData, ['nmea', 'csv'], ais_segments)
+        adsb_summary = MergedSummary(ADSData, ['jsonl', 'csv'], adsb_segments)
+
+        # 建立空间网格索引（矩形查询）
+        self.spatial_indexes = {kind: GridIndex(summary.store.raw('longitude'), summary.store.raw('latitude'))
+                                for kind, summary in (('ais', ais_summary), ('adsb', adsb_summary))}
+        # 建立时间索引（时间范围查询）
+        self.time_indexes = {kind: TimeIndex(summary.store.raw('timestamp'))
+                             for kind, summary in (('ais', ais_summary), ('adsb', adsb_summary))}
+        # 每个目标的最新记录（状态汇总按目标统计在线数）：各分段的最新状态保留在分段上，
+        # 追加的记录只更新新增的行，再按目标合并，不重新扫描合并后的全部记录
+        self.latest_states = {
+            kind: LatestState.merge(summary.store, ENTITY_FIELDS[kind],
+                                    [segment.latest_state(ENTITY_FIELDS[kind]) for segment in summary.segments])
+            for kind, summary in (('ais', ais_summary), ('adsb', adsb_summary))}
+        # 与上一处理结果比较各目标的最新状态，得到新的数据版本号
+        self.change_log.record(self.latest_states)
+        # 按目标构建航迹并预先简化
+        self.trajectories = build_track_sets({'ais': ais_summary.store, 'adsb': adsb_summary.store},
+                                             self.config.TRACK_MAX_GAP_SECONDS, self.config.TRACK_LOD_ZOOMS,
+                                             self.config.TRACK_TOLERANCE_PIXELS)
+        # 预计算各缩放级别的聚类网格
+        self.cluster_pyramid = ClusterPyramid(
+            {kind: (summary.store.raw('longitude'), summary.store.raw('latitude'))
+             for kind, summary in (('ais', ais_summary), ('adsb', adsb_summary))},
+            self.config.CLUSTER_POINT_ZOOM)
 
         # 3. 创建资源覆盖范围
         logger.info("创建资源覆盖范围...")
-        coverage_layers = self._create_coverage_layers(all_ais_data, all_adsb_data)
+        coverage_layers = self._create_coverage_layers(ais_summary, adsb_summary)
 
         # 4. 标准化数据格式
         logger.info("标准化数据格式...")
-        standardized_data = self._standardize_data(all_ais_data, all_adsb_data, coverage_layers)
+        standardized_data = self._standardize_data(ais_summary, adsb_summary, coverage_layers)
 
-        # 5. 保存到缓存
+        # 5. 保存缓存清单
+        self.data_hash = self.calculate_data_hash()
         self._save_to_cache(standardized_data)
 
         self.processed_data = standardized_data
-        logger.info(f"数据处理完成。AIS: {len(all_ais_data)}条, ADS-B: {len(all_adsb_data)}条")
+        logger.info(f"数据处理完成。AIS: {ais_summary.count}条, ADS-B: {adsb_summary.count}条")
 
         return standardized_data
 
-    def _process_all_ais_files(self) -> List[AISData]:
-        """处理所有AIS文件"""
-        all_ais_data = []
-        ais_files = self.config.get_ais_files()
-
-        if not ais_files:
-            logger.warning("未找到任何AIS文件")
-            return all_ais_data
-
-        logger.info(f"找到 {len(ais_files)} 个AIS文件")
-
-        for ais_file in ais_files:
+    def _refresh_segments(self, kind: str, files: List[Path], rebuild: bool) -> Tuple[List[SourceSegment], bool]:
+        """刷新一类数据文件的缓存分段，返回 (分段列表, 是否有分段被重建或增量更新)"""
+        label = 'AIS' if kind == 'ais' else 'ADS-B'
+        if not files:
+            logger.warning(f"未找到任何{label}文件")
+            return [], False
+
+        logger.info(f"找到 {len(files)} 个{label}文件")
+        segments = []
+        loaded = []
+        changed = False
+        for file_path in files:
             try:
-                logger.info(f"处理AIS文件: {ais_file.name}")
-                file_data = self.ais_decoder.decode_ais_file(str(ais_file))
-                all_ais_data.extend(file_data)
-
-                # 收集清洗统计
-                file_stats = self.ais_decoder.get_cleaning_stats()
-                self._merge_cleaning_stats(file_stats)
-
-                logger.info(f"文件 {ais_file.name} 处理完成，获得 {len(file_data)} 条记录")
+                # 分段校验失败的文件从头解码（不复用也不从其检查点增量解码）
+                full_rebuild = rebuild or str(file_path) in self.rebuild_paths
+                segment = None if full_rebuild else self._cached_segment(kind, file_path)
+                # 末尾有未结束的行时不复用：再次检查文件大小，不变则解码该行
+                if segment is not None and not segment.checkpoint.unterminated_tail and fingerprint_matches(
+                        segment.fingerprint, file_fingerprint(file_path, self.config.CACHE_FULL_HASH)):
+                    logger.info(f"复用{label}文件 {file_path.name} 的缓存分段 ({segment.summary['count']} 条记录)")
+                    if segment is not self.segments.get(str(file_path)):
+                        loaded.append(segment)
+                else:
+                    if segment is not None and segment.checkpoint.check() == APPENDED:
+                        logger.info(f"{label}文件 {file_path.name} 有追加内容，增量解码")
+                    else:
+                        logger.info(f"处理{label}文件: {file_path.name}")
+                        segment = None
+                    segment = self._build_segment(kind, file_path, segment)
+                    segment.save(self.config.CACHE_SEGMENT_DIR)
+                    self.rebuild_paths.discard(str(file_path))
+                    changed = True
+                    logger.info(f"文件 {file_path.name} 处理完成，共 {segment.summary['count']} 条记录")
+                segments.append(segment)
             except Exception as e:
-                logger.error(f"处理AIS文件 {ais_file.name} 时出错: {str(e)}")
+                logger.error(f"处理{label}文件 {file_path.name} 时出错: {str(e)}")
                 continue
 
-        logger.info(f"AIS数据总共处理完成，共 {len(all_ais_data)} 条有效位置记录")
-        return all_ais_data
-
-    def _process_all_adsb_files(self) -> List[ADSData]:
-        """处理所有ADS-B文件"""
-        all_adsb_data = []
-        adsb_files = self.config.get_adsb_files()
-
-        if not adsb_files:
-            logger.warning("未找到任何ADS-B文件")
-            return all_adsb_data
-
-        logger.info(f"找到 {len(adsb_files)} 个ADS-B文件")
-
-        for adsb_file in adsb_files:
-            try:
-                logger.info(f"处理ADS-B文件: {adsb_file.name}")
-                file_data = self.adsb_processor.process_adsb_file(str(adsb_file))
-                all_adsb_data.extend(file_data)
-
-                # 收集清洗统计
-                file_stats = self.adsb_processor.get_cleaning_stats()
-                self._merge_cleaning_stats(file_stats)
+        if loaded and self.config.CACHE_VERIFY_SEGMENTS:
+            self._verify_segments_in_background(loaded)
 
-                logger.info(f"文件 {adsb_file.name} 处理完成，获得 {len(file_data)} 条记录")
-            except Exception as e:
-                logger.error(f"处理ADS-B文件 {adsb_file.name} 时出错: {str(e)}")
-                continue
+        logger.info(f"{label}数据总共处理完成，共 {sum(s.summary['count'] for s in segments)} 条有效位置记录")
+        return segments, changed
 
-        logger.info(f"ADS-B数据总共处理完成，共 {len(all_adsb_data)} 条有效位置记录")
-        return all_adsb_data
+    def _verify_segments_in_background(self, segments: List[SourceSegment]) -> threading.Thread:
+        """
+        在后台线程中校验从分段文件加载的分段（加载时不校验，热启动只映射文件）。
+        校验失败的分段被丢弃并移出当前分段，其数据文件在下次处理时从头解码
+        """
+        def verify():
+            failed = 0
+            for segment in segments:
+                if segment.verify():
+                    continue
+                failed += 1
+                self.rebuild_paths.add(segment.path)
+                if self.segments.get(segment.path) is segment:
+                    self.segments.pop(segment.path, None)
+            logger.info(f"后台校验 {len(segments)} 个缓存分段完成，{failed} 个校验失败")
+
+        thread = threading.Thread(target=verify, name='segment-verify', daemon=True)
+        thread.start()
+        self.verify_threads.append(thread)
+        return thread
+
+    def _cached_segment(self, kind: str, file_path: Path) -> Optional[SourceSegment]:
+        """获取文件的缓存分段：优先使用内存中的分段，否则从分段文件加载"""
+        segment = self.segments.get(str(file_path))
+        if segment is not None and segment.kind == kind:
+            return segment
+        return SourceSegment.load(self.config.CACHE_SEGMENT_DIR, kind, file_path)
+
+    def _build_segment(self, kind: str, file_path: Path, segment: Optional[SourceSegment] = None) -> SourceSegment:
+        """
+        解码数据文件生成缓存分段。给出segment时从其检查点继续解码追加的内容，
+        在其存储的拷贝上追加（处理期间原分段仍可被读取）；否则从文件开头解码
+        """
+        decoder = self.ais_decoder if kind == 'ais' else self.adsb_processor
+        record_class = RECORD_CLASSES[kind]
+        # 解码前取指纹：解码期间追加的内容使指纹失效，下次处理时按检查点补上
+        fingerprint = file_fingerprint(file_path, self.config.CACHE_FULL_HASH)
+        cleaning_stats = DataCleaningStats()
+
+        if segment is not None:
+            file_format = segment.file_format
+            checkpoint = FileCheckpoint.from_dict(segment.checkpoint.to_dict())
+            vessel_static = dict(segment.vessel_static)
+            cleaning_stats.merge(segment.cleaning_stats)
+            accumulator = StreamAccumulator(record_class, self.config.MAX_DATA_AGE_HOURS * 3600, segment.store.copy())
+        else:
+            file_format = decoder.detect_format(file_path) or ('nmea' if kind == 'ais' else 'jsonl')
+            checkpoint = FileCheckpoint(str(file_path), file_format)
+            vessel_static = {}
+            accumulator = StreamAccumulator(record_class, self.config.MAX_DATA_AGE_HOURS * 3600)
+
+        # 从头解码大文件时切分后多进程并行解码，其余情况单进程按列块流式解码
+        if segment is None and self._use_parallel(file_path):
+            # 从头解码读到取指纹时的文件末尾（包括没有以换行结束的最后一行）
+            end = fingerprint['size']
+            if kind == 'ais':
+                chunks = self.parallel_decoder.iter_ais_columns(str(file_path), end_offset=end)
+            else:
+                chunks = self.parallel_decoder.iter_adsb_columns(str(file_path), end_offset=end)
+            for columns in chunks:
+                accumulator.add_columns(columns)
+            self._advance_parallel_checkpoint(checkpoint, end)
+            if kind == 'ais':
+                vessel_static.update(self.parallel_decoder.vessel_static)
+            cleaning_stats.merge(self.parallel_decoder.get_cleaning_stats())
+        else:
+            if kind == 'ais':
+                # 解码器直接更新分段的船舶静态信息
+                decoder.vessel_static = vessel_static
+                chunks = decoder.iter_ais_columns(str(file_path), checkpoint=checkpoint)
+            else:
+                chunks = decoder.iter_adsb_columns(str(file_path), checkpoint=checkpoint)
+            for columns in chunks:
+                accumulator.add_columns(columns)
+            cleaning_stats.merge(decoder.get_cleaning_stats())
+
+        built = SourceSegment(kind, str(file_path), file_format, accumulator.store, checkpoint, fingerprint,
+                              cleaning_stats.to_dict(), accumulator.summarize(), vessel_static)
+        if segment is not None and segment.coverage is not None:
+            # 追加的记录在已有覆盖范围网格的拷贝上合并
+            built.coverage = segment.coverage.copy()
+        if segment is not None and segment.polar is not None:
+            built.polar = segment.polar.copy()
+        if segment is not None and segment.latest is not None:
+            built.latest = segment.latest.copy(built.store)
+        return built
+
+    @staticmethod
+    def _advance_parallel_checkpoint(checkpoint: FileCheckpoint, end: int):
+        """并行解码完成后推进检查点（并行解码器自行读取表头，文件末尾的未完成片段已计为孤立片段）"""
+        if checkpoint.file_format == 'csv':
+            checkpoint.header = read_csv_header(checkpoint.path)
+        checkpoint.advance(end)
+
+    def _use_parallel(self, file_path: Path) -> bool:
+        """判断文件是否足够大，值得切分后多进程并行解码"""
+        try:
+            return (self.parallel_decoder.max_workers > 1 and
+                    file_path.stat().st_size >= self.config.PARALLEL_DECODE_MIN_FILE_SIZE)
+        except OSError:
+            return False
 
     def _merge_cleaning_stats(self, file_stats: Dict[str, Any]):
         """合并清洗统计"""
-        self.cleaning_stats.total_records += file_stats.get('total_records', 0)
-        self.cleaning_stats.valid_records += file_stats.get('valid_records', 0)
-        self.cleaning_stats.error_records += file_stats.get('error_records', 0)
-        self.cleaning_stats.warning_records += file_stats.get('warning_records', 0)
-
-        # 合并错误类型
-        for error_type, count in file_stats.get('errors_by_type', {}).items():
-            self.cleaning_stats.errors_by_type[error_type] = \
-                self.cleaning_stats.errors_by_type.get(error_type, 0) + count
-
-        # 合并警告类型
-        for warning_type, count in file_stats.get('warnings_by_type', {}).items():
-            self.cleaning_stats.warnings_by_type[warning_type] = \
-                self.cleaning_stats.warnings_by_type.get(warning_type, 0) + count
-
-    def _create_coverage_layers(self, ais_data: List[AISData], adsb_data: List[ADSData]) -> List[Dict[str, Any]]:
-        """创建资源覆盖范围图层"""
-        coverage_layers = []
+        self.cleaning_stats.merge(file_stats)
 
-        # AIS覆盖范围
-        if ais_data:
-            ais_coverage = self._calculate_coverage_area([(d.longitude, d.latitude) for d in ais_data])
-            ais_layer = ResourceCoverage(
-                resource_id="ais_coverage_layer",
-                data_type="ais",
-                coordinates=ais_coverage,
-                status="online",
-                label="AIS Coverage Area",
-                metadata={
-                    "data_count": len(ais_data),
-                    "update_time": datetime.now().isoformat(),
-                    "description": "船舶自动识别系统覆盖区域",
-                    "data_sources": [str(file) for file in self.config.get_ais_files()]
-                }
-            )
-            coverage_layers.append(ais_layer.to_dict())
-
-        # ADS-B覆盖范围
-        if adsb_data:
-            adsb_coverage = self._calculate_coverage_area([(d.longitude, d.latitude) for d in adsb_data])
-            adsb_layer = ResourceCoverage(
-                resource_id="adsb_coverage_layer",
-                data_type="adsb",
-                coordinates=adsb_coverage,
-                status="online",
-                label="ADS-B Coverage Area",
-                metadata={
-                    "data_count": len(adsb_data),
-                    "update_time": datetime.now().isoformat(),
-                    "description": "广播式自动相关监视覆盖区域",
-                    "data_sources": [str(file) for file in self.config.get_adsb_files()]
-                }
-            )
-            coverage_layers.append(adsb_layer.to_dict())
+    def _create_coverage_layers(self, ais_summary: MergedSummary,
+                                adsb_summary: MergedSummary) -> List[Dict[str, Any]]:
+        """创建资源覆盖范围图层：每个数据文件一个图层，轮廓由该文件记录的占用网格计算"""
+        coverage_layers = []
+        descriptions = {'ais': ('AIS', "船舶自动识别系统覆盖区域"), 'adsb': ('ADS-B', "广播式自动相关监视覆盖区域")}
+
+        for kind, summary in (('ais', ais_summary), ('adsb', adsb_summary)):
+            label, description = descriptions[kind]
+            for segment in summary.segments:
+                if not segment.summary['count']:
+                    continue
+                grid = segment.coverage_grid(self.config.COVERAGE_CELL_DEGREES)
+                polygons = grid.outline(self.config.COVERAGE_CLOSING_CELLS, self.config.COVERAGE_MIN_POINTS,
+                                        self.config.COVERAGE_MAX_POLYGONS)
+                if not polygons:
+                    continue
+                name = Path(segment.path).name
+                layer = ResourceCoverage(
+                    resource_id=f"{kind}_coverage_{name}",
+                    data_type=kind,
+                    coordinates=polygons[0][0],
+                    polygons=polygons,
+                    status="online",
+                    label=f"{label} Coverage Area ({name})",
+                    metadata={
+                        "data_count": segment.summary['count'],
+                        "covered_cells": int(len(grid.keys)),
+                        "cell_degrees": grid.cell_degrees,
+                        "update_time": datetime.now().isoformat(),
+                        "description": description,
+                        "data_sources": [segment.path]
+                    }
+                )
+                coverage_layers.append(layer.to_dict())
+
+        for segment in adsb_summary.segments:
+            layer = self._create_polar_layer(segment)
+            if layer is not None:
+                coverage_layers.append(layer)
 
         return coverage_layers
 
-    def _calculate_coverage_area(self, coordinates: List[tuple]) -> List[List[float]]:
-        """计算覆盖区域（简化版本：使用凸包或边界矩形）"""
-        if not coordinates:
-            return []
-
-        # 过滤无效坐标
-        valid_coords = []
-        for lon, lat in coordinates:
-            if -180 <= lon <= 180 and -90 <= lat <= 90:
-                valid_coords.append((lon, lat))
-
-        if not valid_coords:
-            return []
-
-        # 计算边界矩形
-        lons = [c[0] for c in valid_coords]
-        lats = [c[1] for c in valid_coords]
-
-        min_lon, max_lon = min(lons), max(lons)
-        min_lat, max_lat = min(lats), max(lats)
-
-        # 扩展边界，使覆盖区域更明显
-        lon_margin = max((max_lon - min_lon) * 0.1, 0.01)
-        lat_margin = max((max_lat - min_lat) * 0.1, 0.01)
-
-        min_lon -= lon_margin
-        max_lon += lon_margin
-        min_lat -= lat_margin
-        max_lat += lat_margin
-
-        # 确保边界在有效范围内
-        min_lon = max(min_lon, -180)
-        max_lon = min(max_lon, 180)
-        min_lat = max(min_lat, -90)
-        max_lat = min(max_lat, 90)
-
-        # 创建矩形区域
-        return [
-            [min_lon, min_lat],
-            [max_lon, min_lat],
-            [max_lon, max_lat],
-            [min_lon, max_lat],
-            [min_lon, min_lat]  # 闭合多边形
-        ]
-
-    def _standardize_data(self, ais_data: List[AISData], adsb_data: List[ADSData],
+    def _create_polar_layer(self, segment: SourceSegment) -> Optional[Dict[str, Any]]:
+        """ADS-B接收机的极坐标覆盖图层：各方位扇区（所有高度层中）最远接收距离连成的轮廓"""
+        polar = segment.polar_coverage(self.config.POLAR_SECTOR_DEGREES, self.config.POLAR_ALTITUDE_BANDS)
+        if not polar.total:
+            return None
+        name = Path(segment.path).name
+        ring = polar.outline()
+        layer = ResourceCoverage(
+            resource_id=f"adsb_polar_{name}",
+            data_type='adsb',
+            coordinates=ring,
+            polygons=[[ring]],
+            status="online",
+            label=f"ADS-B Receiver Range ({name})",
+            metadata={
+                "data_count": polar.total,
+                "receiver_position": polar.receiver_position,
+                "max_range_nm": round(float(polar.max_range.max()), 2),
+                "sector_degrees": polar.sector_degrees,
+                "update_time": datetime.now().isoformat(),
+                "description": "ADS-B接收机各方位最远接收距离",
+                "data_sources": [segment.path]
+            }
+        )
+        return layer.to_dict()
+
+    def _standardize_data(self, ais_summary: MergedSummary, adsb_summary: MergedSummary,
                           coverage_layers: List[Dict]) -> Dict[str, Any]:
         """标准化数据格式，包含数据质量统计"""
-        # 分离不同状态的数据
-        normal_ais_data = [ais for ais in ais_data if ais.data_status == "normal"]
-        warning_ais_data = [ais for ais in ais_data if ais.data_status == "warning"]
-        error_ais_data = [ais for ais in ais_data if ais.data_status == "error"]
-
-        normal_adsb_data = [adsb for adsb in adsb_data if adsb.data_status == "normal"]
-        warning_adsb_data = [adsb for adsb in adsb_data if adsb.data_status == "warning"]
-        error_adsb_data = [adsb for adsb in adsb_data if adsb.data_status == "error"]
+        ais_count = ais_summary.count
+        adsb_count = adsb_summary.count
 
         # 统计不同数据状态
         ais_status_stats = {
-            "normal": len(normal_ais_data),
-            "warning": len(warning_ais_data),
-            "error": len(error_ais_data)
+            "normal": ais_summary.by_status.get("normal", 0),
+            "warning": ais_summary.by_status.get("warning", 0),
+            "error": ais_summary.by_status.get("error", 0)
         }
 
         adsb_status_stats = {
-            "normal": len(normal_adsb_data),
-            "warning": len(warning_adsb_data),
-            "error": len(error_adsb_data)
+            "normal": adsb_summary.by_status.get("normal", 0),
+            "warning": adsb_summary.by_status.get("warning", 0),
+            "error": adsb_summary.by_status.get("error", 0)
         }
 
-        # 分离不同格式的数据
-        nmea_ais_data = []
-        csv_ais_data = []
-
-        for ais in ais_data:
-            # 根据来源判断格式
-            if hasattr(ais, 'vessel_name') and ais.vessel_name != 'unknown':
-                csv_ais_data.append(ais)
-            else:
-                nmea_ais_data.append(ais)
-
-        # 分离不同格式的ADS-B数据
-        jsonl_adsb_data = []
-        csv_adsb_data = []
-
-        for adsb in adsb_data:
-            # 根据是否有heading_deg判断格式（CSV格式通常没有航向信息）
-            if adsb.heading_deg == 0.0 and adsb.data_type == "adsb":
-                csv_adsb_data.append(adsb)
-            else:
-                jsonl_adsb_data.append(adsb)
-
         standardized = {
             "metadata": {
                 "version": "2.3",
-                "total_records": len(ais_data) + len(adsb_data),
-                "ais_count": len(ais_data),
-                "ais_by_format": {
-                    "nmea": len(nmea_ais_data),
-                    "csv": len(csv_ais_data)
-                },
+                # 单调递增的数据版本号（/api/data/changes?since=）与服务进程纪元
+                "data_version": self.change_log.version,
+                "data_epoch": self.change_log.epoch,
+                "total_records": ais_count + adsb_count,
+                "ais_count": ais_count,
+                # 格式按来源文件统计
+                "ais_by_format": dict(ais_summary.by_format),
                 "ais_by_status": ais_status_stats,
-                "adsb_count": len(adsb_data),
-                "adsb_by_format": {
-                    "jsonl": len(jsonl_adsb_data),
-                    "csv": len(csv_adsb_data)
-                },
+                "adsb_count": adsb_count,
+                "adsb_by_format": dict(adsb_summary.by_format),
                 "adsb_by_status": adsb_status_stats,
                 "processing_time": datetime.now().isoformat(),
                 "coordinate_system": "WGS-84",
@@ -299,12 +459,12 @@ class DataProcessor:
                     "adsb_files": [str(file) for file in self.config.get_adsb_files()]
                 },
                 "data_quality": {
-                    "ais_normal_percentage": f"{(len(normal_ais_data) / max(len(ais_data), 1) * 100):.1f}%",
-                    "ais_warning_percentage": f"{(len(warning_ais_data) / max(len(ais_data), 1) * 100):.1f}%",
-                    "ais_error_percentage": f"{(len(error_ais_data) / max(len(ais_data), 1) * 100):.1f}%",
-                    "adsb_normal_percentage": f"{(len(normal_adsb_data) / max(len(adsb_data), 1) * 100):.1f}%",
-                    "adsb_warning_percentage": f"{(len(warning_adsb_data) / max(len(adsb_data), 1) * 100):.1f}%",
-                    "adsb_error_percentage": f"{(len(error_adsb_data) / max(len(adsb_data), 1) * 100):.1f}%"
+                    "ais_normal_percentage": f"{(ais_status_stats['normal'] / max(ais_count, 1) * 100):.1f}%",
+                    "ais_warning_percentage": f"{(ais_status_stats['warning'] / max(ais_count, 1) * 100):.1f}%",
+                    "ais_error_percentage": f"{(ais_status_stats['error'] / max(ais_count, 1) * 100):.1f}%",
+                    "adsb_normal_percentage": f"{(adsb_status_stats['normal'] / max(adsb_count, 1) * 100):.1f}%",
+                    "adsb_warning_percentage": f"{(adsb_status_stats['warning'] / max(adsb_count, 1) * 100):.1f}%",
+                    "adsb_error_percentage": f"{(adsb_status_stats['error'] / max(adsb_count, 1) * 100):.1f}%"
                 },
                 "data_cleaning": self.cleaning_stats.to_dict(),
                 "file_status": {
@@ -314,32 +474,31 @@ class DataProcessor:
                     "adsb_csv_exists": self.config.ADSB_CSV_FILE.exists()
                 }
             },
-            "ais_data": [ais.to_dict() for ais in ais_data],
-            "adsb_data": [adsb.to_dict() for adsb in adsb_data],
+            # 记录以列式存储保存，序列化时再转为字典列表
+            "ais_data": ais_summary.store,
+            "adsb_data": adsb_summary.store,
             "coverage_layers": coverage_layers,
-            "status_summary": {
-                "online_ais": len([ais for ais in ais_data if self._is_online(ais)]),
-                "offline_ais": len([ais for ais in ais_data if not self._is_online(ais)]),
-                "online_adsb": len([adsb for adsb in adsb_data if self._is_online(adsb)]),
-                "offline_adsb": len([adsb for adsb in adsb_data if not self._is_online(adsb)])
-            }
+            "status_summary": self._status_summary()
         }
 
         return standardized
 
-    def _is_online(self, data_point) -> bool:
-        """判断数据点是否在线（简化版本）"""
-        # 实际项目中应根据时间戳判断，这里使用简单逻辑
-        if hasattr(data_point, 'timestamp'):
-            try:
-                time_diff = datetime.now() - data_point.timestamp
-                return time_diff.total_seconds() < self.config.MAX_DATA_AGE_HOURS * 3600
-            except:
-                return True
-        return True
-
-    def _save_to_cache(self, data: Dict[str, Any]):
-        """保存处理后的数据到缓存"""
+    def _status_summary(self) -> Dict[str, int]:
+        """按目标统计在线与离线数：目标的最新记录在MAX_DATA_AGE_HOURS内为在线"""
+        summary = {}
+        now = datetime.now()
+        for kind, state in self.latest_states.items():
+            online = state.online_count(self.config.MAX_DATA_AGE_HOURS * 3600, now)
+            summary[f"online_{kind}"] = online
+            summary[f"offline_{kind}"] = state.entity_count - online
+            summary[f"{kind}_entities"] = state.entity_count
+        return summary
+
+    def _save_to_cache(self, data: Dict[str, Any]) -> bool:
+        """
+        保存缓存清单（元数据、覆盖范围、状态汇总与分段列表，不含记录），返回是否成功。
+        记录保存在各数据文件的缓存分段中
+        """
         try:
             # 确保缓存目录存在
             self.config.CACHE_DIR.mkdir(parents=True, exist_ok=True)
@@ -347,106 +506,48 @@ class DataProcessor:
             # 创建临时文件路径
             temp_file = self.config.PROCESSED_DATA_CACHE.with_suffix('.tmp')
 
-            # 写入临时文件
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                # 使用自定义编码器
-                json_str = json.dumps(data, cls=DataEncoder, ensure_ascii=False, indent=2)
-                f.write(json_str)
-
-            # 验证写入的数据
-            with open(temp_file, 'r', encoding='utf-8') as f:
-                test_data = json.load(f)
-                if 'metadata' not in test_data or 'ais_data' not in test_data:
-                    raise ValueError("缓存数据格式不正确")
+            manifest = {
+                "metadata": data["metadata"],
+                "coverage_layers": data["coverage_layers"],
+                "status_summary": data["status_summary"],
+                "data_hash": self.data_hash,
+                "segments": [segment.describe() for segment in self.segments.values()]
+            }
 
-            # 重命名为正式文件
+            # 写入临时文件后重命名为正式文件
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, cls=DataEncoder, ensure_ascii=False, indent=2)
             temp_file.replace(self.config.PROCESSED_DATA_CACHE)
 
             file_size = self.config.PROCESSED_DATA_CACHE.stat().st_size
-            logger.info(f"数据已缓存到: {self.config.PROCESSED_DATA_CACHE} (大小: {file_size} 字节)")
+            logger.info(f"缓存清单已保存到: {self.config.PROCESSED_DATA_CACHE} (大小: {file_size} 字节)")
+            return True
 
         except Exception as e:
             logger.error(f"保存缓存时出错: {str(e)}")
             # 清理临时文件
             if 'temp_file' in locals() and temp_file.exists():
                 temp_file.unlink(missing_ok=True)
-
-    def _load_cached_data(self) -> Dict[str, Any]:
-        """从缓存加载数据"""
-        if not self.config.PROCESSED_DATA_CACHE.exists():
-            logger.info("缓存文件不存在")
-            return None
-
-        try:
-            # 检查文件大小
-            file_size = self.config.PROCESSED_DATA_CACHE.stat().st_size
-            if file_size == 0:
-                logger.warning("缓存文件为空")
-                return None
-
-            with open(self.config.PROCESSED_DATA_CACHE, 'r', encoding='utf-8') as f:
-                # 读取文件内容
-                content = f.read()
-                if not content.strip():
-                    logger.warning("缓存文件内容为空")
-                    return None
-
-                # 解析JSON
-                data = json.loads(content)
-
-            # 验证数据格式
-            if not isinstance(data, dict):
-                logger.warning("缓存数据不是有效的JSON对象")
-                return None
-
-            if 'metadata' not in data:
-                logger.warning("缓存数据缺少metadata字段")
-                return None
-
-            if 'ais_data' not in data or 'adsb_data' not in data:
-                logger.warning("缓存数据缺少数据字段")
-                return None
-
-            logger.info(f"成功加载缓存数据，大小: {file_size} 字节")
-            logger.info(f"缓存数据统计: AIS={len(data.get('ais_data', []))}, ADS-B={len(data.get('adsb_data', []))}")
-
-            return data
-
-        except json.JSONDecodeError as e:
-            logger.warning(f"缓存文件JSON格式错误: {str(e)}")
-            # 尝试修复JSON或创建备份
-            self._backup_corrupted_cache()
-            return None
-        except Exception as e:
-            logger.error(f"加载缓存时出错: {str(e)}")
-            return None
-
-    def _backup_corrupted_cache(self):
-        """备份损坏的缓存文件"""
-        try:
-            if self.config.PROCESSED_DATA_CACHE.exists():
-                backup_file = self.config.PROCESSED_DATA_CACHE.with_suffix('.bak')
-                self.config.PROCESSED_DATA_CACHE.rename(backup_file)
-                logger.info(f"已备份损坏的缓存文件: {backup_file}")
-        except Exception as e:
-            logger.error(f"备份缓存文件时出错: {str(e)}")
+            return False
+
+    def clear_cache(self) -> List[str]:
+        """删除缓存清单与全部缓存分段，返回已删除的文件名"""
+        removed = []
+        if self.config.PROCESSED_DATA_CACHE.exists():
+            self.config.PROCESSED_DATA_CACHE.unlink()
+            removed.append(self.config.PROCESSED_DATA_CACHE.name)
+        # 仍被映射的分段文件（Windows上无法删除）跳过，下次处理时清理
+        for cache_file in self.config.CACHE_SEGMENT_DIR.glob('*.segment.*'):
+            if remove_segment_file(cache_file):
+                removed.append(cache_file.name)
+        self.segments = {}
+        self.processed_data = None
+        return removed
 
     def calculate_data_hash(self) -> str:
-        """计算数据文件的哈希值，用于检测变化"""
+        """由各缓存分段的文件指纹计算数据版本哈希，用于检测变化"""
         hash_md5 = hashlib.md5()
-
-        # 添加所有AIS文件哈希
-        for ais_file in self.config.get_ais_files():
-            if ais_file.exists():
-                with open(ais_file, 'rb') as f:
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        hash_md5.update(chunk)
-
-        # 添加所有ADS-B文件哈希
-        for adsb_file in self.config.get_adsb_files():
-            if adsb_file.exists():
-                with open(adsb_file, 'rb') as f:
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        hash_md5.update(chunk)
-
-        return hash_md5.hexdigest()
\ No newline at end of file
+        for path in sorted(self.segments):
+            fingerprint = self.segments[path].fingerprint
+            hash_md5.update(json.dumps([path, fingerprint], sort_keys=True).encode('utf-8'))
+        return hash_md5.hexdigest()
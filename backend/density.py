@@ -0,0 +1,207 @@
+"""
+密度热力图聚合。
+
+按经纬度划分全球网格：级别L的网格每个方向的间隔为 360 / 2^L 度（经度 2^L 列、纬度 2^(L-1) 行），
+按请求的矩形与分辨率选择级别。网格再划分为固定大小的分块，每个分块统计各网格的点数与数值和
+（AIS为航速、ADS-B为高度），按 (数据版本, 数据类型, 级别, 分块, 时间桶) 缓存：平移、缩放到同一级别时
+复用已算好的分块，时间范围内完整的时间桶也从缓存读取，只有首尾不完整的部分临时计算。
+"""
+import math
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .spatial_index import GridIndex
+from .time_index import NO_TIME_RANGE, TimeIndex, TimeRange
+from .track_store import TrackStore
+from .vector_tiles import TileCache
+
+# 各数据类型求平均值的字段
+VALUE_FIELDS = {'ais': 'sog', 'adsb': 'altitude_ft'}
+
+# 不限时间范围时分块的时间桶键
+_ALL_TIME = 'all'
+
+
+def density_level(bbox: Sequence[float], res: int, max_level: int) -> int:
+    """矩形横向或纵向不超过res个网格的最细级别"""
+    west, south, east, north = bbox
+    width = east - west if west <= east else east - west + 360.0
+    cell = max(width, north - south, 1e-9) / res
+    return int(min(max(math.floor(math.log2(360.0 / cell)), 1), max_level))
+
+
+def time_pieces(time_range: TimeRange, bounds: Optional[Tuple[int, int]],
+                bucket_us: int) -> List[Tuple[Hashable, TimeRange]]:
+    """
+    把时间范围（裁剪到数据的时间范围内）按时间桶拆分，返回 [(缓存键, 时间范围)]：
+    完整的时间桶缓存键为桶编号，首尾不完整的部分缓存键为None（不缓存），覆盖全部数据时与不限时间范围相同
+    """
+    if time_range == NO_TIME_RANGE:
+        return [(_ALL_TIME, NO_TIME_RANGE)]
+    if bounds is None:
+        return []
+    start = bounds[0] if time_range[0] is None else max(time_range[0], bounds[0])
+    end = bounds[1] if time_range[1] is None else min(time_range[1], bounds[1])
+    if start > end:
+        return []
+    if (start, end) == bounds:
+        return [(_ALL_TIME, NO_TIME_RANGE)]
+    pieces = []
+    for bucket in range(start // bucket_us, end // bucket_us + 1):
+        first, last = bucket * bucket_us, (bucket + 1) * bucket_us - 1
+        piece = (max(start, first), min(end, last))
+        pieces.append((bucket if piece == (first, last) else None, piece))
+    return pieces
+
+
+class DensityAggregator:
+    """按级别、分块与时间桶缓存的密度网格"""
+
+    def __init__(self, chunk_cells: int, bucket_seconds: int, max_level: int, cache_size: int):
+        self.chunk_cells = chunk_cells
+        self.bucket_us = int(bucket_seconds * 1000000)
+        self.max_level = max_level
+        self.cache = TileCache(cache_size)
+
+    def grid(self, store: TrackStore, index: GridIndex, time_index: TimeIndex, kind: str, version: Hashable,
+             bbox: Sequence[float], res: int, time_range: TimeRange = NO_TIME_RANGE) -> Dict[str, Any]:
+        """
+        矩形内（west > east 表示跨越180°经线）各网格的点数与数值和，返回 level、cell_degrees、
+        origin（左上角网格的西、北边界）、shape（行数, 列数）以及counts、sums（第0行为最北）
+        """
+        level = density_level(bbox, res, self.max_level)
+        cell = 360.0 / (1 << level)
+        ncols, nrows = 1 << level, 1 << (level - 1)
+        chunk_cols, chunk_rows = min(self.chunk_cells, ncols), min(self.chunk_cells, nrows)
+
+        west, south, east, north = bbox
+        col0, col1 = _cell_of(west + 180.0, cell, ncols), _cell_of(east + 180.0, cell, ncols)
+        row0, row1 = _cell_of(south + 90.0, cell, nrows), _cell_of(north + 90.0, cell, nrows)
+        if west > east:
+            col1 += ncols
+        counts = np.zeros((row1 - row0 + 1, col1 - col0 + 1), dtype=np.int64)
+        sums = np.zeros(counts.shape)
+
+        pieces = time_pieces(time_range, time_index.bounds, self.bucket_us)
+        for cy in range(row0 // chunk_rows, row1 // chunk_rows + 1):
+            for virtual_cx in range(col0 // chunk_cols, col1 // chunk_cols + 1):
+                cx = virtual_cx % (ncols // chunk_cols)
+                chunk = self._chunk(store, index, kind, version, level, cx, cy, chunk_cols, chunk_rows, pieces)
+                if chunk is None:
+                    continue
+                # 分块与输出网格重叠的部分（列按未取模的编号计算）
+                r0, r1 = max(row0, cy * chunk_rows), min(row1, (cy + 1) * chunk_rows - 1)
+                c0, c1 = max(col0, virtual_cx * chunk_cols), min(col1, (virtual_cx + 1) * chunk_cols - 1)
+                source = (slice(r0 - cy * chunk_rows, r1 - cy * chunk_rows + 1),
+                          slice(c0 - virtual_cx * chunk_cols, c1 - virtual_cx * chunk_cols + 1))
+                target = (slice(r0 - row0, r1 - row0 + 1), slice(c0 - col0, c1 - col0 + 1))
+                counts[target] += chunk[0][source]
+                sums[target] += chunk[1][source]
+
+        return {
+            'level': level,
+            'cell_degrees': cell,
+            'origin': [col0 * cell - 180.0, (row1 + 1) * cell - 90.0],
+            'shape': list(counts.shape),
+            'counts': counts[::-1],
+            'sums': sums[::-1]
+        }
+
+    def _chunk(self, store: TrackStore, index: GridIndex, kind: str, version: Hashable, level: int, cx: int, cy: int,
+               chunk_cols: int, chunk_rows: int,
+               pieces: List[Tuple[Hashable, TimeRange]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """一个分块在各时间段上统计结果之和（没有点时为None），完整的时间桶读写缓存"""
+        total, missing = None, []
+        for bucket, piece in pieces:
+            key = (version, kind, level, cx, cy, bucket)
+            cached = self.cache.get(key) if bucket is not None else None
+            if cached is None:
+                missing.append((key if bucket is not None else None, piece))
+            elif cached:
+                total = _add(total, cached)
+
+        if missing:
+            computed = self._compute(store, index, kind, level, cx, cy, chunk_cols, chunk_rows,
+                                     [piece for _, piece in missing])
+            for (key, _), result in zip(missing, computed):
+                if key is not None:
+                    # 空分块缓存为()，与未缓存区分
+                    self.cache.put(key, result if result is not None else ())
+                if result is not None:
+                    total = _add(total, result)
+        return total
+
+    def _compute(self, store: TrackStore, index: GridIndex, kind: str, level: int, cx: int, cy: int,
+                 chunk_cols: int, chunk_rows: int,
+                 pieces: List[TimeRange]) -> List[Optional[Tuple[np.ndarray, np.ndarray]]]:
+        """用空间索引取分块范围内的点，一次划分到各时间段后分别统计"""
+        cell = 360.0 / (1 << level)
+        ncols, nrows = 1 << level, 1 << (level - 1)
+        west, south = cx * chunk_cols * cell - 180.0, cy * chunk_rows * cell - 90.0
+        rows = index.query(west, south, west + chunk_cols * cell, south + chunk_rows * cell)
+        lon, lat = store.raw('longitude')[rows], store.raw('latitude')[rows]
+
+        # 边界上的点只计入所在网格（与相邻分块不重复）
+        cols = _cell_of(lon + 180.0, cell, ncols) - cx * chunk_cols
+        grid_rows = _cell_of(lat + 90.0, cell, nrows) - cy * chunk_rows
+        inside = (cols >= 0) & (cols < chunk_cols) & (grid_rows >= 0) & (grid_rows < chunk_rows)
+        cells = (grid_rows * chunk_cols + cols)[inside]
+        rows = rows[inside]
+        values = np.nan_to_num(store.raw(VALUE_FIELDS[kind])[rows].astype(np.float64))
+
+        # 各点所属的时间段（不在任何时间段内的点丢弃）
+        if pieces == [NO_TIME_RANGE]:
+            slots = np.zeros(len(rows), dtype=np.int64)
+        else:
+            times = store.raw('timestamp')[rows]
+            starts = np.array([piece[0] for piece in pieces], dtype=np.int64)
+            ends = np.array([piece[1] for piece in pieces], dtype=np.int64)
+            slots = np.searchsorted(starts, times, side='right') - 1
+            keep = (slots >= 0) & (times <= ends[np.maximum(slots, 0)])
+            slots, cells, values = slots[keep], cells[keep], values[keep]
+
+        # 按时间段排序后逐段统计（只为有点的时间段分配网格数组）
+        order = np.argsort(slots, kind='stable')
+        slots, cells, values = slots[order], cells[order], values[order]
+        edges = np.searchsorted(slots, np.arange(len(pieces) + 1))
+        size = chunk_rows * chunk_cols
+        results = []
+        for a, b in zip(edges[:-1].tolist(), edges[1:].tolist()):
+            if a == b:
+                results.append(None)
+                continue
+            counts = np.bincount(cells[a:b], minlength=size).reshape(chunk_rows, chunk_cols)
+            sums = np.bincount(cells[a:b], weights=values[a:b], minlength=size).reshape(chunk_rows, chunk_cols)
+            results.append((counts, sums))
+        return results
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+
+def _cell_of(offset, cell: float, count: int):
+    """距网格起点offset度所在的网格编号（限制在 [0, count) 内）"""
+    if isinstance(offset, np.ndarray):
+        return np.clip((offset / cell).astype(np.int64), 0, count - 1)
+    return min(max(int(offset // cell), 0), count - 1)
+
+
+def _add(total: Optional[Tuple[np.ndarray, np.ndarray]],
+         part: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    if total is None:
+        return part[0].copy(), part[1].copy()
+    return total[0] + part[0], total[1] + part[1]
+
+
+def sparse_cells(grid: Dict[str, Any], with_means: bool) -> Dict[str, List]:
+    """非空网格的稀疏表示：cells为行优先的网格编号，counts为点数，means为数值平均值（保留两位小数）"""
+    counts = grid['counts'].ravel()
+    cells = np.flatnonzero(counts)
+    result = {'cells': cells.tolist(), 'counts': counts[cells].tolist()}
+    if with_means:
+        result['means'] = np.round(grid['sums'].ravel()[cells] / counts[cells], 2).tolist()
+    return result
@@ -0,0 +1,186 @@
+"""
+增量摄取检查点。
+
+为每个数据文件记录已处理到的字节偏移、inode/设备号、偏移前一段内容的摘要，以及CSV表头和
+NMEA未完成的多片段语句，使追加写入的文件只需解码新增的完整行。
+从头解码时读到文件末尾；增量解码时末尾未以换行结束的行可能仍在写入，文件大小在两次检查之间不变后才解码。
+文件被截断或轮转（inode变化、大小小于偏移、偏移前内容改变）时由调用方退回全量重扫。
+"""
+import csv
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 文件状态
+UNCHANGED = 'unchanged'
+APPENDED = 'appended'
+TRUNCATED = 'truncated'
+ROTATED = 'rotated'
+MISSING = 'missing'
+
+# 校验偏移前内容时读取的字节数
+_DIGEST_BYTES = 4096
+
+# 按区间读取文件时每次读取的字节数
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class FileCheckpoint:
+    """单个文件的增量摄取检查点"""
+
+    def __init__(self, path: str, file_format: str, device: int = 0, inode: int = 0, offset: int = 0,
+                 digest: str = '', header: Optional[List[str]] = None, pending: Optional[List[str]] = None,
+                 tail_size: int = 0):
+        self.path = str(path)
+        self.file_format = file_format
+        self.device = device
+        self.inode = inode
+        # 已处理的字节数（总是落在行首）
+        self.offset = offset
+        # offset之前_DIGEST_BYTES字节的摘要，用于识别原地截断后重新写入
+        self.digest = digest
+        # CSV表头（offset为0时尚未读取）
+        self.header = header
+        # NMEA未完成的多片段语句，下次摄取时先放回重组缓冲区
+        self.pending = pending or []
+        # 上次检查时文件末尾有未以换行结束的行（暂未解码）时的文件大小
+        self.tail_size = tail_size
+
+    @property
+    def is_new(self) -> bool:
+        """尚未处理过文件（从头解码）"""
+        return not self.digest
+
+    @property
+    def unterminated_tail(self) -> bool:
+        """文件末尾有未以换行结束、等待下次检查的行"""
+        return self.tail_size > self.offset
+
+    def check(self) -> str:
+        """对比当前文件与检查点，返回文件状态"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return MISSING
+
+        if (stat.st_dev, stat.st_ino) != (self.device, self.inode):
+            return ROTATED
+        if stat.st_size < self.offset or _tail_digest(self.path, self.offset) != self.digest:
+            return TRUNCATED
+        if stat.st_size == self.offset:
+            return UNCHANGED
+        return APPENDED
+
+    def advance(self, offset: int):
+        """记录已处理到offset（并更新文件标识与摘要）"""
+        stat = os.stat(self.path)
+        self.device, self.inode = stat.st_dev, stat.st_ino
+        self.offset = offset
+        self.digest = _tail_digest(self.path, offset)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'file_format': self.file_format,
+            'device': self.device,
+            'inode': self.inode,
+            'offset': self.offset,
+            'digest': self.digest,
+            'header': self.header,
+            'pending': self.pending,
+            'tail_size': self.tail_size
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FileCheckpoint':
+        return cls(data['path'], data['file_format'], data.get('device', 0), data.get('inode', 0),
+                   data.get('offset', 0), data.get('digest', ''), data.get('header'), data.get('pending'),
+                   data.get('tail_size', 0))
+
+
+def _tail_digest(path: str, offset: int) -> str:
+    """offset之前最多_DIGEST_BYTES字节内容的摘要"""
+    start = max(0, offset - _DIGEST_BYTES)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return hashlib.md5(f.read(offset - start)).hexdigest()
+
+
+def complete_end(path: str, size: Optional[int] = None) -> int:
+    """文件前size字节中最后一个完整行的结束位置（最后一个换行符之后），没有完整行时返回0"""
+    if size is None:
+        size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        position = size
+        while position > 0:
+            start = max(0, position - _READ_CHUNK_SIZE)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+def _line_start(path: str, offset: int) -> int:
+    """
+    上次解码到未以换行结束的末行时offset不在行首：随后追加的内容以换行开头时跳过该换行，
+    否则该换行会被当作一个空行
+    """
+    if offset == 0:
+        return 0
+    with open(path, 'rb') as f:
+        f.seek(offset - 1)
+        data = f.read(3)
+    if data[:1] == b'\n':
+        return offset
+    if data[1:3] == b'\r\n':
+        return offset + 2
+    return offset + 1 if data[1:2] == b'\n' else offset
+
+
+def iter_range_lines(path: str, start: int, end: int) -> Iterator[str]:
+    """逐行读取文件字节区间 [start, end) 内的文本行（区间应按行对齐）"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        carry = b''
+        while remaining > 0:
+            chunk = f.read(min(_READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            lines = (carry + chunk).split(b'\n')
+            carry = lines.pop()
+            for line in lines:
+                yield line.decode('utf-8', errors='replace') + '\n'
+        if carry:
+            yield carry.decode('utf-8', errors='replace')
+
+
+def read_csv_header(path: str) -> Optional[List[str]]:
+    """读取CSV文件的表头行"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), None)
+
+
+def open_checkpoint_range(checkpoint: FileCheckpoint) -> Tuple[Iterator[str], int]:
+    """
+    打开检查点偏移之后新增的行，返回 (文本行迭代器, 区间结束位置)。
+    从头解码时读到文件末尾；增量解码时末尾未以换行结束的行在文件大小与上次检查时相同才读取，
+    否则留到下次检查（大小记入检查点）。CSV文件从头读取时先读出表头存入检查点，返回的行不含表头
+    """
+    size = os.path.getsize(checkpoint.path)
+    end = complete_end(checkpoint.path, size)
+    if end < size and (checkpoint.is_new or checkpoint.tail_size == size):
+        end = size
+    checkpoint.tail_size = size if end < size else 0
+    lines = iter_range_lines(checkpoint.path, _line_start(checkpoint.path, checkpoint.offset), end)
+    if checkpoint.file_format == 'csv' and checkpoint.header is None:
+        first = next(lines, None)
+        if first is not None:
+            checkpoint.header = next(csv.reader([first]), [])
+    return lines, end
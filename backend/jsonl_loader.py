@@ -0,0 +1,158 @@
+"""
+批量JSONL解析工具。
+
+按块解析JSONL文本行（整块拼接为JSON数组后由simplejson一次解码，与json.loads一样接受NaN/Infinity），
+将已知字段提取到类型化的列缓冲，时间戳由年月日时分秒整列算术计算为epoch微秒；逐条记录对象只在调用方需要时才构造。
+"""
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import simplejson
+
+# 每块解析的行数
+JSONL_BLOCK_ROWS = 50000
+
+
+class JsonlBlock:
+    """
+    一块JSONL数据。records为每行解析得到的JSON值（空行和解析失败的行为None），
+    empty/decode_error分别为空行和JSON解析错误的行掩码
+    """
+
+    def __init__(self, records: List[Any], empty: np.ndarray, decode_error: np.ndarray):
+        self.records = records
+        self.size = len(records)
+        self.empty = empty
+        self.decode_error = decode_error
+
+
+def iter_jsonl_blocks(lines: Iterable[str], block_rows: int = JSONL_BLOCK_ROWS) -> Iterator[JsonlBlock]:
+    """按块读取并解析JSONL文本行，产出JsonlBlock"""
+    lines = iter(lines)
+    while True:
+        texts = [line.strip() for line in islice(lines, block_rows)]
+        if not texts:
+            return
+
+        empty = np.array([not text for text in texts], dtype=bool)
+        records, decode_error = _decode_texts(texts, empty)
+        yield JsonlBlock(records, empty, decode_error)
+
+
+def _decode_texts(texts: List[str], empty: np.ndarray) -> Tuple[List[Any], np.ndarray]:
+    """
+    解码一块非空文本行：先整体拼接为JSON数组一次解码，
+    结果条数与行数不符或存在非法行时退回逐行解码
+    """
+    decode_error = np.zeros(len(texts), dtype=bool)
+    rows = [i for i in range(len(texts)) if not empty[i]]
+    records: List[Any] = [None] * len(texts)
+    if not rows:
+        return records, decode_error
+
+    non_empty = [texts[i] for i in rows]
+    decoded = None
+    if all(text[0] == '{' and text[-1] == '}' for text in non_empty):
+        try:
+            decoded = simplejson.loads('[' + ','.join(non_empty) + ']', allow_nan=True)
+        except ValueError:
+            decoded = None
+        if decoded is not None and len(decoded) != len(non_empty):
+            decoded = None
+
+    if decoded is None:
+        decoded = []
+        for i, text in zip(rows, non_empty):
+            try:
+                decoded.append(simplejson.loads(text, allow_nan=True))
+            except ValueError:
+                decoded.append(None)
+                decode_error[i] = True
+
+    for i, value in zip(rows, decoded):
+        records[i] = value
+    return records, decode_error
+
+
+def float_column(records: Sequence[Dict[str, Any]], key: str, default: float = 0.0,
+                 numeric_only: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    提取数值字段为float64列，返回 (数值, 无法转换的行掩码)。
+    全部为数字时整列转换，否则逐个按float()的规则转换；numeric_only时非数字类型（如字符串）视为无法转换
+    """
+    values = [record.get(key, default) for record in records]
+    invalid = np.zeros(len(values), dtype=bool)
+    try:
+        column = np.array(values)
+        if column.ndim == 1 and column.dtype.kind in 'fi':
+            return column.astype(np.float64), invalid
+    except ValueError:
+        pass
+
+    column = np.zeros(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        if numeric_only and not isinstance(value, (int, float)):
+            invalid[i] = True
+            continue
+        try:
+            column[i] = float(value)
+        except (ValueError, TypeError, OverflowError):
+            invalid[i] = True
+    return column, invalid
+
+
+def int_column(records: Sequence[Dict[str, Any]], key: str, default: int) -> Tuple[np.ndarray, np.ndarray]:
+    """提取整数字段为int64列，返回 (数值, 非整数的行掩码)"""
+    values = [record.get(key, default) for record in records]
+    invalid = np.zeros(len(values), dtype=bool)
+    try:
+        column = np.array(values)
+        if column.ndim == 1 and column.dtype.kind == 'i':
+            return column.astype(np.int64), invalid
+    except (ValueError, OverflowError):
+        pass
+
+    column = np.zeros(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        if isinstance(value, int) and -2 ** 62 < value < 2 ** 62:
+            column[i] = value
+        else:
+            invalid[i] = True
+    return column, invalid
+
+
+def days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """公历日期整列换算为距1970-01-01的天数"""
+    y = year - (month <= 2)
+    era = np.floor_divide(y, 400)
+    yoe = y - era * 400
+    mp = (month + 9) % 12
+    doy = (153 * mp + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def epoch_microseconds(year: np.ndarray, month: np.ndarray, day: np.ndarray, hour: np.ndarray,
+                       minute: np.ndarray, second: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由年月日时分秒整列计算epoch微秒（秒可带小数，小数部分按微秒截断），
+    返回 (epoch微秒, 日期时间是否合法)
+    """
+    with np.errstate(invalid='ignore'):
+        whole_second = np.trunc(second)
+        valid = np.isfinite(second) & (second >= 0) & (whole_second <= 59)
+        whole_second = np.where(valid, whole_second, 0)
+        microsecond = ((second - whole_second) * 1000000).astype(np.int64)
+        whole_second = whole_second.astype(np.int64)
+
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    month_index = np.clip(month - 1, 0, 11)
+    month_days = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[month_index] + \
+        (leap & (month == 2))
+    valid &= (year >= 1) & (year <= 9999) & (month >= 1) & (month <= 12) & \
+        (day >= 1) & (day <= month_days) & (hour >= 0) & (hour <= 23) & (minute >= 0) & (minute <= 59)
+
+    days = days_from_civil(np.where(valid, year, 1970), np.where(valid, month, 1), np.where(valid, day, 1))
+    seconds = ((days * 24 + hour) * 60 + minute) * 60 + whole_second
+    return np.where(valid, seconds * 1000000 + microsecond, 0), valid
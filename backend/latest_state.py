@@ -0,0 +1,112 @@
+"""
+最新状态索引。
+
+按目标（AIS的MMSI、ADS-B的aircraft_id）保存最新一条记录的行号与时间戳，数组以目标标识列的
+字典编码为下标。记录追加到列式存储后调用update()只处理新追加的行（每条记录常数开销，不重新扫描历史），
+时间戳相同时以后到的记录为准。多个存储按顺序拼接时，由各存储的最新状态用merge()合并（开销与目标数成正比）。
+"""
+from datetime import datetime
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .time_index import NO_TIME_RANGE, TimeRange, filter_rows
+from .track_store import TrackStore
+
+_NO_TIME = np.iinfo(np.int64).min
+
+
+class LatestState:
+    """一种数据类型每个目标的最新记录：rows[编码]为行号（-1表示该编码没有记录），times[编码]为时间戳"""
+
+    def __init__(self, store: TrackStore, entity_field: str):
+        self.store = store
+        self.entity_field = entity_field
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.times = np.zeros(0, dtype=np.int64)
+        # 已处理的行数
+        self.size = 0
+        self.update()
+
+    def update(self):
+        """吸收存储中新追加的记录"""
+        start, end = self.size, len(self.store)
+        if start >= end:
+            return
+
+        # 取值表只增不减，新目标的编码追加在末尾
+        entities = len(self.store.categories[self.entity_field].values)
+        if entities > len(self.rows):
+            grow = entities - len(self.rows)
+            self.rows = np.concatenate([self.rows, np.full(grow, -1, dtype=np.int64)])
+            self.times = np.concatenate([self.times, np.full(grow, _NO_TIME, dtype=np.int64)])
+
+        codes = self.store.raw_since(self.entity_field, start)
+        times = self.store.raw_since('timestamp', start)
+        unique, inverse = np.unique(codes, return_inverse=True)
+        newest = np.full(len(unique), _NO_TIME, dtype=np.int64)
+        np.maximum.at(newest, inverse, times)
+
+        # 新记录中各目标时间最新的行（同一目标有多行时后面的行覆盖前面的行）
+        candidates = np.flatnonzero(times == newest[inverse])
+        candidates = candidates[times[candidates] >= self.times[codes[candidates]]]
+        self.rows[codes[candidates]] = candidates + start
+        self.times[codes[candidates]] = times[candidates]
+        self.size = end
+
+    def copy(self, store: Optional[TrackStore] = None) -> 'LatestState':
+        """
+        拷贝索引。store为原存储的拷贝（之后可能追加了记录）时改为引用store，
+        之后update()只处理拷贝后新追加的行
+        """
+        duplicate = LatestState(TrackStore(self.store.record_class), self.entity_field)
+        duplicate.store = self.store if store is None else store
+        duplicate.rows, duplicate.times, duplicate.size = self.rows.copy(), self.times.copy(), self.size
+        return duplicate
+
+    @classmethod
+    def merge(cls, store: TrackStore, entity_field: str, parts: Sequence['LatestState']) -> 'LatestState':
+        """
+        合并各部分的最新状态：store由各部分的存储按顺序拼接而成，各部分须已update()到存储末尾。
+        只比较各部分每个目标的最新记录，不扫描记录；时间戳相同时以后面部分的记录为准
+        """
+        merged = cls(TrackStore(store.record_class), entity_field)
+        merged.store = store
+        categories = store.categories[entity_field]
+        merged.rows = np.full(len(categories.values), -1, dtype=np.int64)
+        merged.times = np.full(len(categories.values), _NO_TIME, dtype=np.int64)
+
+        offset = 0
+        for part in parts:
+            codes = np.flatnonzero(part.rows >= 0)
+            if len(codes):
+                values = np.asarray(part.store.categories[entity_field].values, dtype=object)[codes]
+                target = categories.encode(values.tolist())
+                later = part.times[codes] >= merged.times[target]
+                merged.rows[target[later]] = part.rows[codes[later]] + offset
+                merged.times[target[later]] = part.times[codes[later]]
+            offset += len(part.store)
+        merged.size = len(store)
+        return merged
+
+    @property
+    def entity_count(self) -> int:
+        return int(np.count_nonzero(self.rows >= 0))
+
+    def online_count(self, max_age_seconds: float, now: Optional[datetime] = None) -> int:
+        """最新记录在max_age_seconds内的目标数"""
+        oldest = np.datetime64(now or datetime.now(), 'us').astype(np.int64) - int(max_age_seconds * 1000000)
+        return int(np.count_nonzero((self.rows >= 0) & (self.times > oldest)))
+
+    def latest_rows(self, bbox: Optional[Sequence[float]] = None,
+                    time_range: TimeRange = NO_TIME_RANGE) -> np.ndarray:
+        """各目标最新记录的行号（升序），可按矩形（west > east 表示跨越180°经线）与时间范围过滤"""
+        rows = np.sort(self.rows[self.rows >= 0])
+        rows = filter_rows(self.store.raw('timestamp'), rows, time_range)
+        if bbox is not None:
+            west, south, east, north = bbox
+            lon, lat = self.store.raw('longitude')[rows], self.store.raw('latitude')[rows]
+            inside = (lat >= south) & (lat <= north)
+            inside &= ((lon >= west) & (lon <= east)) if west <= east else ((lon >= west) | (lon <= east))
+            rows = rows[inside]
+        return rows
@@ -2,9 +2,23 @@ from dataclasses import dataclass, asdict, field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import json
+import sys
 
+from .track_store import TrackStore
 
-@dataclass
+# 记录模型使用__slots__（Python 3.10+），省去每条记录的__dict__
+_RECORD_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+def _intern(value):
+    """
+    驻留低基数（枚举类）字符串，相同取值的记录共享同一个字符串对象。
+    驻留表不会释放，MMSI、船名、航班号等高基数标识不驻留
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(**_RECORD_OPTIONS)
 class AISData:
     """AIS数据模型"""
     mmsi: str
@@ -33,13 +47,45 @@ class AISData:
     transceiver_class: str = "unknown"
     base_date_time: str = ""
 
+    def __post_init__(self):
+        self.nav_status = _intern(self.nav_status)
+        self.vessel_type = _intern(self.vessel_type)
+        self.data_type = _intern(self.data_type)
+        self.data_status = _intern(self.data_status)
+        self.cleaning_notes = _intern(self.cleaning_notes)
+        self.status = _intern(self.status)
+        self.cargo = _intern(self.cargo)
+        self.transceiver_class = _intern(self.transceiver_class)
+
     def to_dict(self) -> Dict[str, Any]:
-        result = asdict(self)
-        result['timestamp'] = self.timestamp.isoformat()
-        return result
+        # 字段均为不可变值，直接构造字典，无需asdict()的递归深拷贝
+        return {
+            'mmsi': self.mmsi,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'sog': self.sog,
+            'cog': self.cog,
+            'heading': self.heading,
+            'nav_status': self.nav_status,
+            'vessel_type': self.vessel_type,
+            'timestamp': self.timestamp.isoformat(),
+            'data_type': self.data_type,
+            'data_status': self.data_status,
+            'cleaning_notes': self.cleaning_notes,
+            'vessel_name': self.vessel_name,
+            'imo': self.imo,
+            'call_sign': self.call_sign,
+            'status': self.status,
+            'length': self.length,
+            'width': self.width,
+            'draft': self.draft,
+            'cargo': self.cargo,
+            'transceiver_class': self.transceiver_class,
+            'base_date_time': self.base_date_time
+        }
 
 
-@dataclass
+@dataclass(**_RECORD_OPTIONS)
 class ADSData:
     """ADS-B数据模型"""
     aircraft_id: str
@@ -55,11 +101,34 @@ class ADSData:
     data_status: str = "normal"  # normal, warning, error
     # 数据清洗标记
     cleaning_notes: str = ""
+    # 相对接收机的距离（海里）与方位（0-360度），-1表示未知（CSV格式没有这两项）
+    range_nm: float = -1.0
+    bearing_deg: float = -1.0
+    # 高度是否为GNSS高度（否则为气压高度）
+    altitude_is_gnss: bool = False
+
+    def __post_init__(self):
+        self.data_type = _intern(self.data_type)
+        self.data_status = _intern(self.data_status)
+        self.cleaning_notes = _intern(self.cleaning_notes)
 
     def to_dict(self) -> Dict[str, Any]:
-        result = asdict(self)
-        result['timestamp'] = self.timestamp.isoformat()
-        return result
+        return {
+            'aircraft_id': self.aircraft_id,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'altitude_ft': self.altitude_ft,
+            'ground_speed_kts': self.ground_speed_kts,
+            'heading_deg': self.heading_deg,
+            'aircraft_tail': self.aircraft_tail,
+            'timestamp': self.timestamp.isoformat(),
+            'data_type': self.data_type,
+            'data_status': self.data_status,
+            'cleaning_notes': self.cleaning_notes,
+            'range_nm': self.range_nm,
+            'bearing_deg': self.bearing_deg,
+            'altitude_is_gnss': self.altitude_is_gnss
+        }
 
 
 @dataclass
@@ -71,12 +140,15 @@ class ResourceCoverage:
     status: str  # online/offline
     label: str
     metadata: Dict[str, Any]
+    # 全部覆盖多边形 [[外环, 空洞...], ...]，coordinates为其中面积最大的外环
+    polygons: list = field(default_factory=list)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
             'resource_id': self.resource_id,
             'data_type': self.data_type,
             'coordinates': self.coordinates,
+            'polygons': self.polygons,
             'status': self.status,
             'label': self.label,
             'metadata': self.metadata
@@ -96,11 +168,28 @@ class DataCleaningStats:
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
 
+    def merge(self, other: Dict[str, Any]):
+        """合并另一份清洗统计（to_dict()格式）"""
+        self.total_records += other.get('total_records', 0)
+        self.valid_records += other.get('valid_records', 0)
+        self.error_records += other.get('error_records', 0)
+        self.warning_records += other.get('warning_records', 0)
+
+        # 合并错误类型
+        for error_type, count in other.get('errors_by_type', {}).items():
+            self.errors_by_type[error_type] = self.errors_by_type.get(error_type, 0) + count
+
+        # 合并警告类型
+        for warning_type, count in other.get('warnings_by_type', {}).items():
+            self.warnings_by_type[warning_type] = self.warnings_by_type.get(warning_type, 0) + count
+
 
 class DataEncoder(json.JSONEncoder):
-    """自定义JSON编码器，用于处理datetime对象"""
+    """自定义JSON编码器，用于处理datetime对象和列式记录存储"""
 
     def default(self, obj):
         if isinstance(obj, datetime):
             return obj.isoformat()
+        if isinstance(obj, TrackStore):
+            return obj.to_dicts()
         return super().default(obj)
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+游标分页。
+
+游标编码 (数据版本, 数据类型, 起始行号)，固定在生成它的数据版本上：重新处理得到新版本后，
+已发出的游标仍从原版本的列式存储取页，翻页结果前后一致。最近若干个版本保留在内存中
+（各版本的列数组大多共用，保留旧版本的额外内存很少），更早版本的游标视为过期。
+每页按行区间从列式存储取切片视图后序列化，不复制整列。带时间范围的游标同时记录时间范围，
+按时间索引选出的行号（按时间升序）分页。
+"""
+import base64
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .time_index import NO_TIME_RANGE, TimeRange
+from .track_store import TrackStore
+
+# 数据类型 -> 处理结果中的记录字段
+DATA_KEYS = {'ais': 'ais_data', 'adsb': 'adsb_data'}
+
+
+class CursorError(ValueError):
+    """游标无法解析"""
+
+
+class ExpiredCursorError(CursorError):
+    """游标对应的数据版本已不再保留"""
+
+
+def encode_cursor(version: str, kind: str, offset: int, time_range: TimeRange = NO_TIME_RANGE) -> str:
+    """生成不透明的分页游标"""
+    raw = json.dumps([version, kind, offset, *time_range], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, int, TimeRange]:
+    """解析分页游标，返回 (数据版本, 数据类型, 起始行号, 时间范围)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        version, kind, offset, start, end = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise CursorError(f"无效的分页游标: {cursor}") from e
+    if kind not in DATA_KEYS or not isinstance(offset, int) or offset < 0 or not isinstance(version, str) or \
+            not all(value is None or isinstance(value, int) for value in (start, end)):
+        raise CursorError(f"无效的分页游标: {cursor}")
+    return version, kind, offset, (start, end)
+
+
+class SnapshotRegistry:
+    """保留最近若干个数据版本（处理结果字典），供分页游标按版本取页"""
+
+    def __init__(self, keep: int = 3):
+        self.keep = keep
+        self._versions: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, data: Dict[str, Any], data_hash: Optional[str] = None) -> str:
+        """登记处理结果，返回其版本号（同一处理结果重复登记得到相同版本号）"""
+        with self._lock:
+            for version, registered in self._versions.items():
+                if registered is data:
+                    return version
+
+            processing_time = data.get('metadata', {}).get('processing_time', '')
+            version = hashlib.md5(f"{data_hash}|{processing_time}|{id(data)}".encode('utf-8')).hexdigest()[:16]
+            self._versions[version] = data
+            while len(self._versions) > self.keep:
+                self._versions.popitem(last=False)
+            return version
+
+    def get(self, version: str) -> Dict[str, Any]:
+        """获取版本对应的处理结果，版本已不再保留时抛出ExpiredCursorError"""
+        with self._lock:
+            data = self._versions.get(version)
+        if data is None:
+            raise ExpiredCursorError(f"数据版本 {version} 已过期")
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+
+def read_page(store: TrackStore, version: str, kind: str, offset: int, limit: int,
+              rows: Optional[np.ndarray] = None, time_range: TimeRange = NO_TIME_RANGE) -> Dict[str, Any]:
+    """
+    读取从offset开始的至多limit条记录，返回记录与下一页游标（没有下一页时为None）。
+    rows为时间范围内的行号时，offset为rows中的位置
+    """
+    total = len(store) if rows is None else len(rows)
+    end = min(offset + limit, total)
+    selection = slice(offset, end) if rows is None else rows[offset:end]
+    records: List[Dict[str, Any]] = store.to_dicts(selection) if offset < end else []
+    return {
+        'type': kind,
+        'version': version,
+        'offset': offset,
+        'count': len(records),
+        'total': total,
+        'records': records,
+        'next_cursor': encode_cursor(version, kind, end, time_range) if end < total else None
+    }
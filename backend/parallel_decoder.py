@@ -0,0 +1,265 @@
+import csv
+import logging
+import os
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Tuple, Optional
+
+from .config import Config
+from .ais_decoder import AISDecoder, FragmentBuffer
+from .adsb_processor import ADSBProcessor
+from .models import AISData, DataCleaningStats
+from .track_store import records_to_columns
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def split_file_ranges(file_path: Path, chunk_size: int, start_offset: int = 0,
+                      end_offset: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    将文件切分为按换行符对齐的字节区间 [start, end)。
+    每个边界都向后移动到下一行行首，保证任何一行只属于一个区间；end_offset限定只切分文件的前一部分
+    """
+    file_size = os.path.getsize(file_path) if end_offset is None else end_offset
+    if file_size <= start_offset:
+        return []
+
+    boundaries = [start_offset]
+    with open(file_path, 'rb') as f:
+        position = start_offset
+        while True:
+            position += chunk_size
+            if position >= file_size:
+                break
+            f.seek(position)
+            f.readline()  # 跳到下一行行首
+            position = f.tell()
+            if position >= file_size:
+                break
+            boundaries.append(position)
+    boundaries.append(file_size)
+
+    return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+
+
+def _read_range_lines(file_path: str, start: int, end: int) -> List[str]:
+    """读取字节区间内的所有文本行"""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return data.decode('utf-8', errors='replace').splitlines()
+
+
+def _is_continuation_fragment(line: str) -> bool:
+    """判断NMEA语句是否为多片段消息的后续片段（片段号>1）"""
+    parts = line.strip().split(',')
+    if len(parts) < 7:
+        return False
+    try:
+        return int(parts[1] or 1) > 1 and int(parts[2] or 1) > 1
+    except ValueError:
+        return False
+
+
+def _decode_ais_range(file_path: str, file_format: str, start: int, end: int,
+                      header: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    工作进程：解码AIS文件的一个字节区间，返回清洗后的列数据（columns，各块按顺序）。
+    NMEA分块开头的后续片段与结尾仍未完成的片段连同所在行号作为接缝(seams)原样返回，
+    positions为各条记录所在的行号（分块内从0开始），由主进程在接缝处按原始顺序重组
+    """
+    decoder = AISDecoder()
+    lines = _read_range_lines(file_path, start, end)
+    positions: List[int] = []
+    seams: List[Tuple[int, str]] = []
+
+    if file_format == 'csv':
+        columns = list(decoder.iter_csv_columns(lines, fieldnames=header))
+    else:
+        head = 0
+        while head < len(lines) and _is_continuation_fragment(lines[head]):
+            seams.append((head, lines[head].strip()))
+            head += 1
+        decoder.cleaning_stats.total_records += head
+
+        decoder.fragment_buffer = FragmentBuffer()
+        line_numbers: List[int] = []
+        records = list(decoder._iter_nmea_lines(lines[head:], line_numbers=line_numbers))
+        positions = [head + number - 1 for number in line_numbers]
+        # 在工作进程中转为列数据，主进程不再逐条转换
+        columns = [records_to_columns(AISData, records)]
+
+        # 未完成的片段按所在行排序（同一语句重复出现时缓冲区中保留的是最后一次）
+        line_index = {line.strip(): index for index, line in enumerate(lines)}
+        seams.extend(sorted((line_index[fragment], fragment)
+                            for fragments in decoder.fragment_buffer.drain() for fragment in fragments))
+        decoder._record_orphan_fragments(decoder.fragment_buffer.stats['evicted_orphans'])
+
+    return {
+        'columns': columns,
+        'positions': positions,
+        'lines': len(lines),
+        'stats': decoder.get_cleaning_stats(),
+        'seams': seams,
+        'vessel_static': decoder.vessel_static
+    }
+
+
+def _decode_adsb_range(file_path: str, file_format: str, start: int, end: int,
+                       header: Optional[List[str]]) -> Dict[str, Any]:
+    """工作进程：解码ADS-B文件的一个字节区间，返回清洗后的列数据（各块按顺序）"""
+    processor = ADSBProcessor()
+    lines = _read_range_lines(file_path, start, end)
+
+    if file_format == 'csv':
+        columns = list(processor.iter_csv_columns(lines, fieldnames=header))
+    else:
+        columns = list(processor.iter_jsonl_columns(lines))
+
+    return {
+        'columns': columns,
+        'stats': processor.get_cleaning_stats()
+    }
+
+
+def _slice_columns(columns: Dict[str, Any], start: int, stop: int) -> Dict[str, Any]:
+    """取列数据的 [start, stop) 行"""
+    return {name: values[start:stop] for name, values in columns.items()}
+
+
+class ParallelFileDecoder:
+    """
+    多进程并行文件解码器 - 将单个大文件切分为按行对齐的字节区间，由进程池并行解码为列数据。
+    结果与清洗统计按分块顺序合并：跨分块的多片段消息在其最后一个片段所在的位置插入，
+    静态信息按原始顺序逐字段补全，记录、顺序与清洗统计均与串行解码一致，与分块数无关。
+    同时在途的分块最多为进程数的IN_FLIGHT_PER_WORKER倍，主进程内存占用与文件大小无关
+    """
+
+    # 每个工作进程对应的在途分块数
+    IN_FLIGHT_PER_WORKER = 2
+
+    def __init__(self, max_workers: int = None, chunk_size: int = None):
+        self.max_workers = max_workers or Config.PARALLEL_DECODE_WORKERS
+        self.chunk_size = chunk_size or Config.PARALLEL_DECODE_CHUNK_SIZE
+        self.cleaning_stats = DataCleaningStats()
+        # 最近一次解码AIS文件得到的船舶静态信息
+        self.vessel_static: Dict[str, Dict[str, Any]] = {}
+
+    def iter_ais_columns(self, file_path: str, end_offset: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        并行解码AIS文件（end_offset限定只解码前end_offset字节），按分块顺序逐块产出清洗后的列数据
+        （字段名 -> 数组/列表，可直接追加到TrackStore）
+        """
+        decoder = AISDecoder()
+        self.vessel_static = decoder.vessel_static
+        file_format = decoder.detect_format(Path(file_path))
+        if file_format is None:
+            self.cleaning_stats = DataCleaningStats()
+            return
+
+        # 接缝缓冲区：跨分块的多片段消息在主进程中按原始顺序重组（这些行已在工作进程中计数）
+        decoder.fragment_buffer = FragmentBuffer()
+        reassembled = 0
+        # 本分块之前的总行数（接缝片段的年龄按其在整个文件中的行号计算）
+        offset = 0
+        for result in self._run(file_path, file_format, _decode_ais_range, end_offset):
+            if file_format == 'csv':
+                # CSV记录自带静态字段，没有跨分块的状态
+                yield from result['columns']
+                continue
+
+            columns, positions = result['columns'][0], result['positions']
+            index = 0
+            # 末尾的哨兵用于输出最后一个接缝片段之后的全部记录
+            for position, line in result['seams'] + [(None, None)]:
+                # 该片段之前的记录先输出：工作进程看不到之前分块（及接缝处）的静态报文，用此时已知的静态信息补全
+                stop = len(positions) if line is None else bisect_left(positions, position, index)
+                if stop > index:
+                    self._apply_vessel_static(decoder, columns, index, stop)
+                    yield _slice_columns(columns, index, stop)
+                    index = stop
+                if line is not None:
+                    # 重组得到的记录位于其最后一个片段所在的位置
+                    decoder.fragment_buffer.position = offset + position
+                    seam_records = list(decoder._iter_nmea_lines([line], count_totals=False))
+                    if seam_records:
+                        reassembled += len(seam_records)
+                        yield records_to_columns(AISData, seam_records)
+            for mmsi, static in result['vessel_static'].items():
+                decoder.vessel_static.setdefault(mmsi, {}).update(static)
+            offset += result['lines']
+
+        leftover = decoder.fragment_buffer.drain()
+        decoder._record_orphan_fragments(decoder.fragment_buffer.stats['evicted_orphans'] + len(leftover))
+        self.cleaning_stats.merge(decoder.get_cleaning_stats())
+        logger.info(f"分块接缝处重组得到 {reassembled} 条记录，剩余孤立消息 {len(leftover)} 条")
+
+    @staticmethod
+    def _apply_vessel_static(decoder: AISDecoder, columns: Dict[str, Any], start: int, stop: int):
+        """用此时已知的静态信息逐字段补全列数据中 [start, stop) 行的NMEA位置记录，与apply_vessel_static一致"""
+        known = decoder.vessel_static
+        if not known:
+            return
+        mmsis, base_times = columns['mmsi'], columns['base_date_time']
+        for row in range(start, stop):
+            static = known.get(mmsis[row])
+            if not static or base_times[row]:
+                continue
+            for field_name, default in decoder.STATIC_FIELD_DEFAULTS.items():
+                if field_name in static and columns[field_name][row] == default:
+                    columns[field_name][row] = static[field_name]
+
+    def iter_adsb_columns(self, file_path: str, end_offset: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """并行解码ADS-B文件（end_offset限定只解码前end_offset字节），按分块顺序逐块产出清洗后的列数据"""
+        file_format = ADSBProcessor().detect_format(Path(file_path))
+        if file_format is None:
+            self.cleaning_stats = DataCleaningStats()
+            return
+
+        for result in self._run(file_path, file_format, _decode_adsb_range, end_offset):
+            yield from result['columns']
+
+    def get_cleaning_stats(self) -> Dict[str, Any]:
+        """获取合并后的清洗统计"""
+        return self.cleaning_stats.to_dict()
+
+    def _run(self, file_path: str, file_format: str, worker,
+             end_offset: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """切分文件并提交进程池，按分块顺序产出结果并合并统计"""
+        self.cleaning_stats = DataCleaningStats()
+        file_path = str(file_path)
+
+        # CSV文件：表头单独读取，分块从第二行开始
+        header = None
+        start_offset = 0
+        if file_format == 'csv':
+            with open(file_path, 'rb') as f:
+                header_line = f.readline()
+            header = next(csv.reader([header_line.decode('utf-8').strip()]))
+            start_offset = len(header_line)
+
+        ranges = split_file_ranges(Path(file_path), self.chunk_size, start_offset, end_offset)
+        logger.info(f"并行解码 {Path(file_path).name}: {len(ranges)} 个分块, {self.max_workers} 个进程")
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            # 限制在途的分块数：已完成但尚未按顺序取走的结果不会随文件大小无限堆积
+            pending = deque()
+            remaining = iter(ranges)
+            limit = self.max_workers * self.IN_FLIGHT_PER_WORKER
+            for start, end in islice(remaining, limit):
+                pending.append(executor.submit(worker, file_path, file_format, start, end, header))
+            # 按提交顺序取结果，保证合并结果确定
+            index = 0
+            while pending:
+                result = pending.popleft().result()
+                for start, end in islice(remaining, 1):
+                    pending.append(executor.submit(worker, file_path, file_format, start, end, header))
+                index += 1
+                self.cleaning_stats.merge(result['stats'])
+                count = sum(len(next(iter(columns.values()), ())) for columns in result['columns'])
+                logger.info(f"分块 {index}/{len(ranges)} 解码完成，获得 {count} 条记录")
+                yield result
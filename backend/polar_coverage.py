@@ -0,0 +1,128 @@
+"""
+ADS-B接收机极坐标覆盖图。
+
+每个ADS-B数据文件对应一台接收机。按方位扇区与高度层统计接收到的最远距离与报文数，
+新追加的记录用update()合并（流式聚合，不重新扫描历史记录）。接收机位置由各记录的飞机位置减去
+距离、方位换算的偏移量后取平均估计，用于在地图上绘制每个扇区最远距离连成的覆盖轮廓。
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .track_store import TrackStore
+
+# 地球平均半径（海里）
+_EARTH_RADIUS_NM = 3440.065
+
+
+class PolarCoverage:
+    """
+    一台接收机的极坐标覆盖：max_range[高度层, 扇区]为最远距离（海里，没有报文时为0），
+    counts[高度层, 扇区]为报文数；高度层由altitude_bands（英尺，升序的下边界）划分
+    """
+
+    def __init__(self, sector_degrees: float, altitude_bands: Sequence[float]):
+        self.sector_degrees = sector_degrees
+        self.sectors = int(round(360 / sector_degrees))
+        self.altitude_bands = [float(band) for band in altitude_bands]
+        shape = (len(self.altitude_bands), self.sectors)
+        self.max_range = np.zeros(shape)
+        self.counts = np.zeros(shape, dtype=np.int64)
+        # 接收机位置估计的累加值（纬度和、经度和、记录数）
+        self._position_sum = np.zeros(3)
+        # 已从记录存储中读取的行数（update()从此处继续）
+        self.size = 0
+
+    def copy(self) -> 'PolarCoverage':
+        duplicate = PolarCoverage(self.sector_degrees, self.altitude_bands)
+        duplicate.max_range, duplicate.counts = self.max_range.copy(), self.counts.copy()
+        duplicate._position_sum, duplicate.size = self._position_sum.copy(), self.size
+        return duplicate
+
+    def update(self, store: TrackStore):
+        """合并记录存储中新追加的行（没有距离、方位的记录不计入）"""
+        if len(store) <= self.size:
+            return
+        start, self.size = self.size, len(store)
+        distance = store.raw_since('range_nm', start)
+        known = np.flatnonzero(distance >= 0)
+        if not len(known):
+            return
+        distance = distance[known]
+        bearing = store.raw_since('bearing_deg', start)[known]
+        altitude = store.raw_since('altitude_ft', start)[known]
+
+        sector = np.minimum((bearing / self.sector_degrees).astype(np.int64), self.sectors - 1)
+        band = np.maximum(np.searchsorted(self.altitude_bands, altitude, side='right') - 1, 0)
+        cells = band * self.sectors + sector
+        self.counts += np.bincount(cells, minlength=self.counts.size).reshape(self.counts.shape)
+
+        # 各 (高度层, 扇区) 的最远距离：按网格排序后分段取最大值
+        order = np.argsort(cells, kind='stable')
+        cells, distance_sorted = cells[order], distance[order]
+        heads = np.flatnonzero(np.concatenate([[True], cells[1:] != cells[:-1]]))
+        flat = self.max_range.reshape(-1)
+        flat[cells[heads]] = np.maximum(flat[cells[heads]], np.maximum.reduceat(distance_sorted, heads))
+
+        # 飞机位置减去距离、方位对应的偏移量即为接收机位置（近距离下的平面近似）
+        lat = store.raw_since('latitude', start)[known]
+        lon = store.raw_since('longitude', start)[known]
+        radians = np.radians(bearing)
+        receiver_lat = lat - distance * np.cos(radians) / 60.0
+        receiver_lon = lon - distance * np.sin(radians) / (60.0 * np.cos(np.radians(receiver_lat)))
+        self._position_sum += [receiver_lat.sum(), receiver_lon.sum(), len(known)]
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def receiver_position(self) -> Optional[List[float]]:
+        """估计的接收机位置 [经度, 纬度]"""
+        if not self._position_sum[2]:
+            return None
+        return [float(self._position_sum[1] / self._position_sum[2]), float(self._position_sum[0] / self._position_sum[2])]
+
+    def band_ranges(self, band: Optional[int] = None) -> np.ndarray:
+        """各扇区的最远距离：band为高度层下标，None时取所有高度层的最大值"""
+        return self.max_range.max(axis=0) if band is None else self.max_range[band]
+
+    def outline(self, band: Optional[int] = None) -> List[List[float]]:
+        """以接收机为中心、各扇区最远距离连成的闭合 [经度, 纬度] 环（没有数据时为空列表）"""
+        center = self.receiver_position
+        if center is None:
+            return []
+        ranges = np.repeat(self.band_ranges(band), 2)
+        edges = np.arange(self.sectors + 1) * self.sector_degrees
+        # 每个扇区取起止两个方位，环首尾闭合
+        bearings = np.radians(np.stack([edges[:-1], edges[1:]], axis=1).ravel())
+        lon, lat = destination(center[0], center[1], bearings, ranges)
+        ring = np.stack([lon, lat], axis=1).tolist()
+        ring.append(ring[0])
+        return ring
+
+    def to_dict(self) -> Dict[str, Any]:
+        bands = self.altitude_bands + [None]
+        return {
+            'receiver_position': self.receiver_position,
+            'sector_degrees': self.sector_degrees,
+            'total': self.total,
+            'max_range_nm': float(self.max_range.max()) if self.max_range.size else 0.0,
+            'altitude_bands': [{
+                'min_altitude_ft': bands[i],
+                'max_altitude_ft': bands[i + 1],
+                'max_range_nm': np.round(self.max_range[i], 2).tolist(),
+                'counts': self.counts[i].tolist()
+            } for i in range(len(self.altitude_bands))]
+        }
+
+
+def destination(lon: float, lat: float, bearings: np.ndarray, distances_nm: np.ndarray):
+    """从 (lon, lat) 沿方位（弧度）行进distances_nm海里后的经纬度（球面公式）"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    delta = distances_nm / _EARTH_RADIUS_NM
+    target_phi = np.arcsin(np.sin(phi) * np.cos(delta) + np.cos(phi) * np.sin(delta) * np.cos(bearings))
+    target_lam = lam + np.arctan2(np.sin(bearings) * np.sin(delta) * np.cos(phi),
+                                  np.cos(delta) - np.sin(phi) * np.sin(target_phi))
+    return (np.degrees(target_lam) + 540.0) % 360.0 - 180.0, np.degrees(target_phi)
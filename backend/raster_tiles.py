@@ -0,0 +1,206 @@
+"""
+密度热力图栅格瓦片（PNG）。
+
+按瓦片坐标 z/x/y 用空间网格索引取出瓦片范围（四周各多取BLUR_RADIUS个像素）内的点，投影为瓦片像素后
+用bincount统计每个像素的点数，经方框模糊与对数缩放后查颜色表得到RGBA图像，编码为PNG（zlib压缩，不依赖图像库）。
+瓦片按 (数据版本, z, x, y, 数据类型, 时间范围) 缓存：内存LRU之外写入磁盘目录（按数据版本分目录，
+文件数有上限），数据版本变化时删除旧版本的全部瓦片。
+"""
+import hashlib
+import logging
+import shutil
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .clusters import mercator_xy
+from .spatial_index import GridIndex
+from .time_index import NO_TIME_RANGE, TimeRange, filter_rows
+from .track_store import TrackStore
+from .vector_tiles import TILE_SIZE, TileCache, tile_bounds
+
+logger = logging.getLogger(__name__)
+
+# 方框模糊半径（像素），使稀疏的点在高缩放级别下仍可见
+BLUR_RADIUS = 1
+
+# 颜色表：归一化密度 -> RGBA（低密度透明的蓝色，高密度不透明的红色）
+_COLOR_STOPS = [
+    (0.0, (0, 60, 255, 0)),
+    (0.15, (0, 120, 255, 120)),
+    (0.4, (0, 220, 200, 180)),
+    (0.7, (255, 220, 0, 220)),
+    (1.0, (255, 40, 0, 255)),
+]
+
+
+def _build_colormap() -> np.ndarray:
+    positions = np.linspace(0.0, 1.0, 256)
+    stops = np.array([stop for stop, _ in _COLOR_STOPS])
+    colors = np.array([color for _, color in _COLOR_STOPS], dtype=np.float64)
+    return np.stack([np.interp(positions, stops, colors[:, channel]) for channel in range(4)],
+                    axis=1).round().astype(np.uint8)
+
+
+COLORMAP = _build_colormap()
+
+
+def encode_png(rgba: np.ndarray, level: int = 6) -> bytes:
+    """RGBA图像（高 x 宽 x 4，uint8）编码为PNG，每行使用无滤波"""
+    height, width = rgba.shape[:2]
+    rows = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    rows[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(rows.tobytes(), level)) + chunk(b'IEND', b''))
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def density_counts(sources: Sequence[Tuple[TrackStore, GridIndex]], z: int, x: int, y: int,
+                   time_range: TimeRange = NO_TIME_RANGE) -> np.ndarray:
+    """瓦片每个像素（含四周BLUR_RADIUS个像素的边）的点数，形状为 (TILE_SIZE + 2r) x (TILE_SIZE + 2r)，第0行为最北"""
+    size = TILE_SIZE + 2 * BLUR_RADIUS
+    west, south, east, north = tile_bounds(z, x, y)
+    # 边缘像素对应的经纬度范围（纬度按瓦片的平均像素高度放宽，多取的点在投影后裁掉）
+    lon_margin = (east - west) / TILE_SIZE * (BLUR_RADIUS + 1)
+    lat_margin = (north - south) / TILE_SIZE * (BLUR_RADIUS + 1) * 2
+    query = (max(west - lon_margin, -180.0), max(south - lat_margin, -90.0),
+             min(east + lon_margin, 180.0), min(north + lat_margin, 90.0))
+
+    counts = np.zeros(size * size, dtype=np.int64)
+    scale = TILE_SIZE << z
+    for store, index in sources:
+        rows = filter_rows(store.raw('timestamp'), index.query(*query), time_range)
+        if not len(rows):
+            continue
+        px, py = mercator_xy(store.raw('longitude')[rows], store.raw('latitude')[rows])
+        px = np.floor(px * scale - x * TILE_SIZE).astype(np.int64) + BLUR_RADIUS
+        py = np.floor(py * scale - y * TILE_SIZE).astype(np.int64) + BLUR_RADIUS
+        inside = (px >= 0) & (px < size) & (py >= 0) & (py < size)
+        counts += np.bincount(py[inside] * size + px[inside], minlength=size * size)
+    return counts.reshape(size, size)
+
+
+def render_density_tile(sources: Sequence[Tuple[TrackStore, GridIndex]], z: int, x: int, y: int,
+                        saturation: float, time_range: TimeRange = NO_TIME_RANGE) -> bytes:
+    """
+    生成密度瓦片PNG：像素点数做 (2r+1)^2 方框求和，按 log(1 + n) / log(1 + saturation) 归一化后查颜色表，
+    没有点的像素透明
+    """
+    counts = density_counts(sources, z, x, y, time_range)
+    if not counts.any():
+        return EMPTY_TILE
+
+    # 方框求和（边缘像素来自相邻瓦片的范围，拼接后连续）
+    blurred = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.int64)
+    span = 2 * BLUR_RADIUS + 1
+    for dy in range(span):
+        for dx in range(span):
+            blurred += counts[dy:dy + TILE_SIZE, dx:dx + TILE_SIZE]
+
+    level = np.log1p(blurred) / np.log1p(saturation)
+    shades = np.minimum(level * 255, 255).astype(np.uint8)
+    rgba = COLORMAP[shades]
+    rgba[blurred == 0] = 0
+    return encode_png(rgba)
+
+
+class RasterTileCache:
+    """
+    瓦片的两级缓存：内存LRU（最多memory_capacity个）与磁盘目录（每个数据版本一个子目录，
+    最多disk_capacity个文件，超出时删除最久未使用的）。键为 (z, x, y, 过滤条件)，过滤条件需可稳定转为字符串
+    """
+
+    def __init__(self, directory: Path, memory_capacity: int, disk_capacity: int):
+        self.directory = Path(directory)
+        self.memory = TileCache(memory_capacity)
+        self.disk_capacity = disk_capacity
+        self.version: Optional[str] = None
+        self._files: 'OrderedDict[Path, None]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+
+    def set_version(self, version: str):
+        """切换数据版本：清空内存缓存，删除其他版本的磁盘目录，载入本版本已有的瓦片文件列表"""
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self.memory.clear()
+            removed = 0
+            if self.directory.exists():
+                for path in self.directory.iterdir():
+                    if path.is_dir() and path.name != version:
+                        shutil.rmtree(path, ignore_errors=True)
+                        removed += 1
+            current = self.directory / version
+            files = sorted(current.glob('*.png'), key=lambda path: path.stat().st_mtime) if current.exists() else []
+            self._files = OrderedDict((path, None) for path in files)
+            if removed:
+                logger.info(f"数据版本已变化，删除 {removed} 个旧版本的密度瓦片目录")
+
+    def _path(self, key: Hashable) -> Path:
+        digest = hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+        return self.directory / str(self.version) / f"{digest}.png"
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        tile = self.memory.get(key)
+        if tile is not None or self.version is None:
+            return tile
+        path = self._path(key)
+        try:
+            tile = path.read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            # 磁盘命中的瓦片移到最近使用的一端
+            if path in self._files:
+                self._files.move_to_end(path)
+        self.memory.put(key, tile)
+        return tile
+
+    def put(self, key: Hashable, tile: bytes):
+        self.memory.put(key, tile)
+        if self.version is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_suffix('.tmp')
+            temp.write_bytes(tile)
+            temp.replace(path)
+        except OSError as e:
+            logger.warning(f"写入密度瓦片缓存失败: {str(e)}")
+            return
+        with self._lock:
+            self._files[path] = None
+            self._files.move_to_end(path)
+            while len(self._files) > self.disk_capacity:
+                oldest, _ = self._files.popitem(last=False)
+                oldest.unlink(missing_ok=True)
+
+    def clear(self):
+        """清空内存与磁盘缓存"""
+        with self._lock:
+            self.memory.clear()
+            self._files.clear()
+            self.version = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> Dict[str, int]:
+        stats = self.memory.stats()
+        stats.update({'disk_files': len(self._files), 'disk_capacity': self.disk_capacity,
+                      'disk_hits': self.disk_hits})
+        return stats
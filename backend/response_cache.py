@@ -0,0 +1,146 @@
+"""
+预编码响应缓存。
+
+每个数据版本只序列化一次JSON，同时生成gzip与brotli（已安装brotli模块时）压缩版本并保存在内存中；
+请求按Accept-Encoding选择响应体，以ETag/If-None-Match与Last-Modified/If-Modified-Since校验，
+客户端已有当前版本时返回304。
+"""
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只提供gzip压缩
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# 按优先级排列的内容编码
+ENCODINGS = ('br', 'gzip', 'identity')
+
+
+class EncodedPayload:
+    """一个数据版本的预编码响应体：原始JSON及各压缩版本"""
+
+    def __init__(self, version: Hashable, body: bytes, last_modified: Optional[datetime],
+                 gzip_level: int, brotli_quality: int):
+        self.version = version
+        self.variants: Dict[str, bytes] = {'identity': body}
+        self.variants['gzip'] = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=brotli_quality)
+
+        # 各编码的响应体不同，使用各自的强ETag
+        digest = hashlib.md5(body).hexdigest()
+        self.etags = {encoding: digest if encoding == 'identity' else f"{digest}-{encoding}"
+                      for encoding in self.variants}
+        # HTTP日期只精确到秒
+        self.last_modified = last_modified.replace(microsecond=0) if last_modified else None
+
+    def select(self, request: Request) -> str:
+        """按请求的Accept-Encoding选择编码"""
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding == 'identity' or request.accept_encodings[encoding]):
+                return encoding
+        return 'identity'
+
+    def is_fresh(self, request: Request) -> bool:
+        """客户端缓存是否仍为当前版本（有If-None-Match时忽略If-Modified-Since）"""
+        if request.if_none_match:
+            return any(request.if_none_match.contains(etag) for etag in self.etags.values())
+        if request.if_modified_since and self.last_modified:
+            return self.last_modified.astimezone() <= request.if_modified_since
+        return False
+
+
+class EncodedResponseCache:
+    """
+    按数据版本缓存预编码的响应体（只保留最新版本），并统计编码耗时与压缩、304节省的字节数。
+    build()返回要序列化的对象，encode()将其序列化为JSON字符串
+    """
+
+    def __init__(self, encode: Callable[[Any], str], gzip_level: int = 6, brotli_quality: int = 5):
+        self.encode = encode
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._payload: Optional[EncodedPayload] = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'encodes': 0,
+            'encode_seconds_total': 0.0,
+            'last_encode_seconds': 0.0,
+            'last_body_bytes': 0,
+            'requests': 0,
+            'not_modified': 0,
+            'bytes_uncompressed': 0,
+            'bytes_sent': 0,
+            'by_encoding': {encoding: 0 for encoding in ENCODINGS}
+        }
+
+    def get(self, version: Hashable, build: Callable[[], Any],
+            last_modified: Optional[datetime] = None) -> EncodedPayload:
+        """获取数据版本对应的预编码响应体，版本变化时重新编码"""
+        with self._lock:
+            payload = self._payload
+            if payload is None or payload.version != version:
+                start = time.perf_counter()
+                body = self.encode(build()).encode('utf-8')
+                payload = EncodedPayload(version, body, last_modified, self.gzip_level, self.brotli_quality)
+                elapsed = time.perf_counter() - start
+
+                self._payload = payload
+                self._metrics['encodes'] += 1
+                self._metrics['encode_seconds_total'] += elapsed
+                self._metrics['last_encode_seconds'] = elapsed
+                self._metrics['last_body_bytes'] = len(body)
+                sizes = ', '.join(f"{encoding}={len(data)}" for encoding, data in payload.variants.items())
+                logger.info(f"响应体已预编码 ({elapsed * 1000:.0f} ms): {sizes} 字节")
+            return payload
+
+    def respond(self, request: Request, payload: EncodedPayload) -> Response:
+        """按请求的编码与缓存校验头生成响应（200或304）"""
+        encoding = payload.select(request)
+        uncompressed = len(payload.variants['identity'])
+        metrics = self._metrics
+        metrics['requests'] += 1
+        metrics['bytes_uncompressed'] += uncompressed
+
+        if payload.is_fresh(request):
+            metrics['not_modified'] += 1
+            response = Response(status=304)
+        else:
+            body = payload.variants[encoding]
+            metrics['bytes_sent'] += len(body)
+            metrics['by_encoding'][encoding] += 1
+            response = Response(body, mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(payload.etags[encoding])
+        if payload.last_modified:
+            response.last_modified = payload.last_modified.astimezone()
+        # 客户端每次使用缓存前都须校验
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def invalidate(self):
+        """丢弃已编码的响应体"""
+        with self._lock:
+            self._payload = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """编码与传输统计"""
+        metrics = dict(self._metrics, by_encoding=dict(self._metrics['by_encoding']))
+        metrics['bytes_saved'] = metrics['bytes_uncompressed'] - metrics['bytes_sent']
+        metrics['brotli_available'] = brotli is not None
+        if self._payload is not None:
+            metrics['current_sizes'] = {encoding: len(data) for encoding, data in self._payload.variants.items()}
+        return metrics
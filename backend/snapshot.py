@@ -0,0 +1,154 @@
+"""
+列式存储的二进制快照格式。
+
+文件布局（整数均为小端）：
+    magic(8字节) | 格式版本 u32 | 头部长度 u32 | 头部CRC32 u32 | 保留 u32 | 头部JSON | 列数据块...
+头部JSON记录行数、调用方元数据、字典编码列的取值表，以及每个列数据块的 dtype、偏移、字节数和CRC32。
+列数据块按64字节对齐，加载时用mmap映射文件，各列直接以NumPy数组视图引用映射内存（零拷贝、只读）。
+加载默认不校验列数据块（校验须读遍整个文件），需要时由verify_snapshot()单独校验（如在后台线程中）。
+写入先落到临时文件再原子替换。Windows上不能替换或删除仍被映射的文件，
+因此目标文件可能已被映射时，调用方应将新版本写入新的文件名（见cache_segments模块）。
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from .track_store import TrackStore
+
+MAGIC = b'SDFSSNAP'
+SNAPSHOT_VERSION = 1
+
+# 固定前缀：magic、格式版本、头部长度、头部CRC32、保留
+_PREFIX = struct.Struct('<8sIIII')
+_ALIGNMENT = 64
+# 校验时每次计算CRC32的字节数
+_VERIFY_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+class SnapshotError(ValueError):
+    """快照文件格式错误、版本不符或校验失败"""
+
+
+def write_snapshot(path, store: TrackStore, meta: Dict[str, Any]):
+    """将存储与元数据原子写入快照文件"""
+    path = Path(path)
+    arrays = {}
+    for name in store.names:
+        values = store.raw(name)
+        arrays[name] = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+
+    # 先确定头部长度，再按对齐计算各数据块偏移（偏移位数不定，预留足够的头部空间）
+    columns = [{'name': name, 'dtype': values.dtype.str, 'offset': 0, 'nbytes': values.nbytes,
+                'crc32': zlib.crc32(values)} for name, values in arrays.items()]
+    header = {
+        'size': len(store),
+        'record_class': store.record_class.__name__,
+        'meta': meta,
+        'categories': {name: column.values for name, column in store.categories.items()},
+        'columns': columns
+    }
+    reserve = len(_encode_header(header)) + 24 * len(columns)
+    offset = _align(_PREFIX.size + reserve)
+    for column in columns:
+        column['offset'] = offset
+        offset = _align(offset + column['nbytes'])
+    header_bytes = _encode_header(header).ljust(reserve, b' ')
+
+    temp_file = path.with_suffix(path.suffix + '.tmp')
+    try:
+        with open(temp_file, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, SNAPSHOT_VERSION, len(header_bytes), zlib.crc32(header_bytes), 0))
+            f.write(header_bytes)
+            for column in columns:
+                f.seek(column['offset'])
+                f.write(memoryview(arrays[column['name']]).cast('B'))
+            f.flush()
+            os.fsync(f.fileno())
+        temp_file.replace(path)
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
+
+
+def read_snapshot(path, record_class, verify: bool = False) -> Tuple[TrackStore, Dict[str, Any]]:
+    """
+    以mmap加载快照，返回 (列数组为映射内存只读视图的存储, 元数据)。
+    只读取头部，列数据块在访问时才从磁盘读入；verify时另校验每个列数据块的CRC32（读遍整个文件）
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _PREFIX.size:
+            raise SnapshotError("快照文件不完整")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = _read_header(mapped, record_class)
+    size = header['size']
+    arrays = {}
+    for column in header['columns']:
+        dtype = np.dtype(column['dtype'])
+        if not size:
+            arrays[column['name']] = np.zeros(0, dtype=dtype)
+            continue
+        values = np.frombuffer(mapped, dtype=dtype, count=size, offset=column['offset'])
+        if verify and zlib.crc32(values) != column['crc32']:
+            raise SnapshotError(f"列 {column['name']} 校验失败")
+        arrays[column['name']] = values
+
+    return TrackStore.from_arrays(record_class, arrays, header['categories']), header['meta']
+
+
+def verify_snapshot(path, record_class):
+    """校验快照头部与每个列数据块的CRC32，失败时抛出SnapshotError；校验结束即释放映射，不影响文件的替换与删除"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _PREFIX.size:
+            raise SnapshotError("快照文件不完整")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        header = _read_header(mapped, record_class)
+        if not header['size']:
+            return
+        for column in header['columns']:
+            crc = 0
+            end = column['offset'] + column['nbytes']
+            for start in range(column['offset'], end, _VERIFY_CHUNK_SIZE):
+                crc = zlib.crc32(mapped[start:min(start + _VERIFY_CHUNK_SIZE, end)], crc)
+            if crc != column['crc32']:
+                raise SnapshotError(f"列 {column['name']} 校验失败")
+    finally:
+        mapped.close()
+
+
+def _read_header(mapped: mmap.mmap, record_class) -> Dict[str, Any]:
+    """读取并校验固定前缀与头部JSON，检查各列数据块都在文件范围内"""
+    magic, version, header_length, header_crc, _ = _PREFIX.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise SnapshotError("不是快照文件")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"快照格式版本不符: {version}")
+    header_bytes = mapped[_PREFIX.size:_PREFIX.size + header_length]
+    if len(header_bytes) != header_length or zlib.crc32(header_bytes) != header_crc:
+        raise SnapshotError("快照头部校验失败")
+    header = json.loads(header_bytes)
+    if header['record_class'] != record_class.__name__:
+        raise SnapshotError(f"快照记录类型不符: {header['record_class']}")
+
+    size = header['size']
+    for column in header['columns'] if size else []:
+        if column['nbytes'] != size * np.dtype(column['dtype']).itemsize or \
+                column['offset'] + column['nbytes'] > len(mapped):
+            raise SnapshotError(f"列 {column['name']} 数据块不完整")
+    return header
+
+
+def _encode_header(header: Dict[str, Any]) -> bytes:
+    return json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
@@ -0,0 +1,121 @@
+"""
+空间网格索引。
+
+在有效坐标的外包矩形上划分均匀网格（网格数随点数自适应），行号按网格编号排序后保存，
+每个网格的点在排序结果中连续。矩形查询只取覆盖网格的连续区间作为候选，再按坐标精确过滤；
+跨越180°经线的矩形（west > east）拆为两段查询。
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# 每个网格的目标点数
+_POINTS_PER_CELL = 16
+# 每个方向的最大网格数
+_MAX_CELLS_PER_AXIS = 1024
+
+
+class GridIndex:
+    """经纬度点的均匀网格索引，查询结果为行号数组（升序）"""
+
+    def __init__(self, longitude: np.ndarray, latitude: np.ndarray):
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        valid = ((self.longitude >= -180) & (self.longitude <= 180) &
+                 (self.latitude >= -90) & (self.latitude <= 90))
+        rows = np.flatnonzero(valid)
+        self.size = len(rows)
+
+        if not self.size:
+            self.bounds = None
+            self.ncols = self.nrows = 0
+            self.order = np.zeros(0, dtype=np.int64)
+            self.starts = np.zeros(1, dtype=np.int64)
+            return
+
+        lon, lat = self.longitude[rows], self.latitude[rows]
+        self.bounds = (float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max()))
+        self.ncols, self.nrows = _grid_shape(self.bounds, self.size)
+        self.cell_width = max(self.bounds[2] - self.bounds[0], 1e-9) / self.ncols
+        self.cell_height = max(self.bounds[3] - self.bounds[1], 1e-9) / self.nrows
+
+        cells = self._rows_of(lat) * self.ncols + self._cols_of(lon)
+        # 稳定排序：同一网格内保持原行号顺序
+        by_cell = np.argsort(cells, kind='stable')
+        self.order = rows[by_cell]
+        self.starts = np.zeros(self.ncols * self.nrows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.ncols * self.nrows), out=self.starts[1:])
+
+    def _cols_of(self, lon):
+        return np.clip(((lon - self.bounds[0]) / self.cell_width).astype(np.int64), 0, self.ncols - 1)
+
+    def _rows_of(self, lat):
+        return np.clip(((lat - self.bounds[1]) / self.cell_height).astype(np.int64), 0, self.nrows - 1)
+
+    def query(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """
+        查询矩形内的点（边界包含在内），返回升序行号数组。
+        west > east 表示跨越180°经线的矩形
+        """
+        if west > east:
+            parts = [self._query_box(west, south, 180.0, north), self._query_box(-180.0, south, east, north)]
+            return np.union1d(parts[0], parts[1])
+        return self._query_box(west, south, east, north)
+
+    def _query_box(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        if self.bounds is None or west > self.bounds[2] or east < self.bounds[0] or \
+                south > self.bounds[3] or north < self.bounds[1] or south > north:
+            return np.zeros(0, dtype=np.int64)
+
+        col_range = self._cols_of(np.array([west, east]))
+        row_range = self._rows_of(np.array([south, north]))
+        c0, c1 = int(col_range[0]), int(col_range[1])
+
+        # 每个网格行中覆盖的网格在排序结果中连续
+        slices = []
+        for row in range(int(row_range[0]), int(row_range[1]) + 1):
+            start, end = self.starts[row * self.ncols + c0], self.starts[row * self.ncols + c1 + 1]
+            if end > start:
+                slices.append(self.order[start:end])
+        if not slices:
+            return np.zeros(0, dtype=np.int64)
+
+        candidates = np.concatenate(slices) if len(slices) > 1 else slices[0]
+        lon, lat = self.longitude[candidates], self.latitude[candidates]
+        inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        return np.sort(candidates[inside])
+
+
+def _grid_shape(bounds: Tuple[float, float, float, float], size: int) -> Tuple[int, int]:
+    """按点数与外包矩形的长宽比确定网格列数与行数"""
+    width = max(bounds[2] - bounds[0], 1e-9)
+    height = max(bounds[3] - bounds[1], 1e-9)
+    cells = max(1, size // _POINTS_PER_CELL)
+    ncols = int(np.clip(round(np.sqrt(cells * width / height)), 1, _MAX_CELLS_PER_AXIS))
+    nrows = int(np.clip(round(cells / ncols), 1, _MAX_CELLS_PER_AXIS))
+    return ncols, nrows
+
+
+def parse_bbox(west, south, east, north) -> Optional[List[float]]:
+    """
+    规范化查询矩形：经度换算到[-180, 180]，纬度裁剪到[-90, 90]；
+    经度跨度不小于360°时取全部经度。参数无效时返回None
+    """
+    try:
+        west, south, east, north = (float(value) for value in (west, south, east, north))
+    except (TypeError, ValueError):
+        return None
+    if not all(np.isfinite([west, south, east, north])) or south > north:
+        return None
+
+    if east - west >= 360:
+        west, east = -180.0, 180.0
+    else:
+        west, east = _wrap_longitude(west), _wrap_longitude(east)
+    return [west, max(south, -90.0), east, min(north, 90.0)]
+
+
+def _wrap_longitude(lon: float) -> float:
+    if -180 <= lon <= 180:
+        return lon
+    return (lon + 180) % 360 - 180
@@ -0,0 +1,204 @@
+"""
+位置更新推送（Server-Sent Events）。
+
+每次处理得到新的处理结果后，由变更日志取出上次推送以来新增、更新与移除的目标，按各订阅者的过滤条件
+（矩形、数据类型、船舶类型）放入订阅者的队列。队列以目标为键合并：同一目标尚未发出的更新只保留最新一条，
+队列满时丢弃最早的目标，慢速客户端不会使服务端无限缓存。
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .change_log import ChangeLog
+from .pagination import DATA_KEYS
+from .trajectories import ENTITY_FIELDS
+
+# 队列中的事件：(数据类型, 目标标识) -> 最新记录（None表示目标已移除）
+EntityKey = Tuple[str, str]
+
+
+class StreamFilter:
+    """订阅者的过滤条件：bbox为 (west, south, east, north)（west > east 表示跨越180°经线），
+    vessel_types只作用于AIS记录"""
+
+    def __init__(self, types: Sequence[str], bbox: Optional[Sequence[float]] = None,
+                 vessel_types: Optional[Sequence[str]] = None):
+        self.types = set(types)
+        self.bbox = bbox
+        self.vessel_types = set(vessel_types) if vessel_types else None
+
+    def mask(self, kind: str, longitude: np.ndarray, latitude: np.ndarray,
+             vessel_type: Optional[np.ndarray] = None) -> np.ndarray:
+        """各记录是否满足过滤条件"""
+        if kind not in self.types:
+            return np.zeros(len(longitude), dtype=bool)
+        keep = np.ones(len(longitude), dtype=bool)
+        if self.bbox is not None:
+            west, south, east, north = self.bbox
+            keep &= (latitude >= south) & (latitude <= north)
+            keep &= ((longitude >= west) & (longitude <= east)) if west <= east else \
+                ((longitude >= west) | (longitude <= east))
+        if self.vessel_types is not None and vessel_type is not None:
+            keep &= np.isin(vessel_type, list(self.vessel_types))
+        return keep
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'types': sorted(self.types), 'bbox': self.bbox,
+                'vessel_types': sorted(self.vessel_types) if self.vessel_types else None}
+
+
+class Subscriber:
+    """一个推送连接：按目标合并的有界队列"""
+
+    def __init__(self, stream_filter: StreamFilter, max_queue: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.filter = stream_filter
+        self.max_queue = max_queue
+        self._queue: 'OrderedDict[EntityKey, Optional[Dict[str, Any]]]' = OrderedDict()
+        self._condition = threading.Condition()
+        # 需要客户端重新获取全部数据（推送的变更不连续）
+        self._resync = False
+        self.closed = False
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, key: EntityKey, record: Optional[Dict[str, Any]]):
+        """放入一个目标的最新记录：队列中已有该目标时替换（合并），队列满时丢弃最早的目标"""
+        with self._condition:
+            if key in self._queue:
+                self.coalesced += 1
+                self._queue[key] = record
+                self._queue.move_to_end(key)
+            else:
+                self._queue[key] = record
+                while len(self._queue) > self.max_queue:
+                    self._queue.popitem(last=False)
+                    self.dropped += 1
+            self._condition.notify()
+
+    def request_resync(self):
+        with self._condition:
+            self._queue.clear()
+            self._resync = True
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+
+    def drain(self, timeout: float) -> Tuple[bool, List[Tuple[EntityKey, Optional[Dict[str, Any]]]]]:
+        """等待至多timeout秒，取出队列中的全部事件，返回 (是否需要重新获取全部数据, 事件列表)"""
+        with self._condition:
+            if not (self._queue or self._resync or self.closed):
+                self._condition.wait(timeout)
+            resync, self._resync = self._resync, False
+            events = list(self._queue.items())
+            self._queue.clear()
+            self.delivered += len(events)
+            return resync, events
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'id': self.id, 'filter': self.filter.to_dict(), 'queue_depth': self.depth,
+                'delivered': self.delivered, 'coalesced': self.coalesced, 'dropped': self.dropped}
+
+
+class StreamHub:
+    """推送订阅者集合：publish_changes()把变更日志中上次推送以来的变更分发给各订阅者"""
+
+    def __init__(self, max_subscribers: int, max_queue: int):
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Subscriber] = {}
+        self._lock = threading.Lock()
+        # 已推送到的数据版本与所属的服务进程纪元
+        self.version = 0
+        self.epoch: Optional[str] = None
+        self.published = 0
+        # 已断开的订阅者累计的计数
+        self._closed_totals = {'delivered': 0, 'coalesced': 0, 'dropped': 0}
+
+    def subscribe(self, stream_filter: StreamFilter) -> Optional[Subscriber]:
+        """登记订阅者，订阅者数已达上限时返回None"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(stream_filter, self.max_queue)
+            self._subscribers[subscriber.id] = subscriber
+            return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.close()
+        with self._lock:
+            if self._subscribers.pop(subscriber.id, None) is not None:
+                for name in self._closed_totals:
+                    self._closed_totals[name] += getattr(subscriber, name)
+
+    def subscribers(self) -> List[Subscriber]:
+        with self._lock:
+            return list(self._subscribers.values())
+
+    def publish_changes(self, change_log: ChangeLog) -> int:
+        """
+        推送上次推送以来的变更，返回分发的目标数；变更已不在日志中时通知订阅者重新获取全部数据。
+        变更、其截止版本与行号所指的记录存储一并从变更日志取得，推送的行与版本一致
+        """
+        with self._lock:
+            since = self.version if self.epoch == change_log.epoch else 0
+            subscribers = list(self._subscribers.values())
+        version, changes, stores = change_log.versioned_changes(since, list(DATA_KEYS))
+        with self._lock:
+            self.version, self.epoch = version, change_log.epoch
+        if since == version:
+            return 0
+
+        if changes is None:
+            for subscriber in subscribers:
+                subscriber.request_resync()
+            return 0
+
+        published = 0
+        for kind, change in changes.items():
+            rows = np.concatenate([change['inserted'], change['updated']]).astype(np.int64)
+            published += len(rows) + len(change['evicted'])
+            if not subscribers:
+                continue
+            if len(rows):
+                store = stores[kind]
+                ids = store.column(ENTITY_FIELDS[kind])[rows]
+                longitude, latitude = store.raw('longitude')[rows], store.raw('latitude')[rows]
+                vessel_type = store.column('vessel_type')[rows] if 'vessel_type' in store.kinds else None
+                masks = [subscriber.filter.mask(kind, longitude, latitude, vessel_type) for subscriber in subscribers]
+                # 只转换至少一个订阅者需要的记录
+                wanted = np.flatnonzero(np.logical_or.reduce(masks))
+                records = dict(zip(wanted.tolist(), store.to_dicts(rows[wanted])))
+                for subscriber, mask in zip(subscribers, masks):
+                    for i in np.flatnonzero(mask).tolist():
+                        subscriber.offer((kind, str(ids[i])), records[i])
+            # 移除的目标位置未知，只按数据类型过滤
+            for subscriber in subscribers:
+                if kind in subscriber.filter.types:
+                    for entity in change['evicted'].tolist():
+                        subscriber.offer((kind, entity), None)
+
+        with self._lock:
+            self.published += published
+        return published
+
+    def stats(self) -> Dict[str, Any]:
+        subscribers = self.subscribers()
+        depths = [subscriber.depth for subscriber in subscribers]
+        totals = {name: value + sum(getattr(subscriber, name) for subscriber in subscribers)
+                  for name, value in self._closed_totals.items()}
+        return dict(totals, subscribers=len(subscribers), max_subscribers=self.max_subscribers,
+                    queue_capacity=self.max_queue, queue_depth=sum(depths), max_queue_depth=max(depths, default=0),
+                    published=self.published, version=self.version,
+                    connections=[subscriber.stats() for subscriber in subscribers])
@@ -0,0 +1,111 @@
+"""
+时间索引。
+
+记录的时间戳列（epoch微秒，int64）按时间排序后保存排序后的行号与时间戳，时间范围查询用二分查找
+取得排序结果中的连续区间，不扫描全部记录。查询参数start/end支持ISO 8601时间、epoch秒与
+相对当前时间的时长（如 -15m、-2h）。
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+import numpy as np
+
+# 时间范围：(起始, 结束)，epoch微秒，None表示不限
+TimeRange = Tuple[Optional[int], Optional[int]]
+NO_TIME_RANGE: TimeRange = (None, None)
+
+_RELATIVE = re.compile(r'^-(\d+(?:\.\d+)?)([smhd])$')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class TimeRangeError(ValueError):
+    """时间范围参数无效"""
+
+
+class TimeIndex:
+    """时间戳列的排序索引，查询结果为按时间升序的行号数组"""
+
+    def __init__(self, timestamps: np.ndarray):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.size = len(self.timestamps)
+        # 稳定排序：相同时间戳保持原行号顺序
+        self.order = np.argsort(self.timestamps, kind='stable')
+        self.sorted = self.timestamps[self.order]
+
+    @property
+    def bounds(self) -> Optional[Tuple[int, int]]:
+        """最早与最晚的时间戳"""
+        if not self.size:
+            return None
+        return int(self.sorted[0]), int(self.sorted[-1])
+
+    def _span(self, time_range: TimeRange) -> Tuple[int, int]:
+        start, end = time_range
+        lo = 0 if start is None else int(np.searchsorted(self.sorted, start, side='left'))
+        hi = self.size if end is None else int(np.searchsorted(self.sorted, end, side='right'))
+        return lo, max(lo, hi)
+
+    def query(self, time_range: TimeRange) -> np.ndarray:
+        """时间范围内（两端包含在内）的行号，按时间升序"""
+        lo, hi = self._span(time_range)
+        return self.order[lo:hi]
+
+    def count(self, time_range: TimeRange) -> int:
+        lo, hi = self._span(time_range)
+        return hi - lo
+
+
+def filter_rows(timestamps: np.ndarray, rows: np.ndarray, time_range: TimeRange) -> np.ndarray:
+    """从已选出的行号中保留时间范围内的行（保持原顺序），用于与空间查询结果求交"""
+    start, end = time_range
+    if start is None and end is None:
+        return rows
+    times = timestamps[rows]
+    keep = np.ones(len(rows), dtype=bool)
+    if start is not None:
+        keep &= times >= start
+    if end is not None:
+        keep &= times <= end
+    return rows[keep]
+
+
+def parse_time(value: Optional[str], now: Optional[datetime] = None) -> Optional[int]:
+    """
+    解析时间参数为epoch微秒（与记录时间戳相同的本地时间），空值返回None。
+    带时区的ISO时间换算为本地时间；纯数字视为epoch秒；-15m、-2h等为相对当前时间的时长
+    """
+    if value is None or not str(value).strip():
+        return None
+    value = str(value).strip()
+
+    relative = _RELATIVE.match(value)
+    if relative:
+        seconds = float(relative.group(1)) * _UNIT_SECONDS[relative.group(2)]
+        moment = (now or datetime.now()) - timedelta(seconds=seconds)
+    else:
+        try:
+            moment = datetime.fromtimestamp(float(value))
+        except (ValueError, OverflowError, OSError):
+            try:
+                moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                raise TimeRangeError(f"无效的时间: {value}") from None
+        if moment.tzinfo is not None:
+            moment = moment.astimezone().replace(tzinfo=None)
+    return int(np.datetime64(moment, 'us').astype(np.int64))
+
+
+def parse_time_range(start: Optional[str], end: Optional[str]) -> TimeRange:
+    """解析start/end参数，起始晚于结束时抛出TimeRangeError"""
+    now = datetime.now()
+    time_range = parse_time(start, now), parse_time(end, now)
+    if None not in time_range and time_range[0] > time_range[1]:
+        raise TimeRangeError(f"起始时间晚于结束时间: {start} > {end}")
+    return time_range
+
+
+def format_time_range(time_range: TimeRange) -> Tuple[Optional[str], Optional[str]]:
+    """时间范围转为ISO字符串（用于响应中回显）"""
+    return tuple(None if value is None else np.datetime64(value, 'us').astype(datetime).isoformat()
+                 for value in time_range)
@@ -0,0 +1,314 @@
+"""
+列式记录存储。
+
+按数据类（AISData/ADSData）的字段定义以列存放记录：float字段为float64数组，int字段为int64数组，
+datetime字段为int64 epoch微秒，str等其余字段做字典编码（int32编码 + 取值表）。
+解码器清洗后的列数据可直接整块追加；需要逐条对象的代码通过行视图按需构造数据类实例。
+"""
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, get_type_hints
+
+import numpy as np
+
+from .csv_loader import unique_codes
+
+# 列类型
+FLOAT = 'float'
+INT = 'int'
+TIME = 'time'
+CATEGORY = 'category'
+
+_KIND_BY_TYPE = {float: FLOAT, int: INT, datetime: TIME}
+
+
+class CategoryColumn:
+    """字典编码列：各行存放取值表中的编码，取值表在整个存储中只增不减"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.index: Dict[Any, int] = {}
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        """将一列取值编码为int32编码数组，新取值追加到取值表"""
+        codes, uniques = unique_codes(values)
+        mapping = np.fromiter((self._intern(value) for value in uniques), dtype=np.int32, count=len(uniques))
+        return mapping[codes] if len(codes) else np.zeros(0, dtype=np.int32)
+
+    def _intern(self, value: Any) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    @classmethod
+    def from_values(cls, values: Sequence[Any]) -> 'CategoryColumn':
+        column = cls()
+        column.values = list(values)
+        column.index = {value: code for code, value in enumerate(column.values)}
+        return column
+
+    def copy(self) -> 'CategoryColumn':
+        column = CategoryColumn()
+        column.values = list(self.values)
+        column.index = dict(self.index)
+        return column
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """编码数组还原为取值（object数组）"""
+        table = np.empty(len(self.values), dtype=object)
+        table[:] = self.values
+        return table[codes]
+
+
+class TrackStore:
+    """
+    列式记录存储（struct-of-arrays）。
+    追加的数据按块保存，读取列时再合并为连续数组；取值表按列共享，take()得到的子集与原存储共用取值表
+    """
+
+    def __init__(self, record_class):
+        self.record_class = record_class
+        self.names: List[str] = [f.name for f in fields(record_class)]
+        hints = get_type_hints(record_class)
+        self.kinds: Dict[str, str] = {name: _KIND_BY_TYPE.get(hints.get(name), CATEGORY) for name in self.names}
+        self.defaults: Dict[str, Any] = {f.name: f.default for f in fields(record_class)}
+        self.categories: Dict[str, CategoryColumn] = {
+            name: CategoryColumn() for name, kind in self.kinds.items() if kind == CATEGORY
+        }
+        self._chunks: Dict[str, List[np.ndarray]] = {name: [] for name in self.names}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """列数组占用的字节数（不含取值表）"""
+        return sum(chunk.nbytes for chunks in self._chunks.values() for chunk in chunks)
+
+    # ---- 追加 ----
+
+    def append_columns(self, columns: Dict[str, Any], size: Optional[int] = None):
+        """
+        追加一块列数据（字段名 -> 数组/序列，即解码器iter_*_columns()的产出）。
+        缺失的列使用字段默认值；datetime64列中的NaT记为当前时间
+        """
+        if size is None:
+            size = len(columns[self.names[0]])
+        if size == 0:
+            return
+
+        for name in self.names:
+            values = columns.get(name)
+            if values is None:
+                values = [self.defaults[name]] * size
+            self._chunks[name].append(self._to_array(name, values))
+        self._size += size
+
+    def append_records(self, records: Sequence[Any]):
+        """追加一批数据类对象"""
+        self.append_columns(records_to_columns(self.record_class, records), len(records))
+
+    def append_dicts(self, dicts: Sequence[Dict[str, Any]]):
+        """追加一批to_dict()格式的字典（时间戳为ISO字符串，如读取缓存时）"""
+        columns = {}
+        for name in self.names:
+            default = self.defaults[name]
+            values = [d.get(name, default) for d in dicts]
+            if self.kinds[name] == TIME:
+                values = [datetime.fromisoformat(value) if isinstance(value, str) else value for value in values]
+            columns[name] = values
+        self.append_columns(columns, len(dicts))
+
+    def extend(self, other: 'TrackStore'):
+        """追加另一个同类型存储的全部记录（字典编码列只按取值表重映射编码，不逐行解码）"""
+        if not len(other):
+            return
+        for name in self.names:
+            values = other._consolidate(name)
+            if self.kinds[name] == CATEGORY:
+                source = other.categories[name]
+                if source is not self.categories[name]:
+                    target = self.categories[name]
+                    mapping = np.fromiter((target._intern(value) for value in source.values),
+                                          dtype=np.int32, count=len(source.values))
+                    # 取值表编码一致时（如向空存储追加）直接共用编码数组
+                    if not np.array_equal(mapping, np.arange(len(mapping), dtype=np.int32)):
+                        values = mapping[values]
+            self._chunks[name].append(values)
+        self._size += len(other)
+
+    @classmethod
+    def concat(cls, record_class, stores: Iterable['TrackStore']) -> 'TrackStore':
+        """按顺序合并多个存储为一个新存储"""
+        merged = cls(record_class)
+        for store in stores:
+            merged.extend(store)
+        return merged
+
+    @classmethod
+    def from_records(cls, record_class, records: Iterable[Any]) -> 'TrackStore':
+        store = cls(record_class)
+        store.append_records(list(records))
+        return store
+
+    @classmethod
+    def from_arrays(cls, record_class, arrays: Dict[str, np.ndarray],
+                    categories: Dict[str, Sequence[Any]]) -> 'TrackStore':
+        """由各列的内部表示数组与字典编码列的取值表构造存储，数组直接引用不复制（如快照的映射内存视图）"""
+        store = cls(record_class)
+        for name in store.names:
+            store._chunks[name].append(arrays[name])
+            if store.kinds[name] == CATEGORY:
+                store.categories[name] = CategoryColumn.from_values(categories[name])
+        store._size = len(arrays[store.names[0]]) if store.names else 0
+        return store
+
+    @classmethod
+    def from_dicts(cls, record_class, dicts: Sequence[Dict[str, Any]]) -> 'TrackStore':
+        store = cls(record_class)
+        store.append_dicts(dicts)
+        return store
+
+    def _to_array(self, name: str, values: Any) -> np.ndarray:
+        kind = self.kinds[name]
+        if kind == FLOAT:
+            return np.asarray(values, dtype=np.float64)
+        if kind == INT:
+            return np.asarray(values, dtype=np.int64)
+        if kind == TIME:
+            return _epoch_microseconds(values)
+        if isinstance(values, np.ndarray) and values.dtype != object:
+            values = values.tolist()
+        return self.categories[name].encode(values)
+
+    # ---- 读取 ----
+
+    def _consolidate(self, name: str) -> np.ndarray:
+        chunks = self._chunks[name]
+        if len(chunks) != 1:
+            dtype = {FLOAT: np.float64, INT: np.int64, TIME: np.int64}.get(self.kinds[name], np.int32)
+            merged = np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+            self._chunks[name] = [merged]
+        return self._chunks[name][0]
+
+    def raw(self, name: str) -> np.ndarray:
+        """列的内部表示：数值列为数值数组，时间列为epoch微秒，字典编码列为编码数组"""
+        return self._consolidate(name)
+
+    def raw_since(self, name: str, start: int) -> np.ndarray:
+        """列的内部表示中第start行及以后的部分，只拼接涉及的块（用于处理新追加的记录，不合并整列）"""
+        parts = []
+        end = self._size
+        for chunk in reversed(self._chunks[name]):
+            if end <= start:
+                break
+            parts.append(chunk[max(start - (end - len(chunk)), 0):])
+            end -= len(chunk)
+        if len(parts) == 1:
+            return parts[0]
+        dtype = {FLOAT: np.float64, INT: np.int64, TIME: np.int64}.get(self.kinds[name], np.int32)
+        return np.concatenate(parts[::-1]) if parts else np.zeros(0, dtype=dtype)
+
+    def column(self, name: str) -> np.ndarray:
+        """列的取值：时间列为datetime64[us]，字典编码列解码为object数组"""
+        values = self._consolidate(name)
+        kind = self.kinds[name]
+        if kind == TIME:
+            return values.view('datetime64[us]')
+        if kind == CATEGORY:
+            return self.categories[name].decode(values)
+        return values
+
+    def copy(self) -> 'TrackStore':
+        """
+        浅拷贝：列数组与原存储共用（数组追加后不会被修改），块列表与取值表各自独立，
+        向拷贝追加数据不影响原存储
+        """
+        duplicate = TrackStore.__new__(TrackStore)
+        duplicate.record_class = self.record_class
+        duplicate.names = self.names
+        duplicate.kinds = self.kinds
+        duplicate.defaults = self.defaults
+        duplicate.categories = {name: column.copy() for name, column in self.categories.items()}
+        duplicate._chunks = {name: list(chunks) for name, chunks in self._chunks.items()}
+        duplicate._size = self._size
+        return duplicate
+
+    def take(self, rows) -> 'TrackStore':
+        """按行号数组或布尔掩码取子集，返回新存储（共用取值表）"""
+        subset = TrackStore.__new__(TrackStore)
+        subset.record_class = self.record_class
+        subset.names = self.names
+        subset.kinds = self.kinds
+        subset.defaults = self.defaults
+        subset.categories = self.categories
+        subset._chunks = {name: [self._consolidate(name)[rows]] for name in self.names}
+        subset._size = len(subset._chunks[self.names[0]][0])
+        return subset
+
+    def _python_columns(self, rows=None, iso_times: bool = False) -> List[List[Any]]:
+        """各列转为Python对象列表（时间列为datetime，iso_times时为ISO字符串），rows为None时取全部行"""
+        result = []
+        for name in self.names:
+            values = self._consolidate(name)
+            if rows is not None:
+                values = values[rows]
+            kind = self.kinds[name]
+            if kind == TIME and iso_times:
+                result.append(_isoformat_column(values))
+            elif kind == TIME:
+                result.append(values.view('datetime64[us]').astype(object).tolist())
+            elif kind == CATEGORY:
+                result.append(self.categories[name].decode(values).tolist())
+            else:
+                result.append(values.tolist())
+        return result
+
+    # ---- 行视图 ----
+
+    def row(self, i: int) -> Any:
+        """第i行构造为数据类对象"""
+        if not -self._size <= i < self._size:
+            raise IndexError(f"行号超出范围: {i}")
+        return self.record_class(*(values[0] for values in self._python_columns([i])))
+
+    def iter_records(self, rows=None) -> Iterator[Any]:
+        """按需逐条构造数据类对象"""
+        for values in zip(*self._python_columns(rows)):
+            yield self.record_class(*values)
+
+    def to_dicts(self, rows=None) -> List[Dict[str, Any]]:
+        """转为与记录to_dict()一致的字典列表（时间戳为ISO字符串），用于API与缓存序列化"""
+        names = self.names
+        return [dict(zip(names, values)) for values in zip(*self._python_columns(rows, iso_times=True))]
+
+
+def records_to_columns(record_class, records: Sequence[Any]) -> Dict[str, List[Any]]:
+    """数据类对象列表转为列数据（字段名 -> 取值列表）"""
+    return {f.name: [getattr(record, f.name) for record in records] for f in fields(record_class)}
+
+
+def _epoch_microseconds(values: Any) -> np.ndarray:
+    """datetime序列或datetime64数组转为epoch微秒（NaT/None记为当前时间）"""
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'M':
+        timestamps = values.astype('datetime64[us]')
+    else:
+        timestamps = np.array(values, dtype='datetime64[us]')
+    missing = np.isnat(timestamps)
+    if missing.any():
+        timestamps = timestamps.copy()
+        timestamps[missing] = np.datetime64(datetime.now(), 'us')
+    return timestamps.view(np.int64)
+
+
+def _isoformat_column(epoch_us: np.ndarray) -> List[str]:
+    """epoch微秒列整列格式化为与datetime.isoformat()一致的字符串（微秒为0时省略小数部分）"""
+    timestamps = epoch_us.view('datetime64[us]')
+    whole = np.datetime_as_string(timestamps, unit='s')
+    if not (epoch_us % 1000000).any():
+        return whole.tolist()
+    fraction = np.datetime_as_string(timestamps, unit='us')
+    return np.where(epoch_us % 1000000 == 0, whole, fraction).tolist()
@@ -0,0 +1,190 @@
+"""
+航迹构建与简化。
+
+按目标（AIS的MMSI、ADS-B的aircraft_id）分组、按时间排序，相邻两点间隔超过阈值时断开为不同航迹，
+只有一个点的航迹不保留。每条航迹在若干缩放级别上用Douglas-Peucker算法简化（Web墨卡托坐标，
+容差为该缩放级别下的像素数），所有航迹同时按区间批量计算，不逐条递归；较粗的层级在较细层级的结果上继续简化。
+查询时按请求的缩放级别选择细节层级：选不小于请求级别的最粗层级，超过最细层级时返回全部点。
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .clusters import mercator_xy
+from .time_index import NO_TIME_RANGE, TimeRange
+from .track_store import TrackStore
+
+# 数据类型 -> 目标标识字段
+ENTITY_FIELDS = {'ais': 'mmsi', 'adsb': 'aircraft_id'}
+# 瓦片边长（像素）
+_TILE_SIZE = 256
+
+
+def simplify(x: np.ndarray, y: np.ndarray, offsets: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker简化：offsets划分的每条折线保留首尾点，区间内离首尾连线最远的点距离超过tolerance时
+    保留该点并拆分区间。每轮同时处理所有待拆分的区间，返回各点是否保留的布尔数组
+    """
+    keep = np.zeros(len(x), dtype=bool)
+    if len(offsets) < 2:
+        return keep
+    keep[offsets[:-1]] = True
+    keep[offsets[1:] - 1] = True
+
+    start, end = offsets[:-1], offsets[1:] - 1
+    pending = end - start > 1
+    start, end = start[pending], end[pending]
+    tolerance2 = tolerance * tolerance
+
+    while len(start):
+        # 展开所有区间的内部点
+        lengths = end - start - 1
+        first = np.cumsum(lengths) - lengths
+        interval = np.repeat(np.arange(len(start)), lengths)
+        points = start[interval] + 1 + (np.arange(int(lengths.sum())) - first[interval])
+
+        # 点到首尾连线段的距离平方
+        ax, ay = x[start][interval], y[start][interval]
+        dx, dy = x[end][interval] - ax, y[end][interval] - ay
+        px, py = x[points] - ax, y[points] - ay
+        length2 = dx * dx + dy * dy
+        t = np.clip((px * dx + py * dy) / np.where(length2 > 0, length2, 1.0), 0.0, 1.0)
+        distance2 = (px - t * dx) ** 2 + (py - t * dy) ** 2
+
+        # 每个区间的最远点（距离相同时取第一个）
+        farthest = np.maximum.reduceat(distance2, first)
+        hits = np.flatnonzero(distance2 == farthest[interval])
+        split_at = points[hits[np.unique(interval[hits], return_index=True)[1]]]
+
+        split = farthest > tolerance2
+        split_at = split_at[split]
+        keep[split_at] = True
+        start = np.concatenate([start[split], split_at])
+        end = np.concatenate([split_at, end[split]])
+        pending = end - start > 1
+        start, end = start[pending], end[pending]
+
+    return keep
+
+
+class TrackSet:
+    """
+    一种数据类型的全部航迹：rows为按 (目标, 时间) 排序的行号，offsets划分各条航迹，
+    levels为各缩放级别简化后保留的点（对应rows的布尔数组）
+    """
+
+    def __init__(self, store: TrackStore, entity_field: str, max_gap_seconds: float,
+                 lod_zooms: Sequence[int], tolerance_pixels: float):
+        self.size = len(store)
+        self.longitude = store.raw('longitude')
+        self.latitude = store.raw('latitude')
+        self.timestamps = store.raw('timestamp')
+        entity_codes = store.raw(entity_field)
+
+        valid = np.flatnonzero((self.longitude >= -180) & (self.longitude <= 180) &
+                               (self.latitude >= -90) & (self.latitude <= 90))
+        order = valid[np.lexsort((self.timestamps[valid], entity_codes[valid]))]
+        entities, times = entity_codes[order], self.timestamps[order]
+
+        # 目标变化或时间间隔过大处断开
+        breaks = (entities[1:] != entities[:-1]) | (np.diff(times) > int(max_gap_seconds * 1000000))
+        starts = np.concatenate([[0], np.flatnonzero(breaks) + 1]).astype(np.int64)
+        lengths = np.diff(np.concatenate([starts, [len(order)]]))
+        multi = lengths >= 2
+
+        self.rows = order[np.repeat(multi, lengths)]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths[multi])]).astype(np.int64)
+        self.ids = store.categories[entity_field].decode(entities[starts[multi]])
+        self.count = len(self.ids)
+
+        # 从最细层级开始，每一层在上一层保留的点上继续简化
+        x, y = mercator_xy(self.longitude[self.rows], self.latitude[self.rows])
+        self.levels: Dict[int, np.ndarray] = {}
+        points, offsets = np.arange(len(self.rows)), self.offsets
+        for zoom in sorted(lod_zooms, reverse=True):
+            keep = simplify(x[points], y[points], offsets, tolerance_pixels / (_TILE_SIZE << zoom))
+            level = np.zeros(len(self.rows), dtype=bool)
+            level[points[keep]] = True
+            self.levels[zoom] = level
+            counts = np.add.reduceat(keep, offsets[:-1]) if len(offsets) > 1 else np.zeros(0, dtype=np.int64)
+            points, offsets = points[keep], np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.levels = dict(sorted(self.levels.items()))
+
+        if self.count:
+            lon, lat = self.longitude[self.rows], self.latitude[self.rows]
+            heads = self.offsets[:-1]
+            self.bounds = np.stack([np.minimum.reduceat(lon, heads), np.minimum.reduceat(lat, heads),
+                                    np.maximum.reduceat(lon, heads), np.maximum.reduceat(lat, heads)], axis=1)
+            self.start_times = self.timestamps[self.rows[heads]]
+            self.end_times = self.timestamps[self.rows[self.offsets[1:] - 1]]
+        else:
+            self.bounds = np.zeros((0, 4))
+            self.start_times = self.end_times = np.zeros(0, dtype=np.int64)
+
+    def level_for(self, zoom: int) -> Optional[int]:
+        """缩放级别对应的细节层级（简化容差所用的缩放级别），None表示全部点"""
+        for level in self.levels:
+            if level >= zoom:
+                return level
+        return None
+
+    def select(self, bbox: Optional[Sequence[float]] = None, time_range: TimeRange = NO_TIME_RANGE,
+               entity: Optional[str] = None) -> np.ndarray:
+        """外包矩形与bbox相交、时间与time_range重叠的航迹编号（entity指定时只取该目标）"""
+        selected = np.ones(self.count, dtype=bool)
+        if bbox is not None:
+            west, south, east, north = bbox
+            bounds = self.bounds
+            selected &= (bounds[:, 1] <= north) & (bounds[:, 3] >= south)
+            if west <= east:
+                selected &= (bounds[:, 0] <= east) & (bounds[:, 2] >= west)
+            else:
+                selected &= (bounds[:, 2] >= west) | (bounds[:, 0] <= east)
+        start, end = time_range
+        if start is not None:
+            selected &= self.end_times >= start
+        if end is not None:
+            selected &= self.start_times <= end
+        if entity is not None:
+            selected &= self.ids.astype(str) == str(entity)
+        return np.flatnonzero(selected)
+
+    def to_dicts(self, kind: str, tracks: np.ndarray, level: Optional[int],
+                 time_range: TimeRange = NO_TIME_RANGE) -> List[Dict[str, Any]]:
+        """航迹转为字典列表：coordinates为 [经度, 纬度] 折线（细节层级level，裁剪到时间范围内）"""
+        if not len(tracks):
+            return []
+        heads, tails = self.offsets[tracks], self.offsets[tracks + 1]
+        lengths = tails - heads
+        positions = np.repeat(heads - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+        owner = np.repeat(np.arange(len(tracks)), lengths)
+
+        kept = np.ones(len(positions), dtype=bool) if level is None else self.levels[level][positions]
+        start, end = time_range
+        times = self.timestamps[self.rows[positions]]
+        if start is not None:
+            kept &= times >= start
+        if end is not None:
+            kept &= times <= end
+        positions, owner = positions[kept], owner[kept]
+
+        rows = self.rows[positions]
+        coordinates = np.stack([self.longitude[rows], self.latitude[rows]], axis=1).tolist()
+        bounds = np.searchsorted(owner, np.arange(len(tracks) + 1))
+        starts = self.start_times[tracks].view('datetime64[us]').astype(object)
+        ends = self.end_times[tracks].view('datetime64[us]').astype(object)
+        return [{
+            'type': kind,
+            'id': self.ids[track],
+            'start': starts[i].isoformat(),
+            'end': ends[i].isoformat(),
+            'point_count': int(lengths[i]),
+            'coordinates': coordinates[bounds[i]:bounds[i + 1]]
+        } for i, track in enumerate(tracks.tolist()) if bounds[i + 1] - bounds[i] >= 2]
+
+
+def build_track_sets(stores: Dict[str, TrackStore], max_gap_seconds: float, lod_zooms: Sequence[int],
+                     tolerance_pixels: float) -> Dict[str, TrackSet]:
+    """为各数据类型建立航迹"""
+    return {kind: TrackSet(store, ENTITY_FIELDS[kind], max_gap_seconds, lod_zooms, tolerance_pixels)
+            for kind, store in stores.items()}
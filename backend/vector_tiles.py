@@ -0,0 +1,192 @@
+"""
+点图层矢量瓦片（Mapbox Vector Tile 2.1）。
+
+按瓦片坐标 z/x/y 用空间网格索引取出瓦片范围内的记录，投影为瓦片内坐标（extent 4096）后编码为
+MVT protobuf：每条记录一个POINT要素，属性为记录的部分字段。缩放级别低于完整细节级别时按像素网格抽稀，
+每个网格只保留时间最新的一条记录，并以point_count属性记录该网格合并的点数。
+编码后的瓦片按 (数据版本, 图层, z, x, y) 缓存在LRU中。
+"""
+import math
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .clusters import mercator_xy
+from .spatial_index import GridIndex
+from .time_index import NO_TIME_RANGE, TimeRange, filter_rows
+from .track_store import TrackStore
+
+# 瓦片内坐标范围
+EXTENT = 4096
+# 瓦片边长（像素）
+TILE_SIZE = 256
+# 抽稀时每个网格的最大边长（像素）
+_MAX_THINNING_PIXELS = 16
+
+# 各图层要素携带的属性字段
+TILE_PROPERTIES = {
+    'ais': ['mmsi', 'vessel_name', 'vessel_type', 'sog', 'cog', 'heading', 'data_status', 'timestamp'],
+    'adsb': ['aircraft_id', 'aircraft_tail', 'altitude_ft', 'ground_speed_kts', 'heading_deg', 'data_status',
+             'timestamp']
+}
+
+# MVT几何类型与命令
+_POINT = 1
+_MOVE_TO = 1
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """瓦片的经纬度范围 (west, south, east, north)"""
+    n = 1 << z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def thinning_pixels(z: int, full_detail_zoom: int) -> int:
+    """缩放级别z的抽稀网格边长（像素），0表示不抽稀"""
+    if z >= full_detail_zoom:
+        return 0
+    return min(_MAX_THINNING_PIXELS, 1 << (full_detail_zoom - z))
+
+
+def render_tile(store: TrackStore, index: GridIndex, layer: str, z: int, x: int, y: int,
+                full_detail_zoom: int, time_range: TimeRange = NO_TIME_RANGE) -> bytes:
+    """生成一个点图层瓦片的MVT编码，只包含时间范围内的记录（瓦片内没有记录时为空字节串）"""
+    rows = filter_rows(store.raw('timestamp'), index.query(*tile_bounds(z, x, y)), time_range)
+    if not len(rows):
+        return b''
+
+    # 投影为瓦片内坐标
+    mx, my = mercator_xy(index.longitude[rows], index.latitude[rows])
+    n = 1 << z
+    px = np.clip(((mx * n - x) * EXTENT).astype(np.int64), 0, EXTENT - 1)
+    py = np.clip(((my * n - y) * EXTENT).astype(np.int64), 0, EXTENT - 1)
+
+    point_count = np.ones(len(rows), dtype=np.int64)
+    pixels = thinning_pixels(z, full_detail_zoom)
+    if pixels:
+        # 按时间从新到旧排序后，每个抽稀网格保留第一条
+        cell_size = EXTENT // TILE_SIZE * pixels
+        cells = (py // cell_size) * (EXTENT // cell_size) + px // cell_size
+        newest_first = np.argsort(-store.raw('timestamp')[rows], kind='stable')
+        _, first, counts = np.unique(cells[newest_first], return_index=True, return_counts=True)
+        keep = np.sort(newest_first[first])
+        point_count = np.zeros(len(rows), dtype=np.int64)
+        point_count[newest_first[first]] = counts
+        rows, px, py, point_count = rows[keep], px[keep], py[keep], point_count[keep]
+
+    names = TILE_PROPERTIES[layer]
+    records = store.to_dicts(rows)
+    properties = [[record[name] for name in names] + [int(count)] for record, count in zip(records, point_count)]
+    return encode_point_layer(layer, rows.tolist(), px.tolist(), py.tolist(), names + ['point_count'], properties)
+
+
+def encode_point_layer(name: str, ids: Sequence[int], px: Sequence[int], py: Sequence[int],
+                       keys: Sequence[str], properties: Sequence[Sequence[Any]]) -> bytes:
+    """编码只含一个点图层的瓦片：每个要素一个点（瓦片内坐标）与一组属性（顺序与keys一致，None不编码）"""
+    values: Dict[Tuple[type, Any], int] = {}
+    features = []
+    for feature_id, x, y, row in zip(ids, px, py, properties):
+        tags = []
+        for key_index, value in enumerate(row):
+            if value is None:
+                continue
+            value_key = (type(value), value)
+            value_index = values.get(value_key)
+            if value_index is None:
+                value_index = values[value_key] = len(values)
+            tags.extend((key_index, value_index))
+        geometry = [(_MOVE_TO & 0x7) | (1 << 3), _zigzag(x), _zigzag(y)]
+        features.append(_field_varint(1, feature_id) + _field_packed(2, tags) +
+                        _field_varint(3, _POINT) + _field_packed(4, geometry))
+
+    layer = [_field_varint(15, 2), _field_bytes(1, name.encode('utf-8'))]
+    layer.extend(_field_bytes(2, feature) for feature in features)
+    layer.extend(_field_bytes(3, key.encode('utf-8')) for key in keys)
+    layer.extend(_field_bytes(4, _encode_value(value)) for _, value in values)
+    layer.append(_field_varint(5, EXTENT))
+    return _field_bytes(3, b''.join(layer))
+
+
+def _encode_value(value: Any) -> bytes:
+    """编码MVT属性值（Value消息）"""
+    if isinstance(value, bool):
+        return _field_varint(7, int(value))
+    if isinstance(value, int):
+        return _field_varint(6, _zigzag(value))
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack('<d', value)
+    return _field_bytes(1, str(value).encode('utf-8'))
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _varint(value: int) -> bytes:
+    result = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            result.append(byte | 0x80)
+        else:
+            result.append(byte)
+            return bytes(result)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _key(field, 0) + _varint(value)
+
+
+def _field_bytes(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _field_packed(field: int, values: Sequence[int]) -> bytes:
+    return _field_bytes(field, b''.join(_varint(value) for value in values))
+
+
+class TileCache:
+    """编码后瓦片的LRU缓存，键为 (数据版本, 图层, z, x, y)；也用于缓存密度网格分块"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._tiles: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key: Hashable, tile: bytes):
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.capacity:
+                self._tiles.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'size': len(self._tiles), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses}
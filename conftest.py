@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试共用的辅助函数 - 将数据文件与全部缓存路径指向临时目录、处理结果的比较形式，
+按指定信道与序列号编码NMEA语句，以及默认跳过的耗时对比（benchmark标记）
+"""
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+from pyais.encode import encode_dict
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.config import Config
+
+DATA_FILES = ('AIS_NMEA_FILE', 'AIS_CSV_FILE', 'ADSB_JSONL_FILE', 'ADSB_CSV_FILE')
+CACHE_PATHS = ('CACHE_DIR', 'PROCESSED_DATA_CACHE', 'CACHE_SEGMENT_DIR', 'DENSITY_TILE_CACHE_DIR')
+
+# 只输出耗时的对比默认不随pytest运行：设置 SDFS_RUN_BENCHMARKS=true 或直接运行测试脚本时执行
+benchmark = pytest.mark.skipif(os.environ.get('SDFS_RUN_BENCHMARKS', 'false').lower() != 'true',
+                               reason='耗时对比，设置 SDFS_RUN_BENCHMARKS=true 时运行')
+
+
+def use_directory(directory: Path, copy_data: bool = False):
+    """
+    将数据文件与全部缓存路径（缓存清单、分段、密度瓦片）指向临时目录，返回原配置（用restore_config恢复）。
+    copy_data时复制样例数据文件，否则由测试自行写入
+    """
+    names = DATA_FILES + CACHE_PATHS
+    original = {name: getattr(Config, name) for name in names}
+    for name in names:
+        setattr(Config, name, Path(directory) / original[name].name)
+    if copy_data:
+        for name in DATA_FILES:
+            shutil.copyfile(original[name], getattr(Config, name))
+    return original
+
+
+def restore_config(original):
+    for name, value in original.items():
+        setattr(Config, name, value)
+
+
+def comparable_data(data, ordered: bool = True):
+    """
+    处理结果的比较形式：去掉与处理时刻相关的字段（NMEA记录时间戳为处理时间）的记录、清洗统计、
+    按格式与状态的计数以及覆盖范围坐标。增量追加的记录排在已有记录之后，与全量处理的文件间顺序不同，
+    此时用ordered=False按内容排序比较记录
+    """
+    records = [[dict(record, timestamp=None) for record in data[key].to_dicts()] for key in ('ais_data', 'adsb_data')]
+    if not ordered:
+        records = [sorted(json.dumps(record, sort_keys=True) for record in group) for group in records]
+    metadata = data['metadata']
+    return records, metadata['data_cleaning'], metadata['ais_by_format'], metadata['adsb_by_format'], \
+        metadata['ais_by_status'], metadata['adsb_by_status'], \
+        sorted(json.dumps(layer['coordinates']) for layer in data['coverage_layers'])
+
+
+def encode_nmea(data, channel='A', sequence_id=0):
+    """编码为NMEA语句并改写序列号（重新计算校验和）"""
+    sentences = []
+    for sentence in encode_dict(data, talker_id='AIVDM', radio_channel=channel):
+        parts = sentence[1:sentence.index('*')].split(',')
+        if parts[1] != '1':
+            parts[3] = str(sequence_id)
+        body = ','.join(parts)
+        checksum = 0
+        for char in body:
+            checksum ^= ord(char)
+        sentences.append(f"!{body}*{checksum:02X}")
+    return sentences
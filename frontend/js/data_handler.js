@@ -5,6 +5,14 @@ class DataHandler {
         this.processedData = null;
         this.lastUpdate = null;
         this.isProcessing = false;
+        // 本地数据对应的数据版本号与服务进程纪元（增量同步使用）
+        this.dataVersion = null;
+        this.dataEpoch = null;
+        // 增量同步与推送得到的各目标最新记录（目标标识 -> 记录），与全量加载的历史记录分开保存
+        this.latestRecords = { ais: new Map(), adsb: new Map() };
+        // 位置更新推送连接（Server-Sent Events）
+        this.eventSource = null;
+        this.streamConnected = false;
     }
 
     // 检查后端服务状态
@@ -41,6 +49,10 @@ class DataHandler {
             if (response.data.success) {
                 this.processedData = response.data.data;
                 this.lastUpdate = response.data.last_update;
+                const metadata = response.data.metadata || {};
+                this.dataVersion = metadata.data_version ?? null;
+                this.dataEpoch = metadata.data_epoch ?? null;
+                this.latestRecords = { ais: new Map(), adsb: new Map() };
 
                 updateSystemStatus('数据加载成功', 'success');
                 return {
@@ -73,8 +85,8 @@ class DataHandler {
             const response = await axios.post(`${this.backendUrl}/api/data/update`);
 
             if (response.data.success) {
-                // 重新加载更新后的数据
-                return await this.loadData(true);
+                // 已有数据时只同步变化的目标，否则重新加载全部数据
+                return this.dataVersion === null ? await this.loadData(true) : await this.syncChanges();
             } else {
                 throw new Error(response.data.message || '数据更新失败');
             }
@@ -89,6 +101,119 @@ class DataHandler {
         }
     }
 
+    // 增量同步：只获取本地数据版本之后新增、更新与移除的目标，版本过旧时重新获取全部数据
+    async syncChanges() {
+        if (this.dataVersion === null) {
+            return await this.loadData();
+        }
+        if (this.isProcessing) {
+            return {
+                success: false,
+                message: '正在处理数据，请稍候...'
+            };
+        }
+
+        try {
+            const response = await axios.get(`${this.backendUrl}/api/data/changes`, {
+                params: { since: this.dataVersion, epoch: this.dataEpoch },
+                timeout: 30000
+            });
+
+            if (!response.data.success) {
+                throw new Error(response.data.message || '增量数据获取失败');
+            }
+            if (response.data.resync) {
+                const result = await this.loadData();
+                return { ...result, changed: result.success };
+            }
+
+            const changed = this.applyChanges(response.data.changes);
+            this.dataVersion = response.data.version;
+            this.lastUpdate = response.data.last_update;
+            return {
+                success: true,
+                changed: changed,
+                counts: response.data.counts,
+                lastUpdate: this.lastUpdate,
+                message: '增量数据同步成功'
+            };
+        } catch (error) {
+            console.error('增量同步数据时出错:', error);
+            return {
+                success: false,
+                error: error.message,
+                message: '增量数据同步失败'
+            };
+        }
+    }
+
+    // 合并增量数据：新增与更新的目标替换其最新记录，移除的目标删除最新记录，返回数据是否变化。
+    // 全量加载的历史记录（ais_data/adsb_data）保持不变，与 /api/data 返回的数据一致
+    applyChanges(changes) {
+        const fields = { ais: 'mmsi', adsb: 'aircraft_id' };
+        let changed = false;
+
+        for (const [kind, change] of Object.entries(changes || {})) {
+            const latest = this.latestRecords[kind];
+            for (const record of change.inserted.concat(change.updated)) {
+                latest.set(String(record[fields[kind]]), record);
+            }
+            for (const entity of change.evicted) {
+                latest.delete(String(entity));
+            }
+            changed = changed || change.evicted.length > 0 || change.inserted.length > 0 || change.updated.length > 0;
+        }
+
+        return changed;
+    }
+
+    // 订阅位置更新推送：onUpdate在数据变化后调用，onStatus在连接状态变化时调用
+    openStream(onUpdate, onStatus = () => {}, filter = {}) {
+        if (this.eventSource) {
+            this.eventSource.close();
+        }
+
+        const params = new URLSearchParams(filter);
+        this.eventSource = new EventSource(`${this.backendUrl}/api/stream?${params.toString()}`);
+
+        this.eventSource.addEventListener('hello', () => {
+            this.streamConnected = true;
+            onStatus(true);
+        });
+
+        this.eventSource.addEventListener('positions', (event) => {
+            if (!this.processedData) {
+                return;
+            }
+            const update = JSON.parse(event.data);
+            // 推送的是各目标的最新记录，同样只更新最新记录表
+            const changed = this.applyChanges({
+                ais: { inserted: update.ais_data, updated: [], evicted: update.evicted.ais },
+                adsb: { inserted: update.adsb_data, updated: [], evicted: update.evicted.adsb }
+            });
+            if (update.epoch === this.dataEpoch) {
+                this.dataVersion = update.version;
+            }
+            if (changed) {
+                onUpdate();
+            }
+        });
+
+        // 推送不连续（服务端变更日志已不再保留）时重新获取全部数据
+        this.eventSource.addEventListener('resync', async () => {
+            const result = await this.loadData();
+            if (result.success) {
+                onUpdate();
+            }
+        });
+
+        // 断线后浏览器按服务端的retry间隔自动重连
+        this.eventSource.onerror = () => {
+            this.streamConnected = false;
+            onStatus(false);
+        };
+    }
+
     // 获取数据统计
     async getDataStats() {
         try {
@@ -137,6 +262,130 @@ class DataHandler {
         }
     }
 
+    // 按缩放级别查询视图范围内的聚类（缩放级别较大时后端返回单个数据点）
+    async loadClusters(bounds, zoom, types = ['ais', 'adsb']) {
+        if (!this.processedData) {
+            return {
+                success: false,
+                message: '数据未加载'
+            };
+        }
+
+        try {
+            const response = await axios.get(`${this.backendUrl}/api/clusters`, {
+                params: {
+                    z: zoom,
+                    bbox: [bounds.west, bounds.south, bounds.east, bounds.north].join(','),
+                    types: types.join(','),
+                    // 放大到单个数据点时每个目标只显示最新位置
+                    latest: true
+                },
+                timeout: 10000
+            });
+
+            if (response.data.success) {
+                return {
+                    success: true,
+                    mode: response.data.mode,
+                    clusters: response.data.clusters || [],
+                    aisData: response.data.ais_data || [],
+                    adsbData: response.data.adsb_data || [],
+                    counts: response.data.counts || {},
+                    truncated: response.data.truncated || false,
+                    total: response.data.total || 0,
+                    message: '视图数据获取成功'
+                };
+            } else {
+                throw new Error(response.data.message || '获取聚类数据失败');
+            }
+        } catch (error) {
+            console.error('获取聚类数据时出错:', error);
+            return {
+                success: false,
+                error: error.message,
+                message: '获取聚类数据失败'
+            };
+        }
+    }
+
+    // 按视图范围与缩放级别获取航迹（后端按缩放级别返回对应简化程度的折线）
+    async loadTracks(bounds, zoom, types = ['ais', 'adsb']) {
+        if (!this.processedData) {
+            return {
+                success: false,
+                message: '数据未加载'
+            };
+        }
+
+        try {
+            const response = await axios.get(`${this.backendUrl}/api/tracks`, {
+                params: {
+                    z: zoom,
+                    bbox: [bounds.west, bounds.south, bounds.east, bounds.north].join(','),
+                    types: types.join(',')
+                },
+                timeout: 10000
+            });
+
+            if (response.data.success) {
+                return {
+                    success: true,
+                    tracks: response.data.tracks || [],
+                    pointCount: response.data.point_count || 0,
+                    truncated: response.data.truncated || false,
+                    message: '航迹获取成功'
+                };
+            } else {
+                throw new Error(response.data.message || '获取航迹失败');
+            }
+        } catch (error) {
+            console.error('获取航迹时出错:', error);
+            return {
+                success: false,
+                error: error.message,
+                message: '获取航迹失败'
+            };
+        }
+    }
+
+    // 查询地图视图范围内的数据（bounds为west/south/east/north，跨越180°经线时west > east）
+    async loadBbox(bounds, types = ['ais', 'adsb']) {
+        // 数据尚未加载时后端没有可查询的索引
+        if (!this.processedData) {
+            return {
+                success: false,
+                message: '数据未加载'
+            };
+        }
+
+        try {
+            const response = await axios.get(`${this.backendUrl}/api/data/bbox`, {
+                params: { ...bounds, types: types.join(',') },
+                timeout: 10000
+            });
+
+            if (response.data.success) {
+                return {
+                    success: true,
+                    aisData: response.data.ais_data || [],
+                    adsbData: response.data.adsb_data || [],
+                    counts: response.data.counts,
+                    truncated: response.data.truncated,
+                    message: '视图数据获取成功'
+                };
+            } else {
+                throw new Error(response.data.message || '获取视图数据失败');
+            }
+        } catch (error) {
+            console.error('获取视图数据时出错:', error);
+            return {
+                success: false,
+                error: error.message,
+                message: '获取视图数据失败'
+            };
+        }
+    }
+
     // 获取AIS数据
     getAisData() {
         return this.processedData ? this.processedData.ais_data : [];
@@ -147,6 +396,11 @@ class DataHandler {
         return this.processedData ? this.processedData.adsb_data : [];
     }
 
+    // 获取全量加载之后增量同步得到的各目标最新记录（kind为ais或adsb）
+    getLatestRecords(kind) {
+        return Array.from(this.latestRecords[kind].values());
+    }
+
     // 获取覆盖图层
     getCoverageLayersData() {
         return this.processedData ? this.processedData.coverage_layers : [];
@@ -197,7 +451,9 @@ class DataHandler {
         let info = '';
         if (dataPoint.data_type === 'ais') {
             // 判断是否为CSV格式（包含额外字段）
-            const isCsvFormat = dataPoint.vessel_name !== undefined && dataPoint.vessel_name !== 'unknown';
+            const isCsvFormat = !!dataPoint.base_date_time;
+            // NMEA数据可能已由静态报文补全船名等信息
+            const hasStaticInfo = dataPoint.vessel_name !== undefined && dataPoint.vessel_name !== 'unknown';
 
             info = `
                 <div class="data-item">
@@ -230,7 +486,7 @@ class DataHandler {
                     <p><strong>MMSI:</strong> ${dataPoint.mmsi}</p>
             `;
 
-            if (isCsvFormat) {
+            if (hasStaticInfo) {
                 info += `
                     <p><strong>船名:</strong> ${dataPoint.vessel_name}</p>
                     <p><strong>呼号:</strong> ${dataPoint.call_sign || '未知'}</p>
@@ -246,7 +502,7 @@ class DataHandler {
                     <p><strong>航行状态:</strong> ${dataPoint.nav_status}</p>
             `;
 
-            if (isCsvFormat) {
+            if (hasStaticInfo) {
                 info += `
                     <p><strong>尺寸:</strong> ${dataPoint.length ? dataPoint.length.toFixed(1) : '未知'}×${dataPoint.width ? dataPoint.width.toFixed(1) : '未知'}m</p>
                     <p><strong>吃水:</strong> ${dataPoint.draft ? dataPoint.draft.toFixed(1) + 'm' : '未知'}</p>
@@ -380,9 +636,14 @@ function updateStatsDisplay(stats) {
     }
 }
 
-// 更新后端状态显示
+// 更新后端状态显示（推送连接正常时不再轮询健康检查接口）
 async function updateBackendStatus() {
-    const isHealthy = await dataHandler.checkBackendHealth();
+    const isHealthy = dataHandler.streamConnected || await dataHandler.checkBackendHealth();
+    showBackendStatus(isHealthy);
+    return isHealthy;
+}
+
+function showBackendStatus(isHealthy) {
     const statusElement = document.getElementById('backend-status');
 
     if (isHealthy) {
@@ -392,8 +653,6 @@ async function updateBackendStatus() {
         statusElement.textContent = '离线';
         statusElement.className = 'status-indicator status-offline';
     }
-
-    return isHealthy;
 }
 
 // 初始化后端状态检查
@@ -3,9 +3,28 @@ document.addEventListener('DOMContentLoaded', () => {
     // 初始化地图
     mapVisualization.initializeMap();
 
+    // 地图视图变化时按视图范围与缩放级别加载聚类或数据点
+    mapVisualization.viewportLoader = (bounds, zoom, types) => dataHandler.loadClusters(bounds, zoom, types);
+    mapVisualization.trackLoader = (bounds, zoom, types) => dataHandler.loadTracks(bounds, zoom, types);
+
+    // 矢量瓦片图层（按视图范围下载瓦片）
+    mapVisualization.addVectorTileOverlays(`${dataHandler.backendUrl}/tiles/{layer}/{z}/{x}/{y}.pbf`);
+    // 密度热力图栅格瓦片
+    mapVisualization.addDensityTileOverlay(`${dataHandler.backendUrl}/tiles/density/{z}/{x}/{y}.png`);
+
     // 检查后端状态并加载数据
     checkBackendAndLoadData();
 
+    // 订阅位置更新推送，数据变化时刷新地图与统计信息
+    dataHandler.openStream(refreshMapData, showBackendStatus);
+
+    // 推送连接断开期间定时增量同步数据（只传输变化的目标）
+    setInterval(() => {
+        if (!dataHandler.streamConnected) {
+            syncDataChanges();
+        }
+    }, 60000);
+
     // 绑定事件监听器
     bindEventListeners();
 
@@ -155,9 +174,9 @@ function bindEventListeners() {
         const result = await dataHandler.updateData();
 
         if (result.success) {
-            // 更新地图数据
-            const aisData = dataHandler.getAisData();
-            const adsbData = dataHandler.getAdsbData();
+            // 更新地图数据（含增量同步得到的目标最新位置）
+            const aisData = dataHandler.getAisData().concat(dataHandler.getLatestRecords('ais'));
+            const adsbData = dataHandler.getAdsbData().concat(dataHandler.getLatestRecords('adsb'));
             const coverageLayers = dataHandler.getCoverageLayersData();
 
             mapVisualization.updateMapData(aisData, adsbData, coverageLayers);
@@ -233,6 +252,8 @@ function setupFilterListeners() {
     filters.forEach(filterId => {
         document.getElementById(filterId).addEventListener('change', () => {
             mapVisualization.updateVisibility();
+            // 聚类按选中的数据类型汇总，过滤条件变化后重新查询
+            mapVisualization.scheduleViewportLoad();
             updateFilterStatus();
         });
     });
@@ -914,6 +935,30 @@ function formatTime(dateString) {
     }
 }
 
+// 增量同步数据，有变化时刷新地图与统计信息
+async function syncDataChanges() {
+    if (!dataHandler.processedData) {
+        return;
+    }
+
+    const result = await dataHandler.syncChanges();
+    if (result.success && result.changed) {
+        await refreshMapData();
+    }
+}
+
+// 用本地数据刷新地图与统计信息：历史记录之外叠加增量同步得到的目标最新位置
+async function refreshMapData() {
+    mapVisualization.updateMapData(dataHandler.getAisData().concat(dataHandler.getLatestRecords('ais')),
+        dataHandler.getAdsbData().concat(dataHandler.getLatestRecords('adsb')),
+        dataHandler.getCoverageLayersData());
+
+    const statsResult = await dataHandler.getDataStats();
+    if (statsResult.success) {
+        updateStatsDisplay(statsResult.stats);
+    }
+}
+
 // 加载初始数据（用于手动触发）
 async function loadInitialData() {
     await checkBackendAndLoadData();
@@ -6,9 +6,18 @@ class MapVisualization {
         this.coverageLayers = null;
         this.aisMarkers = new Map();
         this.adsbMarkers = new Map();
+        this.clusterMarkers = new Map();
         this.coveragePolygons = new Map();
         this.currentZoom = 8;
         this.mapCenter = [39.9042, 116.4074]; // 北京
+        // 按视图范围加载数据的回调（参数为视图边界、缩放级别与数据类型，返回聚类或数据点）
+        this.viewportLoader = null;
+        this.viewportTimer = null;
+        this.viewportRequest = 0;
+        this.layerControl = null;
+        // 航迹图层与加载回调（参数同viewportLoader，返回按缩放级别简化的航迹）
+        this.tracksLayer = null;
+        this.trackLoader = null;
     }
 
     // 初始化地图
@@ -39,12 +48,21 @@ class MapVisualization {
         };
 
         // 添加图层控制
-        L.control.layers(baseLayers).addTo(this.map);
+        this.layerControl = L.control.layers(baseLayers).addTo(this.map);
 
         // 初始化图层组
         this.markersLayer = L.layerGroup().addTo(this.map);
         this.coverageLayers = L.layerGroup().addTo(this.map);
 
+        // 航迹图层默认关闭，在图层控制中开启后随视图范围加载
+        this.tracksLayer = L.layerGroup();
+        this.layerControl.addOverlay(this.tracksLayer, '航迹');
+        this.map.on('overlayadd', (e) => {
+            if (e.layer === this.tracksLayer) {
+                this.scheduleViewportLoad();
+            }
+        });
+
         // 添加比例尺
         L.control.scale({ imperial: false }).addTo(this.map);
 
@@ -60,6 +78,11 @@ class MapVisualization {
             this.currentZoom = this.map.getZoom();
         });
 
+        // 地图移动或缩放结束后按视图范围加载数据
+        this.map.on('moveend', () => {
+            this.scheduleViewportLoad();
+        });
+
         console.log('地图初始化完成');
         return this.map;
     }
@@ -233,7 +256,9 @@ class MapVisualization {
         const isOnline = dataHandler.isDataPointOnline(aisData.timestamp);
 
         // 判断是否为CSV格式（包含额外字段）
-        const isCsvFormat = aisData.vessel_name !== undefined && aisData.vessel_name !== 'unknown';
+        const isCsvFormat = !!aisData.base_date_time;
+        // NMEA数据可能已由静态报文补全船名等信息
+        const hasStaticInfo = aisData.vessel_name !== undefined && aisData.vessel_name !== 'unknown';
 
         // 数据状态标签
         let statusLabel = '';
@@ -291,7 +316,7 @@ class MapVisualization {
                     </div>
                 ` : ''}
                 <p><strong>MMSI:</strong> ${aisData.mmsi}</p>
-                ${isCsvFormat ? `
+                ${hasStaticInfo ? `
                     <p><strong>船名:</strong> ${aisData.vessel_name || '未知'}</p>
                     <p><strong>呼号:</strong> ${aisData.call_sign || '未知'}</p>
                     <p><strong>IMO:</strong> ${aisData.imo || '未知'}</p>
@@ -303,7 +328,7 @@ class MapVisualization {
                 <p><strong>航向:</strong> ${aisData.cog.toFixed(1)}°</p>
                 <p><strong>船舶类型:</strong> ${aisData.vessel_type}</p>
                 <p><strong>航行状态:</strong> ${aisData.nav_status}</p>
-                ${isCsvFormat ? `
+                ${hasStaticInfo ? `
                     ${aisData.length > 0 ? `<p><strong>尺寸:</strong> ${aisData.length.toFixed(1)}×${aisData.width.toFixed(1)}m</p>` : ''}
                     ${aisData.draft > 0 ? `<p><strong>吃水:</strong> ${aisData.draft.toFixed(1)}m</p>` : ''}
                     ${aisData.cargo && aisData.cargo !== 'unknown' ? `<p><strong>货物:</strong> ${aisData.cargo}</p>` : ''}
@@ -403,8 +428,11 @@ class MapVisualization {
             return null;
         }
 
-        // 将坐标转换为Leaflet格式
-        const latLngs = coverageData.coordinates.map(coord => [coord[1], coord[0]]);
+        // 将坐标转换为Leaflet格式（有polygons时绘制全部多边形及其空洞）
+        const toLatLngs = ring => ring.map(coord => [coord[1], coord[0]]);
+        const latLngs = coverageData.polygons && coverageData.polygons.length
+            ? coverageData.polygons.map(polygon => polygon.map(toLatLngs))
+            : toLatLngs(coverageData.coordinates);
 
         // 创建多边形
         const polygon = L.polygon(latLngs, {
@@ -487,6 +515,99 @@ class MapVisualization {
 
         console.log(`开始更新地图数据: AIS=${aisData.length}, ADS-B=${adsbData.length}, 覆盖层=${coverageLayers.length}`);
 
+        // 添加数据点标记
+        this.updateMarkers(aisData, adsbData);
+
+        // 添加覆盖范围图层
+        if (coverageLayers && coverageLayers.length > 0) {
+            coverageLayers.forEach((layer, index) => {
+                if (this.shouldShowCoverage()) {
+                    const polygon = this.createCoverageLayer(layer);
+                    if (polygon) {
+                        polygon.addTo(this.coverageLayers);
+                        this.coveragePolygons.set(`coverage_${index}`, polygon);
+                    }
+                }
+            });
+            console.log(`添加了 ${this.coveragePolygons.size} 个覆盖范围图层`);
+        }
+
+        // 如果添加了标记，调整地图视图
+        if (this.aisMarkers.size > 0 || this.adsbMarkers.size > 0) {
+            this.fitMapToBounds();
+        }
+
+        console.log('地图数据更新完成');
+    }
+
+    // 清除数据点与聚类标记（保留覆盖范围图层）
+    clearMarkers() {
+        this.aisMarkers.forEach(marker => this.markersLayer.removeLayer(marker));
+        this.adsbMarkers.forEach(marker => this.markersLayer.removeLayer(marker));
+        this.clusterMarkers.forEach(marker => this.markersLayer.removeLayer(marker));
+        this.aisMarkers.clear();
+        this.adsbMarkers.clear();
+        this.clusterMarkers.clear();
+    }
+
+    // 创建聚类标记（点数越多图标越大，颜色按主要数据类型）
+    createClusterMarker(cluster) {
+        const aisCount = cluster.by_type.ais || 0;
+        const adsbCount = cluster.by_type.adsb || 0;
+        const color = aisCount >= adsbCount ? '#3498db' : '#e74c3c';
+        const size = Math.round(Math.min(56, 22 + Math.log10(cluster.count) * 10));
+
+        const clusterIcon = L.divIcon({
+            className: 'cluster-marker',
+            html: `
+                <div style="
+                    width: ${size}px;
+                    height: ${size}px;
+                    line-height: ${size}px;
+                    background-color: ${color};
+                    opacity: 0.85;
+                    color: white;
+                    font-size: 12px;
+                    font-weight: bold;
+                    text-align: center;
+                    border: 2px solid white;
+                    border-radius: 50%;
+                    box-shadow: 0 2px 4px rgba(0,0,0,0.3);
+                ">${cluster.count}</div>
+            `,
+            iconSize: [size + 4, size + 4],
+            iconAnchor: [(size + 4) / 2, (size + 4) / 2]
+        });
+
+        const marker = L.marker([cluster.latitude, cluster.longitude], {
+            icon: clusterIcon,
+            title: `AIS: ${aisCount}, ADS-B: ${adsbCount}`
+        });
+
+        // 点击聚类时放大到该区域
+        marker.on('click', () => {
+            this.map.setView([cluster.latitude, cluster.longitude],
+                Math.min(this.map.getZoom() + 2, this.map.getMaxZoom()));
+        });
+
+        return marker;
+    }
+
+    // 更新聚类标记
+    updateClusters(clusters) {
+        this.clearMarkers();
+
+        clusters.forEach((cluster, index) => {
+            const marker = this.createClusterMarker(cluster);
+            marker.addTo(this.markersLayer);
+            this.clusterMarkers.set(`cluster_${index}`, marker);
+        });
+    }
+
+    // 更新数据点标记（保留覆盖范围图层）
+    updateMarkers(aisData, adsbData) {
+        this.clearMarkers();
+
         // 添加AIS标记
         if (aisData && aisData.length > 0) {
             aisData.forEach((ais, index) => {
@@ -510,39 +631,145 @@ class MapVisualization {
             });
             console.log(`添加了 ${this.adsbMarkers.size} 个ADS-B标记`);
         }
+    }
 
-        // 添加覆盖范围图层
-        if (coverageLayers && coverageLayers.length > 0) {
-            coverageLayers.forEach((layer, index) => {
-                if (this.shouldShowCoverage()) {
-                    const polygon = this.createCoverageLayer(layer);
-                    if (polygon) {
-                        polygon.addTo(this.coverageLayers);
-                        this.coveragePolygons.set(`coverage_${index}`, polygon);
-                    }
-                }
+    // 当前视图的经纬度范围（经度换算到[-180, 180]，跨越180°经线时west > east）
+    getViewportBounds() {
+        const bounds = this.map.getBounds();
+        let west = bounds.getWest();
+        let east = bounds.getEast();
+
+        if (east - west >= 360) {
+            west = -180;
+            east = 180;
+        } else {
+            west = L.Util.wrapNum(west, [-180, 180], true);
+            east = L.Util.wrapNum(east, [-180, 180], true);
+        }
+
+        return {
+            west: west,
+            south: Math.max(bounds.getSouth(), -90),
+            east: east,
+            north: Math.min(bounds.getNorth(), 90)
+        };
+    }
+
+    // 添加矢量瓦片图层（AIS/ADS-B点图层，可在图层控制中开启），urlTemplate中的{layer}替换为图层名
+    addVectorTileOverlays(urlTemplate) {
+        if (!L.vectorGrid || !this.layerControl) {
+            return;
+        }
+
+        const styles = {
+            ais: { radius: 3, weight: 1, color: '#1565c0', fillColor: '#42a5f5', fill: true, fillOpacity: 0.8 },
+            adsb: { radius: 3, weight: 1, color: '#c62828', fillColor: '#ef5350', fill: true, fillOpacity: 0.8 }
+        };
+        const names = { ais: 'AIS矢量瓦片', adsb: 'ADS-B矢量瓦片' };
+
+        Object.keys(styles).forEach(layer => {
+            const tiles = L.vectorGrid.protobuf(urlTemplate.replace('{layer}', layer), {
+                rendererFactory: L.canvas.tile,
+                vectorTileLayerStyles: { [layer]: styles[layer] },
+                interactive: true,
+                maxNativeZoom: 14
             });
-            console.log(`添加了 ${this.coveragePolygons.size} 个覆盖范围图层`);
+            tiles.on('click', (e) => {
+                const properties = e.layer.properties || {};
+                const rows = Object.keys(properties).map(key => `<div><b>${key}</b>: ${properties[key]}</div>`);
+                L.popup().setLatLng(e.latlng).setContent(rows.join('')).openOn(this.map);
+            });
+            this.layerControl.addOverlay(tiles, names[layer]);
+        });
+    }
+
+    // 添加服务端渲染的密度热力图栅格瓦片图层（在图层控件中开启）
+    addDensityTileOverlay(urlTemplate) {
+        if (!this.layerControl) {
+            return;
         }
 
-        // 如果添加了标记，调整地图视图
-        if (this.aisMarkers.size > 0 || this.adsbMarkers.size > 0) {
-            this.fitMapToBounds();
+        const density = L.tileLayer(urlTemplate, {
+            opacity: 0.8,
+            maxNativeZoom: 16,
+            attribution: '密度热力图'
+        });
+        this.layerControl.addOverlay(density, '密度热力图');
+    }
+
+    // 绘制航迹折线（坐标为[经度, 纬度]）
+    updateTracks(tracks) {
+        this.tracksLayer.clearLayers();
+        tracks.forEach(track => {
+            const color = track.type === 'ais' ? '#1565c0' : '#c62828';
+            const line = L.polyline(track.coordinates.map(([lon, lat]) => [lat, lon]), {
+                color: color,
+                weight: 2,
+                opacity: 0.7
+            });
+            line.bindPopup(`
+                <div>
+                    <div><b>${track.type === 'ais' ? 'MMSI' : '航空器ID'}</b>: ${track.id}</div>
+                    <div><b>开始</b>: ${new Date(track.start).toLocaleString()}</div>
+                    <div><b>结束</b>: ${new Date(track.end).toLocaleString()}</div>
+                    <div><b>点数</b>: ${track.point_count}</div>
+                </div>
+            `);
+            this.tracksLayer.addLayer(line);
+        });
+    }
+
+    // 视图变化后延迟加载视图范围内的数据（连续拖动时只加载最后一次）
+    scheduleViewportLoad() {
+        if (!this.viewportLoader) {
+            return;
         }
 
-        console.log('地图数据更新完成');
+        clearTimeout(this.viewportTimer);
+        this.viewportTimer = setTimeout(async () => {
+            const request = ++this.viewportRequest;
+            const types = [];
+            if (this.shouldShowAis()) types.push('ais');
+            if (this.shouldShowAdsb()) types.push('adsb');
+            if (types.length === 0) {
+                this.clearMarkers();
+                this.tracksLayer.clearLayers();
+                return;
+            }
+
+            const bounds = this.getViewportBounds();
+            const zoom = this.map.getZoom();
+            if (this.trackLoader && this.map.hasLayer(this.tracksLayer)) {
+                this.trackLoader(bounds, zoom, types).then(tracks => {
+                    if (request === this.viewportRequest && tracks && tracks.success) {
+                        this.updateTracks(tracks.tracks);
+                        console.log(`视图范围内航迹: ${tracks.tracks.length} 条，共 ${tracks.pointCount} 个点` +
+                            (tracks.truncated ? '（已截断）' : ''));
+                    }
+                });
+            }
+
+            const result = await this.viewportLoader(bounds, zoom, types);
+
+            // 忽略已被更新的请求取代的结果
+            if (request === this.viewportRequest && result && result.success) {
+                if (result.mode === 'clusters') {
+                    this.updateClusters(result.clusters);
+                    console.log(`视图范围内聚类: ${result.clusters.length} 个，共 ${result.total} 个数据点`);
+                } else {
+                    this.updateMarkers(result.aisData, result.adsbData);
+                    console.log(`视图范围内数据: AIS=${result.counts.ais || 0}, ADS-B=${result.counts.adsb || 0}` +
+                        (result.truncated ? '（已截断）' : ''));
+                }
+            }
+        }, 250);
     }
 
     // 清除地图上的所有标记和图层
     clearMap() {
         // 清除标记
-        this.aisMarkers.forEach(marker => this.markersLayer.removeLayer(marker));
-        this.adsbMarkers.forEach(marker => this.markersLayer.removeLayer(marker));
+        this.clearMarkers();
         this.coveragePolygons.forEach(polygon => this.coverageLayers.removeLayer(polygon));
-
-        // 清空集合
-        this.aisMarkers.clear();
-        this.adsbMarkers.clear();
         this.coveragePolygons.clear();
 
         console.log('地图已清除');
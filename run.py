@@ -19,7 +19,10 @@ def start_backend():
     sys.path.insert(0, str(Path(__file__).parent))
 
     try:
-        from backend.app import app
+        from backend.app import app, start_background_ingest
+
+        # 后台摄取数据文件新追加的内容，并向推送订阅者发送变化的目标
+        start_background_ingest()
 
         # 在单独的线程中启动Flask
         def run_flask():
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+AIS快速路径一致性测试脚本 - 对比向量化解码与pyais逐条解码的字段结果
+"""
+import sys
+from pathlib import Path
+
+import pyais
+from pyais.encode import encode_dict
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.ais_fastpath import split_fastpath_candidate, decode_position_reports
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+
+
+def _pyais_fields(sentence, fields):
+    """用pyais解码并取出与快速路径相同的字段（枚举转为int）"""
+    msg = pyais.decode(sentence).asdict()
+    return {name: int(msg[name]) if hasattr(msg[name], 'value') else msg[name] for name in fields}
+
+
+def _assert_parity(sentences):
+    candidates = [split_fastpath_candidate(s) for s in sentences]
+    assert all(c is not None for c in candidates)
+    results = decode_position_reports(candidates)
+
+    checked = 0
+    for sentence, fast in zip(sentences, results):
+        if fast is None:
+            continue
+        assert fast == _pyais_fields(sentence, fast.keys()), sentence
+        checked += 1
+    return checked
+
+
+def test_fastpath_parity_on_sample_file():
+    """样例文件中的所有单片段位置报告，快速路径与pyais结果一致"""
+    sentences = []
+    with open(Config.AIS_NMEA_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('!AIVD') and split_fastpath_candidate(line):
+                sentences.append(line)
+
+    checked = _assert_parity(sentences)
+    print(f"样例文件: {checked}/{len(sentences)} 条位置报告一致")
+    assert checked > 0
+
+
+def test_fastpath_parity_on_edge_cases():
+    """负坐标、不可用值、最大值以及类型19的船名与尺寸"""
+    messages = [
+        {'type': 1, 'mmsi': 123456789, 'status': 5, 'speed': 102.3, 'lon': -179.999, 'lat': -89.5,
+         'course': 360.0, 'heading': 511},
+        {'type': 2, 'mmsi': 1, 'status': 15, 'speed': 0, 'lon': 181, 'lat': 91, 'course': 0, 'heading': 0},
+        {'type': 3, 'mmsi': 999999999, 'status': 0, 'speed': 12.3, 'lon': 121.123456, 'lat': 31.654321,
+         'course': 245.6, 'heading': 244},
+        {'type': 18, 'mmsi': 412000001, 'speed': 7.5, 'lon': -0.000017, 'lat': 0.000017,
+         'course': 13.2, 'heading': 12},
+        {'type': 19, 'mmsi': 412000002, 'speed': 3.1, 'lon': 120.5, 'lat': -33.25, 'course': 90.0,
+         'heading': 91, 'shipname': 'FAST PATH 1', 'ship_type': 37, 'to_bow': 10, 'to_stern': 5,
+         'to_port': 2, 'to_starboard': 3},
+    ]
+    sentences = [encode_dict(m, talker_id='AIVDM')[0] for m in messages]
+    assert _assert_parity(sentences) == len(messages)
+
+
+def test_decoder_output_unchanged_by_fastpath():
+    """解码器启用快速路径前后，记录与清洗统计完全一致"""
+    import backend.ais_decoder as ais_decoder
+
+    def decode():
+        decoder = AISDecoder()
+        records = [dict(r.to_dict(), timestamp=None) for r in decoder.decode_ais_file(Config.AIS_NMEA_FILE)]
+        return records, decoder.get_cleaning_stats()
+
+    fast_records, fast_stats = decode()
+    original = ais_decoder.decode_position_reports
+    ais_decoder.decode_position_reports = lambda candidates: [None] * len(candidates)
+    try:
+        slow_records, slow_stats = decode()
+    finally:
+        ais_decoder.decode_position_reports = original
+
+    assert fast_records == slow_records
+    assert fast_stats == slow_stats
+
+
+if __name__ == "__main__":
+    test_fastpath_parity_on_sample_file()
+    test_fastpath_parity_on_edge_cases()
+    test_decoder_output_unchanged_by_fastpath()
+    print("快速路径一致性测试通过")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+缓存分段测试脚本 - 验证启动时只重建指纹失效的数据文件分段，合并结果与全量处理一致；
+分段每次保存写入新文件名，列数据在后台校验，校验失败的分段被丢弃、下次处理时从头重建
+"""
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.cache_segments import segment_files
+from backend.config import Config
+from backend.data_processor import DataProcessor
+from conftest import comparable_data as _comparable, restore_config, use_directory
+
+
+def _rebuilt_files(processor):
+    """处理一次，返回被重新解码的数据文件名"""
+    rebuilt = []
+    build = processor._build_segment
+
+    def tracking_build(kind, file_path, segment=None):
+        rebuilt.append(Path(file_path).name)
+        return build(kind, file_path, segment)
+
+    processor._build_segment = tracking_build
+    return processor.process_all_data(), rebuilt
+
+
+def test_only_stale_segments_rebuilt():
+    directory = Path(tempfile.mkdtemp())
+    original = use_directory(directory, copy_data=True)
+    try:
+        full = DataProcessor().process_all_data(force_update=True)
+        manifest = json.loads(Config.PROCESSED_DATA_CACHE.read_text(encoding='utf-8'))
+        assert len(manifest['segments']) == 4 and 'ais_data' not in manifest
+
+        # 文件均未变化：全部复用分段，合并结果与全量处理一致
+        data, rebuilt = _rebuilt_files(DataProcessor())
+        assert rebuilt == []
+        assert _comparable(data) == _comparable(full)
+        assert data['metadata']['ais_count'] == full['metadata']['ais_count']
+
+        # 改写一个文件（大小不变）：只重建该文件的分段
+        csv_file = Config.ADSB_CSV_FILE
+        content = csv_file.read_bytes()
+        csv_file.write_bytes(content[:-3] + b'XYZ' if not content.endswith(b'\n') else content[:-4] + b'XYZ\n')
+        data, rebuilt = _rebuilt_files(DataProcessor())
+        assert rebuilt == ['ADSB.csv']
+
+        # 重建的分段写入新的文件名，旧版本文件已删除
+        files = segment_files(Config.CACHE_SEGMENT_DIR, 'adsb', Config.ADSB_CSV_FILE)
+        assert [generation for generation, _ in files] == [1]
+
+        # 分段文件头部损坏：加载时即可发现，只重建该分段
+        segment_file = segment_files(Config.CACHE_SEGMENT_DIR, 'ais', Config.AIS_CSV_FILE)[-1][1]
+        segment_file.write_text('{', encoding='utf-8')
+        data, rebuilt = _rebuilt_files(DataProcessor())
+        assert rebuilt == ['AIS.csv']
+        assert _comparable(data)[0][0] == _comparable(full)[0][0]
+
+        # 列数据损坏：加载时不校验，由后台校验发现后丢弃分段并删除分段文件，下次处理时从头重建
+        segment_file = segment_files(Config.CACHE_SEGMENT_DIR, 'adsb', Config.ADSB_JSONL_FILE)[-1][1]
+        content = bytearray(segment_file.read_bytes())
+        content[-1] ^= 0xFF
+        segment_file.write_bytes(bytes(content))
+        processor = DataProcessor()
+        data, rebuilt = _rebuilt_files(processor)
+        assert rebuilt == []
+        for thread in processor.verify_threads:
+            thread.join()
+        assert str(Config.ADSB_JSONL_FILE) not in processor.segments and not segment_file.exists()
+
+        # 数据文件同时有追加内容：不在损坏的存储上增量解码
+        with open(Config.ADSB_JSONL_FILE, 'ab') as f:
+            f.write(Config.ADSB_JSONL_FILE.read_bytes()[:2000].rpartition(b'\n')[0] + b'\n')
+        data, rebuilt = _rebuilt_files(processor)
+        assert rebuilt == ['ADSB.jsonl'] and not processor.rebuild_paths
+        assert _comparable(data) == _comparable(DataProcessor().process_all_data(force_update=True))
+
+        # 数据文件删除：其分段随之删除，统计中不再包含
+        Config.AIS_NMEA_FILE.unlink()
+        data, rebuilt = _rebuilt_files(DataProcessor())
+        assert rebuilt == []
+        assert data['metadata']['ais_by_format']['nmea'] == 0
+        assert len(list(Config.CACHE_SEGMENT_DIR.glob('*.segment.snap'))) == 3
+        print(f"缓存分段复用正确: AIS={data['metadata']['ais_count']}, ADS-B={data['metadata']['adsb_count']}")
+    finally:
+        restore_config(original)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_only_stale_segments_rebuilt()
+    print("缓存分段测试通过")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+增量同步测试脚本 - 验证变更日志按目标记录新增、更新与移除，跨多个版本合并变更，
+超出保留条数或版本不一致时要求重新获取全部数据，以及/api/data/changes接口
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.ais_decoder import AISDecoder
+from backend.change_log import ChangeLog
+from backend.config import Config
+from backend.latest_state import LatestState
+from backend.models import AISData, ADSData
+from backend.track_store import TrackStore
+
+
+def _sample_store():
+    return TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+
+
+def _states(ais_store, adsb_store=None):
+    return {'ais': LatestState(ais_store, 'mmsi'),
+            'adsb': LatestState(adsb_store if adsb_store is not None else TrackStore(ADSData), 'aircraft_id')}
+
+
+def _next_version(store, evict, move, insert):
+    """去掉evict目标的全部记录，为move目标追加一条更晚的记录，并新增insert目标"""
+    mmsi = store.column('mmsi')
+    kept = store.take(np.flatnonzero(mmsi != evict))
+    last = store.to_dicts([int(np.flatnonzero(mmsi == move)[-1])])[0]
+    later = datetime.fromisoformat(last['timestamp']).replace(year=2030)
+    added = [dict(last, timestamp=later, latitude=last['latitude'] + 0.01),
+             dict(last, mmsi=insert, timestamp=later)]
+    kept.extend(TrackStore.from_dicts(AISData, added))
+    return kept
+
+
+def test_change_log():
+    store = _sample_store()
+    entities = sorted(set(store.column('mmsi').tolist()))
+    assert len(entities) >= 3
+    evict, move, insert = entities[0], entities[1], 'NEW000001'
+
+    log = ChangeLog(1000000)
+    assert log.record(_states(store)) == 1
+    first = log.changes(0, ['ais'])['ais']
+    assert len(first['inserted']) == len(entities) and not len(first['updated']) and not len(first['evicted'])
+
+    second = _next_version(store, evict, move, insert)
+    assert log.record(_states(second)) == 2
+    changes = log.changes(1, ['ais', 'adsb'])
+    assert second.column('mmsi')[changes['ais']['inserted']].tolist() == [insert]
+    assert second.column('mmsi')[changes['ais']['updated']].tolist() == [move]
+    assert changes['ais']['evicted'].tolist() == [evict]
+    assert not any(len(values) for values in changes['adsb'].values())
+
+    # 更新后的最新记录是追加的那一条
+    row = int(changes['ais']['updated'][0])
+    assert second.to_dicts([row])[0]['timestamp'].startswith('2030')
+
+    # 没有变化的处理结果只增加版本号；从版本0合并：被移除的目标不返回
+    assert log.record(_states(second)) == 3
+    assert not any(len(values) for values in log.changes(2, ['ais'])['ais'].values())
+    merged = log.changes(0, ['ais'])['ais']
+    assert len(merged['inserted']) == len(entities) and not len(merged['evicted'])
+    assert evict not in second.column('mmsi')[merged['inserted']].tolist()
+
+    # 超出保留条数时丢弃最早的版本，更早的客户端需要重新获取全部数据
+    small = ChangeLog(len(entities))
+    small.record(_states(store))
+    small.record(_states(second))
+    assert small.floor == 1 and small.changes(0, ['ais']) is None
+    assert small.changes(1, ['ais']) is not None and small.changes(3, ['ais']) is None
+    print(f"变更日志: {log.stats()}")
+
+
+def test_changes_endpoint():
+    client = server.app.test_client()
+    store = _sample_store()
+    change_log = server.data_processor.change_log
+    try:
+        server.data_processor.change_log = ChangeLog(Config.CHANGE_LOG_MAX_ENTRIES)
+        entities = sorted(set(store.column('mmsi').tolist()))
+        adsb_store = TrackStore(ADSData)
+        server.data_processor.change_log.record(_states(store, adsb_store))
+        second = _next_version(store, entities[0], entities[1], 'NEW000001')
+        server.data_processor.change_log.record(_states(second, adsb_store))
+        server.processed_data = {'metadata': {}, 'ais_data': second, 'adsb_data': adsb_store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        epoch = server.data_processor.change_log.epoch
+
+        data = client.get('/api/data/changes', query_string={'since': 1, 'epoch': epoch}).get_json()
+        assert data['success'] and not data['resync'] and data['version'] == 2
+        assert [record['mmsi'] for record in data['changes']['ais']['inserted']] == ['NEW000001']
+        assert [record['mmsi'] for record in data['changes']['ais']['updated']] == [entities[1]]
+        assert data['changes']['ais']['evicted'] == [entities[0]]
+        assert data['counts']['adsb'] == {'inserted': 0, 'updated': 0, 'evicted': 0}
+
+        current = client.get('/api/data/changes', query_string={'since': 2, 'types': 'ais'}).get_json()
+        assert current['counts'] == {'ais': {'inserted': 0, 'updated': 0, 'evicted': 0}}
+
+        # 服务重启（纪元不同）或版本超前时要求重新获取
+        assert client.get('/api/data/changes', query_string={'since': 1, 'epoch': 'old'}).get_json()['resync']
+        assert client.get('/api/data/changes', query_string={'since': 9}).get_json()['resync']
+        assert client.get('/api/data/changes').status_code == 400
+        assert client.get('/api/data/changes', query_string={'since': 0, 'types': 'boats'}).status_code == 400
+
+        # 变更日志与当前处理结果不一致
+        server.processed_data['ais_data'] = store
+        assert client.get('/api/data/changes', query_string={'since': 1}).status_code == 503
+    finally:
+        server.data_processor.change_log = change_log
+        server.processed_data = None
+        server.last_update_time = None
+
+
+if __name__ == "__main__":
+    test_change_log()
+    test_changes_endpoint()
+    print("增量同步测试通过")
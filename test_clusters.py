@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+聚类金字塔测试脚本 - 验证各缩放级别的聚合结果与逐点统计一致，以及/api/clusters按缩放级别返回聚类或数据点
+"""
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.clusters import CELLS_PER_TILE, ClusterPyramid, mercator_xy
+from backend.config import Config
+from backend.models import AISData, ADSData
+from backend.spatial_index import GridIndex
+from backend.track_store import TrackStore
+
+POINTS = 200000
+MAX_ZOOM = 10
+
+
+def _expected_cells(lon, lat, zoom):
+    """逐点计算缩放级别zoom下每个网格的点数"""
+    size = (1 << zoom) * CELLS_PER_TILE
+    x, y = mercator_xy(lon, lat)
+    keys = (y * size).astype(np.int64) * size + (x * size).astype(np.int64)
+    unique, counts = np.unique(keys, return_counts=True)
+    return dict(zip(unique.tolist(), counts.tolist()))
+
+
+def test_pyramid_levels():
+    rng = np.random.default_rng(3)
+    lon = np.concatenate([rng.normal(120, 2, POINTS // 2), rng.uniform(-180, 180, POINTS // 2)])
+    lat = np.concatenate([rng.normal(30, 2, POINTS // 2), rng.uniform(-80, 80, POINTS // 2)])
+    lon[:10] = 999  # 无效坐标不参与聚类
+
+    start = time.perf_counter()
+    pyramid = ClusterPyramid({'ais': (lon[::2], lat[::2]), 'adsb': (lon[1::2], lat[1::2])}, MAX_ZOOM)
+    build_ms = (time.perf_counter() - start) * 1000
+    valid = np.abs(lon) <= 180
+
+    for zoom in (0, 4, MAX_ZOOM):
+        level = pyramid.levels[zoom]
+        size = level.cells_per_axis
+        actual = dict(zip((level.cy * size + level.cx).tolist(), level.counts.sum(axis=0).astype(int).tolist()))
+        assert actual == _expected_cells(lon[valid], lat[valid], zoom), zoom
+
+    # 全球查询覆盖所有点；按类型查询只统计该类型
+    everything = pyramid.query(3, (-180, -90, 180, 90), ['ais', 'adsb'])
+    assert sum(cluster['count'] for cluster in everything) == int(valid.sum())
+    ais_only = pyramid.query(3, (-180, -90, 180, 90), ['ais'])
+    assert sum(cluster['count'] for cluster in ais_only) == int(valid[::2].sum())
+    assert all(set(cluster['by_type']) == {'ais'} for cluster in ais_only)
+
+    # 跨越180°经线的矩形包含两侧的网格
+    crossing = pyramid.query(5, (170, -20, -170, 20), ['ais', 'adsb'])
+    longitudes = np.array([cluster['longitude'] for cluster in crossing])
+    assert len(crossing) and ((longitudes >= 169) | (longitudes <= -169)).all()
+    assert (longitudes > 0).any() and (longitudes < 0).any()
+
+    start = time.perf_counter()
+    pyramid.query(6, (110, 20, 130, 40), ['ais', 'adsb'])
+    print(f"{POINTS} 个点: 建金字塔 {build_ms:.0f} ms, 各级网格数 {[len(level) for level in pyramid.levels]}, "
+          f"查询 {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+def test_clusters_endpoint():
+    client = server.app.test_client()
+    ais_store = TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+    adsb_store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    try:
+        server.processed_data = {'metadata': {}, 'ais_data': ais_store, 'adsb_data': adsb_store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        points = {kind: (store.raw('longitude'), store.raw('latitude'))
+                  for kind, store in (('ais', ais_store), ('adsb', adsb_store))}
+        server.data_processor.spatial_indexes = {kind: GridIndex(*xy) for kind, xy in points.items()}
+        server.data_processor.cluster_pyramid = ClusterPyramid(points, Config.CLUSTER_POINT_ZOOM)
+
+        clusters = client.get('/api/clusters', query_string={'z': 2, 'bbox': '-180,-90,180,90'}).get_json()
+        assert clusters['mode'] == 'clusters'
+        assert clusters['total'] == len(ais_store) + len(adsb_store)
+
+        detail = client.get('/api/clusters', query_string={
+            'z': Config.CLUSTER_POINT_ZOOM + 1, 'bbox': '-180,-90,180,90', 'types': 'adsb'}).get_json()
+        assert detail['mode'] == 'points' and detail['counts'] == {'adsb': len(adsb_store)}
+        assert len(detail['adsb_data']) == min(len(adsb_store), Config.BBOX_MAX_RECORDS)
+
+        assert client.get('/api/clusters', query_string={'z': 2, 'bbox': '1,2,3'}).status_code == 400
+        assert client.get('/api/clusters', query_string={'bbox': '-180,-90,180,90'}).status_code == 400
+        print(f"缩放级别2: {len(clusters['clusters'])} 个聚类")
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.spatial_indexes = {}
+        server.data_processor.cluster_pyramid = None
+
+
+if __name__ == "__main__":
+    test_pyramid_levels()
+    test_clusters_endpoint()
+    print("聚类金字塔测试通过")
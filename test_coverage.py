@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+覆盖范围测试脚本 - 验证占用网格轮廓（外环与空洞、对角相接的网格）、分批更新与一次建立结果一致、
+大数据量下的计算耗时，以及每个数据文件生成一个覆盖范围图层
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.ais_decoder import AISDecoder
+from backend.cache_segments import SourceSegment
+from backend.config import Config
+from backend.coverage import CoverageGrid
+from backend.data_processor import DataProcessor, MergedSummary
+from backend.ingest_checkpoint import FileCheckpoint
+from backend.models import AISData, ADSData
+from backend.track_store import TrackStore
+
+POINTS = 10000000
+
+
+def _ring_area(ring):
+    """闭合环的带符号面积（逆时针为正）"""
+    x, y = np.asarray(ring)[:-1].T
+    return 0.5 * float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+
+def test_annulus_outline():
+    rng = np.random.default_rng(5)
+    angle, radius = rng.uniform(0, 2 * np.pi, 200000), rng.uniform(5, 10, 200000)
+    grid = CoverageGrid(0.5)
+    grid.add(100 + radius * np.cos(angle), 20 + radius * np.sin(angle))
+
+    # 圆环：一个外环（逆时针）与一个空洞（顺时针），面积接近 π(10² - 5²)（边界网格整格计入，略偏大）
+    polygons = grid.outline(closing_cells=1)
+    assert len(polygons) == 1 and len(polygons[0]) == 2
+    outer, hole = polygons[0]
+    assert outer[0] == outer[-1] and hole[0] == hole[-1]
+    assert _ring_area(outer) > 0 > _ring_area(hole)
+    assert abs(_ring_area(outer) + _ring_area(hole) - np.pi * 75) < np.pi * 75 * 0.2
+    # 顶点都在网格线上，相邻顶点之间不共线
+    assert all((np.asarray(ring) / 0.5 == np.round(np.asarray(ring) / 0.5)).all() for ring in polygons[0])
+    assert len(outer) < 200
+
+
+def test_separate_and_diagonal_cells():
+    grid = CoverageGrid(1.0)
+    # 两块相距较远的区域，以及只在对角相接的两个网格
+    grid.add(np.array([0.5, 1.5, 0.5, 1.5, 20.5, 21.5]), np.array([0.5, 0.5, 1.5, 1.5, 10.5, 11.5]))
+    polygons = grid.outline(closing_cells=0)
+    assert len(polygons) == 2
+    assert sorted(_ring_area(polygon[0]) for polygon in polygons) == [3.0, 4.0]
+
+    # 点数不足的网格不计入，最多返回max_polygons个
+    grid.add(np.array([0.5]), np.array([0.5]))
+    assert len(grid.outline(closing_cells=0, min_points=2)) == 1
+    assert len(grid.outline(closing_cells=0, max_polygons=1)) == 1
+    assert grid.outline(closing_cells=0, min_points=3) == []
+
+
+def test_incremental_update():
+    rng = np.random.default_rng(3)
+    store = TrackStore(AISData)
+    grid = CoverageGrid(Config.COVERAGE_CELL_DEGREES)
+    for _ in range(5):
+        size = 100000
+        zeros = np.zeros(size)
+        store.append_columns({
+            'mmsi': ['1'] * size, 'latitude': rng.normal(30, 2, size), 'longitude': rng.normal(120, 2, size),
+            'sog': zeros, 'cog': zeros, 'heading': zeros, 'nav_status': ['0'] * size,
+            'vessel_type': ['unknown'] * size,
+            'timestamp': np.full(size, np.datetime64('2024-05-01T00:00:00', 'us'))
+        })
+        grid.update(store)
+    assert grid.size == len(store)
+
+    full = CoverageGrid(Config.COVERAGE_CELL_DEGREES)
+    full.add(store.raw('longitude'), store.raw('latitude'))
+    assert np.array_equal(grid.keys, full.keys) and np.array_equal(grid.counts, full.counts)
+    assert int(grid.counts.sum()) == len(store)
+    assert grid.outline() == full.outline()
+
+
+def test_large_outline():
+    rng = np.random.default_rng(1)
+    lon, lat = rng.normal(115, 5, POINTS), rng.normal(20, 5, POINTS)
+    grid = CoverageGrid(Config.COVERAGE_CELL_DEGREES)
+    start = time.perf_counter()
+    grid.add(lon, lat)
+    added = time.perf_counter()
+    polygons = grid.outline(Config.COVERAGE_CLOSING_CELLS, Config.COVERAGE_MIN_POINTS, Config.COVERAGE_MAX_POLYGONS)
+    finished = time.perf_counter()
+
+    assert 0 < len(polygons) <= Config.COVERAGE_MAX_POLYGONS
+    areas = [_ring_area(polygon[0]) for polygon in polygons]
+    assert (np.diff(areas) <= 1e-9).all()
+    print(f"{POINTS} 个点: 划分网格 {(added - start) * 1000:.0f} ms ({len(grid.keys)} 个网格), "
+          f"轮廓 {(finished - added) * 1000:.0f} ms, 最大多边形 {len(polygons[0][0])} 个顶点")
+
+
+def test_layers_per_file():
+    records = AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE))
+    segments = []
+    for name, part in (('a.csv', records[::2]), ('b.csv', records[1::2])):
+        store = TrackStore.from_records(AISData, part)
+        summary = {'count': len(store), 'by_status': {}, 'online': 0, 'bounds': None}
+        segments.append(SourceSegment('ais', f'/data/{name}', 'csv', store, FileCheckpoint(name, 'csv'),
+                                      {}, {}, summary))
+
+    layers = DataProcessor()._create_coverage_layers(MergedSummary(AISData, ['nmea', 'csv'], segments),
+                                                     MergedSummary(ADSData, ['jsonl', 'csv'], []))
+    assert [layer['resource_id'] for layer in layers] == ['ais_coverage_a.csv', 'ais_coverage_b.csv']
+    for layer in layers:
+        assert layer['coordinates'] == layer['polygons'][0][0] and len(layer['coordinates']) >= 4
+        assert layer['metadata']['data_sources'] == [f"/data/{layer['resource_id'][len('ais_coverage_'):]}"]
+    print(f"覆盖范围图层: {[(layer['resource_id'], len(layer['polygons'])) for layer in layers]}")
+
+
+if __name__ == "__main__":
+    test_annulus_outline()
+    test_separate_and_diagonal_cells()
+    test_incremental_update()
+    test_large_outline()
+    test_layers_per_file()
+    print("覆盖范围测试通过")
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+CSV向量化清洗一致性测试脚本 - 以逐行清洗（csv.DictReader逐条检查）为参照，验证AIS/ADS-B样例文件
+及包含各类异常行的文件经列式向量化清洗后，记录、清洗备注与清洗统计完全一致，并输出两者耗时
+"""
+import csv
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from conftest import benchmark
+from backend.models import AISData, ADSData, DataCleaningStats
+
+AIS_DIRTY_ROWS = [
+    # MMSI缺失、时间戳缺失
+    ',,29.9,-89.9,6.0,296.2,299.0,NAME,,CALL,57,12,23,10,3.0,57,A',
+    # 经纬度缺失、坐标格式错误、纬度/经度超出范围
+    '368000001,2022-01-01T00:00:00,,-89.9,6.0,296.2,299.0,NAME,,CALL,57,12,23,10,3.0,57,A',
+    '368000002,2022-01-01T00:00:00,abc,-89.9,6.0,296.2,299.0,NAME,,CALL,57,12,23,10,3.0,57,A',
+    '368000003,2022-01-01T00:00:00,91.5,-89.9,6.0,296.2,299.0,NAME,,CALL,57,12,23,10,3.0,57,A',
+    '368000004,2022-01-01T00:00:00,29.9,-181,6.0,296.2,299.0,NAME,,CALL,57,12,23,10,3.0,57,A',
+    # 可疑坐标(0,0)、航速/航向/船首向/船长异常、船舶类型代码格式错误
+    '368000005,2022-01-01T00:01:00,0,0,60.5,-10,400,NAME,,CALL,x,5,2.5,10,3.0,57,A',
+    # 时间戳格式错误、数值格式错误按0处理
+    '368000006,2022/01/01 00:02,29.9,-89.9,fast,296.2,299.0, NAME ,IMO1,CALL,70,0,600,wide,,,B',
+    'unknown,2022-01-01T00:03:00Z,29.9,-89.9,6.0,361,-1,NAME,,CALL,1e400,,,,,,',
+]
+
+ADSB_DIRTY_ROWS = [
+    # 飞行标识缺失（用尾号代替）、飞行标识与尾号都缺失
+    ',N300NJ,-118.2,34.5,20175,M,X,1/31/24,O,C,S,1077,474,11/7/22 13:30',
+    ',,-118.2,34.5,20175,M,X,1/31/24,O,C,S,1077,474,11/7/22 13:31',
+    # 经纬度缺失、坐标格式错误、纬度/经度超出范围
+    'SIS300,N300NJ,,34.5,20175,M,X,1/31/24,O,C,S,1077,474,11/7/22 13:30',
+    'SIS300,N300NJ,-118.2,north,20175,M,X,1/31/24,O,C,S,1077,474,11/7/22 13:30',
+    'SIS300,N300NJ,-118.2,95,20175,M,X,1/31/24,O,C,S,1077,474,11/7/22 13:30',
+    'SIS300,N300NJ,190,34.5,20175,M,X,1/31/24,O,C,S,1077,474,11/7/22 13:30',
+    # 可疑坐标(0,0)、高度为负数、高度异常高、高度/速度格式错误、地速异常
+    'SIS301,unknown,0,0,70000,M,X,1/31/24,O,C,S,1077,2000,11/7/22 13:32',
+    'SIS302,N302,-118.2,34.5,-50,M,X,1/31/24,O,C,S,1077,474,11/7/22 13:30',
+    'SIS303,N303,-118.2,34.5,high,M,X,1/31/24,O,C,S,1077,fast,11/7/22 13:30',
+    'SIS304,N304,-118.2,34.5,1000,M,X,1/31/24,O,C,S,1077,-20,11/7/22 13:30',
+    # 时间戳格式错误、无法识别的时间格式与空时间
+    'SIS305,N305,-118.2,34.5,1000,M,X,1/31/24,O,C,S,1077,100,13/45/22 13:30',
+    'SIS306,N306,-118.2,34.5,1000,M,X,1/31/24,O,C,S,1077,100,2022-11-07',
+    'SIS307,N307,-118.2,34.5,1000,M,X,1/31/24,O,C,S,1077,100,',
+]
+
+
+def _count(counter, key):
+    counter[key] = counter.get(key, 0) + 1
+
+
+def _parse_float(value):
+    try:
+        return float(value) if value else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _reference_ais(file_path):
+    """逐行清洗AIS CSV（参照实现）；时间戳缺失或格式错误时timestamp为None"""
+    decoder = AISDecoder()
+    stats = DataCleaningStats()
+    records = []
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            stats.total_records += 1
+            mmsi = row.get('MMSI', '').strip()
+            lat_str = row.get('LAT', '').strip()
+            lon_str = row.get('LON', '').strip()
+            notes = []
+            data_status = "normal"
+
+            if not mmsi or mmsi == 'unknown':
+                notes.append("MMSI缺失")
+                data_status = "warning"
+            if not lat_str or not lon_str:
+                _count(stats.errors_by_type, 'missing_coordinates')
+                continue
+            try:
+                lat = float(lat_str)
+                lon = float(lon_str)
+            except ValueError:
+                _count(stats.errors_by_type, 'coordinate_format')
+                continue
+            if not (-90 <= lat <= 90):
+                _count(stats.errors_by_type, 'latitude_range')
+                continue
+            if not (-180 <= lon <= 180):
+                _count(stats.errors_by_type, 'longitude_range')
+                continue
+            if lat == 0 and lon == 0:
+                notes.append("可疑坐标(0,0)")
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'suspicious_coordinates')
+
+            sog, cog, heading, length, width, draft = (
+                _parse_float(row.get(name, '0')) for name in ('SOG', 'COG', 'Heading', 'Length', 'Width', 'Draft'))
+            if sog < 0 or sog > 50:
+                notes.append(f"航速异常: {sog}")
+                sog = max(0, min(sog, 50))
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'speed_range')
+            if cog < 0 or cog > 360:
+                notes.append(f"航向异常: {cog}")
+                cog = cog % 360
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'course_range')
+            if heading < 0 or heading > 360:
+                notes.append(f"船首向异常: {heading}")
+                heading = heading % 360
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'heading_range')
+            if length > 0 and (length < 5 or length > 500):
+                notes.append(f"船长异常: {length}")
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'length_range')
+
+            timestamp_str = row.get('BaseDateTime', '')
+            timestamp = None
+            if timestamp_str:
+                try:
+                    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00')).replace(tzinfo=None)
+                except ValueError:
+                    notes.append(f"时间戳格式错误: {timestamp_str}")
+                    data_status = "warning"
+                    _count(stats.warnings_by_type, 'timestamp_format')
+            else:
+                notes.append("时间戳缺失")
+                data_status = "warning"
+
+            vessel_type_code = row.get('VesselType', '0')
+            try:
+                vessel_type_code_int = int(float(vessel_type_code))
+            except (ValueError, TypeError, OverflowError):
+                vessel_type_code_int = 0
+                notes.append(f"船舶类型代码格式错误: {vessel_type_code}")
+                data_status = "warning"
+
+            records.append(AISData(
+                mmsi=mmsi if mmsi else "unknown", latitude=lat, longitude=lon, sog=sog, cog=cog, heading=heading,
+                nav_status=decoder._get_nav_status_from_code(row.get('Status', '')),
+                vessel_type=decoder._get_vessel_type(vessel_type_code_int), timestamp=timestamp,
+                data_status=data_status, cleaning_notes="; ".join(notes),
+                vessel_name=row.get('VesselName', 'unknown').strip(), imo=row.get('IMO', 'unknown').strip(),
+                call_sign=row.get('CallSign', 'unknown').strip(), status=row.get('Status', 'unknown').strip(),
+                length=length, width=width, draft=draft, cargo=row.get('Cargo', 'unknown').strip(),
+                transceiver_class=row.get('TransceiverClass', 'unknown').strip(), base_date_time=timestamp_str))
+            if data_status == "warning":
+                stats.warning_records += 1
+            else:
+                stats.valid_records += 1
+    return records, stats.to_dict()
+
+
+def _parse_spotted(spotted_str):
+    """"11/7/22 13:30" 格式，返回 (时间, 是否格式错误)"""
+    if not spotted_str or '/' not in spotted_str or ':' not in spotted_str:
+        return None, False
+    try:
+        date_part, time_part = spotted_str.split(' ')
+        month, day, year = date_part.split('/')
+        hour, minute = time_part.split(':')
+        year_int = int(year) + 2000 if int(year) < 100 else int(year)
+        return datetime(year_int, int(month), int(day), int(hour), int(minute)), False
+    except Exception:
+        return None, True
+
+
+def _reference_adsb(file_path):
+    """逐行清洗ADS-B CSV（参照实现）；时间戳无法解析时timestamp为None"""
+    stats = DataCleaningStats()
+    records = []
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            stats.total_records += 1
+            aircraft_id = row.get('flight', '').strip()
+            tail_number = row.get('tail_number', '').strip()
+            lon_str = row.get('long', '').strip()
+            lat_str = row.get('lat', '').strip()
+            alt_str = row.get('alt', '').strip()
+            notes = []
+            data_status = "normal"
+
+            if not aircraft_id:
+                aircraft_id = tail_number if tail_number else "unknown"
+                if aircraft_id == 'unknown':
+                    notes.append("飞行标识缺失")
+                    data_status = "warning"
+                    stats.warning_records += 1
+                    _count(stats.warnings_by_type, 'missing_aircraft_id')
+            if not tail_number or tail_number == 'unknown':
+                notes.append("飞机尾号缺失")
+                data_status = "warning"
+                stats.warning_records += 1
+                _count(stats.warnings_by_type, 'missing_tail_number')
+            if not lon_str or not lat_str:
+                stats.error_records += 1
+                _count(stats.errors_by_type, 'missing_coordinates')
+                continue
+            try:
+                lon = float(lon_str)
+                lat = float(lat_str)
+            except ValueError:
+                stats.error_records += 1
+                _count(stats.errors_by_type, 'coordinate_format')
+                continue
+            if not (-90 <= lat <= 90):
+                stats.error_records += 1
+                _count(stats.errors_by_type, 'latitude_range')
+                continue
+            if not (-180 <= lon <= 180):
+                stats.error_records += 1
+                _count(stats.errors_by_type, 'longitude_range')
+                continue
+            if lat == 0 and lon == 0:
+                notes.append("可疑坐标(0,0)")
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'suspicious_coordinates')
+
+            altitude_ft = 0.0
+            if alt_str:
+                try:
+                    altitude_ft = float(alt_str)
+                except ValueError:
+                    notes.append(f"高度格式错误: {alt_str}")
+            if altitude_ft < 0:
+                stats.error_records += 1
+                _count(stats.errors_by_type, 'negative_altitude')
+                continue
+            if altitude_ft > 60000:
+                notes.append(f"高度异常高: {altitude_ft}")
+                altitude_ft = 60000.0
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'high_altitude')
+
+            ground_speed_kts = 0.0
+            mph_str = row.get('mph', '').strip()
+            if mph_str:
+                try:
+                    ground_speed_kts = float(mph_str) * 0.868976
+                except ValueError:
+                    notes.append(f"速度格式错误: {mph_str}")
+            if ground_speed_kts < 0 or ground_speed_kts > 1000:
+                notes.append(f"地速异常: {ground_speed_kts} kts")
+                ground_speed_kts = max(0, min(ground_speed_kts, 1000))
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'speed_range')
+
+            spotted_str = row.get('spotted', '').strip()
+            timestamp, invalid = _parse_spotted(spotted_str)
+            if invalid:
+                notes.append(f"时间戳格式错误: {spotted_str}")
+                data_status = "warning"
+                _count(stats.warnings_by_type, 'timestamp_format')
+
+            records.append(ADSData(
+                aircraft_id=aircraft_id, latitude=lat, longitude=lon, altitude_ft=altitude_ft,
+                ground_speed_kts=ground_speed_kts, heading_deg=0.0, aircraft_tail=tail_number, timestamp=timestamp,
+                data_status=data_status, cleaning_notes="; ".join(notes)))
+            if data_status == "warning":
+                stats.warning_records += 1
+            else:
+                stats.valid_records += 1
+    return records, stats.to_dict()
+
+
+def _comparable(records, references):
+    """参照实现中时间戳取当前时刻的记录不比较时间戳"""
+    pairs = []
+    for record, reference in zip(records, references):
+        left, right = record.to_dict(), asdict(reference)
+        if reference.timestamp is None:
+            left.pop('timestamp')
+            right.pop('timestamp')
+        else:
+            right['timestamp'] = reference.timestamp.isoformat()
+        pairs.append(({name: left[name] for name in right}, right))
+    return pairs
+
+
+def _with_dirty_rows(directory, source, rows):
+    lines = source.read_text(encoding='utf-8').splitlines()
+    path = Path(directory) / source.name
+    path.write_text('\n'.join(lines[:40] + rows + lines[40:]) + '\n', encoding='utf-8')
+    return path
+
+
+def _assert_parity(processor_class, iterate, reference, file_path):
+    processor = processor_class()
+    records = list(iterate(processor, str(file_path)))
+    expected, expected_stats = reference(file_path)
+    assert len(records) == len(expected)
+    for index, (left, right) in enumerate(_comparable(records, expected)):
+        assert left == right, f"第 {index} 条记录不一致: {left} != {right}"
+    assert processor.get_cleaning_stats() == expected_stats
+    return expected_stats
+
+
+def test_ais_parity():
+    with tempfile.TemporaryDirectory() as directory:
+        for file_path in (Config.AIS_CSV_FILE, _with_dirty_rows(directory, Config.AIS_CSV_FILE, AIS_DIRTY_ROWS)):
+            stats = _assert_parity(AISDecoder, AISDecoder.iter_ais_file, _reference_ais, file_path)
+    assert len(stats['errors_by_type']) == 4 and len(stats['warnings_by_type']) == 6
+
+
+def test_adsb_parity():
+    with tempfile.TemporaryDirectory() as directory:
+        for file_path in (Config.ADSB_CSV_FILE, _with_dirty_rows(directory, Config.ADSB_CSV_FILE, ADSB_DIRTY_ROWS)):
+            stats = _assert_parity(ADSBProcessor, ADSBProcessor.iter_adsb_file, _reference_adsb, file_path)
+    assert len(stats['errors_by_type']) == 5 and len(stats['warnings_by_type']) == 6
+
+
+@benchmark
+def test_timing():
+    """输出逐行清洗与向量化清洗（列数据/记录对象）在放大样例文件上的耗时"""
+    with tempfile.TemporaryDirectory() as directory:
+        for source, processor_class, reference, columns, records in (
+                (Config.AIS_CSV_FILE, AISDecoder, _reference_ais,
+                 AISDecoder._iter_csv_file_columns, AISDecoder._iter_csv_file),
+                (Config.ADSB_CSV_FILE, ADSBProcessor, _reference_adsb,
+                 ADSBProcessor._iter_csv_file_columns, ADSBProcessor._iter_csv_file)):
+            lines = source.read_text(encoding='utf-8').splitlines(keepends=True)
+            file_path = Path(directory) / source.name
+            file_path.write_text(lines[0] + ''.join(lines[1:]) * 100, encoding='utf-8')
+
+            timings = []
+            for run in (lambda: reference(file_path),
+                        lambda: sum(len(block) for block in columns(processor_class(), file_path)),
+                        lambda: sum(1 for _ in records(processor_class(), file_path))):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            print(f"{source.name} x100: 逐行 {timings[0]:.2f}s, 列数据 {timings[1]:.2f}s "
+                  f"({timings[0] / timings[1]:.1f}x), 记录对象 {timings[2]:.2f}s ({timings[0] / timings[2]:.1f}x)")
+
+
+if __name__ == "__main__":
+    test_ais_parity()
+    test_adsb_parity()
+    test_timing()
+    print("CSV向量化清洗一致性测试通过")
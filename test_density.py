@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+密度网格测试脚本 - 验证分块拼接的网格与直接统计一致（含跨越180°经线的矩形与时间范围）、
+平移时复用缓存的分块，以及/api/density的稀疏返回格式
+"""
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.density import DensityAggregator, time_pieces
+from backend.models import AISData, ADSData
+from backend.spatial_index import GridIndex
+from backend.time_index import TimeIndex
+from backend.track_store import TrackStore
+
+POINTS = 1000000
+HOUR_US = 3600 * 1000000
+
+
+def _store(rng, size):
+    zeros = np.zeros(size)
+    store = TrackStore(AISData)
+    store.append_columns({
+        'mmsi': rng.integers(0, 1000, size).astype(str).tolist(),
+        'latitude': np.clip(rng.normal(10, 20, size), -89, 89), 'longitude': rng.uniform(-180, 180, size),
+        'sog': rng.uniform(0, 20, size), 'cog': zeros, 'heading': zeros, 'nav_status': ['0'] * size,
+        'vessel_type': ['unknown'] * size,
+        'timestamp': np.datetime64('2024-05-01T00:00:00', 'us') + rng.integers(0, 86400, size).astype('timedelta64[s]')
+    })
+    return store
+
+
+def _expected(store, grid, time_range=(None, None)):
+    """直接按网格统计矩形内（经纬度所在网格落在输出范围内）的点数与航速和"""
+    lon, lat = store.raw('longitude'), store.raw('latitude')
+    times = store.raw('timestamp')
+    cell, (west, north), (rows, cols) = grid['cell_degrees'], grid['origin'], grid['shape']
+    col = np.floor((lon - west) / cell).astype(np.int64) % (1 << grid['level'])
+    row = np.floor((north - lat) / cell).astype(np.int64)
+    keep = (col < cols) & (row >= 0) & (row < rows)
+    if time_range[0] is not None:
+        keep &= times >= time_range[0]
+    if time_range[1] is not None:
+        keep &= times <= time_range[1]
+    counts = np.bincount(row[keep] * cols + col[keep], minlength=rows * cols).reshape(rows, cols)
+    sums = np.bincount(row[keep] * cols + col[keep], weights=store.raw('sog')[keep],
+                       minlength=rows * cols).reshape(rows, cols)
+    return counts, sums
+
+
+def test_density_grid():
+    rng = np.random.default_rng(4)
+    store = _store(rng, POINTS)
+    index = GridIndex(store.raw('longitude'), store.raw('latitude'))
+    time_index = TimeIndex(store.raw('timestamp'))
+    aggregator = DensityAggregator(64, 3600, 20, 4096)
+
+    for bbox, res in (((-180, -90, 180, 90), 256), ((100, 0, 140, 30), 128), ((170, -10, -170, 10), 100)):
+        grid = aggregator.grid(store, index, time_index, 'ais', 'v1', bbox, res)
+        assert max(grid['shape']) <= res + 1
+        counts, sums = _expected(store, grid)
+        assert np.array_equal(grid['counts'], counts)
+        assert np.allclose(grid['sums'], sums)
+
+    # 时间范围：完整的时间桶读写缓存，首尾不完整的部分临时计算
+    start = int(store.raw('timestamp').min()) + HOUR_US * 3 // 2
+    time_range = (start, start + HOUR_US * 5)
+    pieces = time_pieces(time_range, time_index.bounds, HOUR_US)
+    assert [key is None for key, _ in pieces] == [True, False, False, False, False, True]
+    grid = aggregator.grid(store, index, time_index, 'ais', 'v1', (100, 0, 140, 30), 128, time_range)
+    counts, _ = _expected(store, grid, time_range)
+    assert np.array_equal(grid['counts'], counts)
+
+    # 平移到同一级别的相邻范围时复用分块
+    aggregator.grid(store, index, time_index, 'ais', 'v2', (100, 0, 140, 30), 128)
+    hits = aggregator.cache.hits
+    begin = time.perf_counter()
+    panned = aggregator.grid(store, index, time_index, 'ais', 'v2', (105, 2, 145, 32), 128)
+    pan_ms = (time.perf_counter() - begin) * 1000
+    assert aggregator.cache.hits > hits
+    assert np.array_equal(panned['counts'], _expected(store, panned)[0])
+
+    begin = time.perf_counter()
+    aggregator.grid(store, index, time_index, 'ais', 'v3', (-180, -90, 180, 90), 256)
+    cold_ms = (time.perf_counter() - begin) * 1000
+    begin = time.perf_counter()
+    aggregator.grid(store, index, time_index, 'ais', 'v3', (-180, -90, 180, 90), 256)
+    warm_ms = (time.perf_counter() - begin) * 1000
+    print(f"{POINTS} 个点: 全球网格首次 {cold_ms:.1f} ms, 缓存 {warm_ms:.1f} ms, 平移 {pan_ms:.1f} ms")
+
+
+def test_density_endpoint():
+    client = server.app.test_client()
+    ais_store = TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+    adsb_store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    try:
+        server.processed_data = {'metadata': {}, 'ais_data': ais_store, 'adsb_data': adsb_store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        server.data_processor.spatial_indexes = {
+            kind: GridIndex(store.raw('longitude'), store.raw('latitude'))
+            for kind, store in (('ais', ais_store), ('adsb', adsb_store))}
+        server.data_processor.time_indexes = {}
+
+        response = client.get('/api/density', query_string={
+            'bbox': '-81.5,39.5,-78.5,42', 'res': 64, 'type': 'adsb', 'mean': 'true'})
+        data = response.get_json()
+        assert data['success'] and data['total'] == len(adsb_store)
+        assert len(data['cells']) == len(data['counts']) == len(data['means']) > 0
+        assert sum(data['counts']) == data['total'] and max(data['counts']) == data['max_count']
+        assert all(0 <= cell < data['shape'][0] * data['shape'][1] for cell in data['cells'])
+
+        # 网格编号对应的位置包含该网格的点
+        cell = data['cells'][0]
+        row, col = divmod(cell, data['shape'][1])
+        west = data['origin'][0] + col * data['cell_degrees']
+        north = data['origin'][1] - row * data['cell_degrees']
+        lon, lat = adsb_store.raw('longitude'), adsb_store.raw('latitude')
+        inside = (lon >= west) & (lon < west + data['cell_degrees']) & (lat < north) & \
+            (lat >= north - data['cell_degrees'])
+        assert np.count_nonzero(inside) == data['counts'][0]
+        assert abs(float(adsb_store.raw('altitude_ft')[inside].mean()) - data['means'][0]) < 0.01
+
+        assert 'means' not in client.get('/api/density', query_string={'bbox': '-180,-90,180,90'}).get_json()
+        assert client.get('/api/density').status_code == 400
+        assert client.get('/api/density', query_string={'bbox': '0,0,1,1', 'type': 'boats'}).status_code == 400
+        assert client.get('/api/density', query_string={'bbox': '0,0,1,1', 'start': 'soon'}).status_code == 400
+        print(f"ADS-B密度网格 {data['shape']}: {len(data['cells'])} 个非空网格, 响应 {len(response.data)} 字节")
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.spatial_indexes = {}
+        server.data_processor.time_indexes = {}
+        server.density_aggregator.clear()
+
+
+if __name__ == "__main__":
+    test_density_grid()
+    test_density_endpoint()
+    print("密度网格测试通过")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+多片段消息重组测试脚本 - 验证交错信道与序列号的多片段消息重组、按LRU顺序的容量淘汰、
+按读入行数计算的年龄淘汰、序列号复用时的淘汰，以及解码器的孤立片段统计
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.ais_decoder import AISDecoder, FragmentBuffer
+from conftest import encode_nmea
+
+STATIC = {'type': 5, 'mmsi': 366000001, 'shipname': 'FRAGMENT TEST', 'callsign': 'WXYZ', 'ship_type': 70,
+          'to_bow': 100, 'to_stern': 20, 'to_port': 10, 'to_starboard': 8}
+REPORT = {'type': 1, 'mmsi': 366000009, 'status': 0, 'speed': 10.0, 'lon': -122.4, 'lat': 37.8,
+          'course': 90.0, 'heading': 90}
+
+
+def _add(buffer, channel, sequence_id, number, total=2):
+    """读入一行片段"""
+    buffer.advance()
+    return buffer.add(f"{channel}{sequence_id}-{number}", total, number, str(sequence_id), channel)
+
+
+def test_interleaved_reassembly():
+    buffer = FragmentBuffer(max_messages=10, max_age_lines=100)
+    # 两个信道使用相同的序列号，同一信道上两个序列号交错
+    assert _add(buffer, 'A', 1, 1) is None
+    assert _add(buffer, 'B', 1, 1) is None
+    assert _add(buffer, 'A', 2, 1, total=3) is None
+    assert _add(buffer, 'B', 1, 2) == ['B1-1', 'B1-2']
+    assert _add(buffer, 'A', 2, 3, total=3) is None
+    assert _add(buffer, 'A', 1, 2) == ['A1-1', 'A1-2']
+    # 片段乱序到达时按片段号排序返回
+    assert _add(buffer, 'A', 2, 2, total=3) == ['A2-1', 'A2-2', 'A2-3']
+    assert len(buffer) == 0 and buffer.stats['completed_messages'] == 3 and buffer.stats['evicted_orphans'] == 0
+
+
+def test_lru_eviction():
+    buffer = FragmentBuffer(max_messages=2, max_age_lines=100)
+    _add(buffer, 'A', 1, 1, total=3)
+    _add(buffer, 'A', 2, 1, total=3)
+    # 消息1收到新片段后成为最近更新的消息，超出容量时淘汰消息2
+    _add(buffer, 'A', 1, 2, total=3)
+    _add(buffer, 'A', 3, 1, total=3)
+    assert buffer.stats['evicted_by_size'] == 1 and len(buffer) == 2
+    assert _add(buffer, 'A', 1, 3, total=3) == ['A1-1', 'A1-2', 'A1-3']
+    assert _add(buffer, 'A', 2, 2, total=3) is None
+
+    drained = buffer.drain()
+    assert drained == [['A3-1'], ['A2-2']] and len(buffer) == 0
+
+
+def test_age_eviction_by_lines():
+    buffer = FragmentBuffer(max_messages=10, max_age_lines=3)
+    _add(buffer, 'A', 1, 1)
+    buffer.advance(2)
+    # 后续片段是之后读入的第3行：仍在年龄上限内
+    assert _add(buffer, 'A', 1, 2) == ['A1-1', 'A1-2']
+
+    _add(buffer, 'A', 2, 1)
+    buffer.advance(3)
+    # 后续片段是之后读入的第4行：超龄消息先被淘汰，迟到的片段作为新消息等待
+    assert _add(buffer, 'A', 2, 2) is None
+    assert buffer.stats['evicted_by_age'] == 1 and buffer.stats['evicted_orphans'] == 1
+    assert buffer.drain() == [['A2-2']]
+
+
+def test_restart_eviction():
+    buffer = FragmentBuffer(max_messages=10, max_age_lines=100)
+    _add(buffer, 'A', 1, 1)
+    # 同一序列号上出现新的首片段：旧消息已丢片
+    _add(buffer, 'A', 1, 1)
+    assert buffer.stats['evicted_by_restart'] == 1
+    assert _add(buffer, 'A', 1, 2) == ['A1-1', 'A1-2']
+
+
+def test_decoder_orphans():
+    """解码器的孤立片段统计按读入行数计算，与解码耗时无关"""
+    first, second = encode_nmea(STATIC, 'A', 3)
+    reports = [encode_nmea(dict(REPORT, mmsi=366000010 + n))[0] for n in range(6)]
+    other_first, other_second = encode_nmea(dict(STATIC, mmsi=366000002), 'B', 3)
+    lines = [first, other_first] + reports[:2] + [other_second] + reports[2:] + [second]
+
+    for _ in range(2):
+        decoder = AISDecoder()
+        decoder.fragment_buffer = FragmentBuffer(max_messages=10, max_age_lines=4)
+        records = list(decoder._iter_nmea_lines(lines))
+        leftover = decoder.fragment_buffer.drain()
+        decoder._record_orphan_fragments(decoder.fragment_buffer.stats['evicted_orphans'] + len(leftover))
+
+        # 信道B的消息在3行后补全；信道A的后续片段在7行后到达，首片段已被淘汰
+        assert len(records) == len(reports)
+        assert decoder.vessel_static['366000002']['vessel_name'] == 'FRAGMENT TEST'
+        assert '366000001' not in decoder.vessel_static
+        assert decoder.get_cleaning_stats()['errors_by_type']['orphan_fragments'] == 2
+        assert decoder.get_fragment_stats()['evicted_by_age'] == 1
+
+
+if __name__ == "__main__":
+    test_interleaved_reassembly()
+    test_lru_eviction()
+    test_age_eviction_by_lines()
+    test_restart_eviction()
+    test_decoder_orphans()
+    print("多片段消息重组测试通过")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+增量摄取测试脚本 - 验证按检查点只解码追加内容的结果与全量重新处理一致，
+每个目标的最新状态只处理追加的记录，以及最后一行没有换行符的文件不丢失记录
+"""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import pytest
+
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.data_processor import DataProcessor
+from backend.latest_state import LatestState
+from backend.parallel_decoder import ParallelFileDecoder
+from backend.trajectories import ENTITY_FIELDS
+from conftest import comparable_data, restore_config, use_directory
+
+# 样例文件名 -> 第一次写入的行数（AIS.txt在多片段消息的第一个片段之后切分）
+SPLIT_LINES = {'AIS.txt': 37, 'AIS.csv': 500, 'ADSB.jsonl': 600, 'ADSB.csv': 700}
+
+
+def _write_lines(path: Path, lines, mode='w'):
+    with open(path, mode, encoding='utf-8', newline='') as f:
+        f.writelines(lines)
+
+
+def _comparable(data):
+    """增量追加的记录排在已有记录之后，与全量处理的文件间顺序不同，因此按内容排序比较"""
+    return comparable_data(data, ordered=False)
+
+
+def test_incremental_matches_full_rescan(monkeypatch):
+    directory = Path(tempfile.mkdtemp())
+    original = use_directory(directory)
+    try:
+        sources = {name: Path(original_path).read_text(encoding='utf-8').splitlines(keepends=True)
+                   for name, original_path in ((p.name, p) for p in original.values() if p.name in SPLIT_LINES)}
+        for name, lines in sources.items():
+            _write_lines(directory / name, lines[:SPLIT_LINES[name]])
+
+        processor = DataProcessor()
+        first = processor.process_all_data(force_update=True)
+        assert processor.segments[str(directory / 'AIS.txt')].checkpoint.pending, "切分处应有未完成的多片段消息"
+
+        # 没有新增内容时直接返回已有结果
+        assert processor.process_all_data() is first
+
+        for name, lines in sources.items():
+            _write_lines(directory / name, lines[SPLIT_LINES[name]:], mode='a')
+
+        # 同一处理器增量合并：各分段的最新状态只处理追加的记录，合并结果与重新建立的一致
+        processed = []
+        update = LatestState.update
+
+        def tracking_update(state):
+            processed.append(len(state.store) - state.size)
+            update(state)
+
+        monkeypatch.setattr(LatestState, 'update', tracking_update)
+        merged = processor.process_all_data()
+        monkeypatch.undo()
+        assert sum(processed) == len(merged['ais_data']) + len(merged['adsb_data']) - \
+            len(first['ais_data']) - len(first['adsb_data'])
+        for kind, state in processor.latest_states.items():
+            rebuilt = LatestState(state.store, ENTITY_FIELDS[kind])
+            assert np.array_equal(state.rows, rebuilt.rows) and np.array_equal(state.times, rebuilt.times)
+
+        # 新的处理器从缓存分段与其检查点恢复后增量合并
+        incremental = DataProcessor().process_all_data()
+        full = DataProcessor().process_all_data(force_update=True)
+        assert len(incremental['ais_data']) > len(first['ais_data'])
+        assert _comparable(incremental) == _comparable(full) == _comparable(merged)
+
+        # 截断后重写：退回全量重扫
+        _write_lines(directory / 'ADSB.jsonl', sources['ADSB.jsonl'][:50])
+        _write_lines(directory / 'ADSB.jsonl', sources['ADSB.jsonl'][50:1000], mode='a')
+        rescanned = DataProcessor().process_all_data()
+        assert _comparable(rescanned) == _comparable(DataProcessor().process_all_data(force_update=True))
+        print(f"增量摄取一致: AIS={len(incremental['ais_data'])}, ADS-B={len(incremental['adsb_data'])}")
+    finally:
+        restore_config(original)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_unterminated_last_line():
+    """最后一行没有换行符：从头解码（单进程与并行）读到文件末尾；增量解码在文件大小两次检查不变后读取"""
+    directory = Path(tempfile.mkdtemp())
+    original = use_directory(directory)
+    try:
+        sources = {name: Path(original_path).read_text(encoding='utf-8').splitlines(keepends=True)
+                   for name, original_path in ((p.name, p) for p in original.values() if p.name in SPLIT_LINES)}
+        for name, lines in sources.items():
+            _write_lines(directory / name, lines[:-1] + [lines[-1].rstrip('\n')])
+        expected = {str(directory / 'AIS.csv'): len(AISDecoder().decode_ais_file(str(directory / 'AIS.csv'))),
+                    str(directory / 'ADSB.jsonl'): len(ADSBProcessor().process_adsb_file(str(directory / 'ADSB.jsonl')))}
+
+        serial = DataProcessor()
+        full = serial.process_all_data(force_update=True)
+        parallel = DataProcessor()
+        parallel.parallel_decoder = ParallelFileDecoder(max_workers=2, chunk_size=16384)
+        parallel.config.PARALLEL_DECODE_MIN_FILE_SIZE = 0
+        assert _comparable(parallel.process_all_data(force_update=True)) == _comparable(full)
+        for processor in (serial, parallel):
+            for path, count in expected.items():
+                assert processor.segments[path].summary['count'] == count
+
+        # 增量追加的最后一行没有换行符：第一次检查时可能仍在写入，不解码
+        name, split = 'ADSB.jsonl', SPLIT_LINES['ADSB.jsonl']
+        path = directory / name
+        lines = sources[name]
+        _write_lines(path, lines[:split])
+        processor = DataProcessor()
+        processor.process_all_data(force_update=True)
+        _write_lines(path, lines[split:split + 10] + [lines[split + 10].rstrip('\n')], mode='a')
+        processor.process_all_data()
+        assert processor.segments[str(path)].summary['count'] == split + 10
+        assert processor.segments[str(path)].checkpoint.unterminated_tail
+
+        # 文件大小不变：视为完整的行；之后追加的内容以换行开头时不产生空行
+        processor.process_all_data()
+        assert processor.segments[str(path)].summary['count'] == split + 11
+        _write_lines(path, ['\n'] + lines[split + 11:], mode='a')
+        assert _comparable(processor.process_all_data()) == \
+            _comparable(DataProcessor().process_all_data(force_update=True))
+    finally:
+        restore_config(original)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as patch:
+        test_incremental_matches_full_rescan(patch)
+    test_unterminated_last_line()
+    print("增量摄取测试通过")
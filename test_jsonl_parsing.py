@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+JSONL批量解析一致性测试脚本 - 以逐行json.loads解析与清洗为参照，验证ADS-B JSONL样例文件及包含
+空行、非法JSON、非对象值、字段类型错误与各类异常值的文件经批量解析后，记录与清洗统计完全一致，
+以及由年月日时分秒算术计算的时间戳与datetime()逐条构造一致（含非法日期、闰年与小数秒）
+"""
+import json
+import random
+import sys
+import tempfile
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.adsb_processor import ADSBProcessor
+from backend.config import Config
+from backend.models import ADSData, DataCleaningStats
+
+# 接收机距离/方位字段由极坐标覆盖图测试覆盖，不在逐行参照实现中
+RECEIVER_FIELDS = ('range_nm', 'bearing_deg', 'altitude_is_gnss')
+
+BASE = {"aircraft_id": 12613781, "year": 2022, "month": 1, "day": 26, "hour": 0, "minute": 54, "second": 28.5,
+        "altitude_ft": 39000.0, "ground_speed_kts": 501.0, "heading_deg": 8.0, "latitude": 39.70772,
+        "longitude": -79.80563, "aircraft_tail": "C-GTRG"}
+
+MALFORMED_LINES = [
+    '', '   ', '{"latitude": 39.7, "longitude": ', 'not json', '{"a": 1}{"b": 2}',
+    '[1, 2]', '42', 'null', '"latitude longitude"', '{"latitude": 39.7}',
+]
+
+
+def _dirty_records():
+    """覆盖各清洗分支与时间戳边界的记录"""
+    changes = [
+        {'aircraft_id': 'unknown'}, {'aircraft_id': ''}, {'aircraft_tail': None}, {'aircraft_tail': 'unknown'},
+        {'latitude': 'abc'}, {'latitude': '45.5'}, {'latitude': None}, {'latitude': 91.0}, {'longitude': -180.5},
+        {'latitude': 0, 'longitude': 0}, {'altitude_ft': 'high'}, {'altitude_ft': -10}, {'altitude_ft': 70000},
+        {'ground_speed_kts': 1200}, {'ground_speed_kts': -1}, {'ground_speed_kts': [1]}, {'heading_deg': -10},
+        {'heading_deg': 725.5}, {'heading_deg': '90'}, {'second': 59.999999}, {'second': 60}, {'second': -0.5},
+        {'second': '30'}, {'second': 7}, {'month': 13}, {'month': 2, 'day': 29}, {'year': 2024, 'month': 2, 'day': 29},
+        {'year': '2022'}, {'minute': 1.0}, {'hour': 24}, {'day': 0}, {'year': 10000}, {'hour': True},
+    ]
+    records = [dict(BASE, **change) for change in changes]
+    for key in ('year', 'second', 'altitude_ft', 'aircraft_tail', 'aircraft_id'):
+        records.append({name: value for name, value in BASE.items() if name != key})
+    return [json.dumps(record) for record in records] + ['{"latitude": 10, "longitude": 20, "second": NaN}']
+
+
+def _count(counter, key):
+    counter[key] = counter.get(key, 0) + 1
+
+
+def _parse_timestamp(data):
+    """逐条以datetime()构造时间戳；无法构造时返回None（原实现使用当前时间）"""
+    try:
+        second = data.get('second', 0)
+        microsecond = 0
+        if isinstance(second, float):
+            microsecond = int((second - int(second)) * 1000000)
+            second = int(second)
+        return datetime(data.get('year', 2022), data.get('month', 1), data.get('day', 1),
+                        data.get('hour', 0), data.get('minute', 0), second, microsecond)
+    except Exception:
+        return None
+
+
+def _reference(file_path):
+    """逐行json.loads解析并清洗（参照实现）"""
+    stats = DataCleaningStats()
+    records = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stats.total_records += 1
+            try:
+                line = line.strip()
+                if not line:
+                    stats.error_records += 1
+                    _count(stats.errors_by_type, 'empty_line')
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    stats.error_records += 1
+                    _count(stats.errors_by_type, 'json_decode')
+                    continue
+                if 'latitude' not in data or 'longitude' not in data:
+                    stats.error_records += 1
+                    _count(stats.errors_by_type, 'missing_fields')
+                    continue
+
+                notes = []
+                data_status = "normal"
+                aircraft_id = str(data.get('aircraft_id', 'unknown'))
+                if not aircraft_id or aircraft_id == 'unknown':
+                    notes.append("航空器ID缺失")
+                    data_status = "warning"
+                    stats.warning_records += 1
+                    _count(stats.warnings_by_type, 'missing_aircraft_id')
+                aircraft_tail = data.get('aircraft_tail', 'unknown')
+                if not aircraft_tail or aircraft_tail == 'unknown':
+                    notes.append("飞机尾号缺失")
+                    data_status = "warning"
+
+                try:
+                    lat = float(data.get('latitude', 0.0))
+                    lon = float(data.get('longitude', 0.0))
+                except (ValueError, TypeError):
+                    stats.error_records += 1
+                    _count(stats.errors_by_type, 'coordinate_format')
+                    continue
+                if not (-90 <= lat <= 90):
+                    stats.error_records += 1
+                    _count(stats.errors_by_type, 'latitude_range')
+                    continue
+                if not (-180 <= lon <= 180):
+                    stats.error_records += 1
+                    _count(stats.errors_by_type, 'longitude_range')
+                    continue
+                if lat == 0 and lon == 0:
+                    notes.append("可疑坐标(0,0)")
+                    data_status = "warning"
+                    stats.warning_records += 1
+                    _count(stats.warnings_by_type, 'suspicious_coordinates')
+
+                altitude_ft = float(data.get('altitude_ft', 0.0))
+                if altitude_ft < 0:
+                    stats.error_records += 1
+                    _count(stats.errors_by_type, 'negative_altitude')
+                    continue
+                if altitude_ft > 60000:
+                    notes.append(f"高度异常高: {altitude_ft}")
+                    altitude_ft = 60000.0
+                    data_status = "warning"
+                    stats.warning_records += 1
+                    _count(stats.warnings_by_type, 'high_altitude')
+
+                ground_speed_kts = float(data.get('ground_speed_kts', 0.0))
+                if ground_speed_kts < 0 or ground_speed_kts > 1000:
+                    notes.append(f"地速异常: {ground_speed_kts}")
+                    ground_speed_kts = max(0, min(ground_speed_kts, 1000))
+                    data_status = "warning"
+                    stats.warning_records += 1
+                    _count(stats.warnings_by_type, 'speed_range')
+
+                heading_deg = float(data.get('heading_deg', 0.0))
+                if heading_deg < 0 or heading_deg > 360:
+                    notes.append(f"航向异常: {heading_deg}")
+                    heading_deg = heading_deg % 360
+                    data_status = "warning"
+                    stats.warning_records += 1
+                    _count(stats.warnings_by_type, 'heading_range')
+
+                records.append(ADSData(
+                    aircraft_id=aircraft_id, latitude=lat, longitude=lon, altitude_ft=altitude_ft,
+                    ground_speed_kts=ground_speed_kts, heading_deg=heading_deg, aircraft_tail=aircraft_tail,
+                    timestamp=_parse_timestamp(data), data_status=data_status, cleaning_notes="; ".join(notes)))
+                if data_status == "warning":
+                    stats.warning_records += 1
+                else:
+                    stats.valid_records += 1
+            except Exception:
+                stats.error_records += 1
+                _count(stats.errors_by_type, 'processing_error')
+    return records, stats.to_dict()
+
+
+def _assert_parity(file_path):
+    processor = ADSBProcessor()
+    records = processor.process_adsb_file(str(file_path))
+    expected, expected_stats = _reference(file_path)
+
+    assert len(records) == len(expected)
+    for index, (record, reference) in enumerate(zip(records, expected)):
+        left, right = record.to_dict(), asdict(reference)
+        for name in RECEIVER_FIELDS:
+            left.pop(name), right.pop(name)
+        if reference.timestamp is None:
+            left.pop('timestamp'), right.pop('timestamp')
+        else:
+            right['timestamp'] = reference.timestamp.isoformat()
+        assert left == right, f"第 {index} 条记录不一致: {left} != {right}"
+    assert processor.get_cleaning_stats() == expected_stats
+    return expected_stats
+
+
+def test_sample_parity():
+    stats = _assert_parity(Config.ADSB_JSONL_FILE)
+    assert stats['total_records'] == stats['valid_records'] + stats['error_records'] + stats['warning_records']
+
+
+def test_malformed_parity():
+    lines = Config.ADSB_JSONL_FILE.read_text(encoding='utf-8').splitlines()
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = Path(directory) / 'dirty.jsonl'
+        file_path.write_text('\n'.join(lines[:50] + MALFORMED_LINES + _dirty_records() + lines[50:]) + '\n',
+                             encoding='utf-8')
+        stats = _assert_parity(file_path)
+        assert set(stats['errors_by_type']) == {'empty_line', 'json_decode', 'missing_fields', 'processing_error',
+                                                'coordinate_format', 'latitude_range', 'longitude_range',
+                                                'negative_altitude'}
+
+        # 只有一行把两个对象用逗号连在一起：整块拼接解码的条数与行数不符，退回逐行解码
+        file_path.write_text('\n'.join(lines[:50] + ['{"a": 1}, {"b": 2}'] + lines[50:]) + '\n', encoding='utf-8')
+        stats = _assert_parity(file_path)
+        assert stats['errors_by_type']['json_decode'] == 1
+
+
+def test_timestamp_arithmetic():
+    """随机的年月日时分秒（含越界值与小数秒）整列计算结果与datetime()逐条构造一致"""
+    rng = random.Random(6)
+    records = []
+    for _ in range(20000):
+        second = rng.choice([rng.randint(-1, 61), round(rng.uniform(-1, 61), rng.randint(0, 9))])
+        records.append({'year': rng.choice([rng.randint(0, 10001), rng.randint(1999, 2025)]),
+                        'month': rng.randint(0, 13), 'day': rng.randint(0, 32), 'hour': rng.randint(-1, 24),
+                        'minute': rng.randint(-1, 60), 'second': second})
+    timestamps = ADSBProcessor()._jsonl_timestamps(records)
+    expected = [_parse_timestamp(record) for record in records]
+
+    valid = [value is not None for value in expected]
+    assert np.array_equal(~np.isnat(timestamps), valid) and 0 < sum(valid) < len(records)
+    assert timestamps[valid].astype(object).tolist() == [value for value in expected if value is not None]
+
+
+if __name__ == "__main__":
+    test_sample_parity()
+    test_malformed_parity()
+    test_timestamp_arithmetic()
+    print("JSONL批量解析一致性测试通过")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+最新状态索引测试脚本 - 验证每个目标的最新记录与逐条比较结果一致、分批追加时增量更新、
+拷贝后继续更新与多个存储的合并，以及/api/state/latest与按目标统计的状态汇总
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.latest_state import LatestState
+from backend.models import AISData, ADSData
+from backend.track_store import TrackStore
+
+VESSELS = 20000
+POINTS = 1000000
+BATCHES = 10
+
+
+def _expected_latest(store):
+    """逐条比较得到每个MMSI的最新记录行号（时间相同时取后面的行）"""
+    latest = {}
+    for row, (mmsi, timestamp) in enumerate(zip(store.column('mmsi').tolist(), store.raw('timestamp').tolist())):
+        if mmsi not in latest or timestamp >= latest[mmsi][0]:
+            latest[mmsi] = (timestamp, row)
+    return sorted(row for _, row in latest.values())
+
+
+def _batch(rng, size):
+    zeros = np.zeros(size)
+    seconds = rng.integers(0, 86400, size)
+    seconds[:size // 10] = 3600  # 相同时间戳
+    return {
+        'mmsi': rng.integers(0, VESSELS, size).astype(str).tolist(), 'latitude': rng.uniform(-60, 60, size),
+        'longitude': rng.uniform(-180, 180, size), 'sog': zeros, 'cog': zeros, 'heading': zeros,
+        'nav_status': ['0'] * size, 'vessel_type': ['unknown'] * size,
+        'timestamp': np.datetime64('2024-05-01T00:00:00', 'us') + seconds.astype('timedelta64[s]')
+    }
+
+
+def test_latest_state():
+    rng = np.random.default_rng(9)
+    store = TrackStore(AISData)
+    state = LatestState(store, 'mmsi')
+
+    # 分批追加，每批只处理新追加的记录
+    update_ms = []
+    for _ in range(BATCHES):
+        store.append_columns(_batch(rng, POINTS // BATCHES))
+        start = time.perf_counter()
+        state.update()
+        update_ms.append((time.perf_counter() - start) * 1000)
+    assert state.size == POINTS
+
+    latest = state.latest_rows()
+    assert latest.tolist() == _expected_latest(store)
+    assert state.entity_count == len(latest) == len(set(store.column('mmsi').tolist()))
+
+    # 一次建立与分批更新的结果相同
+    assert np.array_equal(LatestState(store, 'mmsi').latest_rows(), latest)
+
+    now = datetime(2024, 5, 1, 12)
+    times = store.raw('timestamp')[latest]
+    oldest = np.datetime64(now - timedelta(hours=6), 'us').astype(np.int64)
+    assert state.online_count(6 * 3600, now) == int(np.count_nonzero(times > oldest))
+
+    inside = state.latest_rows(bbox=(170, -10, -170, 10))
+    lon, lat = store.raw('longitude')[inside], store.raw('latitude')[inside]
+    assert len(inside) and ((lon >= 170) | (lon <= -170)).all() and (np.abs(lat) <= 10).all()
+    print(f"{POINTS} 条记录 {state.entity_count} 个目标: 每批 {POINTS // BATCHES} 条平均更新 "
+          f"{np.mean(update_ms):.1f} ms")
+
+
+def test_copy_and_merge():
+    rng = np.random.default_rng(10)
+    parts = [TrackStore(AISData) for _ in range(3)]
+    for part in parts:
+        part.append_columns(_batch(rng, 50000))
+    states = [LatestState(part, 'mmsi') for part in parts]
+
+    # 拷贝到存储的拷贝上，追加记录后只处理新行
+    grown = parts[0].copy()
+    copied = states[0].copy(grown)
+    grown.append_columns(_batch(rng, 20000))
+    copied.update()
+    assert copied.latest_rows().tolist() == _expected_latest(grown)
+    assert states[0].size == len(parts[0])
+
+    # 各部分的最新状态合并（同一目标出现在多个部分、时间戳相同时以后面的部分为准）
+    parts[0] = grown
+    states[0] = copied
+    store = TrackStore.concat(AISData, parts)
+    merged = LatestState.merge(store, 'mmsi', states)
+    full = LatestState(store, 'mmsi')
+    assert merged.size == len(store)
+    assert np.array_equal(merged.rows, full.rows) and np.array_equal(merged.times, full.times)
+    assert merged.latest_rows().tolist() == _expected_latest(store)
+
+
+def test_latest_endpoint():
+    client = server.app.test_client()
+    ais_store = TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+    adsb_store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    try:
+        server.processed_data = {'metadata': {}, 'ais_data': ais_store, 'adsb_data': adsb_store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        server.data_processor.latest_states = {'ais': LatestState(ais_store, 'mmsi'),
+                                               'adsb': LatestState(adsb_store, 'aircraft_id')}
+
+        response = client.get('/api/state/latest').get_json()
+        assert response['success']
+        assert response['counts'] == {'ais': len(set(ais_store.column('mmsi').tolist())),
+                                      'adsb': len(set(adsb_store.column('aircraft_id').tolist()))}
+        vessels = [record['mmsi'] for record in response['ais_data']]
+        assert len(vessels) == len(set(vessels)) < len(ais_store)
+
+        # 每个目标返回的记录是其时间最新的记录
+        newest = {}
+        for record in ais_store.to_dicts():
+            moment = datetime.fromisoformat(record['timestamp'])
+            newest[record['mmsi']] = max(newest.get(record['mmsi'], moment), moment)
+        assert all(datetime.fromisoformat(record['timestamp']) == newest[record['mmsi']]
+                   for record in response['ais_data'])
+
+        # 状态汇总按目标统计
+        summary = server.data_processor._status_summary()
+        assert summary['ais_entities'] == response['counts']['ais']
+        assert summary['online_ais'] + summary['offline_ais'] == summary['ais_entities']
+
+        detail = client.get('/api/clusters', query_string={
+            'z': Config.CLUSTER_POINT_ZOOM + 1, 'bbox': '-180,-90,180,90', 'types': 'ais', 'latest': 'true'})
+        assert detail.get_json()['counts'] == {'ais': response['counts']['ais']}
+
+        assert client.get('/api/state/latest', query_string={'types': 'boats'}).status_code == 400
+        print(f"最新状态: AIS {response['counts']['ais']} 个目标（共 {len(ais_store)} 条记录）, "
+              f"ADS-B {response['counts']['adsb']} 个目标")
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.latest_states = {}
+
+
+if __name__ == "__main__":
+    test_latest_state()
+    test_copy_and_merge()
+    test_latest_endpoint()
+    print("最新状态索引测试通过")
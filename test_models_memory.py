@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+记录模型内存基准脚本 - 对比__slots__+枚举字段驻留的AISData/ADSData与普通dataclass的内存占用与序列化耗时，并验证高基数标识不驻留
+"""
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, fields, make_dataclass
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.ais_decoder import AISDecoder
+from backend.adsb_processor import ADSBProcessor
+from backend.config import Config
+from backend.models import AISData, ADSData
+
+# 样例数据重复的份数
+REPEAT = 20
+
+
+def _legacy_class(record_class):
+    """与记录模型字段相同的普通dataclass（无__slots__、不驻留字符串、asdict序列化）"""
+    return make_dataclass('Legacy' + record_class.__name__, [(f.name, f.type, f) for f in fields(record_class)])
+
+
+def _fresh(value):
+    """复制字符串，模拟逐行解析时每行得到独立的字符串对象"""
+    return ''.join(list(value)) if isinstance(value, str) else value
+
+
+def _measure(record_class, rows):
+    """构造全部记录，返回 (记录占用字节数, 序列化耗时秒)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [record_class(*[_fresh(value) for value in row]) for row in rows]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    if hasattr(record_class, 'to_dict'):
+        for record in records:
+            record.to_dict()
+    else:
+        for record in records:
+            result = asdict(record)
+            result['timestamp'] = record.timestamp.isoformat()
+    return used, time.perf_counter() - start
+
+
+def _benchmark(record_class, records):
+    names = [f.name for f in fields(record_class)]
+    rows = [[getattr(record, name) for name in names] for record in records] * REPEAT
+
+    legacy_bytes, legacy_seconds = _measure(_legacy_class(record_class), rows)
+    slotted_bytes, slotted_seconds = _measure(record_class, rows)
+    print(f"{record_class.__name__} x{len(rows)}: "
+          f"内存 {legacy_bytes / len(rows):.0f} -> {slotted_bytes / len(rows):.0f} 字节/条 "
+          f"({legacy_bytes / slotted_bytes:.1f}x), "
+          f"序列化 {legacy_seconds * 1000:.0f} -> {slotted_seconds * 1000:.0f} ms "
+          f"({legacy_seconds / slotted_seconds:.1f}x)")
+    return legacy_bytes / slotted_bytes
+
+
+def test_intern_enum_fields_only():
+    """只驻留枚举类字段；MMSI、船名、航班号等高基数标识保持原字符串对象，不进入驻留表"""
+    record = AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE))[0]
+    names = [f.name for f in fields(AISData)]
+    values = {name: _fresh(getattr(record, name)) for name in names}
+    copy = AISData(**values)
+    for name in ('mmsi', 'vessel_name', 'imo', 'call_sign'):
+        assert getattr(copy, name) is values[name]
+    for name in ('nav_status', 'vessel_type', 'data_type', 'data_status', 'status', 'cleaning_notes', 'cargo',
+                 'transceiver_class'):
+        assert getattr(copy, name) is sys.intern(values[name])
+
+    aircraft = ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE))[0]
+    aircraft_id = _fresh(aircraft.aircraft_id)
+    copy = ADSData(**dict({f.name: getattr(aircraft, f.name) for f in fields(ADSData)}, aircraft_id=aircraft_id))
+    assert copy.aircraft_id is aircraft_id and copy.data_status is sys.intern(aircraft.data_status)
+
+
+def test_ais_record_memory():
+    records = AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE))
+    assert not hasattr(records[0], '__dict__') or sys.version_info < (3, 10)
+    # 样例数据重复多份，高基数标识不驻留时每份各占一份字符串
+    assert _benchmark(AISData, records) > 1.5
+
+
+def test_adsb_record_memory():
+    records = ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE))
+    assert _benchmark(ADSData, records) > 1.5
+
+
+if __name__ == "__main__":
+    test_intern_enum_fields_only()
+    test_ais_record_memory()
+    test_adsb_record_memory()
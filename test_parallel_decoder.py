@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+并行解码一致性测试脚本 - 验证极小分块下并行解码与串行解码的记录、顺序与清洗统计一致，
+包括跨分块的多片段静态报文、交错信道与序列号的多片段消息，以及静态信息的逐字段补全
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.csv_loader import build_records
+from backend.models import AISData, ADSData
+from backend.parallel_decoder import ParallelFileDecoder
+from conftest import encode_nmea
+
+
+def _comparable(record):
+    """NMEA记录的时间戳取解码时刻，不参与比较"""
+    fields = record.to_dict()
+    if not record.base_date_time:
+        fields.pop('timestamp')
+    return fields
+
+
+def _records(record_class, chunks):
+    """并行解码产出的列数据逐块构造为记录对象"""
+    return [record for columns in chunks
+            for record in build_records(record_class, columns, len(next(iter(columns.values()))))]
+
+
+def _assert_ais_parity(file_path, chunk_size):
+    serial = AISDecoder()
+    expected = [_comparable(record) for record in serial.decode_ais_file(str(file_path))]
+    parallel = ParallelFileDecoder(max_workers=2, chunk_size=chunk_size)
+    actual = [_comparable(record) for record in _records(AISData, parallel.iter_ais_columns(str(file_path)))]
+
+    assert len(actual) == len(expected)
+    for index, (left, right) in enumerate(zip(actual, expected)):
+        assert left == right, f"第 {index} 条记录不一致: {left} != {right}"
+    assert parallel.get_cleaning_stats() == serial.get_cleaning_stats()
+    assert parallel.vessel_static == serial.vessel_static
+    return expected
+
+
+def test_nmea_parity_on_sample_file():
+    """样例NMEA文件：每个分块只有几行，多片段静态报文大多跨越分块"""
+    for chunk_size in (160, 1000, 1 << 20):
+        records = _assert_ais_parity(Config.AIS_NMEA_FILE, chunk_size)
+    completed = [record for record in records if record['call_sign'] != 'unknown']
+    assert completed, "样例文件中应有由静态报文补全的位置记录"
+    print(f"NMEA样例文件: {len(records)} 条记录一致，其中 {len(completed)} 条由静态信息补全")
+
+
+def test_nmea_parity_interleaved():
+    """交错信道与序列号的多片段消息，后续片段位于下一分块的中间（不在分块开头）"""
+    static = {'type': 5, 'mmsi': 366000001, 'shipname': 'PARALLEL TEST', 'callsign': 'WXYZ',
+              'ship_type': 70, 'to_bow': 100, 'to_stern': 20, 'to_port': 10, 'to_starboard': 8}
+    report = {'type': 1, 'mmsi': 366000001, 'status': 0, 'speed': 10.0, 'lon': -122.4, 'lat': 37.8,
+              'course': 90.0, 'heading': 90}
+    other = dict(report, mmsi=366000002, lat=37.9)
+
+    lines = []
+    for n in range(6):
+        sequence_id = n % 4
+        first_a, second_a = encode_nmea(dict(static, mmsi=366000001 + n % 2), 'A', sequence_id)
+        first_b, second_b = encode_nmea(dict(static, shipname=f'SHIP {n}', mmsi=366000003), 'B', sequence_id)
+        # A、B两条多片段消息交错，中间夹有位置报告
+        lines += [first_a, encode_nmea(report)[0], first_b, encode_nmea(other)[0],
+                  second_b, encode_nmea(dict(report, mmsi=366000003))[0], second_a, encode_nmea(other)[0]]
+    # 文件末尾的孤立首片段计入孤立消息统计
+    lines.append(encode_nmea(static, 'A', 9)[0])
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = Path(directory) / 'interleaved.txt'
+        file_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        for chunk_size in (50, 120, 300):
+            records = _assert_ais_parity(file_path, chunk_size)
+
+    assert records[-1]['vessel_name'] == 'PARALLEL TEST' and records[-1]['length'] == 120.0
+
+
+def test_csv_parity():
+    for decoder_name, file_path in (('ais', Config.AIS_CSV_FILE), ('adsb', Config.ADSB_JSONL_FILE),
+                                    ('adsb', Config.ADSB_CSV_FILE)):
+        if decoder_name == 'ais':
+            _assert_ais_parity(file_path, 4096)
+            continue
+        serial = ADSBProcessor()
+        expected = [record.to_dict() for record in serial.process_adsb_file(str(file_path))]
+        parallel = ParallelFileDecoder(max_workers=2, chunk_size=4096)
+        actual = [record.to_dict() for record in _records(ADSData, parallel.iter_adsb_columns(str(file_path)))]
+        assert actual == expected
+        assert parallel.get_cleaning_stats() == serial.get_cleaning_stats()
+
+
+if __name__ == "__main__":
+    test_nmea_parity_on_sample_file()
+    test_nmea_parity_interleaved()
+    test_csv_parity()
+    print("并行解码一致性测试通过")
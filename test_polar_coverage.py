@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+ADS-B接收机极坐标覆盖图测试脚本 - 验证JSONL的range_nm/bearing_deg/altitude_is_gnss字段保留在记录中、
+各扇区与高度层的最远距离和报文数与直接统计一致、增量合并与一次性统计一致、接收机位置估计，
+以及覆盖图层与/api/adsb/polar接口
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.cache_segments import SourceSegment
+from backend.config import Config
+from backend.data_processor import DataProcessor, MergedSummary
+from backend.ingest_checkpoint import FileCheckpoint
+from backend.models import AISData, ADSData
+from backend.polar_coverage import PolarCoverage, destination
+from backend.track_store import TrackStore
+
+BANDS = Config.POLAR_ALTITUDE_BANDS
+
+
+def _sample_store():
+    return TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+
+
+def _segment(store, name='ADSB.jsonl'):
+    summary = {'count': len(store), 'by_status': {}, 'online': 0, 'bounds': None}
+    return SourceSegment('adsb', f'/data/{name}', 'jsonl', store, FileCheckpoint(name, 'jsonl'), {}, {}, summary)
+
+
+def _synthetic_store(rng, size, center=(10.0, 50.0)):
+    """围绕center处接收机的随机飞机位置（按距离、方位反推经纬度），约十分之一的记录没有距离"""
+    distance = rng.uniform(0, 200, size)
+    bearing = rng.uniform(0, 360, size)
+    lon, lat = destination(center[0], center[1], np.radians(bearing), distance)
+    distance[rng.random(size) < 0.1] = -1.0
+    store = TrackStore(ADSData)
+    store.append_columns({
+        'aircraft_id': ['ABC123'] * size, 'latitude': lat, 'longitude': lon,
+        'altitude_ft': rng.uniform(-500, 45000, size), 'ground_speed_kts': np.zeros(size), 'heading_deg': np.zeros(size),
+        'aircraft_tail': ['N123'] * size,
+        'timestamp': np.full(size, np.datetime64('2024-05-01T00:00:00', 'us')),
+        'range_nm': distance, 'bearing_deg': bearing
+    })
+    return store
+
+
+def test_fields_kept():
+    store = _sample_store()
+    distance, bearing = store.raw('range_nm'), store.raw('bearing_deg')
+    assert (distance >= 0).all() and ((bearing >= 0) & (bearing < 360)).all()
+    record = store.to_dicts(range(1))[0]
+    assert {'range_nm', 'bearing_deg', 'altitude_is_gnss'} <= set(record)
+    assert isinstance(record['altitude_is_gnss'], bool)
+
+
+def test_matches_direct_statistics():
+    rng = np.random.default_rng(11)
+    store = _synthetic_store(rng, 100000)
+    polar = PolarCoverage(Config.POLAR_SECTOR_DEGREES, BANDS)
+    polar.update(store)
+
+    distance, bearing, altitude = store.raw('range_nm'), store.raw('bearing_deg'), store.raw('altitude_ft')
+    known = distance >= 0
+    sector = (bearing // Config.POLAR_SECTOR_DEGREES).astype(int)
+    band = np.maximum(np.searchsorted(BANDS, altitude, side='right') - 1, 0)
+    for b in range(len(BANDS)):
+        for s in range(polar.sectors):
+            cell = known & (band == b) & (sector == s)
+            assert polar.counts[b, s] == np.count_nonzero(cell)
+            assert polar.max_range[b, s] == (distance[cell].max() if cell.any() else 0)
+    assert polar.total == np.count_nonzero(known)
+
+    # 接收机位置估计接近真实位置
+    lon, lat = polar.receiver_position
+    assert abs(lon - 10.0) < 0.2 and abs(lat - 50.0) < 0.2
+
+    # 轮廓闭合，每个扇区两个顶点，顶点到接收机的距离为该扇区的最远距离
+    ring = polar.outline()
+    assert len(ring) == 2 * polar.sectors + 1 and ring[0] == ring[-1]
+    assert len(polar.outline(0)) == len(ring)
+
+
+def test_incremental_update():
+    rng = np.random.default_rng(12)
+    full = _synthetic_store(rng, 30000)
+    incremental = TrackStore(ADSData)
+    polar = PolarCoverage(Config.POLAR_SECTOR_DEGREES, BANDS)
+    for start in range(0, len(full), 7000):
+        rows = np.arange(start, min(start + 7000, len(full)))
+        incremental.extend(full.take(rows))
+        polar.update(incremental)
+    copy = polar.copy()
+
+    expected = PolarCoverage(Config.POLAR_SECTOR_DEGREES, BANDS)
+    expected.update(full)
+    for result in (polar, copy):
+        assert np.array_equal(result.counts, expected.counts)
+        assert np.array_equal(result.max_range, expected.max_range)
+        assert np.allclose(result.receiver_position, expected.receiver_position)
+    assert polar.size == len(full)
+
+
+def test_sample_receiver():
+    store = _sample_store()
+    layers = DataProcessor()._create_coverage_layers(MergedSummary(AISData, ['nmea', 'csv'], []),
+                                                     MergedSummary(ADSData, ['jsonl', 'csv'], [_segment(store)]))
+    polar_layers = [layer for layer in layers if layer['resource_id'] == 'adsb_polar_ADSB.jsonl']
+    assert len(polar_layers) == 1
+    layer = polar_layers[0]
+    lon, lat = layer['metadata']['receiver_position']
+    assert abs(lon + 79.96) < 0.1 and abs(lat - 40.79) < 0.1
+    assert layer['polygons'] == [[layer['coordinates']]]
+    assert 100 < layer['metadata']['max_range_nm'] < 130
+    print(f"接收机位置 ({lat:.3f}, {lon:.3f}), 最远距离 {layer['metadata']['max_range_nm']} 海里")
+
+
+def test_polar_endpoint():
+    client = server.app.test_client()
+    store = _sample_store()
+    segments = server.data_processor.segments
+    try:
+        server.processed_data = {'metadata': {}, 'ais_data': TrackStore(AISData), 'adsb_data': store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        segment = _segment(store)
+        server.data_processor.segments = {segment.path: segment}
+
+        data = client.get('/api/adsb/polar').get_json()
+        assert data['success'] and len(data['receivers']) == 1
+        receiver = data['receivers'][0]
+        assert receiver['receiver'] == 'ADSB.jsonl' and receiver['total'] == len(store)
+        assert len(receiver['altitude_bands']) == len(BANDS)
+        assert sum(sum(band['counts']) for band in receiver['altitude_bands']) == len(store)
+        assert receiver['outline'][0] == receiver['outline'][-1]
+
+        high = client.get('/api/adsb/polar', query_string={'receiver': 'ADSB.jsonl', 'band': 4}).get_json()
+        assert high['band'] == 4 and high['receivers'][0]['outline'] != receiver['outline']
+        assert client.get('/api/adsb/polar', query_string={'band': 9}).status_code == 400
+        assert client.get('/api/adsb/polar', query_string={'receiver': 'missing.jsonl'}).status_code == 404
+
+        # 配置实例上的覆盖值生效
+        server.config.POLAR_ALTITUDE_BANDS = [0, 20000]
+        server.config.POLAR_SECTOR_DEGREES = 30
+        data = client.get('/api/adsb/polar').get_json()
+        receiver = data['receivers'][0]
+        assert len(receiver['altitude_bands']) == 2 and len(receiver['altitude_bands'][0]['counts']) == 12
+        assert client.get('/api/adsb/polar', query_string={'band': 2}).status_code == 400
+    finally:
+        vars(server.config).pop('POLAR_ALTITUDE_BANDS', None)
+        vars(server.config).pop('POLAR_SECTOR_DEGREES', None)
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.segments = segments
+
+
+if __name__ == "__main__":
+    test_fields_kept()
+    test_matches_direct_statistics()
+    test_incremental_update()
+    test_sample_receiver()
+    test_polar_endpoint()
+    print("接收机极坐标覆盖图测试通过")
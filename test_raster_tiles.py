@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+密度栅格瓦片测试脚本 - 解码生成的PNG验证像素计数与着色、相邻瓦片拼接后点数守恒、
+内存与磁盘两级缓存及数据版本变化时的失效，以及/tiles/density接口
+"""
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.models import AISData, ADSData
+from backend.raster_tiles import BLUR_RADIUS, EMPTY_TILE, RasterTileCache, density_counts, render_density_tile
+from backend.spatial_index import GridIndex
+from backend.track_store import TrackStore
+from backend.vector_tiles import TILE_SIZE
+
+POINTS = 1000000
+
+
+def _decode_png(data):
+    """解码无滤波的8位RGBA PNG，返回 高 x 宽 x 4 数组"""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    position, idat, size = 8, b'', None
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        assert struct.unpack('>I', data[position + 8 + length:position + 12 + length])[0] == zlib.crc32(kind + body)
+        if kind == b'IHDR':
+            size = struct.unpack('>II', body[:8])
+            assert body[8:10] == b'\x08\x06'
+        elif kind == b'IDAT':
+            idat += body
+        position += 12 + length
+    width, height = size
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert (rows[:, 0] == 0).all()
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+def _store(rng, size):
+    zeros = np.zeros(size)
+    store = TrackStore(AISData)
+    store.append_columns({
+        'mmsi': ['1'] * size, 'latitude': np.clip(rng.normal(30, 10, size), -80, 80),
+        'longitude': rng.normal(120, 10, size), 'sog': zeros, 'cog': zeros, 'heading': zeros,
+        'nav_status': ['0'] * size, 'vessel_type': ['unknown'] * size,
+        'timestamp': np.full(size, np.datetime64('2024-05-01T00:00:00', 'us'))
+    })
+    return store
+
+
+def _inner(counts):
+    return counts[BLUR_RADIUS:BLUR_RADIUS + TILE_SIZE, BLUR_RADIUS:BLUR_RADIUS + TILE_SIZE]
+
+
+def test_render():
+    rng = np.random.default_rng(8)
+    store = _store(rng, POINTS)
+    sources = [(store, GridIndex(store.raw('longitude'), store.raw('latitude')))]
+
+    # z=0 瓦片包含全部点；4个z=1子瓦片拼接后点数不变
+    world = _inner(density_counts(sources, 0, 0, 0))
+    assert world.sum() == POINTS
+    children = sum(int(_inner(density_counts(sources, 1, x, y)).sum()) for x in range(2) for y in range(2))
+    assert children == POINTS
+
+    # 边缘像素来自相邻瓦片的范围
+    left, right = density_counts(sources, 4, 12, 6), density_counts(sources, 4, 13, 6)
+    assert np.array_equal(left[:, -BLUR_RADIUS:], right[:, BLUR_RADIUS:2 * BLUR_RADIUS])
+
+    start = time.perf_counter()
+    tile = render_density_tile(sources, 3, 6, 3, Config.DENSITY_TILE_SATURATION)
+    render_ms = (time.perf_counter() - start) * 1000
+    image = _decode_png(tile)
+    assert image.shape == (TILE_SIZE, TILE_SIZE, 4)
+    assert (image[..., 3] > 0).any() and (image[..., 3] == 0).any()
+
+    # 点数越多颜色越接近饱和色（alpha越大）
+    counts = _inner(density_counts(sources, 3, 6, 3))
+    dense, sparse = np.unravel_index(counts.argmax(), counts.shape), np.argwhere(counts == 1)[0]
+    assert image[dense][3] >= image[tuple(sparse)][3]
+    assert render_density_tile(sources, 3, 0, 0, Config.DENSITY_TILE_SATURATION) == EMPTY_TILE
+    print(f"{POINTS} 个点: 渲染瓦片 {render_ms:.1f} ms, PNG {len(tile)} 字节")
+
+
+def test_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RasterTileCache(Path(directory), 2, 3)
+        cache.set_version('v1')
+        for i in range(5):
+            cache.put((0, 0, i), bytes([i]))
+        assert cache.stats()['disk_files'] == 3
+        assert len(list((Path(directory) / 'v1').glob('*.png'))) == 3
+
+        # 内存LRU淘汰后从磁盘读取；磁盘超出上限时删除最久未使用的
+        assert cache.get((0, 0, 2)) == bytes([2]) and cache.disk_hits == 1
+        assert cache.get((0, 0, 0)) is None
+
+        # 磁盘命中的瓦片成为最近使用的，超出上限时淘汰最久未使用的
+        cache.put((0, 0, 5), bytes([5]))
+        assert cache._path((0, 0, 2)).exists() and not cache._path((0, 0, 3)).exists()
+
+        # 重启后按版本复用磁盘缓存
+        restarted = RasterTileCache(Path(directory), 2, 3)
+        restarted.set_version('v1')
+        assert restarted.get((0, 0, 4)) == bytes([4])
+
+        # 数据版本变化时删除旧版本
+        restarted.set_version('v2')
+        assert not (Path(directory) / 'v1').exists() and restarted.get((0, 0, 4)) is None
+
+
+def test_density_tile_endpoint():
+    client = server.app.test_client()
+    ais_store = TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+    adsb_store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    original, data_hash = server.density_tiles, server.data_processor.data_hash
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            server.density_tiles = RasterTileCache(Path(directory), 16, 16)
+            server.processed_data = {'metadata': {}, 'ais_data': ais_store, 'adsb_data': adsb_store,
+                                     'coverage_layers': [], 'status_summary': {}}
+            server.last_update_time = datetime.now()
+            server.data_processor.data_hash = 'test-version'
+            server.data_processor.spatial_indexes = {
+                kind: GridIndex(store.raw('longitude'), store.raw('latitude'))
+                for kind, store in (('ais', ais_store), ('adsb', adsb_store))}
+
+            response = client.get('/tiles/density/0/0/0.png')
+            assert response.status_code == 200 and response.mimetype == 'image/png'
+            assert (_decode_png(response.data)[..., 3] > 0).any()
+            assert client.get('/tiles/density/0/0/0.png',
+                              headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+            assert server.density_tiles.stats()['hits'] == 1
+
+            # 不同的过滤条件是不同的瓦片
+            ais_only = client.get('/tiles/density/0/0/0.png', query_string={'types': 'ais'})
+            assert ais_only.headers['ETag'] != response.headers['ETag']
+
+            assert client.get('/tiles/density/1/2/0.png').status_code == 400
+            assert client.get('/tiles/density/0/0/0.png', query_string={'types': 'boats'}).status_code == 400
+            print(f"密度瓦片: {len(response.data)} 字节, 缓存 {server.density_tiles.stats()}")
+    finally:
+        server.density_tiles = original
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.data_hash = data_hash
+        server.data_processor.spatial_indexes = {}
+
+
+if __name__ == "__main__":
+    test_render()
+    test_cache()
+    test_density_tile_endpoint()
+    print("密度栅格瓦片测试通过")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+预编码响应测试脚本 - 验证/api/data按数据版本只编码一次，支持gzip压缩与ETag/Last-Modified条件请求
+"""
+import gzip
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.config import Config
+from backend.models import ADSData
+from backend.track_store import TrackStore
+
+
+def _use_data(data_hash: str, last_update: datetime):
+    """直接设置服务端的处理结果（不经过数据处理）"""
+    store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    server.processed_data = {'metadata': {'adsb_count': len(store)}, 'ais_data': TrackStore(store.record_class),
+                             'adsb_data': store, 'coverage_layers': [], 'status_summary': {}}
+    server.data_processor.data_hash = data_hash
+    server.last_update_time = last_update
+
+
+def test_encoded_data_responses():
+    client = server.app.test_client()
+    try:
+        last_update = datetime.now() - timedelta(minutes=5)
+        _use_data('version-1', last_update)
+        encodes = server.data_responses.metrics()['encodes']
+
+        plain = client.get('/api/data', headers={'Accept-Encoding': 'identity'})
+        assert plain.status_code == 200 and plain.headers.get('Content-Encoding') is None
+        body = json.loads(plain.data)
+        assert body['success'] and len(body['data']['adsb_data']) == body['metadata']['adsb_count']
+
+        compressed = client.get('/api/data', headers={'Accept-Encoding': 'gzip, deflate'})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(compressed.data) == plain.data
+        assert compressed.headers['ETag'] != plain.headers['ETag']
+        assert 'Accept-Encoding' in compressed.headers['Vary']
+
+        # 条件请求：ETag或Last-Modified未变化时返回304
+        assert client.get('/api/data', headers={'Accept-Encoding': 'gzip',
+                                                'If-None-Match': compressed.headers['ETag']}).status_code == 304
+        assert client.get('/api/data', headers={'If-Modified-Since': plain.headers['Last-Modified']}).status_code == 304
+        assert server.data_responses.metrics()['encodes'] == encodes + 1
+
+        # 数据版本变化后重新编码，旧ETag失效
+        _use_data('version-2', datetime.now())
+        refreshed = client.get('/api/data', headers={'If-None-Match': plain.headers['ETag']})
+        assert refreshed.status_code == 200
+
+        metrics = server.data_responses.metrics()
+        assert metrics['encodes'] == encodes + 2 and metrics['not_modified'] >= 2
+        assert metrics['bytes_saved'] > 0
+        print(f"响应体 {len(plain.data)} 字节，gzip {len(compressed.data)} 字节，"
+              f"编码 {metrics['last_encode_seconds'] * 1000:.0f} ms，累计节省 {metrics['bytes_saved']} 字节")
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.data_hash = None
+        server.data_responses.invalidate()
+
+
+if __name__ == "__main__":
+    test_encoded_data_responses()
+    print("预编码响应测试通过")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+二进制快照测试脚本 - 验证快照往返一致、列数组为映射内存视图、数据块损坏可被显式校验检出，并对比JSON缓存的加载耗时
+"""
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.models import AISData
+from backend.snapshot import SnapshotError, read_snapshot, verify_snapshot, write_snapshot
+from backend.track_store import TrackStore
+from conftest import benchmark
+
+# 基准测试中样例数据重复的份数
+REPEAT = 200
+
+
+def _sample_store() -> TrackStore:
+    store = TrackStore(AISData)
+    for columns in AISDecoder().iter_ais_columns(str(Config.AIS_CSV_FILE)):
+        store.append_columns(columns)
+    return store
+
+
+def test_snapshot_roundtrip():
+    directory = Path(tempfile.mkdtemp())
+    try:
+        store = _sample_store()
+        path = directory / 'ais.snap'
+        write_snapshot(path, store, {'source': 'AIS.csv'})
+
+        loaded, meta = read_snapshot(path, AISData)
+        assert meta == {'source': 'AIS.csv'}
+        assert loaded.to_dicts() == store.to_dicts()
+        # 列数组直接引用映射内存，不可写
+        assert not loaded.raw('latitude').flags.writeable
+
+        # 追加到加载的存储不影响映射内存
+        merged = loaded.copy()
+        merged.extend(store)
+        assert len(merged) == 2 * len(store) and len(loaded) == len(store)
+
+        # 数据块被改写：默认加载不读取数据块，显式校验时失败
+        verify_snapshot(path, AISData)
+        content = bytearray(path.read_bytes())
+        content[-1] ^= 0xFF
+        path.write_bytes(bytes(content))
+        read_snapshot(path, AISData)
+        for check in (lambda: read_snapshot(path, AISData, verify=True), lambda: verify_snapshot(path, AISData)):
+            try:
+                check()
+                raise AssertionError("损坏的快照应校验失败")
+            except SnapshotError as e:
+                print(f"检出损坏的快照: {e}")
+        # 校验结束即释放映射，文件可以删除
+        path.unlink()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@benchmark
+def test_snapshot_load_benchmark():
+    """快照加载与JSON缓存加载耗时对比"""
+    directory = Path(tempfile.mkdtemp())
+    try:
+        sample = _sample_store()
+        store = TrackStore.concat(AISData, [sample] * REPEAT)
+
+        json_path = directory / 'ais.json'
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(store.to_dicts(), f, ensure_ascii=False, indent=2)
+        start = time.perf_counter()
+        with open(json_path, 'r', encoding='utf-8') as f:
+            TrackStore.from_dicts(AISData, json.load(f))
+        json_seconds = time.perf_counter() - start
+
+        snapshot_path = directory / 'ais.snap'
+        write_snapshot(snapshot_path, store, {})
+        start = time.perf_counter()
+        loaded, _ = read_snapshot(snapshot_path, AISData)
+        snapshot_seconds = time.perf_counter() - start
+
+        assert np.array_equal(loaded.raw('timestamp'), store.raw('timestamp'))
+        print(f"{len(store)} 条记录: JSON {json_seconds * 1000:.0f} ms, 快照 {snapshot_seconds * 1000:.1f} ms "
+              f"({json_path.stat().st_size} -> {snapshot_path.stat().st_size} 字节)")
+        assert snapshot_seconds < json_seconds
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_snapshot_roundtrip()
+    test_snapshot_load_benchmark()
+    print("二进制快照测试通过")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+空间网格索引测试脚本 - 验证矩形查询与逐点判断一致（含跨越180°经线的矩形），并测量百万点规模的查询耗时
+"""
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.config import Config
+from backend.models import AISData, ADSData
+from backend.spatial_index import GridIndex, parse_bbox
+from backend.track_store import TrackStore
+
+POINTS = 1000000
+
+
+def _brute_force(lon, lat, west, south, east, north):
+    in_lon = (lon >= west) & (lon <= east) if west <= east else (lon >= west) | (lon <= east)
+    return np.flatnonzero(in_lon & (lat >= south) & (lat <= north))
+
+
+def test_grid_index_queries():
+    rng = np.random.default_rng(7)
+    lon = rng.uniform(-180, 180, POINTS)
+    lat = rng.uniform(-85, 85, POINTS)
+    lon[:1000] = np.nan  # 无效坐标不入索引
+
+    start = time.perf_counter()
+    index = GridIndex(lon, lat)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    boxes = [(116.0, 39.5, 117.0, 40.5), (-10.0, -10.0, 10.0, 10.0),
+             (179.5, -5.0, -179.5, 5.0), (170.0, 60.0, -170.0, 70.0), (-180.0, -90.0, 180.0, 90.0)]
+    for box in boxes:
+        assert np.array_equal(index.query(*box), _brute_force(lon, lat, *box)), box
+
+    # 地图视图大小的矩形查询耗时
+    timings = []
+    for west, south in zip(rng.uniform(-179, 178, 200), rng.uniform(-80, 78, 200)):
+        start = time.perf_counter()
+        index.query(west, south, west + 0.5, south + 0.5)
+        timings.append(time.perf_counter() - start)
+    median_ms = float(np.median(timings)) * 1000
+    print(f"{POINTS} 个点: 建索引 {build_ms:.0f} ms, {index.ncols}x{index.nrows} 网格, 查询中位数 {median_ms:.3f} ms")
+    assert median_ms < 1
+
+
+def test_parse_bbox():
+    assert parse_bbox(-200, -95, 200, 95) == [-180.0, -90.0, 180.0, 90.0]
+    assert parse_bbox(170, 0, 190, 10) == [170.0, 0.0, -170.0, 10.0]
+    assert parse_bbox('a', 0, 1, 1) is None
+    assert parse_bbox(0, 10, 1, 5) is None
+
+
+def test_bbox_endpoint():
+    client = server.app.test_client()
+    store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    try:
+        server.processed_data = {'metadata': {}, 'ais_data': TrackStore(AISData), 'adsb_data': store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        server.data_processor.spatial_indexes = {
+            'ais': GridIndex(np.zeros(0), np.zeros(0)),
+            'adsb': GridIndex(store.raw('longitude'), store.raw('latitude'))
+        }
+
+        lon, lat = store.raw('longitude'), store.raw('latitude')
+        west, east = float(np.median(lon)), float(lon.max())
+        south, north = float(lat.min()), float(np.median(lat))
+        response = client.get('/api/data/bbox', query_string={
+            'west': west, 'south': south, 'east': east, 'north': north, 'types': 'adsb', 'limit': 20}).get_json()
+        expected = _brute_force(lon, lat, west, south, east, north)
+        assert response['counts'] == {'adsb': len(expected)}
+        assert response['adsb_data'] == store.to_dicts(expected[:20])
+        assert response['truncated'] == (len(expected) > 20) and 'ais_data' not in response
+
+        assert client.get('/api/data/bbox', query_string={'west': 1, 'south': 2}).status_code == 400
+        assert client.get('/api/data/bbox', query_string={
+            'west': 0, 'south': 0, 'east': 1, 'north': 1, 'types': 'ships'}).status_code == 400
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.spatial_indexes = {}
+
+
+if __name__ == "__main__":
+    test_grid_index_queries()
+    test_parse_bbox()
+    test_bbox_endpoint()
+    print("空间网格索引测试通过")
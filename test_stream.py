@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+位置更新推送测试脚本 - 验证订阅者队列按目标合并、超出容量时丢弃最早的目标、按矩形/数据类型/船舶类型过滤，
+推送的变更跨版本连续（日志不再保留时通知重新获取）、/api/stream的SSE消息与推送统计，
+以及数据文件追加内容后由后台摄取推送给订阅者
+"""
+import json
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.ais_decoder import AISDecoder
+from backend.change_log import ChangeLog
+from backend.config import Config
+from backend.data_processor import DataProcessor
+from backend.latest_state import LatestState
+from backend.models import AISData, ADSData
+from backend.raster_tiles import RasterTileCache
+from backend.stream import StreamFilter, StreamHub, Subscriber
+from backend.track_store import TrackStore
+from conftest import restore_config, use_directory
+
+
+def _sample_store():
+    return TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+
+
+def _record(change_log, ais_store, adsb_store):
+    change_log.record({'ais': LatestState(ais_store, 'mmsi'), 'adsb': LatestState(adsb_store, 'aircraft_id')})
+    return {'ais_data': ais_store, 'adsb_data': adsb_store}
+
+
+def _moved(store, entities):
+    """为entities中的每个目标追加一条更晚的记录"""
+    mmsi = store.column('mmsi')
+    rows = [int(np.flatnonzero(mmsi == entity)[-1]) for entity in entities]
+    later = [dict(record, timestamp=datetime.fromisoformat(record['timestamp']).replace(year=2030))
+             for record in store.to_dicts(rows)]
+    moved = store.copy()
+    moved.extend(TrackStore.from_dicts(AISData, later))
+    return moved
+
+
+def _parse_sse(chunk):
+    event, data = None, None
+    for line in chunk.strip().split('\n'):
+        if line.startswith('event: '):
+            event = line[len('event: '):]
+        elif line.startswith('data: '):
+            data = json.loads(line[len('data: '):])
+    return event, data
+
+
+def test_subscriber_queue():
+    subscriber = Subscriber(StreamFilter(['ais']), 3)
+    subscriber.offer(('ais', 'A'), {'n': 1})
+    subscriber.offer(('ais', 'A'), {'n': 2})
+    assert subscriber.depth == 1 and subscriber.coalesced == 1
+    for entity in 'BCD':
+        subscriber.offer(('ais', entity), {'n': 0})
+    # 容量为3：最早的目标A被丢弃
+    assert subscriber.depth == 3 and subscriber.dropped == 1
+    resync, events = subscriber.drain(0)
+    assert not resync and [key[1] for key, _ in events] == ['B', 'C', 'D']
+    assert subscriber.depth == 0 and subscriber.delivered == 3
+
+    # 没有事件时等待至超时
+    assert subscriber.drain(0.01) == (False, [])
+    subscriber.request_resync()
+    assert subscriber.drain(0) == (True, [])
+
+
+def test_publish_changes():
+    store = _sample_store()
+    adsb_store = TrackStore(ADSData)
+    entities = sorted(set(store.column('mmsi').tolist()))
+    lon, lat = store.raw('longitude'), store.raw('latitude')
+    bbox = (float(np.median(lon)), float(lat.min()), float(lon.max()), float(lat.max()))
+    vessel_type = store.column('vessel_type')[0]
+
+    change_log = ChangeLog(1000000)
+    hub = StreamHub(10, 100000)
+    data = _record(change_log, store, adsb_store)
+    everything = hub.subscribe(StreamFilter(['ais', 'adsb']))
+    boxed = hub.subscribe(StreamFilter(['ais'], bbox))
+    typed = hub.subscribe(StreamFilter(['ais'], vessel_types=[vessel_type]))
+    aircraft = hub.subscribe(StreamFilter(['adsb']))
+
+    # 首次推送全部目标
+    assert hub.publish_changes(change_log) == len(entities)
+    assert everything.depth == len(entities) and aircraft.depth == 0
+    state = LatestState(store, 'mmsi')
+    latest = state.rows[state.rows >= 0]
+    inside = (lon[latest] >= bbox[0]) & (lat[latest] >= bbox[1])
+    assert 0 < boxed.depth == np.count_nonzero(inside) < len(entities)
+    assert 0 < typed.depth == np.count_nonzero(store.column('vessel_type')[latest] == vessel_type)
+    _, events = everything.drain(0)
+    assert {key[1] for key, _ in events} == set(entities)
+    assert all(record['mmsi'] == key[1] for key, record in events)
+
+    # 下一版本只推送变化的目标；未取走的旧更新与新更新合并
+    moved = _moved(store, entities[:2])
+    data = _record(change_log, moved, adsb_store)
+    depth = boxed.depth
+    assert hub.publish_changes(change_log) == 2
+    _, events = everything.drain(0)
+    assert sorted(key[1] for key, _ in events) == entities[:2]
+    assert all(record['timestamp'].startswith('2030') for _, record in events)
+    inside_entities = set(store.column('mmsi')[latest[inside]].tolist())
+    assert boxed.depth == depth and boxed.coalesced == len(inside_entities & set(entities[:2]))
+    assert hub.publish_changes(change_log) == 0
+
+    # 推送时取变更日志中最新版本的变更，行号按该版本的存储取记录（不是调用方此前持有的数据）
+    newer = _moved(moved, entities[2:3])
+    _record(change_log, newer, adsb_store)
+    assert hub.publish_changes(change_log) == 1 and hub.version == change_log.version
+    _, events = everything.drain(0)
+    assert [key[1] for key, _ in events] == entities[2:3] and events[0][1]['timestamp'].startswith('2030')
+
+    # 推送落后于变更日志的保留范围时通知重新获取
+    small = ChangeLog(1)
+    _record(small, store, adsb_store)
+    data = _record(small, moved, adsb_store)
+    assert hub.publish_changes(small) == 0
+    assert everything.drain(0)[0] and aircraft.drain(0)[0]
+
+    stats = hub.stats()
+    assert stats['subscribers'] == 4 and stats['published'] == len(entities) + 3
+    hub.unsubscribe(everything)
+    assert hub.stats()['subscribers'] == 3 and hub.stats()['delivered'] == stats['delivered']
+    print(f"推送统计: { {name: value for name, value in hub.stats().items() if name != 'connections'} }")
+
+
+def test_stream_endpoint():
+    client = server.app.test_client()
+    store = _sample_store()
+    adsb_store = TrackStore(ADSData)
+    entities = sorted(set(store.column('mmsi').tolist()))
+    change_log, hub = server.data_processor.change_log, server.stream_hub
+    heartbeat = server.config.STREAM_HEARTBEAT_SECONDS
+    try:
+        server.data_processor.change_log = ChangeLog(Config.CHANGE_LOG_MAX_ENTRIES)
+        server.stream_hub = StreamHub(1, 100)
+        server.config.STREAM_HEARTBEAT_SECONDS = 0.05
+        server.processed_data = _record(server.data_processor.change_log, store, adsb_store)
+        server._publish_stream()
+
+        response = client.get('/api/stream', query_string={'types': 'ais'}, buffered=False)
+        assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+        chunks = (chunk.decode('utf-8') for chunk in response.response)
+        assert next(chunks).startswith('retry: ')
+        event, hello = _parse_sse(next(chunks))
+        assert event == 'hello' and hello['filter']['types'] == ['ais'] and hello['version'] == 1
+
+        # 已达订阅者上限
+        assert client.get('/api/stream').status_code == 503
+        assert client.get('/api/stream', query_string={'types': 'boats'}).status_code == 400
+
+        # 没有更新时发送心跳
+        assert next(chunks).startswith(':')
+
+        server.processed_data = _record(server.data_processor.change_log, _moved(store, entities[:3]), adsb_store)
+        server._publish_stream()
+        event, positions = _parse_sse(next(chunks))
+        assert event == 'positions' and positions['version'] == 2
+        assert sorted(record['mmsi'] for record in positions['ais_data']) == entities[:3]
+        assert positions['adsb_data'] == [] and positions['evicted'] == {'ais': [], 'adsb': []}
+
+        stats = client.get('/api/stream/stats').get_json()['stream']
+        assert stats['subscribers'] == 1 and stats['delivered'] == 3
+
+        # 断开连接后注销订阅者
+        response.close()
+        assert server.stream_hub.stats()['subscribers'] == 0
+    finally:
+        server.data_processor.change_log = change_log
+        server.stream_hub = hub
+        server.config.STREAM_HEARTBEAT_SECONDS = heartbeat
+        server.processed_data = None
+        server.last_update_time = None
+
+
+def test_background_ingest():
+    """数据文件追加内容后，后台摄取增量解码并把变化的目标推送给订阅者"""
+    directory = Path(tempfile.mkdtemp())
+    saved = {name: getattr(server, name) for name in ('data_processor', 'stream_hub', 'density_tiles')}
+    lines = Config.AIS_CSV_FILE.read_text(encoding='utf-8').splitlines(keepends=True)
+    original = use_directory(directory)
+    try:
+        Config.AIS_CSV_FILE.write_text(''.join(lines[:300]), encoding='utf-8')
+        server.data_processor = DataProcessor()
+        server.stream_hub = StreamHub(10, 100000)
+        server.density_tiles = RasterTileCache(Config.DENSITY_TILE_CACHE_DIR, 10, 10)
+
+        assert server.ingest_once() and not server.ingest_once()
+        first = server.processed_data
+        # 没有新增内容时手动更新不改变数据版本（响应缓存与瓦片版本仍有效）
+        updated = server.last_update_time
+        response = server.app.test_client().post('/api/data/update').get_json()
+        assert response['success'] and not response['changed']
+        assert server.processed_data is first and server.last_update_time == updated
+        subscriber = server.stream_hub.subscribe(StreamFilter(['ais']))
+        thread = server.start_background_ingest(0.05)
+
+        with open(Config.AIS_CSV_FILE, 'a', encoding='utf-8') as f:
+            f.writelines(lines[300:])
+        events = []
+        for _ in range(100):
+            events += subscriber.drain(0.1)[1]
+            if events:
+                break
+        server.stop_background_ingest()
+        thread.join(5)
+
+        assert not thread.is_alive() and server.processed_data is not first
+        assert len(server.processed_data['ais_data']) > len(first['ais_data'])
+        appended = set(TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(original['AIS_CSV_FILE'])))
+                       .column('mmsi')[len(first['ais_data']):].tolist())
+        assert events and {key[1] for key, _ in events} <= appended
+        assert all(key[0] == 'ais' and record is not None for key, record in events)
+        print(f"后台摄取推送 {len(events)} 个目标的更新")
+    finally:
+        server.stop_background_ingest()
+        restore_config(original)
+        for name, value in saved.items():
+            setattr(server, name, value)
+        server.processed_data = None
+        server.last_update_time = None
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_subscriber_queue()
+    test_publish_changes()
+    test_stream_endpoint()
+    test_background_ingest()
+    print("位置更新推送测试通过")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+流式解码测试脚本 - 验证AIS/ADS-B文件按需惰性解码（取出第一批时只读入文件开头）、
+按固定大小分批产出的记录与一次性解码的列表一致，以及流式汇总器按批累积后的统计与逐条统计一致
+"""
+import sys
+import tempfile
+from itertools import count
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.data_processor import StreamAccumulator
+from backend.models import AISData
+from backend.utils import iter_batches
+
+SOURCES = ((AISDecoder, AISDecoder.iter_ais_file, Config.AIS_NMEA_FILE),
+           (AISDecoder, AISDecoder.iter_ais_file, Config.AIS_CSV_FILE),
+           (ADSBProcessor, ADSBProcessor.iter_adsb_file, Config.ADSB_JSONL_FILE),
+           (ADSBProcessor, ADSBProcessor.iter_adsb_file, Config.ADSB_CSV_FILE))
+
+
+def _comparable(record):
+    """NMEA记录的时间戳取解码时刻，不参与比较"""
+    fields = record.to_dict()
+    if isinstance(record, AISData) and not record.base_date_time:
+        fields.pop('timestamp')
+    return fields
+
+
+def _repeated(directory, source, times):
+    """将样例文件的数据行重复times次（保留表头）"""
+    lines = source.read_text(encoding='utf-8').splitlines(keepends=True)
+    header = lines[:1] if source.suffix == '.csv' else []
+    path = Path(directory) / source.name
+    path.write_text(''.join(header) + ''.join(lines[len(header):]) * times, encoding='utf-8')
+    return path, len(lines) - len(header)
+
+
+def test_iter_batches():
+    assert [len(batch) for batch in iter_batches(range(250), 100)] == [100, 100, 50]
+    assert list(iter_batches([], 10)) == []
+    # 惰性切分：无限序列也可以只取前几批
+    assert next(iter_batches(count(), 3)) == [0, 1, 2]
+
+
+def test_lazy_decoding():
+    """取出第一批记录时只读入了文件的一部分"""
+    with tempfile.TemporaryDirectory() as directory:
+        for processor_class, iterate, source in SOURCES:
+            path, rows = _repeated(directory, source, 120)
+            processor = processor_class()
+            batches = iterate(processor, str(path), batch_size=100)
+            assert processor.cleaning_stats.total_records == 0, "调用时不应开始解码"
+            first = next(batches)
+            read = processor.cleaning_stats.total_records
+            assert len(first) == 100 and 0 < read < rows * 120, f"{source.name}: 已读入 {read} 行"
+            batches.close()
+            print(f"{source.name} x120: 取出第一批时读入 {read} / {rows * 120} 行")
+
+
+def test_batches_match_list():
+    for processor_class, iterate, source in SOURCES:
+        serial = processor_class()
+        expected = [_comparable(record) for record in iterate(serial, str(source))]
+        batched = processor_class()
+        batches = list(iterate(batched, str(source), batch_size=100))
+
+        assert batches and all(len(batch) == 100 for batch in batches[:-1]) and 0 < len(batches[-1]) <= 100
+        assert [_comparable(record) for batch in batches for record in batch] == expected
+        assert batched.get_cleaning_stats() == serial.get_cleaning_stats()
+
+    # 文件不存在时不产出记录
+    assert list(AISDecoder().iter_ais_file('missing.txt')) == []
+    assert list(ADSBProcessor().iter_adsb_file('missing.jsonl', batch_size=10)) == []
+
+
+def test_accumulator():
+    """按批累积的汇总与逐条统计一致"""
+    records = AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE))
+    accumulator = StreamAccumulator(AISData, Config.MAX_DATA_AGE_HOURS * 3600)
+    for batch in iter_batches(records, 128):
+        accumulator.add_records(batch)
+    summary = accumulator.summarize()
+
+    assert summary['count'] == accumulator.count == len(records)
+    for status in ('normal', 'warning', 'error'):
+        assert summary['by_status'][status] == sum(record.data_status == status for record in records)
+    lons = [record.longitude for record in records]
+    lats = [record.latitude for record in records]
+    assert summary['bounds'] == [min(lons), min(lats), max(lons), max(lats)]
+    assert accumulator.store.to_dicts(range(5)) == [record.to_dict() for record in records[:5]]
+
+
+if __name__ == "__main__":
+    test_iter_batches()
+    test_lazy_decoding()
+    test_batches_match_list()
+    test_accumulator()
+    print("流式解码测试通过")
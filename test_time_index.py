@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+时间索引测试脚本 - 验证时间范围查询与逐条比较结果一致，以及各数据接口的start/end过滤与按时间分页
+"""
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.models import AISData, ADSData
+from backend.spatial_index import GridIndex
+from backend.time_index import TimeIndex, TimeRangeError, parse_time, parse_time_range
+from backend.track_store import TrackStore
+
+POINTS = 1000000
+
+
+def test_time_index_query():
+    rng = np.random.default_rng(5)
+    timestamps = rng.integers(1_700_000_000_000_000, 1_700_086_400_000_000, POINTS)
+    timestamps[:1000] = timestamps[1000]  # 重复时间戳
+
+    start = time.perf_counter()
+    index = TimeIndex(timestamps)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    for time_range in ((None, None), (int(timestamps[1000]), int(timestamps[1000])),
+                       (1_700_040_000_000_000, 1_700_040_900_000_000), (None, 1_700_001_000_000_000),
+                       (1_700_086_000_000_000, None), (1_800_000_000_000_000, None)):
+        rows = index.query(time_range)
+        lo, hi = time_range
+        expected = np.ones(POINTS, dtype=bool)
+        if lo is not None:
+            expected &= timestamps >= lo
+        if hi is not None:
+            expected &= timestamps <= hi
+        assert np.array_equal(np.sort(rows), np.flatnonzero(expected)), time_range
+        assert (np.diff(timestamps[rows]) >= 0).all()
+        assert index.count(time_range) == len(rows)
+
+    window = (1_700_040_000_000_000, 1_700_040_900_000_000)
+    start = time.perf_counter()
+    index.query(window)
+    query_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    np.flatnonzero((timestamps >= window[0]) & (timestamps <= window[1]))
+    scan_ms = (time.perf_counter() - start) * 1000
+    print(f"{POINTS} 条时间戳: 建索引 {build_ms:.0f} ms, 15分钟窗口查询 {query_ms:.3f} ms（全表扫描 {scan_ms:.2f} ms）")
+
+
+def test_parse_time():
+    now = datetime(2024, 5, 1, 12, 0, 0)
+    microseconds = lambda moment: int(np.datetime64(moment, 'us').astype(np.int64))
+    assert parse_time(None) is None and parse_time('') is None
+    assert parse_time('2024-05-01T11:00:00') == microseconds(datetime(2024, 5, 1, 11))
+    assert parse_time('-15m', now) == microseconds(now - timedelta(minutes=15))
+    assert parse_time('-2h', now) == microseconds(now - timedelta(hours=2))
+    assert parse_time('1714560000') == microseconds(datetime.fromtimestamp(1714560000))
+    utc = datetime(2024, 5, 1, 3, tzinfo=timezone.utc)
+    assert parse_time('2024-05-01T03:00:00Z') == microseconds(utc.astimezone().replace(tzinfo=None))
+    for invalid in ('yesterday', 'nan', '-15x'):
+        try:
+            parse_time(invalid)
+            raise AssertionError(invalid)
+        except TimeRangeError:
+            pass
+    try:
+        parse_time_range('2024-05-02', '2024-05-01')
+        raise AssertionError('起始时间晚于结束时间')
+    except TimeRangeError:
+        pass
+
+
+def _in_range(store, start, end):
+    timestamps = store.raw('timestamp')
+    return np.flatnonzero((timestamps >= start) & (timestamps <= end))
+
+
+def test_time_range_endpoints():
+    client = server.app.test_client()
+    ais_store = TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+    adsb_store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    stores = {'ais': ais_store, 'adsb': adsb_store}
+    try:
+        server.processed_data = {'metadata': {'processing_time': datetime.now().isoformat()},
+                                 'ais_data': ais_store, 'adsb_data': adsb_store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        server.data_processor.spatial_indexes = {kind: GridIndex(store.raw('longitude'), store.raw('latitude'))
+                                                 for kind, store in stores.items()}
+        server.data_processor.time_indexes = {kind: TimeIndex(store.raw('timestamp'))
+                                              for kind, store in stores.items()}
+
+        # 取AIS时间戳的中间一段作为查询范围
+        times = np.sort(ais_store.raw('timestamp'))
+        start_us, end_us = int(times[len(times) // 4]), int(times[len(times) * 3 // 4])
+        start, end = (str(np.datetime64(value, 'us')) for value in (start_us, end_us))
+        expected = {kind: _in_range(store, start_us, end_us) for kind, store in stores.items()}
+        params = {'start': start, 'end': end}
+
+        data = client.get('/api/data', query_string=params).get_json()
+        assert data['counts'] == {kind: len(rows) for kind, rows in expected.items()}
+        assert 0 < data['counts']['ais'] < len(ais_store)
+        moments = [datetime.fromisoformat(record['timestamp']) for record in data['data']['ais_data']]
+        assert all(datetime.fromisoformat(start) <= moment <= datetime.fromisoformat(end) for moment in moments)
+
+        # 按时间分页：翻完所有页得到范围内的全部记录，时间升序
+        records = []
+        page = client.get('/api/data/ais', query_string=dict(params, limit=50)).get_json()
+        while True:
+            records.extend(page['records'])
+            if page['next_cursor'] is None:
+                break
+            page = client.get('/api/data/ais', query_string={'cursor': page['next_cursor'], 'limit': 50}).get_json()
+        assert len(records) == len(expected['ais'])
+        moments = [datetime.fromisoformat(record['timestamp']) for record in records]
+        assert moments == sorted(moments)
+
+        bbox = client.get('/api/data/bbox', query_string=dict(
+            params, west=-180, south=-90, east=180, north=90)).get_json()
+        assert bbox['counts'] == {kind: len(rows) for kind, rows in expected.items()}
+
+        clusters = client.get('/api/clusters', query_string=dict(params, z=3, bbox='-180,-90,180,90')).get_json()
+        assert clusters['total'] == sum(len(rows) for rows in expected.values())
+
+        stats = client.get('/api/data/stats', query_string=params).get_json()
+        assert stats['stats']['time_range']['counts'] == {kind: len(rows) for kind, rows in expected.items()}
+
+        assert client.get('/api/data', query_string={'start': 'yesterday'}).status_code == 400
+        assert client.get('/api/data/adsb', query_string={'start': end, 'end': start}).status_code == 400
+        print(f"时间范围 {start} ~ {end}: AIS {len(expected['ais'])} 条, ADS-B {len(expected['adsb'])} 条")
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.spatial_indexes = {}
+        server.data_processor.time_indexes = {}
+
+
+if __name__ == "__main__":
+    test_time_index_query()
+    test_parse_time()
+    test_time_range_endpoints()
+    print("时间索引测试通过")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+列式存储测试脚本 - 验证TrackStore与逐条数据对象的序列化结果一致
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.ais_decoder import AISDecoder
+from backend.adsb_processor import ADSBProcessor
+from backend.config import Config
+from backend.models import AISData, ADSData
+from backend.track_store import TrackStore
+
+
+def test_store_matches_records():
+    """按列追加与按记录追加得到的存储，序列化结果都与记录的to_dict()一致"""
+    for decoder, iter_columns, record_class, path in (
+            (AISDecoder(), 'iter_ais_columns', AISData, Config.AIS_CSV_FILE),
+            (ADSBProcessor(), 'iter_adsb_columns', ADSData, Config.ADSB_JSONL_FILE)):
+        column_store = TrackStore(record_class)
+        for columns in getattr(decoder, iter_columns)(str(path)):
+            column_store.append_columns(columns)
+
+        records = list(column_store.iter_records())
+        record_store = TrackStore.from_records(record_class, records)
+
+        expected = [record.to_dict() for record in records]
+        assert column_store.to_dicts() == expected
+        assert record_store.to_dicts() == expected
+        assert column_store.row(-1) == records[-1]
+        print(f"{path.name}: {len(column_store)} 条记录，列数组 {column_store.nbytes} 字节")
+
+
+def test_take_and_cache_roundtrip():
+    """子集与字典往返：take()保留取值表，from_dicts()还原的存储与原存储一致"""
+    store = TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_NMEA_FILE)))
+    dicts = store.to_dicts()
+    assert TrackStore.from_dicts(AISData, dicts).to_dicts() == dicts
+
+    mask = store.column('data_status') == 'normal'
+    subset = store.take(mask)
+    assert len(subset) == int(np.count_nonzero(mask))
+    assert subset.to_dicts() == [d for d, keep in zip(dicts, mask) if keep]
+
+    merged = TrackStore(AISData)
+    merged.extend(subset)
+    merged.extend(store.take(~mask))
+    assert len(merged) == len(store)
+
+
+if __name__ == "__main__":
+    test_store_matches_records()
+    test_take_and_cache_roundtrip()
+    print("列式存储测试通过")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+航迹测试脚本 - 验证批量Douglas-Peucker简化与逐条递归结果一致、航迹按目标分组并在时间间隔处断开，
+以及/api/tracks按缩放级别返回对应简化程度的航迹
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.adsb_processor import ADSBProcessor
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.models import AISData, ADSData
+from backend.track_store import TrackStore
+from backend.trajectories import TrackSet, build_track_sets, simplify
+
+VESSELS = 10000
+POSITIONS = 100
+
+
+def _douglas_peucker(x, y, tolerance):
+    """逐条递归的参考实现，返回保留点的下标"""
+    keep = {0, len(x) - 1}
+
+    def split(a, b):
+        if b - a < 2:
+            return
+        dx, dy = x[b] - x[a], y[b] - y[a]
+        length2 = dx * dx + dy * dy
+        best, farthest = -1.0, None
+        for i in range(a + 1, b):
+            px, py = x[i] - x[a], y[i] - y[a]
+            t = 0.0 if length2 == 0 else min(1.0, max(0.0, (px * dx + py * dy) / length2))
+            distance2 = (px - t * dx) ** 2 + (py - t * dy) ** 2
+            if distance2 > best:
+                best, farthest = distance2, i
+        if best > tolerance * tolerance:
+            keep.add(farthest)
+            split(a, farthest)
+            split(farthest, b)
+
+    split(0, len(x) - 1)
+    return sorted(keep)
+
+
+def test_simplify():
+    rng = np.random.default_rng(11)
+    lengths = [2, 3, 10, 57, 400]
+    x = np.concatenate([np.cumsum(rng.normal(0, 1, n)) for n in lengths])
+    y = np.concatenate([np.cumsum(rng.normal(0, 1, n)) for n in lengths])
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    keep = simplify(x, y, offsets, 1.5)
+    for a, b in zip(offsets[:-1], offsets[1:]):
+        assert np.flatnonzero(keep[a:b]).tolist() == _douglas_peucker(x[a:b], y[a:b], 1.5)
+
+
+def _fleet_store():
+    """VESSELS艘船各POSITIONS个随机游走位置（顺序打乱），每艘船中间有一段超过断开阈值的间隔"""
+    rng = np.random.default_rng(7)
+    mmsi = np.repeat(np.arange(VESSELS), POSITIONS)
+    seconds = np.tile(np.arange(POSITIONS) * 60, VESSELS)
+    seconds[np.tile(np.arange(POSITIONS) >= POSITIONS // 2, VESSELS)] += Config.TRACK_MAX_GAP_SECONDS * 2
+    lon = np.repeat(rng.uniform(100, 140, VESSELS), POSITIONS) + np.cumsum(rng.normal(0, 0.002, mmsi.size))
+    lat = np.repeat(rng.uniform(0, 40, VESSELS), POSITIONS) + np.cumsum(rng.normal(0, 0.002, mmsi.size))
+    shuffle = rng.permutation(mmsi.size)
+    zeros = np.zeros(mmsi.size)
+    store = TrackStore(AISData)
+    store.append_columns({
+        'mmsi': mmsi[shuffle].astype(str).tolist(), 'latitude': lat[shuffle], 'longitude': lon[shuffle],
+        'sog': zeros, 'cog': zeros, 'heading': zeros, 'nav_status': ['0'] * mmsi.size,
+        'vessel_type': ['unknown'] * mmsi.size,
+        'timestamp': np.datetime64('2024-05-01T00:00:00', 'us') + seconds[shuffle].astype('timedelta64[s]')
+    })
+    return store
+
+
+def test_track_set():
+    store = _fleet_store()
+    start = time.perf_counter()
+    tracks = TrackSet(store, 'mmsi', Config.TRACK_MAX_GAP_SECONDS, Config.TRACK_LOD_ZOOMS,
+                      Config.TRACK_TOLERANCE_PIXELS)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # 每艘船在间隔处断开为两条航迹，航迹内按时间排序
+    assert tracks.count == VESSELS * 2
+    assert (np.diff(tracks.offsets) == POSITIONS // 2).all()
+    assert sorted(set(tracks.ids.tolist())) == sorted(str(m) for m in range(VESSELS))
+    times = store.raw('timestamp')[tracks.rows]
+    inside = np.ones(len(times) - 1, dtype=bool)
+    inside[tracks.offsets[1:-1] - 1] = False
+    assert (np.diff(times)[inside] > 0).all()
+
+    # 缩放级别越小保留的点越少
+    kept = [int(tracks.levels[zoom].sum()) for zoom in Config.TRACK_LOD_ZOOMS]
+    assert kept == sorted(kept) and kept[0] < kept[-1] <= len(tracks.rows)
+    assert tracks.level_for(0) == Config.TRACK_LOD_ZOOMS[0]
+    assert tracks.level_for(Config.TRACK_LOD_ZOOMS[-1] + 1) is None
+
+    selected = tracks.select(entity='42')
+    assert len(selected) == 2
+    full = tracks.to_dicts('ais', selected, None)
+    assert [len(track['coordinates']) for track in full] == [POSITIONS // 2] * 2
+    print(f"{VESSELS * POSITIONS} 个位置: 建航迹 {build_ms:.0f} ms, {tracks.count} 条航迹, "
+          f"各层级保留点数 {dict(zip(Config.TRACK_LOD_ZOOMS, kept))}")
+
+
+def test_tracks_endpoint():
+    client = server.app.test_client()
+    ais_store = TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+    adsb_store = TrackStore.from_records(ADSData, ADSBProcessor().process_adsb_file(str(Config.ADSB_JSONL_FILE)))
+    try:
+        server.processed_data = {'metadata': {}, 'ais_data': ais_store, 'adsb_data': adsb_store,
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        server.data_processor.trajectories = build_track_sets(
+            {'ais': ais_store, 'adsb': adsb_store}, Config.TRACK_MAX_GAP_SECONDS, Config.TRACK_LOD_ZOOMS,
+            Config.TRACK_TOLERANCE_PIXELS)
+
+        coarse = client.get('/api/tracks', query_string={'z': 3}).get_json()
+        detail = client.get('/api/tracks', query_string={'z': 18}).get_json()
+        assert coarse['success'] and detail['success']
+        assert coarse['levels']['ais'] == Config.TRACK_LOD_ZOOMS[0] and detail['levels']['ais'] is None
+        assert coarse['counts'] == detail['counts'] and coarse['counts']['ais'] > 0
+        assert coarse['point_count'] <= detail['point_count']
+        for track in detail['tracks']:
+            assert len(track['coordinates']) == track['point_count']
+
+        first = detail['tracks'][0]
+        single = client.get('/api/tracks', query_string={'z': 18, 'types': first['type'], 'id': first['id']})
+        assert all(track['id'] == first['id'] for track in single.get_json()['tracks'])
+
+        # 时间范围裁剪航迹上的点
+        start = datetime.fromisoformat(first['start'])
+        clipped = client.get('/api/tracks', query_string={
+            'z': 18, 'types': first['type'], 'id': first['id'], 'start': first['start'],
+            'end': (start + timedelta(seconds=1)).isoformat()}).get_json()
+        assert all(len(track['coordinates']) <= len(first['coordinates']) for track in clipped['tracks'])
+
+        assert client.get('/api/tracks').status_code == 400
+        assert client.get('/api/tracks', query_string={'z': 3, 'bbox': '1,2'}).status_code == 400
+        print(f"缩放级别3: {len(coarse['tracks'])} 条航迹 {coarse['point_count']} 个点; "
+              f"缩放级别18: {detail['point_count']} 个点")
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.trajectories = {}
+
+
+if __name__ == "__main__":
+    test_simplify()
+    test_track_set()
+    test_tracks_endpoint()
+    print("航迹测试通过")
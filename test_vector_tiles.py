@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+矢量瓦片测试脚本 - 解码生成的MVT瓦片，验证要素与瓦片范围内的记录一致、低缩放级别抽稀，
+以及/tiles接口的缓存与ETag校验
+"""
+import struct
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend import app as server
+from backend.ais_decoder import AISDecoder
+from backend.config import Config
+from backend.models import AISData
+from backend.spatial_index import GridIndex
+from backend.track_store import TrackStore
+from backend.vector_tiles import EXTENT, TileCache, render_tile, tile_bounds
+
+
+def _read_varint(data, pos):
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _fields(data):
+    """逐个读取protobuf字段 (字段号, 取值)"""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"不支持的wire type: {wire_type}")
+        yield field, value
+
+
+def _packed(data):
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_tile(data):
+    """解码单图层瓦片，返回 (图层名, extent, 要素列表)，要素为 (id, x, y, 属性字典)"""
+    (field, layer), = list(_fields(data))
+    assert field == 3
+    name, extent, keys, values, raw_features = None, None, [], [], []
+    for field, value in _fields(layer):
+        if field == 1:
+            name = value.decode('utf-8')
+        elif field == 2:
+            raw_features.append(value)
+        elif field == 3:
+            keys.append(value.decode('utf-8'))
+        elif field == 4:
+            (value_field, raw), = list(_fields(value))
+            values.append({1: lambda v: v.decode('utf-8'), 3: lambda v: struct.unpack('<d', v)[0],
+                           6: _unzigzag, 7: bool}[value_field](raw))
+        elif field == 5:
+            extent = value
+        elif field == 15:
+            assert value == 2
+
+    features = []
+    for raw in raw_features:
+        feature = dict(_fields(raw))
+        assert feature[3] == 1
+        command, dx, dy = _packed(feature[4])
+        assert command == (1 | 1 << 3)
+        tags = _packed(feature.get(2, b''))
+        properties = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+        features.append((feature[1], _unzigzag(dx), _unzigzag(dy), properties))
+    return name, extent, features
+
+
+def _load_store():
+    return TrackStore.from_records(AISData, AISDecoder().decode_ais_file(str(Config.AIS_CSV_FILE)))
+
+
+def _busiest_tile(index, z):
+    """缩放级别z下点数最多的瓦片坐标"""
+    lon, lat = index.longitude, index.latitude
+    n = 1 << z
+    x = ((lon + 180) / 360 * n).astype(np.int64)
+    y = ((1 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2 * n).astype(np.int64)
+    keys, counts = np.unique(y * n + x, return_counts=True)
+    key = int(keys[np.argmax(counts)])
+    return key % n, key // n
+
+
+def test_render_tile():
+    store = _load_store()
+    index = GridIndex(store.raw('longitude'), store.raw('latitude'))
+    full_zoom = Config.TILE_FULL_DETAIL_ZOOM
+
+    # 完整细节级别：每条瓦片范围内的记录都是一个要素
+    x, y = _busiest_tile(index, full_zoom)
+    start = time.perf_counter()
+    tile = render_tile(store, index, 'ais', full_zoom, x, y, full_zoom)
+    render_ms = (time.perf_counter() - start) * 1000
+    name, extent, features = decode_tile(tile)
+    rows = index.query(*tile_bounds(full_zoom, x, y))
+    assert name == 'ais' and extent == EXTENT
+    assert sorted(feature[0] for feature in features) == rows.tolist()
+    assert all(0 <= fx < EXTENT and 0 <= fy < EXTENT for _, fx, fy, _ in features)
+    records = {row: record for row, record in zip(rows.tolist(), store.to_dicts(rows))}
+    for feature_id, _, _, properties in features[:50]:
+        assert properties['mmsi'] == records[feature_id]['mmsi']
+        assert properties['timestamp'] == records[feature_id]['timestamp']
+        assert properties['point_count'] == 1
+
+    # 低缩放级别抽稀：要素少于瓦片内的记录，合并的点数之和等于记录数
+    low_zoom = 4
+    x, y = _busiest_tile(index, low_zoom)
+    _, _, thinned = decode_tile(render_tile(store, index, 'ais', low_zoom, x, y, full_zoom))
+    total = len(index.query(*tile_bounds(low_zoom, x, y)))
+    assert len(thinned) < total
+    assert sum(properties['point_count'] for _, _, _, properties in thinned) == total
+
+    # 没有记录的瓦片为空
+    assert render_tile(store, index, 'ais', full_zoom, 0, 0, full_zoom) == b''
+    print(f"缩放级别{full_zoom}瓦片: {len(features)} 个要素, {len(tile)} 字节, {render_ms:.1f} ms; "
+          f"缩放级别{low_zoom}: {total} 条记录抽稀为 {len(thinned)} 个要素")
+
+
+def test_tile_cache():
+    cache = TileCache(2)
+    cache.put('a', b'1')
+    cache.put('b', b'2')
+    assert cache.get('a') == b'1'
+    cache.put('c', b'3')  # 淘汰最久未使用的b
+    assert cache.get('b') is None and cache.get('c') == b'3'
+    assert cache.stats() == {'size': 2, 'capacity': 2, 'hits': 2, 'misses': 1}
+
+
+def test_tiles_endpoint():
+    client = server.app.test_client()
+    store = _load_store()
+    index = GridIndex(store.raw('longitude'), store.raw('latitude'))
+    try:
+        server.processed_data = {'metadata': {}, 'ais_data': store, 'adsb_data': TrackStore(AISData),
+                                 'coverage_layers': [], 'status_summary': {}}
+        server.last_update_time = datetime.now()
+        server.data_processor.spatial_indexes = {'ais': index}
+        server.tile_cache.clear()
+
+        z = 8
+        x, y = _busiest_tile(index, z)
+        response = client.get(f'/tiles/ais/{z}/{x}/{y}.pbf')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/vnd.mapbox-vector-tile'
+        assert decode_tile(response.data)[2]
+
+        hits = server.tile_cache.hits
+        cached = client.get(f'/tiles/ais/{z}/{x}/{y}.pbf', headers={'If-None-Match': response.headers['ETag']})
+        assert cached.status_code == 304 and server.tile_cache.hits == hits + 1
+
+        assert client.get(f'/tiles/ais/{z}/{1 << z}/0.pbf').status_code == 400
+        assert client.get('/tiles/adsb/0/0/0.pbf').status_code == 503
+    finally:
+        server.processed_data = None
+        server.last_update_time = None
+        server.data_processor.spatial_indexes = {}
+        server.tile_cache.clear()
+
+
+if __name__ == "__main__":
+    test_render_tile()
+    test_tile_cache()
+    test_tiles_endpoint()
+    print("矢量瓦片测试通过")